@@ -13,15 +13,27 @@ Provides a simple user-friendly interface for interacting with the FractalFlow a
 """
 
 import os
+import time
+import uuid
 import asyncio
-from typing import Dict, Any, Optional, List
+from contextlib import suppress
+from typing import Dict, Any, Optional, List, AsyncIterator
 
 from .core.orchestrator import Orchestrator
 from .core.query_processor import QueryProcessor
 from .core.tool_executor import ToolExecutor
-from .infra.config import ConfigManager
+from .core.scheduler import get_scheduler, priority as scheduler_priority
+from .core.response_cache import get_response_cache, make_scope
+from .infra.config import ConfigManager, call_path_scope
+from .infra import budget as budgets, events, tracing
+from .infra.loop_monitor import get_loop_monitor
+from .mcpcore.resource_monitor import get_resource_monitor
 from .infra.logging_utils import get_logger
 
+def is_remote_tool(tool_path: str) -> bool:
+    """Whether a tool location is the URL of a running MCP server rather than a script."""
+    return tool_path.startswith(('http://', 'https://'))
+
 class Agent:
     """
     Main interface for using the FractalFlow agent.
@@ -30,23 +42,27 @@ class Agent:
     the FractalFlow agent system.
     """
     
-    def __init__(self, config: ConfigManager, name: str = 'agent'):
+    def __init__(self, config: ConfigManager, name: str = 'agent', session_id: Optional[str] = None):
         """
         Initialize the FractalFlow agent.
         
         Args:
-            config: ConfigManager instance with all configuration settings
+            config: ConfigManager instance with all configuration settings; the agent
+                    keeps a frozen snapshot, so later changes do not affect it
             name: Name for the agent
+            session_id: Conversation to resume when a history store is configured
+                        (history.store); a new ID is generated if not given
         """
-        # Use provided configuration
-        self.config = config
+        # Freeze the configuration; a snapshot is shared as is
+        self.config = config.snapshot()
         self.name = name
+        self.session_id = session_id or uuid.uuid4().hex
         
         # Push agent name to call path
-        self.config.push_to_call_path(self.name)
+        self.call_path = self.config.push_to_call_path(self.name)
         
         # Initialize logger with call path
-        self.logger = get_logger(self.config.get_call_path())
+        self.logger = get_logger(self.call_path)
         
         # Initialize tool configs
         self.tool_configs = {}
@@ -59,18 +75,33 @@ class Agent:
         
         self.logger.info(f"Agent '{self.name}' initialized")
         
-    def add_tool(self, tool_path: str, tool_name: str) -> None:
+    def add_tool(self, tool_path: str, tool_name: str, replicas: int = 1,
+                 transport: Optional[str] = None) -> None:
         """
         Add a tool to the agent.
         
         Args:
-            tool_path: Path to the tool script
+            tool_path: Path to the tool script, or the http(s) URL of an already
+                       running MCP server (e.g. one started with `--http`)
             tool_name: Optional name for the tool. If not provided, the basename of the path will be used.
+            replicas: Number of server processes to launch for CPU-heavy tools.
+                      Calls are routed to the replica with the fewest calls in flight.
+            transport: For URLs, 'streamable-http' or 'sse'. Defaults to 'sse' for
+                       URLs ending in /sse and 'streamable-http' otherwise.
         """
+        if is_remote_tool(tool_path):
+            if transport is None:
+                transport = 'sse' if tool_path.rstrip('/').endswith('/sse') else 'streamable-http'
+            self.tool_configs[tool_name] = {'url': tool_path, 'transport': transport}
+            return
+        
         if not os.path.exists(tool_path):
             raise ValueError(f"Tool script not found: {tool_path}")
         
-        self.tool_configs[tool_name] = tool_path
+        if replicas > 1:
+            self.tool_configs[tool_name] = {'path': tool_path, 'replicas': replicas}
+        else:
+            self.tool_configs[tool_name] = tool_path
     
     def _ensure_initialized(self) -> None:
         """Initialize components if they haven't been initialized yet."""
@@ -80,18 +111,24 @@ class Agent:
             
             self.logger.debug("Initializing agent components")
             
-            # Create components with the config_manager
-            self._orchestrator = Orchestrator(
-                tool_configs=self.tool_configs,
-                provider=provider,
-                config=self.config
-            )
-            self._tool_executor = ToolExecutor(config=self.config)
-            self._query_processor = QueryProcessor(
-                self._orchestrator, 
-                self._tool_executor,
-                config=self.config
-            )
+            # Create components with the config_manager, logging under the agent's call path
+            with call_path_scope(self.call_path):
+                self._orchestrator = Orchestrator(
+                    tool_configs=self.tool_configs,
+                    provider=provider,
+                    config=self.config,
+                    session_id=self.session_id
+                )
+                self._tool_executor = ToolExecutor(
+                    config=self.config,
+                    client_pool=self._orchestrator.client_pool,
+                    session_id=f"{self.name}-{id(self):x}"
+                )
+                self._query_processor = QueryProcessor(
+                    self._orchestrator, 
+                    self._tool_executor,
+                    config=self.config
+                )
             self._is_initialized = True
             
             self.logger.info("Agent components initialized")
@@ -107,19 +144,26 @@ class Agent:
         """Shut down the agent system."""
         if self._orchestrator:
             self.logger.info("Shutting down agent system")
+            self._tool_executor.shutdown()
             await self._orchestrator.shutdown()
             self._is_initialized = False
             self.logger.info("Agent system shut down")
     
-    async def process_query(self, query: str) -> str:
+    async def process_query(self, query: str, priority: Optional[str] = None,
+                            budget: Optional[budgets.Budget] = None) -> str:
         """
         Process a user query.
         
         Args:
             query: The user's input query
+            priority: Scheduling priority of the query's tool calls, 'interactive' or
+                      'batch' (defaults to the agent's scheduler.priority setting)
+            budget: Time, LLM call and token budget shared with the nested agents
+                    (defaults to the budget of a calling agent, or one built from
+                    the agent.budget_* settings)
             
         Returns:
-            The agent's response
+            The agent's response, partial if the budget ran out
         """
         # Initialize if not already initialized
         self._ensure_initialized()
@@ -132,17 +176,232 @@ class Agent:
         # Log the incoming query
         self.logger.info(f"Processing query", {"query": query})
         
-        # Process the query
-        result = await self._query_processor.process_query(query)
+        # The budget of a calling agent takes precedence over our own settings
+        owned_budget = None
+        if budget is None and budgets.current() is None:
+            owned_budget = budgets.Budget(
+                time_limit=self.config.get('agent.budget_time', 0.0),
+                llm_calls=self.config.get('agent.budget_llm_calls', 0),
+                tokens=self.config.get('agent.budget_tokens', 0)
+            )
+            if owned_budget.is_limited:
+                budget = owned_budget
         
-        return result 
+        try:
+            with budgets.attach(budget):
+                return await self._process_query(query, priority)
+        finally:
+            if owned_budget is not None:
+                owned_budget.close()
+    
+    async def stream_query(self, query: str, priority: Optional[str] = None,
+                           budget: Optional[budgets.Budget] = None,
+                           heartbeat: Optional[float] = None) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Process a user query, yielding progress events while it runs.
         
-    def get_history(self) -> List[Dict[str, Any]]:
+        Events are dictionaries with a 'type': 'token' (a piece of the model's
+        response in 'content'), 'tool_start' and 'tool_end' (with 'tool', and
+        'status', 'duration' and a 'result' preview at the end), 'heartbeat'
+        when nothing happened for `heartbeat` seconds, and finally 'final' with
+        the answer in 'content'. Closing the iterator early (e.g. because the
+        client disconnected) cancels the query, including running tool calls.
+        
+        Args:
+            query: The user's input query
+            priority: Scheduling priority of the query's tool calls (see process_query)
+            budget: Time, LLM call and token budget (see process_query)
+            heartbeat: Seconds of silence after which a heartbeat event is yielded
+                       (None for no heartbeats)
+            
+        Yields:
+            Event dictionaries, ending with the 'final' event
+        """
+        queue: asyncio.Queue = asyncio.Queue()
+        
+        async def run() -> str:
+            with events.attach(queue.put_nowait):
+                return await self.process_query(query, priority, budget)
+        
+        task = asyncio.create_task(run())
+        task.add_done_callback(lambda _: queue.put_nowait(None))
+        try:
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), heartbeat)
+                except asyncio.TimeoutError:
+                    yield {"type": "heartbeat", "time": time.time()}
+                    continue
+                if event is None:
+                    break
+                yield event
+            yield {"type": "final", "time": time.time(), "content": task.result()}
+        finally:
+            if not task.done():
+                self.logger.info("Query cancelled by the consumer of its events")
+                task.cancel()
+                with suppress(asyncio.CancelledError):
+                    await task
+    
+    async def _process_query(self, query: str, priority: Optional[str]) -> str:
+        """Process a user query under the current budget."""
+        # Child span of the calling agent's tool call, or the root of a new trace
+        with tracing.span(f"query:{self.name}", query=query[:200]) as attributes:
+            trace = tracing.current()
+            if trace is not None:
+                self.logger.debug("Tracing query", {"trace_id": trace[0]})
+            
+            # Answers of fresh sessions can be served from the response cache
+            cache_scope = await self._response_cache_scope()
+            if cache_scope is not None:
+                cached = get_response_cache().get(
+                    cache_scope, query, self.config.get('agent.response_cache_similarity', 0.9))
+                if cached is not None:
+                    self.logger.info("Answered from response cache", {"query": query})
+                    if attributes is not None:
+                        attributes['cached'] = True
+                    model = self._orchestrator.get_model()
+                    model.add_user_message(query)
+                    model.add_assistant_message(cached)
+                    return cached
+            
+            # Process the query
+            with scheduler_priority(priority or self.config.get('scheduler.priority', 'interactive')):
+                result = await self._query_processor.process_query(query)
+            
+            if cache_scope is not None and self._query_processor.last_answered:
+                get_response_cache().put(
+                    cache_scope, query, result, self.config.get('agent.response_cache_ttl', 3600.0))
+            
+            return result
+    
+    async def _response_cache_scope(self) -> Optional[str]:
+        """
+        Fingerprint the context of a new query for the response cache.
+        
+        Returns:
+            The cache scope, or None if the cache is disabled or the session
+            already has turns that could change the answer
+        """
+        if not self.config.get('agent.response_cache', False):
+            return None
+        messages = self._orchestrator.get_history()
+        if any(message.get("role") != "system" for message in messages):
+            return None
+        
+        tools = await self._orchestrator.get_available_tools()
+        model = self._orchestrator.get_model()
+        return make_scope(
+            self.config.get('agent.provider'),
+            getattr(model, 'model', None),
+            [message.get("content") for message in messages],
+            sorted((tool["function"]["name"], tool["function"].get("description", "")) for tool in tools),
+        )
+        
+    def get_history(self, limit: Optional[int] = None, before: Optional[int] = None) -> List[Dict[str, Any]]:
         """
         Get the conversation history from the current session.
         
+        Args:
+            limit: Return only the last `limit` messages of the whole transcript,
+                   including those no longer kept in memory
+            before: Return only messages of the transcript before this position
+                    (to load older messages page by page)
+        
+        Returns:
+            The current conversation history as a list of message dictionaries,
+            or without system messages the requested page of the transcript
+        """
+        self._ensure_initialized()
+        return self._query_processor.get_history(limit=limit, before=before)
+    
+    async def reload_history(self) -> None:
+        """
+        Bring the conversation in memory up to date with the history store.
+        
+        Agents that share a session ID (e.g. one per assistant mode) persist
+        their turns to the same transcript; reloading before an agent takes
+        over the conversation lets it see the turns the others added.
+        """
+        self._ensure_initialized()
+        await self._orchestrator.reload_history()
+    
+    def get_tool_stats(self) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Get load statistics for the agent's tool servers.
+        
+        Returns:
+            Dictionary mapping tool names to per-replica statistics, including
+            the number of calls in flight (queue depth) and restart counts
+        """
+        self._ensure_initialized()
+        return self._orchestrator.client_pool.get_stats()
+    
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """
+        Get tool result cache statistics.
+        
+        Returns:
+            Dictionary with hit/miss counters, the hit rate and per-tool counts, and
+            under 'coalescing' the number of duplicate concurrent calls that were
+            joined (both are shared by all agents in the process)
+        """
+        self._ensure_initialized()
+        return self._orchestrator.client_pool.get_cache_stats()
+    
+    def get_scheduler_stats(self) -> Dict[str, Any]:
+        """
+        Get statistics of the tool scheduler shared by all sessions on the event loop.
+        
+        Must be called from within the event loop.
+        
+        Returns:
+            Dictionary with running and queued calls and queue-wait times per tool and priority
+        """
+        return get_scheduler().get_stats()
+    
+    def get_response_cache_stats(self) -> Dict[str, Any]:
+        """
+        Get statistics of the response cache shared by all agents in the process.
+        
+        Returns:
+            Dictionary with entry count, exact and near hits, misses and hit rate
+        """
+        return get_response_cache().get_stats()
+    
+    def get_loop_stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Get the event loop stalls seen in this process (see monitor.loop_threshold).
+        
+        Stalls inside tool servers are reported by the servers themselves, in their
+        logs and in monitor.loop_report_dir.
+        
+        Returns:
+            Dictionary keyed by tool or code location with stall counts, total and
+            maximum blocked time, and the stack of the longest stall
+        """
+        return get_loop_monitor().get_stats()
+    
+    def resource_report(self) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Sample the CPU, memory and open files of the agent's tool servers.
+        
+        Each server is measured together with its subprocesses and the servers of
+        nested agents it runs. Limits are set with monitor.rss_limit_mb and
+        monitor.fd_limit.
+        
         Returns:
-            The current conversation history as a list of message dictionaries
+            Dictionary mapping tool names to per-replica samples with 'pid',
+            'processes', 'rss' and 'peak_rss' (bytes), 'cpu_percent', 'fds',
+            'threads' and 'last_tool'; samples are empty for servers not running
         """
         self._ensure_initialized()
-        return self._query_processor.get_history() 
\ No newline at end of file
+        monitor = get_resource_monitor()
+        report = {}
+        for client_name, connection in self._orchestrator.client_pool.clients.items():
+            replicas = getattr(connection, 'replicas', [connection])
+            report[client_name] = [
+                {"replica": replica.name, **monitor.sample_connection(replica)}
+                for replica in replicas
+            ]
+        return report
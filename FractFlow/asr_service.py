@@ -0,0 +1,414 @@
+"""
+Host-wide speech recognition service.
+
+Loading the SenseVoice model takes seconds and hundreds of megabytes, so it is
+loaded once per host by a worker process that every client shares: the API
+gateway, voice assistants (AudioInput) and tool servers. The worker listens
+on 127.0.0.1:FRACTFLOW_ASR_PORT; the port doubles as a host-wide lock, so when
+several clients start a worker at the same time only one survives. Clients
+start the worker on first use and send audio in memory (WAV bytes or raw
+16-bit PCM), without temporary files.
+
+Concurrent requests are micro-batched: the worker waits a few milliseconds
+after the first request for others to arrive and runs them through the model
+together, which is much cheaper on CPU than one inference per request.
+
+    python -m FractFlow.asr_service   # run the worker in the foreground
+
+Configuration (environment): FRACTFLOW_ASR_MODEL (model name or path,
+default iic/SenseVoiceSmall), FRACTFLOW_ASR_DEVICE (default cpu),
+FRACTFLOW_ASR_PORT (default 47615), FRACTFLOW_ASR_MAX_BATCH (default 8),
+FRACTFLOW_ASR_BATCH_WINDOW (seconds, default 0.02) and
+FRACTFLOW_ASR_IDLE_TIMEOUT (seconds without requests after which the worker
+exits, default 1800, 0 to never exit).
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import wave
+import socket
+import struct
+import asyncio
+import logging
+import argparse
+import threading
+import subprocess
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+ASR_HOST = '127.0.0.1'
+ASR_SAMPLE_RATE = 16000
+DEFAULT_ASR_PORT = 47615
+DEFAULT_ASR_MODEL = 'iic/SenseVoiceSmall'
+
+_LENGTH = struct.Struct('!I')
+
+def asr_port() -> int:
+    """Port of the host's ASR worker."""
+    return int(os.environ.get('FRACTFLOW_ASR_PORT', DEFAULT_ASR_PORT))
+
+def decode_audio(data: bytes, audio_format: str = 'wav', sample_rate: int = ASR_SAMPLE_RATE,
+                 channels: int = 1) -> Any:
+    """
+    Convert audio bytes to the model's input: mono float32 samples at 16 kHz.
+
+    Args:
+        data: WAV file content, or raw little-endian 16-bit PCM
+        audio_format: 'wav' or 'pcm'
+        sample_rate: Sample rate of raw PCM (WAV files carry their own)
+        channels: Number of interleaved channels of raw PCM
+
+    Returns:
+        A 1-D numpy float32 array
+
+    Raises:
+        ValueError: If the audio cannot be decoded
+    """
+    import numpy as np
+
+    channels = max(1, channels)
+    if audio_format == 'wav':
+        try:
+            with wave.open(io.BytesIO(data), 'rb') as wav:
+                if wav.getsampwidth() != 2:
+                    raise ValueError("Only 16-bit WAV audio is supported")
+                channels = wav.getnchannels()
+                sample_rate = wav.getframerate()
+                data = wav.readframes(wav.getnframes())
+        except (wave.Error, EOFError) as e:
+            raise ValueError(f"Invalid WAV audio: {e}") from e
+    elif audio_format != 'pcm':
+        raise ValueError(f"Unsupported audio format: {audio_format}")
+
+    samples = np.frombuffer(data[:len(data) - len(data) % (2 * channels)], dtype='<i2').astype(np.float32) / 32768.0
+    if channels > 1:
+        samples = samples.reshape(-1, channels).mean(axis=1)
+    if sample_rate != ASR_SAMPLE_RATE and len(samples):
+        duration = len(samples) / sample_rate
+        target = np.linspace(0, duration, int(duration * ASR_SAMPLE_RATE), endpoint=False)
+        samples = np.interp(target, np.arange(len(samples)) / sample_rate, samples).astype(np.float32)
+    return samples
+
+def clean_transcript(text: str) -> str:
+    """Strip SenseVoice's language, emotion and event tags (<|zh|><|NEUTRAL|>...)."""
+    return text.split('>')[-1].strip()
+
+async def _read_frame(reader: asyncio.StreamReader) -> bytes:
+    (size,) = _LENGTH.unpack(await reader.readexactly(_LENGTH.size))
+    return await reader.readexactly(size)
+
+def _frame(data: bytes) -> bytes:
+    return _LENGTH.pack(len(data)) + data
+
+class ASRWorker:
+    """
+    Server side: owns the model and runs micro-batched inference.
+    """
+
+    def __init__(self, model: Any = None, max_batch: int = 8, batch_window: float = 0.02,
+                 idle_timeout: float = 0.0):
+        """
+        Initialize the worker.
+
+        Args:
+            model: Loaded model with a funasr-style generate(), or None to load
+                   FRACTFLOW_ASR_MODEL when serving starts
+            max_batch: Maximum number of requests per inference
+            batch_window: Seconds to wait after the first request for more to batch
+            idle_timeout: Seconds without requests after which serve() returns (0 for never)
+        """
+        self.model = model
+        self.max_batch = max(1, max_batch)
+        self.batch_window = batch_window
+        self.idle_timeout = idle_timeout
+        self._queue: Optional[asyncio.Queue] = None
+        self._last_request = time.monotonic()
+        self.stats = {'requests': 0, 'batches': 0, 'errors': 0}
+
+    @staticmethod
+    def load_model() -> Any:
+        """Load the configured funasr model."""
+        from funasr import AutoModel
+        return AutoModel(
+            model=os.environ.get('FRACTFLOW_ASR_MODEL', DEFAULT_ASR_MODEL),
+            device=os.environ.get('FRACTFLOW_ASR_DEVICE', 'cpu'),
+            trust_remote_code=True,
+            disable_update=True,
+        )
+
+    async def transcribe(self, samples: Any, language: str = 'auto', use_itn: bool = False) -> str:
+        """
+        Queue decoded audio for the next batch and wait for its transcript.
+
+        Args:
+            samples: Mono float32 samples at 16 kHz (see decode_audio)
+            language: Language hint ('auto', 'zh', 'en', ...)
+            use_itn: Whether to apply inverse text normalization (punctuation, numbers)
+
+        Returns:
+            The recognized text
+        """
+        future = asyncio.get_running_loop().create_future()
+        self._last_request = time.monotonic()
+        await self._queue.put(((language, use_itn), samples, future))
+        return await future
+
+    async def _batcher(self) -> None:
+        """Collect queued requests into batches and run them one batch at a time."""
+        while True:
+            first = await self._queue.get()
+            batch = [first]
+            deadline = time.monotonic() + self.batch_window
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+
+            # Requests with different options cannot share an inference
+            groups: Dict[Tuple[str, bool], List[Tuple[Any, asyncio.Future]]] = {}
+            for options, samples, future in batch:
+                groups.setdefault(options, []).append((samples, future))
+            for (language, use_itn), items in groups.items():
+                try:
+                    results = await asyncio.to_thread(
+                        self.model.generate,
+                        input=[samples for samples, _ in items],
+                        cache={},
+                        language=language,
+                        use_itn=use_itn,
+                        batch_size=len(items),
+                    )
+                    texts = [clean_transcript(result.get('text', '')) for result in results]
+                    if len(texts) != len(items):
+                        raise RuntimeError(f"Model returned {len(texts)} results for {len(items)} inputs")
+                except Exception as e:
+                    self.stats['errors'] += 1
+                    logger.exception("ASR inference failed")
+                    for _, future in items:
+                        if not future.done():
+                            future.set_exception(e)
+                    continue
+                self.stats['batches'] += 1
+                for (_, future), text in zip(items, texts):
+                    if not future.done():
+                        future.set_result(text)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Serve the requests of one client connection."""
+        try:
+            while True:
+                try:
+                    header = json.loads(await _read_frame(reader))
+                    if not isinstance(header, dict):
+                        raise ValueError("header is not a JSON object")
+                except asyncio.IncompleteReadError:
+                    return
+                except ValueError as e:
+                    # Without a valid header it is unknown whether an audio frame follows
+                    response = {'error': f"Malformed request header: {e}"}
+                    writer.write(_frame(json.dumps(response, ensure_ascii=False).encode('utf-8')))
+                    await writer.drain()
+                    return
+                if header.get('op') == 'stats':
+                    response = dict(self.stats, pid=os.getpid())
+                else:
+                    audio = await _read_frame(reader)
+                    self.stats['requests'] += 1
+                    try:
+                        # Resampling long recordings takes a while; keep the batcher responsive
+                        samples = await asyncio.to_thread(
+                            decode_audio, audio, header.get('format', 'wav'),
+                            int(header.get('sample_rate', ASR_SAMPLE_RATE)), int(header.get('channels', 1)))
+                    except ValueError as e:
+                        response = {'error': str(e), 'invalid_audio': True}
+                    except Exception as e:
+                        response = {'error': f"{type(e).__name__}: {e}"}
+                    else:
+                        try:
+                            text = await self.transcribe(samples, header.get('language', 'auto'),
+                                                         bool(header.get('use_itn', False)))
+                            response = {'text': text}
+                        except Exception as e:
+                            response = {'error': f"{type(e).__name__}: {e}"}
+                writer.write(_frame(json.dumps(response, ensure_ascii=False).encode('utf-8')))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host: str = ASR_HOST, port: Optional[int] = None,
+                    ready: Optional[threading.Event] = None) -> None:
+        """
+        Accept clients until the idle timeout expires.
+
+        Args:
+            host: Address to listen on
+            port: Port to listen on (defaults to FRACTFLOW_ASR_PORT)
+            ready: Event set once the port is bound
+
+        Raises:
+            OSError: If the port is taken, i.e. another worker already serves this host
+        """
+        self._queue = asyncio.Queue()
+        # Bind before loading the model: the port is the lock that keeps other
+        # workers from loading it too; early clients wait in the backlog
+        server = await asyncio.start_server(self._handle, host, port or asr_port())
+        if ready is not None:
+            ready.set()
+        async with server:
+            if self.model is None:
+                logger.info("Loading ASR model")
+                self.model = await asyncio.to_thread(self.load_model)
+            batcher = asyncio.create_task(self._batcher())
+            try:
+                while True:
+                    await asyncio.sleep(min(self.idle_timeout, 60.0) if self.idle_timeout else 3600.0)
+                    if self.idle_timeout and time.monotonic() - self._last_request > self.idle_timeout:
+                        logger.info("ASR worker idle, exiting")
+                        return
+            finally:
+                batcher.cancel()
+
+class ASRClient:
+    """
+    Client side: sends audio to the host's ASR worker, starting it if needed.
+    """
+
+    def __init__(self, host: str = ASR_HOST, port: Optional[int] = None, timeout: float = 120.0):
+        """
+        Initialize the client.
+
+        Args:
+            host: Address of the worker
+            port: Port of the worker (defaults to FRACTFLOW_ASR_PORT)
+            timeout: Seconds to wait for a transcript, including a model load
+        """
+        self.host = host
+        self.port = port or asr_port()
+        self.timeout = timeout
+        self._start_lock = threading.Lock()
+
+    def _spawn_worker(self) -> None:
+        """Start a detached worker; it exits on its own if another one wins the port."""
+        package_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        env = dict(os.environ, FRACTFLOW_ASR_PORT=str(self.port))
+        env['PYTHONPATH'] = os.pathsep.join(filter(None, [package_root, env.get('PYTHONPATH')]))
+        subprocess.Popen(
+            [sys.executable, '-m', 'FractFlow.asr_service'],
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            env=env,
+            start_new_session=True,
+        )
+
+    def _connect(self) -> socket.socket:
+        """Connect to the worker, starting one if none is running."""
+        try:
+            return socket.create_connection((self.host, self.port), timeout=self.timeout)
+        except OSError:
+            pass
+        with self._start_lock:
+            deadline = time.monotonic() + 30.0
+            spawned = False
+            while True:
+                try:
+                    return socket.create_connection((self.host, self.port), timeout=self.timeout)
+                except OSError:
+                    if time.monotonic() > deadline:
+                        raise RuntimeError(f"ASR worker did not start on port {self.port}")
+                if not spawned:
+                    self._spawn_worker()
+                    spawned = True
+                time.sleep(0.1)
+
+    def _request(self, header: Dict[str, Any], audio: Optional[bytes] = None) -> Dict[str, Any]:
+        with self._connect() as conn:
+            conn.sendall(_frame(json.dumps(header).encode('utf-8')) + (_frame(audio) if audio is not None else b''))
+            stream = conn.makefile('rb')
+            (size,) = _LENGTH.unpack(stream.read(_LENGTH.size))
+            return json.loads(stream.read(size))
+
+    def transcribe(self, audio: bytes, audio_format: str = 'wav', sample_rate: int = ASR_SAMPLE_RATE,
+                   language: str = 'auto', use_itn: bool = False, channels: int = 1) -> str:
+        """
+        Recognize speech in memory.
+
+        Args:
+            audio: WAV file content, or raw little-endian 16-bit PCM
+            audio_format: 'wav' or 'pcm'
+            sample_rate: Sample rate of raw PCM
+            language: Language hint ('auto', 'zh', 'en', ...)
+            use_itn: Whether to apply inverse text normalization
+            channels: Number of interleaved channels of raw PCM
+
+        Returns:
+            The recognized text
+
+        Raises:
+            ValueError: If the audio cannot be decoded
+            RuntimeError: If the worker cannot be reached or recognition fails
+        """
+        header = {'format': audio_format, 'sample_rate': sample_rate, 'channels': channels,
+                  'language': language, 'use_itn': use_itn}
+        try:
+            response = self._request(header, audio)
+        except (OSError, struct.error, ValueError) as e:
+            raise RuntimeError(f"ASR request failed: {e}") from e
+        if response.get('invalid_audio'):
+            raise ValueError(response['error'])
+        if 'error' in response:
+            raise RuntimeError(f"ASR failed: {response['error']}")
+        return response['text']
+
+    async def atranscribe(self, audio: bytes, audio_format: str = 'wav', sample_rate: int = ASR_SAMPLE_RATE,
+                          language: str = 'auto', use_itn: bool = False, channels: int = 1) -> str:
+        """Recognize speech without blocking the event loop (see transcribe)."""
+        return await asyncio.to_thread(self.transcribe, audio, audio_format, sample_rate, language, use_itn, channels)
+
+    def stats(self) -> Dict[str, Any]:
+        """Request, batch and error counts of the worker."""
+        return self._request({'op': 'stats'})
+
+_asr_client: Optional[ASRClient] = None
+
+def get_asr_client() -> ASRClient:
+    """
+    Get the process-wide ASR client.
+
+    Returns:
+        The shared ASRClient instance
+    """
+    global _asr_client
+    if _asr_client is None:
+        _asr_client = ASRClient()
+    return _asr_client
+
+def main() -> None:
+    """Run the ASR worker of this host."""
+    parser = argparse.ArgumentParser(description='FractFlow speech recognition worker')
+    parser.add_argument('--port', type=int, default=None, help='Port to listen on (defaults to $FRACTFLOW_ASR_PORT)')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s asr_service %(levelname)s %(message)s')
+
+    worker = ASRWorker(
+        max_batch=int(os.environ.get('FRACTFLOW_ASR_MAX_BATCH', 8)),
+        batch_window=float(os.environ.get('FRACTFLOW_ASR_BATCH_WINDOW', 0.02)),
+        idle_timeout=float(os.environ.get('FRACTFLOW_ASR_IDLE_TIMEOUT', 1800)),
+    )
+    try:
+        asyncio.run(worker.serve(port=args.port))
+    except OSError as e:
+        logger.info(f"Not starting: another ASR worker serves this host ({e})")
+
+if __name__ == '__main__':
+    main()
@@ -1,10 +1,10 @@
 import pyaudio
 import webrtcvad
-import wave
 import threading
 import time
 from queue import Queue
-from funasr import AutoModel
+
+from FractFlow.asr_service import get_asr_client
 
 class AudioInput:
     def __init__(self, rate=16000, channels=1, chunk=1024, vad_mode=3):
@@ -24,11 +24,8 @@ class AudioInput:
         self._audio_buffer = []
         self.last_active_time = time.time()
         
-        # ASR模型
-        self.asr_model = AutoModel(
-            model=r"E:\mnt\e\LLM\ModelScope\SenseVoiceSmall",
-            trust_remote_code=True,
-        )
+        # ASR由本机共享的识别进程完成，模型每台主机只加载一次（见 asr_service）
+        self.asr = get_asr_client()
         
         # PyAudio初始化
         self._pyaudio = pyaudio.PyAudio()
@@ -187,27 +184,8 @@ class AudioInput:
             if not audio_data:
                 continue
                 
-            # 保存临时wav文件
-            temp_file = "temp_audio.wav"
-            with wave.open(temp_file, 'wb') as wf:
-                wf.setnchannels(self.channels)
-                wf.setsampwidth(2)  # 16-bit PCM
-                wf.setframerate(self.rate)
-                wf.writeframes(audio_data)
-            
-            # ASR识别
-            res = self.asr_model.generate(
-                input=temp_file,
-                cache={},
-                language="auto",
-                use_itn=False,
-            )
-            
-            # 删除临时文件
-            import os
-            os.remove(temp_file)
-            
-            text = res[0]['text'].split(">")[-1]
+            # ASR识别（直接发送内存中的PCM数据，无需临时文件）
+            text = self.asr.transcribe(audio_data, audio_format='pcm', sample_rate=self.rate, channels=self.channels)
             if text.strip():  # 如果识别出的文本不为空
                 return text
             print("\n未能识别语音，请重新说话...")
@@ -73,6 +73,37 @@ class BaseConversationHistory(ABC):
         """
         pass
     
+    def load_messages(self, limit: Optional[int] = None, before: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Page through the conversation transcript, without system messages.
+        
+        Histories that keep only recent messages in memory read older ones from
+        their store, so this may return messages that get_messages() does not.
+        
+        Args:
+            limit: Return only the last `limit` messages (None for all)
+            before: Return only messages before this position in the transcript
+            
+        Returns:
+            The messages in chronological order
+        """
+        messages = [msg for msg in self.get_messages() if msg["role"] != "system"]
+        if before is not None:
+            messages = messages[:max(0, before)]
+        if limit is not None:
+            messages = messages[-limit:] if limit > 0 else []
+        return messages
+    
+    def reload(self) -> None:
+        """
+        Refresh the messages in memory from the history's store.
+        
+        Histories backed by a store that other agents of the same session also
+        write to call this to see their turns; in-memory histories have nothing
+        to refresh.
+        """
+        pass
+    
     @abstractmethod
     def get_last_message(self) -> Optional[Dict[str, Any]]:
         """
@@ -130,6 +161,15 @@ class ConversationHistory(BaseConversationHistory):
         if system_prompt:
             self.add_system_message(system_prompt)
     
+    def _append(self, message: Dict[str, Any]) -> None:
+        """
+        Add a formatted message to the history.
+        
+        Args:
+            message: Message in OpenAI format
+        """
+        self.messages.append(message)
+    
     def add_system_message(self, content: str) -> None:
         """
         Add a system message to the conversation history.
@@ -137,7 +177,7 @@ class ConversationHistory(BaseConversationHistory):
         Args:
             content: The system message content
         """
-        self.messages.append({
+        self._append({
             "role": "system",
             "content": content
         })
@@ -149,7 +189,7 @@ class ConversationHistory(BaseConversationHistory):
         Args:
             content: The user message content
         """
-        self.messages.append({
+        self._append({
             "role": "user", 
             "content": content
         })
@@ -199,7 +239,7 @@ class ConversationHistory(BaseConversationHistory):
             if formatted_tool_calls:
                 message["tool_calls"] = formatted_tool_calls
             
-        self.messages.append(message)
+        self._append(message)
     
     def add_tool_result(self, tool_name: str, result: str, tool_call_id: Optional[str] = None) -> None:
         """
@@ -217,7 +257,7 @@ class ConversationHistory(BaseConversationHistory):
             "tool_call_id": tool_call_id or f"call_{tool_name}"
         }
             
-        self.messages.append(message)
+        self._append(message)
     
     def get_messages(self) -> List[Dict[str, Any]]:
         """
@@ -294,4 +334,89 @@ class ConversationHistory(BaseConversationHistory):
         # 记录带有横幅的标题
         log_func(f"===== {prefix} START =====")
         log_func(history_output)
-        log_func(f"===== {prefix} END =====") 
\ No newline at end of file
+        log_func(f"===== {prefix} END =====") 
+
+class PersistentConversationHistory(ConversationHistory):
+    """
+    Conversation history that is appended to a durable store.
+    
+    Only the system messages and a window of recent messages stay in memory and
+    are sent to the model; the window is cut at user messages so that tool
+    results never lose the assistant message that requested them. Older messages
+    remain available through load_messages(), and creating a history with the ID
+    of an existing session resumes it.
+    """
+    
+    def __init__(self, session_id: str, store: Any, window: int = 50, system_prompt: str = "",
+                 load: bool = True):
+        """
+        Initialize the history, loading the recent messages of an existing session.
+        
+        Args:
+            session_id: ID of the conversation in the store
+            store: Message store (see history_store.SQLiteHistoryStore)
+            window: Maximum number of non-system messages kept in memory
+            system_prompt: Initial system prompt to set (not persisted)
+            load: Load the session's recent messages now; pass False to call
+                  reload() later, e.g. from a worker thread
+        """
+        self.session_id = session_id
+        self.store = store
+        self.window = max(1, window)
+        super().__init__(system_prompt)
+        
+        # Resume from the most recent whole turns of the session
+        if load:
+            self.reload()
+            if len(self.messages) > (1 if system_prompt else 0):
+                logger.debug(f"Resumed session {session_id} with {len(self.messages)} messages in memory")
+    
+    def reload(self) -> None:
+        """Replace the messages in memory by the most recent whole turns in the store."""
+        recent = self.store.load(self.session_id, limit=self.window)
+        start = next((i for i, msg in enumerate(recent) if msg["role"] == "user"), 0)
+        system_messages = [msg for msg in self.messages if msg["role"] == "system"]
+        self.messages = system_messages + recent[start:]
+    
+    def _append(self, message: Dict[str, Any]) -> None:
+        """
+        Add a formatted message to the history and persist it.
+        
+        Args:
+            message: Message in OpenAI format
+        """
+        if message["role"] != "system":
+            self.store.append_nowait(self.session_id, message)
+        self.messages.append(message)
+        self._trim()
+    
+    def _trim(self) -> None:
+        """Drop the oldest turns from memory once the window is exceeded."""
+        body = [msg for msg in self.messages if msg["role"] != "system"]
+        if len(body) <= self.window:
+            return
+        turn_starts = [i for i, msg in enumerate(body) if msg["role"] == "user"]
+        # Keep the longest run of whole turns that fits, but never cut into the current turn
+        cut = next((i for i in turn_starts if len(body) - i <= self.window),
+                   turn_starts[-1] if turn_starts else len(body) - self.window)
+        if cut > 0:
+            system_messages = [msg for msg in self.messages if msg["role"] == "system"]
+            self.messages = system_messages + body[cut:]
+    
+    def load_messages(self, limit: Optional[int] = None, before: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Page through the stored conversation transcript, without system messages.
+        
+        Args:
+            limit: Return only the last `limit` messages (None for all)
+            before: Return only messages before this position in the transcript
+            
+        Returns:
+            The messages in chronological order
+        """
+        return self.store.load(self.session_id, limit=limit, before=before)
+    
+    def clear(self) -> None:
+        """Clear the conversation history and its stored messages, except for any system messages."""
+        super().clear()
+        self.store.delete(self.session_id)
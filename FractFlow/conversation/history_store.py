@@ -0,0 +1,200 @@
+"""
+Durable storage for conversation histories.
+
+Messages of persistent conversations (see PersistentConversationHistory) are
+appended to a local SQLite database, one row per message keyed by session ID
+and sequence number. The agent keeps only a window of recent messages in
+memory; older ones are read back on demand, and a conversation can be resumed
+from any process by its session ID. The database runs in WAL mode, so the
+agents of one machine can share it while they write. Appends made while a turn
+runs are written in order by a background thread, so the event loop never waits
+for the disk.
+"""
+
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HISTORY_PATH = os.path.join('~', '.cache', 'fractflow', 'history.sqlite3')
+
+class SQLiteHistoryStore:
+    """
+    Append-only message store backed by SQLite.
+
+    Sequence numbers of a session start at 0 and have no gaps, so they double as
+    message indices for paging through older messages.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        """
+        Initialize the store, creating the database if needed.
+
+        Args:
+            path: Database file (defaults to ~/.cache/fractflow/history.sqlite3),
+                  a 'file:' URI, or ':memory:' for a private in-memory store
+        """
+        self.path = path if _is_special(path) else os.path.expanduser(path or DEFAULT_HISTORY_PATH)
+        if not _is_special(self.path):
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='history-writer')
+        self._pending: Optional[Future] = None
+        self._db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None,
+                                   uri=self.path.startswith('file:'))
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS messages ("
+            " session_id TEXT NOT NULL,"
+            " seq INTEGER NOT NULL,"
+            " role TEXT NOT NULL,"
+            " data TEXT NOT NULL,"
+            " created REAL NOT NULL,"
+            " PRIMARY KEY (session_id, seq))"
+        )
+
+    def append(self, session_id: str, message: Dict[str, Any]) -> int:
+        """
+        Append a message to a session.
+
+        Args:
+            session_id: ID of the conversation
+            message: Message in OpenAI format
+
+        Returns:
+            Sequence number of the stored message
+        """
+        data = json.dumps(message, ensure_ascii=False, default=str)
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._db.execute(
+                    "SELECT COALESCE(MAX(seq), -1) + 1 FROM messages WHERE session_id = ?", (session_id,)
+                ).fetchone()
+                self._db.execute(
+                    "INSERT INTO messages (session_id, seq, role, data, created) VALUES (?, ?, ?, ?, ?)",
+                    (session_id, row[0], message.get('role', ''), data, time.time())
+                )
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+        return row[0]
+
+    def append_nowait(self, session_id: str, message: Dict[str, Any]) -> None:
+        """
+        Queue a message to be appended by the background writer.
+
+        Queued messages are written in order, and every read of the store waits
+        for them first.
+
+        Args:
+            session_id: ID of the conversation
+            message: Message in OpenAI format
+        """
+        self._pending = self._writer.submit(self._append_logged, session_id, message)
+
+    def _append_logged(self, session_id: str, message: Dict[str, Any]) -> None:
+        try:
+            self.append(session_id, message)
+        except Exception as e:
+            logger.error(f"Failed to persist message of session {session_id}: {e}")
+
+    def flush(self) -> None:
+        """Wait until all queued messages are written."""
+        pending = self._pending
+        if pending is not None:
+            pending.result()
+
+    def load(self, session_id: str, limit: Optional[int] = None,
+             before: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Load messages of a session in chronological order.
+
+        Args:
+            session_id: ID of the conversation
+            limit: Return only the last `limit` messages (None for all)
+            before: Return only messages with a sequence number below this one
+
+        Returns:
+            The messages
+        """
+        query = "SELECT data FROM messages WHERE session_id = ?"
+        params: List[Any] = [session_id]
+        if before is not None:
+            query += " AND seq < ?"
+            params.append(before)
+        query += " ORDER BY seq DESC"
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(limit)
+        self.flush()
+        with self._lock:
+            rows = self._db.execute(query, params).fetchall()
+        return [json.loads(row[0]) for row in reversed(rows)]
+
+    def count(self, session_id: str) -> int:
+        """Number of messages stored for a session."""
+        self.flush()
+        with self._lock:
+            return self._db.execute(
+                "SELECT COUNT(*) FROM messages WHERE session_id = ?", (session_id,)
+            ).fetchone()[0]
+
+    def delete(self, session_id: str) -> None:
+        """Delete all messages of a session."""
+        self.flush()
+        with self._lock:
+            self._db.execute("DELETE FROM messages WHERE session_id = ?", (session_id,))
+
+    def list_sessions(self) -> List[Dict[str, Any]]:
+        """
+        List the stored sessions, most recently active first.
+
+        Returns:
+            One dictionary per session with its ID, message count and last activity time
+        """
+        self.flush()
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT session_id, COUNT(*), MAX(created) FROM messages"
+                " GROUP BY session_id ORDER BY MAX(created) DESC"
+            ).fetchall()
+        return [{'session_id': row[0], 'messages': row[1], 'updated': row[2]} for row in rows]
+
+    def close(self) -> None:
+        """Write the queued messages and close the database connection."""
+        self._writer.shutdown(wait=True)
+        with self._lock:
+            self._db.close()
+
+def _is_special(path: Optional[str]) -> bool:
+    """Whether a database name is an in-memory database or URI rather than a file path."""
+    return path is not None and (path == ':memory:' or path.startswith('file:'))
+
+_history_stores: Dict[str, SQLiteHistoryStore] = {}
+_history_stores_lock = threading.Lock()
+
+def get_history_store(path: Optional[str] = None) -> SQLiteHistoryStore:
+    """
+    Get the process-wide history store for a database file.
+
+    Args:
+        path: Database file (defaults to ~/.cache/fractflow/history.sqlite3),
+              a 'file:' URI, or ':memory:'
+
+    Returns:
+        The shared SQLiteHistoryStore instance for that file
+    """
+    key = path if _is_special(path) else os.path.abspath(os.path.expanduser(path or DEFAULT_HISTORY_PATH))
+    with _history_stores_lock:
+        if key not in _history_stores:
+            _history_stores[key] = SQLiteHistoryStore(key)
+        return _history_stores[key]
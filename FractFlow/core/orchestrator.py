@@ -15,11 +15,12 @@ tool management, and initialization of the agent system.
 
 import os
 import json
+import asyncio
 from typing import Dict, List, Any, Optional
 
 from FractFlow.models.factory import create_model
 from FractFlow.models.base_model import BaseModel
-from FractFlow.infra.config import ConfigManager
+from FractFlow.infra.config import ConfigManager, call_path_scope
 from FractFlow.infra.error_handling import AgentError, handle_error, ConfigurationError
 from FractFlow.infra.logging_utils import get_logger
 
@@ -34,7 +35,8 @@ class Orchestrator:
     def __init__(self,
                  tool_configs: Optional[Dict[str, str]] = None,
                  provider: Optional[str] = None,
-                 config: Optional[ConfigManager] = None):
+                 config: Optional[ConfigManager] = None,
+                 session_id: Optional[str] = None):
         """
         Initialize the orchestrator.
         
@@ -44,6 +46,8 @@ class Orchestrator:
                                    'search': '/path/to/search_tool.py'}
             provider: The AI provider to use (e.g., 'openai', 'deepseek')
             config: Configuration manager instance to use
+            session_id: ID under which the conversation is persisted when a
+                        history store is configured (resuming an existing session)
         """
         # Create or use the provided config
         if config is None:
@@ -52,16 +56,26 @@ class Orchestrator:
             self.config = config
         
         # Push component name to call path
-        self.config.push_to_call_path("orchestrator")
+        self.call_path = self.config.push_to_call_path("orchestrator")
         
         # Initialize logger
-        self.logger = get_logger(self.config.get_call_path())
+        self.logger = get_logger(self.call_path)
         
         # Get provider from config or use provided override
         self.provider = provider or self.config.get('agent.provider', 'openai')
         
         # Create the model directly using factory with provider only
-        self.model = create_model(provider=self.provider, config=self.config)
+        with call_path_scope(self.call_path):
+            self.model = create_model(provider=self.provider, config=self.config)
+        
+        # Persist the conversation when a history store is configured
+        if session_id and self.config.get('history.store', ''):
+            self._attach_history_store(session_id)
+        
+        # Each orchestrator owns its client pool so that tool mappings and
+        # shutdown are scoped to this agent; server processes are still shared
+        from FractFlow.mcpcore.client_pool import MCPClientPool
+        self.client_pool = MCPClientPool()
         
         # Tool launcher will be initialized in self.start()
         self.launcher = None
@@ -78,29 +92,45 @@ class Orchestrator:
         
         Args:
             name: Name for the tool provider
-            provider_info: Path to the provider script
+            provider_info: Path to the provider script, or a dict with a 'path'
+                           key and optional server options such as 'replicas',
+                           or a dict with a 'url' key (and optional 'transport')
+                           for an already running HTTP server
         """
         if not self.launcher:
             # Store the config until we launch
             self.tool_configs[name] = provider_info
             self.logger.debug(f"Queued tool provider registration", {"name": name})
             return
-            
-        self.launcher.register_server(name, provider_info)
+        
+        if isinstance(provider_info, dict) and 'url' in provider_info:
+            self.launcher.register_remote_server(name, **provider_info)
+        elif isinstance(provider_info, dict):
+            options = dict(provider_info)
+            self.launcher.register_server(name, options.pop('path'), **options)
+        else:
+            self.launcher.register_server(name, provider_info)
         self.logger.debug(f"Registered tool provider", {"name": name})
         
-    def register_tools_from_config(self, tools_config: Dict[str, str]) -> None:
+    def register_tools_from_config(self, tools_config: Dict[str, Any]) -> None:
         """
         Register multiple tool providers from a configuration dictionary.
         
         Args:
             tools_config: Dictionary mapping tool names to their provider scripts
                           Example: {'weather': '/path/to/weather_agent.py',
-                                   'search': '/path/to/search_tool.py'}
+                                   'search': '/path/to/search_tool.py',
+                                   'video': {'path': '/path/to/video_mcp.py', 'replicas': 4},
+                                   'websearch': {'url': 'http://127.0.0.1:8000/mcp'}}
         """
-        for tool_name, script_path in tools_config.items():
+        for tool_name, provider_info in tools_config.items():
+            if isinstance(provider_info, dict) and 'url' in provider_info:
+                self.register_tool_provider(tool_name, provider_info)
+                self.logger.debug(f"Registered remote tool provider", {"name": tool_name, "url": provider_info['url']})
+                continue
+            script_path = provider_info['path'] if isinstance(provider_info, dict) else provider_info
             if os.path.exists(script_path):
-                self.register_tool_provider(tool_name, script_path)
+                self.register_tool_provider(tool_name, provider_info)
                 self.logger.debug(f"Registered tool provider", {"name": tool_name, "path": script_path})
             else:
                 self.logger.warning(f"Tool script not found", {"name": tool_name, "path": script_path})
@@ -116,7 +146,8 @@ class Orchestrator:
         {
             "tools": {
                 "tool_name1": "path/to/script1.py",
-                "tool_name2": "path/to/script2.py"
+                "tool_name2": {"path": "path/to/script2.py", "replicas": 4},
+                "tool_name3": {"url": "http://127.0.0.1:8000/mcp", "transport": "streamable-http"}
             }
         }
         """
@@ -146,13 +177,17 @@ class Orchestrator:
         self.logger.debug("Starting orchestrator")
         
         # Initialize MCP components
-        self.launcher = MCPLauncher()
-        self.tool_loader = MCPToolLoader()
+        with call_path_scope(self.call_path):
+            self.launcher = MCPLauncher(config=self.config, client_pool=self.client_pool)
+            self.tool_loader = MCPToolLoader(config=self.config)
         
         # Register tools from config
         if self.tool_configs:
             self.register_tools_from_config(self.tool_configs)
             
+        # Resume a persisted conversation
+        await self.reload_history()
+        
         # Launch all registered tool providers
         self.logger.debug("Launching tool providers")
         await self.launcher.launch_all()
@@ -176,11 +211,13 @@ class Orchestrator:
             raise ConfigurationError("Orchestrator not started")
             
         try:
-            # Get tools from all clients, not just the first one
+            # Get tools from all clients, not just the first one.
+            # Schemas are held by the pool, so lazily started servers need not be running.
             all_tools = []
-            for client_name, session in self.launcher.client_pool.clients.items():
+            client_pool = self.launcher.client_pool
+            for client_name in list(client_pool.clients):
                 try:
-                    client_tools = await self.tool_loader.load_tools(session)
+                    client_tools = self.tool_loader.convert_to_standard_format(client_pool.get_tools(client_name))
                     all_tools.extend(client_tools)
                     self.logger.debug(f"Loaded tools from client", {"client": client_name, "count": len(client_tools)})
                 except Exception as e:
@@ -212,10 +249,8 @@ class Orchestrator:
             for tool_name, tool_path in self.tool_configs.items():
                 # Find the client for this tool
                 if tool_name in self.launcher.client_pool.clients:
-                    session = self.launcher.client_pool.clients[tool_name]
                     try:
-                        response = await session.list_tools()
-                        function_names = [tool.name for tool in response.tools]
+                        function_names = [tool.name for tool in self.launcher.client_pool.get_tools(tool_name)]
                         mapping[tool_name] = function_names
                         self.logger.debug(f"Mapped tool", {"tool_name": tool_name, "functions": function_names})
                     except Exception as e:
@@ -231,6 +266,44 @@ class Orchestrator:
             
         return mapping
 
+    def _attach_history_store(self, session_id: str) -> None:
+        """
+        Replace the model's in-memory history by one persisted in the configured store.
+        
+        The recent messages of a resumed session are loaded by start(), so that
+        constructing an orchestrator on the event loop does no disk I/O.
+        
+        Args:
+            session_id: ID of the conversation in the store
+            
+        Raises:
+            ConfigurationError: If the configured store is not supported
+        """
+        store_type = self.config.get('history.store')
+        if store_type != 'sqlite':
+            raise ConfigurationError(f"Unsupported history store: {store_type}")
+        
+        # Import here to avoid circular imports
+        from FractFlow.conversation.base_history import PersistentConversationHistory
+        from FractFlow.conversation.history_store import get_history_store
+        
+        system_prompt = "\n\n".join(
+            message["content"] for message in self.model.history.get_messages() if message["role"] == "system"
+        )
+        self.model.history = PersistentConversationHistory(
+            session_id,
+            get_history_store(self.config.get('history.path') or None),
+            window=self.config.get('history.window', 50),
+            system_prompt=system_prompt,
+            # The recent messages are loaded off the event loop in start()
+            load=False
+        )
+        self.logger.debug("Conversation history persisted", {"session_id": session_id})
+    
+    async def reload_history(self) -> None:
+        """Refresh the model's history from its store, picking up turns persisted by other agents of the session."""
+        await asyncio.to_thread(self.model.history.reload)
+    
     def get_model(self) -> BaseModel:
         """
         Get the model instance.
@@ -240,13 +313,22 @@ class Orchestrator:
         """
         return self.model 
         
-    def get_history(self) -> List[Dict[str, Any]]:
+    def get_history(self, limit: Optional[int] = None, before: Optional[int] = None) -> List[Dict[str, Any]]:
         """
         Get the conversation history from the model.
         
+        Args:
+            limit: Page through the whole transcript, returning only the last
+                   `limit` messages (including those no longer kept in memory)
+            before: Page through the whole transcript, returning only messages
+                    before this position
+        
         Returns:
-            The current conversation history
+            Without arguments, the messages the model currently sees (including
+            system messages); otherwise the requested page of the transcript
         """
         if not self.model:
             return []
-        return self.model.history.get_messages() 
\ No newline at end of file
+        if limit is None and before is None:
+            return self.model.history.get_messages()
+        return self.model.history.load_messages(limit=limit, before=before) 
\ No newline at end of file
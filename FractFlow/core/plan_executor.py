@@ -0,0 +1,256 @@
+"""
+Plan-graph execution.
+
+In plan mode the orchestrator model may answer a pipeline-style request with a
+whole dependency graph of tool calls instead of one step at a time. Arguments
+of a step can reference the outputs of earlier steps, and the executor runs
+every step as soon as its dependencies are done. The model is consulted again
+only to synthesize the final answer or when a step fails, which turns N+1
+model round trips into two.
+"""
+
+import re
+import json
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence
+
+from ..infra.error_handling import AgentError
+
+# Instructions appended to the orchestrator's system prompt in plan mode
+PLAN_INSTRUCTIONS = """PLAN MODE:
+When every tool call needed for the request can be decided upfront (for example a pipeline where each step feeds the next), you may answer with a complete plan instead of requesting tools one at a time:
+
+<plan>
+[
+  {"id": "search", "tool": "web_search", "args": {"query": "latest FractFlow release"}},
+  {"id": "report", "tool": "write_file", "args": {"file_path": "report.md", "content": "${search}"}}
+]
+</plan>
+
+- Each step has a unique "id", the exact "tool" function name and its "args".
+- "${step_id}" in an argument is replaced by the output of that step; "${step_id.field}" takes a field of a JSON output. A step runs after every step it references (add "depends_on": [ids] for other ordering constraints).
+- Independent steps run in parallel. You receive all results at once and then give the final answer.
+- Use <tool_request> instead when a later step depends on looking at an earlier result."""
+
+_PLAN_TAG = re.compile(r"<plan>(.*?)</plan>", re.DOTALL)
+_REFERENCE = re.compile(r"\$\{([A-Za-z0-9_\-]+)((?:\.[A-Za-z0-9_\-]+)*)\}")
+
+class PlanError(AgentError):
+    """Exception raised for plans that cannot be executed."""
+    pass
+
+class PlanNode:
+    """One tool call of a plan."""
+
+    def __init__(self, node_id: str, tool: str, args: Dict[str, Any], depends_on: Sequence[str] = ()):
+        """
+        Initialize the node.
+
+        Args:
+            node_id: Unique id of the step within the plan
+            tool: Name of the tool to call
+            args: Tool arguments, possibly containing ${step_id} references
+            depends_on: Ids of steps that must finish first, besides the referenced ones
+        """
+        self.id = node_id
+        self.tool = tool
+        self.args = args
+        self.depends_on = set(depends_on) | set(_references(args))
+
+def _references(value: Any) -> List[str]:
+    """Ids of the steps referenced anywhere in an argument value."""
+    if isinstance(value, str):
+        return [match.group(1) for match in _REFERENCE.finditer(value)]
+    if isinstance(value, dict):
+        return [ref for item in value.values() for ref in _references(item)]
+    if isinstance(value, list):
+        return [ref for item in value for ref in _references(item)]
+    return []
+
+def result_text(result: Any) -> str:
+    """
+    Get the text of a tool result.
+
+    Args:
+        result: A tool result (MCP content list or string)
+
+    Returns:
+        The text content, joined across content items
+    """
+    if isinstance(result, list):
+        return "\n".join(getattr(item, "text", None) or str(item) for item in result)
+    return str(result)
+
+def parse_plan(content: str, tool_names: Optional[Sequence[str]] = None) -> Optional[List[PlanNode]]:
+    """
+    Extract and validate a plan from a model response.
+
+    Args:
+        content: Model response text
+        tool_names: Names of the available tools, to validate the steps against
+
+    Returns:
+        The plan's nodes, or None if the response contains no plan
+
+    Raises:
+        PlanError: If the plan is malformed, uses unknown tools or has cycles
+    """
+    match = _PLAN_TAG.search(content or "")
+    if match is None:
+        return None
+    try:
+        steps = json.loads(match.group(1).strip())
+    except json.JSONDecodeError as e:
+        raise PlanError(f"Plan is not valid JSON: {e}")
+    if isinstance(steps, dict):
+        steps = steps.get("steps", [])
+    if not isinstance(steps, list) or not steps:
+        raise PlanError("Plan must be a non-empty JSON list of steps")
+
+    nodes: Dict[str, PlanNode] = {}
+    for index, step in enumerate(steps):
+        if not isinstance(step, dict) or not step.get("tool"):
+            raise PlanError(f"Step {index + 1} must be an object with a 'tool'")
+        node_id = str(step.get("id") or f"step{index + 1}")
+        if node_id in nodes:
+            raise PlanError(f"Duplicate step id '{node_id}'")
+        if tool_names is not None and step["tool"] not in tool_names:
+            raise PlanError(f"Step '{node_id}' uses unknown tool '{step['tool']}'")
+        args = step.get("args") or {}
+        if not isinstance(args, dict):
+            raise PlanError(f"Arguments of step '{node_id}' must be an object")
+        nodes[node_id] = PlanNode(node_id, step["tool"], args, [str(d) for d in step.get("depends_on") or []])
+
+    for node in nodes.values():
+        unknown = node.depends_on - set(nodes)
+        if unknown:
+            raise PlanError(f"Step '{node.id}' depends on unknown steps {sorted(unknown)}")
+
+    # Kahn's algorithm: every node must become ready at some point
+    remaining = {node.id: set(node.depends_on) for node in nodes.values()}
+    while remaining:
+        ready = [node_id for node_id, deps in remaining.items() if not deps]
+        if not ready:
+            raise PlanError(f"Plan has a dependency cycle among {sorted(remaining)}")
+        for node_id in ready:
+            del remaining[node_id]
+        for deps in remaining.values():
+            deps.difference_update(ready)
+
+    return list(nodes.values())
+
+def resolve_arguments(value: Any, outputs: Dict[str, str]) -> Any:
+    """
+    Substitute step references in tool arguments.
+
+    A string that is exactly one reference takes the referenced value itself
+    (parsed from JSON when possible); references inside longer strings are
+    replaced by their text.
+
+    Args:
+        value: Argument value
+        outputs: Text outputs of the finished steps
+
+    Returns:
+        The value with all references resolved
+
+    Raises:
+        PlanError: If a referenced field does not exist
+    """
+    if isinstance(value, dict):
+        return {key: resolve_arguments(item, outputs) for key, item in value.items()}
+    if isinstance(value, list):
+        return [resolve_arguments(item, outputs) for item in value]
+    if not isinstance(value, str):
+        return value
+
+    def lookup(match) -> Any:
+        node_id, path = match.group(1), match.group(2)
+        text = outputs[node_id]
+        if not path:
+            try:
+                return json.loads(text)
+            except (json.JSONDecodeError, TypeError):
+                return text
+        try:
+            current = json.loads(text)
+            for key in path[1:].split("."):
+                current = current[int(key)] if isinstance(current, list) else current[key]
+            return current
+        except (json.JSONDecodeError, KeyError, IndexError, ValueError, TypeError):
+            raise PlanError(f"Output of step '{node_id}' has no field '{path[1:]}'")
+
+    whole = _REFERENCE.fullmatch(value)
+    if whole:
+        return lookup(whole)
+
+    def replace(match) -> str:
+        resolved = lookup(match)
+        return resolved if isinstance(resolved, str) else json.dumps(resolved, ensure_ascii=False)
+
+    return _REFERENCE.sub(replace, value)
+
+class PlanExecutor:
+    """
+    Runs a plan with as much parallelism as its dependencies allow.
+
+    Each step starts as soon as all of its dependencies have finished. When a
+    step fails, no further steps are started; steps already running are allowed
+    to finish so that their results are not wasted.
+    """
+
+    def __init__(self, call_tool: Callable[[str, Dict[str, Any]], Awaitable[Any]]):
+        """
+        Initialize the executor.
+
+        Args:
+            call_tool: Coroutine function calling a tool by name with arguments,
+                       raising on failure
+        """
+        self.call_tool = call_tool
+
+    async def run(self, nodes: Sequence[PlanNode]) -> Dict[str, Dict[str, Any]]:
+        """
+        Execute a plan.
+
+        Args:
+            nodes: Validated plan nodes (see parse_plan())
+
+        Returns:
+            Dictionary mapping step ids, in plan order, to a dict with 'tool',
+            'status' ('done', 'failed' or 'skipped') and 'output' (result text or error)
+        """
+        pending = {node.id: node for node in nodes}
+        outputs: Dict[str, str] = {}
+        results: Dict[str, Dict[str, Any]] = {}
+        running: Dict[asyncio.Task, PlanNode] = {}
+        failed = False
+
+        async def execute(node: PlanNode) -> str:
+            arguments = resolve_arguments(node.args, outputs)
+            return result_text(await self.call_tool(node.tool, arguments))
+
+        try:
+            while pending or running:
+                if not failed:
+                    for node in [n for n in pending.values() if n.depends_on <= outputs.keys()]:
+                        del pending[node.id]
+                        running[asyncio.ensure_future(execute(node))] = node
+                if not running:
+                    break
+                done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    node = running.pop(task)
+                    try:
+                        outputs[node.id] = task.result()
+                        results[node.id] = {"tool": node.tool, "status": "done", "output": outputs[node.id]}
+                    except Exception as e:
+                        failed = True
+                        results[node.id] = {"tool": node.tool, "status": "failed", "output": str(e)}
+        finally:
+            for task in running:
+                task.cancel()
+
+        for node in pending.values():
+            results[node.id] = {"tool": node.tool, "status": "skipped", "output": ""}
+        return {node.id: results[node.id] for node in nodes}
@@ -14,9 +14,13 @@ and processes model responses with tool calls.
 """
 
 import json
+import time
+import asyncio
 from typing import Dict, Any, Optional, List
 from .orchestrator import Orchestrator
 from .tool_executor import ToolExecutor
+from .plan_executor import PlanExecutor
+from ..infra import budget as budgets, events, tracing
 from ..infra.config import ConfigManager
 from ..infra.error_handling import AgentError, handle_error
 from ..infra.logging_utils import get_logger
@@ -46,14 +50,21 @@ class QueryProcessor:
             self.config = config
         
         # Push component name to call path
-        self.config.push_to_call_path("query_processor")
+        self.call_path = self.config.push_to_call_path("query_processor")
         
         # Initialize logger
-        self.logger = get_logger(self.config.get_call_path())
+        self.logger = get_logger(self.call_path)
         
         self.max_iterations = self.config.get('agent.max_iterations', 10)
+        self.parallel_tool_calls = self.config.get('agent.parallel_tool_calls', False)
+        # Whether the last query ended with a final answer from the model
+        self.last_answered = False
         self.logger.debug("Query processor initialized", {"max_iterations": self.max_iterations})
     
+    # Seconds granted past the deadline to tool calls, so that nested agents
+    # sharing the budget can return their partial results
+    BUDGET_GRACE = 5.0
+    
     async def process_query(self, user_query: str) -> str:
         """
         Process a user query through the loop.
@@ -64,6 +75,7 @@ class QueryProcessor:
         Returns:
             The final response to the user
         """
+        self.last_answered = False
         try:
             model = self.orchestrator.get_model()
             
@@ -91,13 +103,28 @@ class QueryProcessor:
             
             # Initial content placeholder
             content = ""
+            gathered: List[str] = []
+            
+            # A query budget shared with the calling agents caps our iterations
+            budget = budgets.current()
+            max_iterations = budget.iteration_limit(self.max_iterations) if budget else self.max_iterations
             
             # Main agent loop
-            for iteration in range(self.max_iterations):
+            for iteration in range(max_iterations):
                 # self.logger.debug("Starting iteration", {"current": iteration+1, "max": self.max_iterations})
                 
+                reason = budget.exhausted() if budget else None
+                if reason:
+                    return self._partial_answer(model, reason, content, gathered)
+                
                 # Get response from model
-                response = await model.execute(tools)
+                try:
+                    with tracing.span("model", iteration=iteration + 1):
+                        response = await asyncio.wait_for(
+                            model.execute(tools), budget.remaining_time() if budget else None
+                        )
+                except asyncio.TimeoutError:
+                    return self._partial_answer(model, "time limit reached", content, gathered)
                 
                 message = response["choices"][0]["message"]
                 tool_calls = message.get("tool_calls", [])
@@ -108,10 +135,22 @@ class QueryProcessor:
                 if reasoning_content:
                     self.logger.info("Reasoning content", {"reasoning": reasoning_content})
                 
+                # Plan mode: run the whole graph of tool calls, then let the model synthesize
+                plan = message.get("plan")
+                plan_error = message.get("plan_error")
+                if plan or plan_error:
+                    model.add_assistant_message(content)
+                    if plan_error:
+                        model.add_user_message(f"The plan could not be executed: {plan_error}\nPlease fix the plan or request tools step by step.")
+                    else:
+                        await self._run_plan(model, plan)
+                    continue
+                
                 # If there are no tool calls, return final answer
                 if not tool_calls:
                     # Add final answer to conversation history
                     model.add_assistant_message(content)
+                    self.last_answered = True
                     self.logger.info(content, {"iterations": iteration+1})
                     # Log complete conversation history for final result
                     # self.logger.info(f"Final response ready", {"iterations": iteration+1})
@@ -123,7 +162,8 @@ class QueryProcessor:
                     model.add_assistant_message(content, tool_calls)
                     self.logger.debug(f"Processing tool calls", {"count": len(tool_calls)})
                     
-                    # Process each tool call
+                    # Parse each tool call
+                    calls = []
                     for tool_call in tool_calls:
                         # Skip None values
                         if tool_call is None:
@@ -148,21 +188,25 @@ class QueryProcessor:
                             self.logger.warning("Tool call missing 'name' field")
                             continue
                         
-                        self.logger.info("Calling tool", {"name": tool_name, "args": function_args})
-                        
-                        # Call the tool
-                        try:
-                            result = await self.tool_executor.execute_tool(tool_name, function_args)
-                            # Add tool execution result log
-                            self.logger.info("Tool execution result", {"tool": tool_name, "result": result})
-                            # Add result to conversation history
-                            model.add_tool_result(tool_name, result, tool_call_id)
-                                
-                        except Exception as e:
-                            error = handle_error(e, {"tool_name": tool_name, "args": function_args})
-                            error_message = f"Error calling tool {tool_name}: {str(error)}"
-                            self.logger.error(error_message, {"tool": tool_name, "error": str(error)})
-                            model.add_tool_result(tool_name, error_message, tool_call_id)
+                        calls.append((tool_name, function_args, tool_call_id))
+                    
+                    # Calls of one turn may depend on each other (create a directory, then
+                    # write into it), so they run in order unless the agent opted in to
+                    # parallel calls; results are added in the original order either way
+                    if self.parallel_tool_calls and len(calls) > 1:
+                        results = await asyncio.gather(*(self._call_tool(name, args) for name, args, _ in calls))
+                    else:
+                        results = [await self._call_tool(name, args) for name, args, _ in calls]
+                    
+                    gathered = []
+                    for (tool_name, _, tool_call_id), result in zip(calls, results):
+                        # Add result to conversation history
+                        model.add_tool_result(tool_name, result, tool_call_id)
+                        gathered.append(f"[{tool_name}] {result}")
+            
+            reason = budget.exhausted() if budget else None
+            if reason or max_iterations < self.max_iterations:
+                return self._partial_answer(model, reason or "LLM call limit reached", content, gathered)
             
             # If we reached the maximum iterations, return a fallback response
             self.logger.warning("Reached maximum iterations", {"max": self.max_iterations})
@@ -179,6 +223,118 @@ class QueryProcessor:
                 self.logger.error("Error occurred while processing query", {"history_length": len(model.history.get_messages())})
             return f"Sorry, there was a technical problem processing your request. Error: {str(error)}"
     
+    async def _run_plan(self, model: Any, plan: List[Any]) -> None:
+        """
+        Execute a plan from the model and add its results to the history.
+        
+        Args:
+            model: The orchestrator model
+            plan: Validated plan nodes
+        """
+        self.logger.debug("Executing plan", {"steps": len(plan)})
+        results = await PlanExecutor(self._execute_tool).run(plan)
+        
+        for node_id, result in results.items():
+            if result["status"] != "skipped":
+                model.add_tool_result(result["tool"], f"[{node_id}] {result['output']}", node_id)
+        
+        failed = [node_id for node_id, result in results.items() if result["status"] == "failed"]
+        if failed:
+            skipped = [node_id for node_id, result in results.items() if result["status"] == "skipped"]
+            self.logger.warning("Plan step failed", {"failed": failed, "skipped": skipped})
+            model.add_user_message(
+                f"Plan step(s) {', '.join(failed)} failed"
+                + (f" and {', '.join(skipped)} were not run" if skipped else "")
+                + ". Continue with a corrected plan or step by step, or explain the problem."
+            )
+        else:
+            model.add_user_message("All plan steps have finished. Give the final answer based on their results.")
+    
+    async def _call_tool(self, tool_name: str, function_args: Dict[str, Any]) -> str:
+        """
+        Call a tool, turning failures into an error message for the model.
+        
+        Args:
+            tool_name: Name of the tool to call
+            function_args: Parsed arguments for the tool
+            
+        Returns:
+            The tool result, or an error message if the call failed
+        """
+        self.logger.info("Calling tool", {"name": tool_name, "args": function_args})
+        
+        budget = budgets.current()
+        timeout = budget.remaining_time() if budget else None
+        try:
+            result = await asyncio.wait_for(
+                self._execute_tool(tool_name, function_args),
+                timeout + self.BUDGET_GRACE if timeout is not None else None
+            )
+            # Add tool execution result log
+            self.logger.info("Tool execution result", {"tool": tool_name, "result": result})
+            return result
+        except asyncio.TimeoutError:
+            error_message = f"Error calling tool {tool_name}: the query's time budget ran out"
+            self.logger.warning(error_message, {"tool": tool_name})
+            return error_message
+        except Exception as e:
+            error = handle_error(e, {"tool_name": tool_name, "args": function_args})
+            error_message = f"Error calling tool {tool_name}: {str(error)}"
+            self.logger.error(error_message, {"tool": tool_name, "error": str(error)})
+            return error_message
+    
+    async def _execute_tool(self, tool_name: str, function_args: Dict[str, Any],
+                            preview_chars: int = 1000) -> str:
+        """
+        Execute a tool, reporting its start and end to the query's event sink.
+        
+        Args:
+            tool_name: Name of the tool to call
+            function_args: Parsed arguments for the tool
+            preview_chars: Maximum characters of the result included in the end event
+            
+        Returns:
+            The tool result
+        """
+        events.emit("tool_start", tool=tool_name, arguments=function_args)
+        started = time.perf_counter()
+        result, status = None, "error"
+        try:
+            result = await self.tool_executor.execute_tool(tool_name, function_args)
+            status = "ok"
+            return result
+        except asyncio.CancelledError:
+            status = "cancelled"
+            raise
+        finally:
+            events.emit(
+                "tool_end", tool=tool_name, status=status,
+                duration=time.perf_counter() - started,
+                result=str(result)[:preview_chars] if result is not None else None
+            )
+    
+    def _partial_answer(self, model: Any, reason: str, content: str, gathered: List[str],
+                        max_chars: int = 2000) -> str:
+        """
+        End a query whose budget is exhausted with what has been gathered so far.
+        
+        Args:
+            model: The orchestrator model
+            reason: Which limit was reached
+            content: The model's latest response
+            gathered: Results of the latest tool calls
+            max_chars: Maximum characters kept per tool result
+            
+        Returns:
+            The partial answer, which is also added to the history
+        """
+        self.logger.warning("Query budget exhausted", {"reason": reason})
+        parts = [f"I had to stop because the query budget was exhausted ({reason}). Here's what I've gathered so far: {content}"]
+        parts.extend(result[:max_chars] for result in gathered)
+        final_content = "\n\n".join(parts)
+        model.add_assistant_message(final_content)
+        return final_content
+    
     def _create_tool_mapping_description(self, tool_mapping: Dict[str, List[str]]) -> str:
         """
         Create a human-readable description of tool name mappings.
@@ -207,11 +363,15 @@ class QueryProcessor:
         
         return "\n".join(lines)
 
-    def get_history(self) -> List[Dict[str, Any]]:
+    def get_history(self, limit: Optional[int] = None, before: Optional[int] = None) -> List[Dict[str, Any]]:
         """
         Get the conversation history from the current model.
         
+        Args:
+            limit: Return only the last `limit` messages of the whole transcript
+            before: Return only messages of the transcript before this position
+        
         Returns:
-            The current conversation history
+            The current conversation history, or the requested page of the transcript
         """
-        return self.orchestrator.get_history() 
\ No newline at end of file
+        return self.orchestrator.get_history(limit=limit, before=before) 
\ No newline at end of file
@@ -0,0 +1,200 @@
+"""
+Query response cache.
+
+Caches the final answers of fresh sessions, so that FAQ-style agents answer
+repeated questions without running the model and tool loop again. Entries are
+scoped by a fingerprint of everything else that shapes the answer (provider and
+model, system prompt, tool set); within a scope a query matches exactly after
+normalization, or approximately by TF-IDF cosine similarity.
+"""
+
+import math
+import time
+import hashlib
+import threading
+import unicodedata
+from collections import Counter, OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from .tool_index import tokenize
+
+_TRAILING_PUNCTUATION = " \t\r\n.?!,;:。？！，；：、~…"
+
+def normalize_query(query: str) -> str:
+    """
+    Normalize a query for exact matching.
+
+    Args:
+        query: The user's query
+
+    Returns:
+        The query in NFKC form, lowercased, with whitespace collapsed and
+        trailing punctuation removed
+    """
+    text = unicodedata.normalize("NFKC", query or "").lower()
+    return " ".join(text.split()).rstrip(_TRAILING_PUNCTUATION)
+
+def make_scope(*parts: Any) -> str:
+    """
+    Fingerprint the context an answer depends on.
+
+    Args:
+        *parts: Values that shape the answer (system prompt, model name, tool
+                names and descriptions...)
+
+    Returns:
+        A hex digest identifying the scope
+    """
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(repr(part).encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+class _Entry:
+    """A cached answer."""
+
+    def __init__(self, query: str, response: str, expires_at: float):
+        self.query = query
+        self.response = response
+        self.expires_at = expires_at
+        self.terms = Counter(tokenize(query))
+
+class ResponseCache:
+    """
+    LRU cache of final answers with TTL and near-duplicate matching.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 3600.0, similarity: float = 0.9):
+        """
+        Initialize the response cache.
+
+        Args:
+            max_entries: Maximum number of cached answers before the least recently
+                         used ones are evicted
+            ttl: Seconds an answer stays valid
+            similarity: Minimum TF-IDF cosine similarity for a near match
+                        (0 to only serve exact matches)
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.similarity = similarity
+        self._entries: "OrderedDict[Tuple[str, str], _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'exact_hits': 0, 'near_hits': 0, 'misses': 0, 'evictions': 0}
+
+    def _vector(self, terms: Counter, idf: Dict[str, float]) -> Dict[str, float]:
+        vector = {term: count * idf.get(term, 0.0) for term, count in terms.items()}
+        norm = math.sqrt(sum(value * value for value in vector.values()))
+        return {term: value / norm for term, value in vector.items()} if norm else {}
+
+    def _near_match(self, scope: str, query: str) -> Tuple[Optional[_Entry], float]:
+        """Most similar live entry in the scope (caller holds the lock)."""
+        candidates = [entry for (entry_scope, _), entry in self._entries.items() if entry_scope == scope]
+        if not candidates:
+            return None, 0.0
+        query_terms = Counter(tokenize(query))
+        documents = [entry.terms for entry in candidates] + [query_terms]
+        document_frequency = Counter(term for terms in documents for term in terms)
+        idf = {term: math.log((1 + len(documents)) / (1 + df)) + 1 for term, df in document_frequency.items()}
+        query_vector = self._vector(query_terms, idf)
+        best, best_score = None, 0.0
+        for entry in candidates:
+            entry_vector = self._vector(entry.terms, idf)
+            score = sum(weight * entry_vector.get(term, 0.0) for term, weight in query_vector.items())
+            if score > best_score:
+                best, best_score = entry, score
+        return best, best_score
+
+    def _expire(self) -> None:
+        now = time.monotonic()
+        for key in [key for key, entry in self._entries.items() if entry.expires_at <= now]:
+            del self._entries[key]
+
+    def get(self, scope: str, query: str, similarity: Optional[float] = None) -> Optional[str]:
+        """
+        Look up the answer to a query.
+
+        Args:
+            scope: Fingerprint from make_scope()
+            query: The user's query
+            similarity: Minimum similarity for a near match (defaults to the
+                        cache's threshold)
+
+        Returns:
+            The cached answer, or None on a miss
+        """
+        similarity = self.similarity if similarity is None else similarity
+        normalized = normalize_query(query)
+        with self._lock:
+            self._expire()
+            entry = self._entries.get((scope, normalized))
+            if entry is not None:
+                self._entries.move_to_end((scope, normalized))
+                self._stats['exact_hits'] += 1
+                return entry.response
+            if similarity > 0:
+                entry, score = self._near_match(scope, normalized)
+                if entry is not None and score >= similarity:
+                    self._entries.move_to_end((scope, entry.query))
+                    self._stats['near_hits'] += 1
+                    return entry.response
+            self._stats['misses'] += 1
+            return None
+
+    def put(self, scope: str, query: str, response: str, ttl: Optional[float] = None) -> None:
+        """
+        Store the answer to a query.
+
+        Args:
+            scope: Fingerprint from make_scope()
+            query: The user's query
+            response: The final answer
+            ttl: Seconds the answer stays valid (defaults to the cache's TTL)
+        """
+        ttl = self.ttl if ttl is None else ttl
+        if ttl <= 0 or self.max_entries <= 0:
+            return
+        normalized = normalize_query(query)
+        with self._lock:
+            self._entries[(scope, normalized)] = _Entry(normalized, response, time.monotonic() + ttl)
+            self._entries.move_to_end((scope, normalized))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats['evictions'] += 1
+
+    def clear(self) -> None:
+        """Drop all cached answers."""
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get cache statistics.
+
+        Returns:
+            Dictionary with entry count, exact and near hit counters, misses,
+            evictions and the overall hit rate
+        """
+        with self._lock:
+            hits = self._stats['exact_hits'] + self._stats['near_hits']
+            lookups = hits + self._stats['misses']
+            return {
+                'entries': len(self._entries),
+                **self._stats,
+                'hit_rate': hits / lookups if lookups else 0.0,
+            }
+
+_response_cache: Optional[ResponseCache] = None
+
+def get_response_cache() -> ResponseCache:
+    """
+    Get the process-wide response cache shared by all agents.
+
+    Returns:
+        The shared ResponseCache instance
+    """
+    global _response_cache
+    if _response_cache is None:
+        _response_cache = ResponseCache()
+    return _response_cache
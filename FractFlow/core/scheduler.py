@@ -0,0 +1,258 @@
+"""
+Tool call scheduler.
+
+Admission control between the query processors of all sessions and the MCP
+client pools: enforces per-tool and global concurrency limits, serves waiting
+calls round-robin across sessions so one session cannot starve the others, and
+lets interactive turns overtake batch work.
+"""
+
+import time
+import asyncio
+import weakref
+import contextvars
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, Deque, Dict, Optional, Tuple
+
+from ..infra.logging_utils import get_logger
+
+# Priorities, most urgent first
+PRIORITIES = ('interactive', 'batch')
+
+# Priority of the tool calls made in the current context (set per query by the Agent)
+current_priority: contextvars.ContextVar[str] = contextvars.ContextVar('tool_priority', default='interactive')
+
+@contextmanager
+def priority(value: str):
+    """
+    Run the enclosed tool calls with the given priority.
+
+    Args:
+        value: 'interactive' or 'batch'
+    """
+    if value not in PRIORITIES:
+        raise ValueError(f"Unknown priority '{value}', expected one of {PRIORITIES}")
+    token = current_priority.set(value)
+    try:
+        yield
+    finally:
+        current_priority.reset(token)
+
+class _Waiter:
+    """A tool call waiting for a slot."""
+
+    def __init__(self, tool_name: str, session_id: str, priority: str):
+        self.tool_name = tool_name
+        self.session_id = session_id
+        self.priority = priority
+        self.future = asyncio.get_running_loop().create_future()
+        self.enqueued_at = time.monotonic()
+
+class ToolScheduler:
+    """
+    Fair, priority-aware admission control for tool calls.
+
+    Waiting calls are kept in one queue per session and priority. When a slot
+    frees up, the highest priority with an eligible call is served, rotating
+    through its sessions so each gets a turn. A call is eligible when both its
+    tool and the global limit have a free slot, so calls to a saturated heavy
+    tool never block calls to other tools.
+    """
+
+    def __init__(self, max_concurrent: int = 0, tool_limits: Optional[Dict[str, int]] = None):
+        """
+        Initialize the scheduler.
+
+        Args:
+            max_concurrent: Maximum number of tool calls running at once (0 for no limit)
+            tool_limits: Maximum concurrent calls per tool name (missing or 0 for no limit)
+        """
+        self.max_concurrent = max_concurrent
+        self.tool_limits: Dict[str, int] = dict(tool_limits or {})
+        # Limits of individual sessions (agents), applied to their own calls only
+        self._session_limits: Dict[str, Tuple[int, Dict[str, int]]] = {}
+
+        self._queues: Dict[str, "OrderedDict[str, Deque[_Waiter]]"] = {p: OrderedDict() for p in PRIORITIES}
+        self._running = 0
+        self._running_per_tool: Dict[str, int] = {}
+        self._wait_stats: Dict[str, Dict[str, float]] = {}
+
+        self.logger = get_logger('tool_scheduler')
+
+    def configure(self, max_concurrent: Optional[int] = None, tool_limits: Optional[Dict[str, int]] = None) -> None:
+        """
+        Update the limits and admit any calls they now allow.
+
+        Args:
+            max_concurrent: New global limit, if given
+            tool_limits: Per-tool limits to add or replace
+        """
+        if max_concurrent is not None:
+            self.max_concurrent = max_concurrent
+        if tool_limits:
+            self.tool_limits.update(tool_limits)
+        self._dispatch()
+
+    def set_session_limits(self, session_id: str, max_concurrent: int = 0,
+                           tool_limits: Optional[Dict[str, int]] = None) -> None:
+        """
+        Set the limits a session's calls must respect, without affecting other sessions.
+
+        A call of the session only starts while fewer than `max_concurrent` tool
+        calls (of any session) are running, and fewer than its per-tool limit
+        for that tool. Empty limits remove the session's entry.
+
+        Args:
+            session_id: Identity of the session
+            max_concurrent: Running calls above which the session's calls wait (0 for no limit)
+            tool_limits: Running calls per tool name above which the session's calls wait
+        """
+        if max_concurrent or tool_limits:
+            self._session_limits[session_id] = (max_concurrent, dict(tool_limits or {}))
+        else:
+            self._session_limits.pop(session_id, None)
+        self._dispatch()
+
+    def _has_capacity(self, tool_name: str, session_id: Optional[str] = None) -> bool:
+        running_tool = self._running_per_tool.get(tool_name, 0)
+        if self.max_concurrent and self._running >= self.max_concurrent:
+            return False
+        limit = self.tool_limits.get(tool_name, 0)
+        if limit and running_tool >= limit:
+            return False
+        session_limits = self._session_limits.get(session_id) if session_id is not None else None
+        if session_limits is not None:
+            max_concurrent, tool_limits = session_limits
+            if max_concurrent and self._running >= max_concurrent:
+                return False
+            limit = tool_limits.get(tool_name, 0)
+            if limit and running_tool >= limit:
+                return False
+        return True
+
+    def _start(self, tool_name: str) -> None:
+        self._running += 1
+        self._running_per_tool[tool_name] = self._running_per_tool.get(tool_name, 0) + 1
+
+    def _finish(self, tool_name: str) -> None:
+        self._running -= 1
+        self._running_per_tool[tool_name] -= 1
+        self._dispatch()
+
+    def _record_wait(self, waiter_tool: str, priority: str, waited: float) -> None:
+        for key in (waiter_tool, f"priority:{priority}"):
+            stats = self._wait_stats.setdefault(key, {'calls': 0, 'total_wait': 0.0, 'max_wait': 0.0})
+            stats['calls'] += 1
+            stats['total_wait'] += waited
+            stats['max_wait'] = max(stats['max_wait'], waited)
+
+    def _dispatch(self) -> None:
+        """Admit waiting calls while there is capacity."""
+        admitted = True
+        while admitted:
+            admitted = False
+            if self.max_concurrent and self._running >= self.max_concurrent:
+                return
+            for priority in PRIORITIES:
+                sessions = self._queues[priority]
+                for session_id in list(sessions):
+                    queue = sessions[session_id]
+                    waiter = next((w for w in queue if self._has_capacity(w.tool_name, w.session_id)), None)
+                    if waiter is None:
+                        continue
+                    queue.remove(waiter)
+                    if queue:
+                        # Round-robin: this session goes to the back of the line
+                        sessions.move_to_end(session_id)
+                    else:
+                        del sessions[session_id]
+                    self._start(waiter.tool_name)
+                    waiter.future.set_result(None)
+                    admitted = True
+                    break
+                if admitted:
+                    break
+
+    @asynccontextmanager
+    async def slot(self, tool_name: str, session_id: str, priority: Optional[str] = None):
+        """
+        Wait for permission to run a tool call, holding it for the enclosed block.
+
+        Args:
+            tool_name: Name of the tool to call
+            session_id: Identity of the calling session, for fair queueing
+            priority: 'interactive' or 'batch' (defaults to the current context's priority)
+        """
+        priority = priority or current_priority.get()
+        queue_empty = not any(self._queues[p] for p in PRIORITIES)
+
+        if queue_empty and self._has_capacity(tool_name, session_id):
+            self._start(tool_name)
+            self._record_wait(tool_name, priority, 0.0)
+        else:
+            waiter = _Waiter(tool_name, session_id, priority)
+            self._queues[priority].setdefault(session_id, deque()).append(waiter)
+            self._dispatch()
+            try:
+                await waiter.future
+            except asyncio.CancelledError:
+                if waiter.future.done() and not waiter.future.cancelled():
+                    # Admitted just as we were cancelled: give the slot back
+                    self._finish(tool_name)
+                else:
+                    queue = self._queues[priority].get(session_id)
+                    if queue is not None and waiter in queue:
+                        queue.remove(waiter)
+                        if not queue:
+                            del self._queues[priority][session_id]
+                raise
+            waited = time.monotonic() - waiter.enqueued_at
+            self._record_wait(tool_name, priority, waited)
+            self.logger.debug("Tool call admitted after waiting", {
+                "tool": tool_name, "session": session_id, "priority": priority, "wait": round(waited, 3)
+            })
+
+        try:
+            yield
+        finally:
+            self._finish(tool_name)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get scheduler statistics.
+
+        Returns:
+            Dictionary with the number of running and queued calls, running calls
+            per tool, and queue-wait statistics ('calls', 'avg_wait', 'max_wait' in
+            seconds) per tool and per priority ('priority:interactive', ...)
+        """
+        return {
+            'running': self._running,
+            'queued': sum(len(q) for p in PRIORITIES for q in self._queues[p].values()),
+            'running_per_tool': {tool: n for tool, n in self._running_per_tool.items() if n},
+            'queue_wait': {
+                key: {
+                    'calls': stats['calls'],
+                    'avg_wait': stats['total_wait'] / stats['calls'] if stats['calls'] else 0.0,
+                    'max_wait': stats['max_wait'],
+                }
+                for key, stats in self._wait_stats.items()
+            },
+        }
+
+_schedulers: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, ToolScheduler]" = weakref.WeakKeyDictionary()
+
+def get_scheduler() -> ToolScheduler:
+    """
+    Get the scheduler shared by all sessions on the running event loop.
+
+    Returns:
+        The ToolScheduler for the current event loop
+    """
+    loop = asyncio.get_running_loop()
+    scheduler = _schedulers.get(loop)
+    if scheduler is None:
+        scheduler = ToolScheduler()
+        _schedulers[loop] = scheduler
+    return scheduler
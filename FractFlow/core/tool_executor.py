@@ -14,8 +14,10 @@ Handles the execution of tools based on model requests.
 
 from typing import Dict, Any, Optional
 from ..infra.config import ConfigManager
+from ..infra.artifact_store import get_artifact_store
 from ..infra.error_handling import ToolExecutionError, handle_error
 from ..infra.logging_utils import get_logger
+from .scheduler import get_scheduler
 
 class ToolExecutor:
     """
@@ -25,20 +27,31 @@ class ToolExecutor:
     handling errors and formatting results.
     """
     
-    def __init__(self, config: Optional[ConfigManager] = None):
+    def __init__(self, config: Optional[ConfigManager] = None, client_pool: Optional[Any] = None,
+                 session_id: Optional[str] = None):
         """
         Initialize the tool executor.
         
         Args:
             config: Configuration manager instance to use
+            client_pool: MCP client pool to call tools through (defaults to the global pool)
+            session_id: Identity of the session this executor serves, used by the
+                        scheduler to share tool capacity fairly between sessions
         """
         self.config = config or ConfigManager()
+        self.client_pool = client_pool
+        self.session_id = session_id or f"executor-{id(self):x}"
+        
+        # This session's limits, registered once with the scheduler of each event loop
+        self.max_concurrent = self.config.get('scheduler.max_concurrent', 0)
+        self.tool_limits = self.config.get('scheduler.tool_limits', {}) or {}
+        self._scheduler = None
         
         # Push component name to call path
-        self.config.push_to_call_path("tool_executor")
+        self.call_path = self.config.push_to_call_path("tool_executor")
         
         # Initialize logger
-        self.logger = get_logger(self.config.get_call_path())
+        self.logger = get_logger(self.call_path)
         self.logger.debug("Tool executor initialized")
         
     async def execute_tool(self, tool_name: str, arguments: Dict[str, Any]) -> str:
@@ -58,13 +71,24 @@ class ToolExecutor:
         try:
             self.logger.debug(f"Executing tool", {"tool": tool_name, "args": arguments})
             
-            # Get the client pool from the MCP module
+            # Use the agent's own pool, falling back to the global one
             # This is imported here to avoid circular imports
-            from ..mcpcore import get_client_pool
+            client_pool = self.client_pool
+            if client_pool is None:
+                from ..mcpcore import get_client_pool
+                client_pool = get_client_pool()
+            
+            # Tools take local paths; artifact handles are resolved here so every tool accepts them
+            artifact_store = getattr(client_pool, 'artifact_store', None) or get_artifact_store()
+            arguments = artifact_store.resolve_arguments(arguments)
             
-            # Call the tool using the MCP client pool
-            client_pool = get_client_pool()
-            result = await client_pool.call(tool_name, arguments)
+            # Wait for the scheduler to admit the call, then use the MCP client pool
+            scheduler = get_scheduler()
+            if scheduler is not self._scheduler:
+                scheduler.set_session_limits(self.session_id, self.max_concurrent, self.tool_limits)
+                self._scheduler = scheduler
+            async with scheduler.slot(tool_name, self.session_id):
+                result = await client_pool.call(tool_name, arguments)
             
             self.logger.debug(f"Tool execution successful", {"tool": tool_name, "result_length": len(result) if result else 0})
             return result
@@ -72,4 +96,10 @@ class ToolExecutor:
         except Exception as e:
             error = handle_error(e, {"tool_name": tool_name, "arguments": arguments})
             self.logger.error(f"Error executing tool {tool_name}: {error}")
-            raise ToolExecutionError(f"Failed to execute tool {tool_name}: {str(error)}", e) 
\ No newline at end of file
+            raise ToolExecutionError(f"Failed to execute tool {tool_name}: {str(error)}", e)
+
+    def shutdown(self) -> None:
+        """Remove this session's limits from the shared scheduler."""
+        if self._scheduler is not None:
+            self._scheduler.set_session_limits(self.session_id)
+            self._scheduler = None
@@ -0,0 +1,136 @@
+"""
+Tool retrieval index.
+
+Ranks the tools of a large catalog by relevance to a piece of text (the user
+query, a tool request instruction) with Okapi BM25 over tool names, descriptions
+and parameters, so that prompts only need to describe the few tools that matter
+for the current turn. Runs locally; Chinese text is indexed as character
+unigrams and bigrams.
+"""
+
+import re
+import math
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+_WORD = re.compile(r"[a-z0-9]+|[一-鿿]+")
+_CAMEL = re.compile(r"([a-z0-9])([A-Z])")
+
+def tokenize(text: str) -> List[str]:
+    """
+    Split text into index terms.
+
+    Args:
+        text: Text to tokenize
+
+    Returns:
+        Lowercase ASCII words (snake_case and camelCase split apart) and CJK
+        character unigrams and bigrams
+    """
+    tokens = []
+    for run in _WORD.findall(_CAMEL.sub(r"\1 \2", text or "").lower()):
+        if run[0] >= "一":
+            tokens.extend(run)
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+        else:
+            tokens.append(run)
+    return tokens
+
+def tool_name(tool: Dict[str, Any]) -> str:
+    """Name of a tool in OpenAI function format."""
+    return tool.get("function", {}).get("name", "")
+
+def _tool_terms(tool: Dict[str, Any]) -> List[str]:
+    function = tool.get("function", {})
+    parameters = function.get("parameters", {}).get("properties", {})
+    # Names are short and decisive, so they count twice
+    terms = tokenize(function.get("name", "")) * 2
+    terms += tokenize(function.get("description", ""))
+    for name, info in parameters.items():
+        terms += tokenize(name)
+        terms += tokenize(info.get("description", "") if isinstance(info, dict) else "")
+    return terms
+
+class ToolIndex:
+    """
+    BM25 index over a tool catalog.
+    """
+
+    def __init__(self, tools: Sequence[Dict[str, Any]], k1: float = 1.5, b: float = 0.75):
+        """
+        Build the index.
+
+        Args:
+            tools: Tools in OpenAI function format
+            k1: BM25 term frequency saturation
+            b: BM25 document length normalization
+        """
+        self.tools = list(tools)
+        self.names = [tool_name(tool) for tool in self.tools]
+        self.k1 = k1
+        self.b = b
+
+        self._docs = [Counter(_tool_terms(tool)) for tool in self.tools]
+        self._lengths = [sum(doc.values()) for doc in self._docs]
+        self._avg_length = (sum(self._lengths) / len(self._lengths)) if self._lengths else 0.0
+        document_frequency = Counter(term for doc in self._docs for term in doc)
+        count = len(self._docs)
+        self._idf = {
+            term: math.log(1 + (count - df + 0.5) / (df + 0.5))
+            for term, df in document_frequency.items()
+        }
+
+    def scores(self, text: str) -> List[float]:
+        """
+        Score every tool against a query.
+
+        Args:
+            text: Query text
+
+        Returns:
+            One BM25 score per tool, in catalog order
+        """
+        query = Counter(tokenize(text))
+        scores = []
+        for doc, length in zip(self._docs, self._lengths):
+            score = 0.0
+            norm = self.k1 * (1 - self.b + self.b * length / self._avg_length) if self._avg_length else self.k1
+            for term, weight in query.items():
+                tf = doc.get(term)
+                if tf:
+                    score += weight * self._idf[term] * tf * (self.k1 + 1) / (tf + norm)
+            scores.append(score)
+        return scores
+
+    def mentioned(self, text: str) -> List[str]:
+        """
+        Find the tools named verbatim in a text.
+
+        Args:
+            text: Text to search, e.g. a model response
+
+        Returns:
+            Names of the tools that appear in the text
+        """
+        return [name for name in self.names if name and re.search(rf"\b{re.escape(name)}\b", text or "")]
+
+    def select(self, text: str, k: int, include: Optional[Iterable[str]] = None) -> List[Dict[str, Any]]:
+        """
+        Select the tools most relevant to a query.
+
+        Args:
+            text: Query text
+            k: Number of tools to select by relevance
+            include: Names of tools to select in any case (e.g. tools the model
+                     already used or named)
+
+        Returns:
+            The selected tools, in catalog order; all tools when k is not smaller
+            than the catalog
+        """
+        if k <= 0 or k >= len(self.tools):
+            return list(self.tools)
+        selected = set(include or ()) | set(self.mentioned(text))
+        ranked = sorted(enumerate(self.scores(text)), key=lambda item: (-item[1], item[0]))
+        selected.update(self.names[i] for i, _ in ranked[:k])
+        return [tool for tool, name in zip(self.tools, self.names) if name in selected]
@@ -0,0 +1,402 @@
+"""
+Content-addressed artifact store.
+
+Images, audio and video produced by tools are stored once under the SHA-256 of
+their bytes and referred to by handles such as
+`artifact://sha256/<hex>.png`. Storing the same bytes again is free, any
+process on the machine can read an artifact without re-encoding or
+re-uploading it (zero-copy through mmap), and a least-recently-used garbage
+collector keeps the store under its disk quota.
+
+Tool servers and agents share the store through the file system: the root is
+FRACTFLOW_ARTIFACT_DIR, or ~/.cache/fractflow/artifacts by default. Agents
+replace handles in tool arguments by local paths before calling a tool (see
+ToolExecutor), so every tool accepts handles wherever it accepts paths.
+"""
+
+import os
+import re
+import json
+import mmap
+import stat
+import time
+import shutil
+import hashlib
+import tempfile
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+ARTIFACT_DIR_ENV = 'FRACTFLOW_ARTIFACT_DIR'
+DEFAULT_QUOTA_BYTES = 10 * 1024 ** 3
+
+# Stored objects are read-only: every handle with the same hash shares the file
+READ_ONLY = stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH
+
+HANDLE_PATTERN = re.compile(r"artifact://sha256/([0-9a-f]{64})((?:\.[A-Za-z0-9]{1,10})?)")
+
+def is_handle(value: Any) -> bool:
+    """Whether a value is an artifact handle."""
+    return isinstance(value, str) and HANDLE_PATTERN.fullmatch(value) is not None
+
+class ArtifactStore:
+    """
+    Content-addressed storage for media files with metadata and a disk quota.
+
+    Objects live in `<root>/objects/<first two hex digits>/<hex><suffix>` next to
+    a JSON metadata file whose modification time records the last access.
+    """
+
+    def __init__(self, root: Optional[str] = None, quota_bytes: int = DEFAULT_QUOTA_BYTES):
+        """
+        Initialize the artifact store.
+
+        Args:
+            root: Directory of the store (defaults to FRACTFLOW_ARTIFACT_DIR or
+                  ~/.cache/fractflow/artifacts)
+            quota_bytes: Total size above which the least recently used
+                         artifacts are deleted (0 for no limit)
+        """
+        self.root = os.path.expanduser(
+            root or os.environ.get(ARTIFACT_DIR_ENV) or os.path.join('~', '.cache', 'fractflow', 'artifacts')
+        )
+        self.quota_bytes = quota_bytes
+        self._lock = threading.Lock()
+        self._size: Optional[int] = None
+
+    def configure(self, root: Optional[str] = None, quota_bytes: Optional[int] = None) -> None:
+        """
+        Change the store location or quota.
+
+        Args:
+            root: New store directory, if given
+            quota_bytes: New quota in bytes (0 for no limit), if given
+        """
+        with self._lock:
+            if root:
+                self.root = os.path.expanduser(root)
+                self._size = None
+            if quota_bytes is not None:
+                self.quota_bytes = quota_bytes
+
+    def _object_path(self, digest: str, suffix: str) -> str:
+        return os.path.join(self.root, 'objects', digest[:2], digest + suffix)
+
+    def _meta_path(self, digest: str, suffix: str) -> str:
+        return os.path.join(self.root, 'objects', digest[:2], digest + suffix + '.json')
+
+    def _parse(self, handle: str):
+        match = HANDLE_PATTERN.fullmatch(handle or '')
+        if match is None:
+            raise ValueError(f"Not an artifact handle: {handle}")
+        return match.group(1), match.group(2)
+
+    def _add(self, digest: str, suffix: str, source: str, move: bool, metadata: Optional[Dict[str, Any]]) -> str:
+        """Move or copy a file into the store unless the same content is already there."""
+        handle = f"artifact://sha256/{digest}{suffix}"
+        object_path = self._object_path(digest, suffix)
+        meta_path = self._meta_path(digest, suffix)
+        os.makedirs(os.path.dirname(object_path), exist_ok=True)
+
+        if self._is_intact(digest, suffix):
+            if move:
+                os.unlink(source)
+            os.utime(meta_path)
+            return handle
+
+        if move:
+            os.replace(source, object_path)
+        else:
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(object_path))
+            os.close(fd)
+            shutil.copyfile(source, tmp_path)
+            os.replace(tmp_path, object_path)
+        os.chmod(object_path, READ_ONLY)
+
+        info = os.stat(object_path)
+        meta = {
+            'size': info.st_size,
+            'suffix': suffix,
+            'mtime_ns': info.st_mtime_ns,
+            'created': time.time(),
+            'metadata': metadata or {},
+        }
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(meta_path))
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False)
+        os.replace(tmp_path, meta_path)
+
+        with self._lock:
+            if self._size is not None:
+                self._size += info.st_size
+        if self.quota_bytes and self._total_size() > self.quota_bytes:
+            self.gc()
+        return handle
+
+    def _is_intact(self, digest: str, suffix: str) -> bool:
+        """Whether an object exists and has not been modified since it was stored."""
+        try:
+            with open(self._meta_path(digest, suffix), encoding='utf-8') as f:
+                meta = json.load(f)
+            info = os.stat(self._object_path(digest, suffix))
+        except (OSError, ValueError):
+            return False
+        return info.st_size == meta.get('size') and info.st_mtime_ns == meta.get('mtime_ns')
+
+    def put_bytes(self, data: bytes, suffix: str = '', metadata: Optional[Dict[str, Any]] = None) -> str:
+        """
+        Store bytes.
+
+        Args:
+            data: Content to store
+            suffix: File extension including the dot, e.g. '.png'
+            metadata: JSON-serializable metadata (producer, prompt, mime type...)
+
+        Returns:
+            The artifact handle
+        """
+        digest = hashlib.sha256(data).hexdigest()
+        if self._is_intact(digest, suffix):
+            os.utime(self._meta_path(digest, suffix))
+            return f"artifact://sha256/{digest}{suffix}"
+        os.makedirs(os.path.join(self.root, 'objects', digest[:2]), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.join(self.root, 'objects', digest[:2]))
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        return self._add(digest, suffix, tmp_path, True, metadata)
+
+    def put_file(self, path: str, metadata: Optional[Dict[str, Any]] = None, move: bool = False) -> str:
+        """
+        Store the content of a file.
+
+        Args:
+            path: File to store
+            metadata: JSON-serializable metadata
+            move: Move the file into the store instead of copying it
+
+        Returns:
+            The artifact handle
+        """
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+        suffix = os.path.splitext(path)[1].lower()
+        if not re.fullmatch(r"(?:\.[A-Za-z0-9]{1,10})?", suffix):
+            suffix = ''
+        return self._add(digest.hexdigest(), suffix, path, move, metadata)
+
+    def path(self, handle: str) -> str:
+        """
+        Get the local path of an artifact.
+
+        The file is read-only and shared by every handle with the same content;
+        use export() for a copy that may be changed.
+
+        Args:
+            handle: Artifact handle
+
+        Returns:
+            Path of the stored file
+
+        Raises:
+            KeyError: If the artifact is unknown, was collected or was modified
+        """
+        digest, suffix = self._parse(handle)
+        if not self._is_intact(digest, suffix):
+            raise KeyError(f"Artifact not found: {handle}")
+        os.utime(self._meta_path(digest, suffix))
+        return self._object_path(digest, suffix)
+
+    def open(self, handle: str) -> mmap.mmap:
+        """
+        Map an artifact into memory without copying it.
+
+        Args:
+            handle: Artifact handle
+
+        Returns:
+            A read-only mmap (usable as a context manager and as a buffer)
+
+        Raises:
+            KeyError: If the artifact is unknown
+        """
+        with open(self.path(handle), 'rb') as f:
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def metadata(self, handle: str) -> Dict[str, Any]:
+        """
+        Get the metadata of an artifact.
+
+        Args:
+            handle: Artifact handle
+
+        Returns:
+            Dictionary with 'size', 'created' and the user 'metadata'
+
+        Raises:
+            KeyError: If the artifact is unknown
+        """
+        digest, suffix = self._parse(handle)
+        try:
+            with open(self._meta_path(digest, suffix), encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            raise KeyError(f"Artifact not found: {handle}")
+
+    def export(self, handle: str, destination: str, copy: bool = False) -> str:
+        """
+        Make an artifact available at a path, hard-linking when possible.
+
+        A hard link is the stored file itself and stays read-only; it must be
+        replaced rather than modified in place. Pass copy=True for a private,
+        writable copy.
+
+        Args:
+            handle: Artifact handle
+            destination: Path to create or replace
+            copy: Copy the content instead of linking it
+
+        Returns:
+            The destination path
+        """
+        source = self.path(handle)
+        destination = os.path.abspath(os.path.expanduser(destination))
+        os.makedirs(os.path.dirname(destination) or '.', exist_ok=True)
+        tmp_path = f"{destination}.{os.getpid()}.tmp"
+        if copy:
+            shutil.copyfile(source, tmp_path)
+        else:
+            try:
+                os.link(source, tmp_path)
+            except OSError:
+                shutil.copyfile(source, tmp_path)
+        os.replace(tmp_path, destination)
+        return destination
+
+    def publish(self, path: str, metadata: Optional[Dict[str, Any]] = None) -> str:
+        """
+        Store a copy of a file a tool has written to a path the user chose.
+
+        The file itself stays an ordinary writable file: a later run may
+        overwrite it, and editing it never touches the stored artifact.
+
+        Args:
+            path: Output file of the tool
+            metadata: JSON-serializable metadata
+
+        Returns:
+            The artifact handle
+        """
+        return self.put_file(path, metadata)
+
+    def resolve_arguments(self, value: Any) -> Any:
+        """
+        Replace artifact handles in tool arguments by local paths.
+
+        Tools get the read-only stored file, so a tool that tries to change its
+        input in place fails instead of corrupting the artifact for every other
+        handle with the same content.
+
+        Args:
+            value: Arguments (nested dicts and lists are searched)
+
+        Returns:
+            The arguments with every known handle replaced by its path
+        """
+        if isinstance(value, dict):
+            return {key: self.resolve_arguments(item) for key, item in value.items()}
+        if isinstance(value, list):
+            return [self.resolve_arguments(item) for item in value]
+        if is_handle(value):
+            try:
+                return self.path(value)
+            except KeyError:
+                return value
+        return value
+
+    def _entries(self):
+        """Yield (digest, suffix, size, last_access) of every stored artifact."""
+        objects_dir = os.path.join(self.root, 'objects')
+        if not os.path.isdir(objects_dir):
+            return
+        for shard in os.scandir(objects_dir):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if not entry.name.endswith('.json'):
+                    continue
+                try:
+                    with open(entry.path, encoding='utf-8') as f:
+                        meta = json.load(f)
+                    yield entry.name[:64], meta.get('suffix', ''), meta.get('size', 0), entry.stat().st_mtime
+                except (OSError, ValueError):
+                    continue
+
+    def _total_size(self) -> int:
+        with self._lock:
+            if self._size is None:
+                self._size = sum(size for _, _, size, _ in self._entries())
+            return self._size
+
+    def gc(self, quota_bytes: Optional[int] = None) -> int:
+        """
+        Delete the least recently used artifacts until the store fits its quota.
+
+        Args:
+            quota_bytes: Size to shrink to (defaults to the store's quota)
+
+        Returns:
+            Number of artifacts deleted
+        """
+        quota = self.quota_bytes if quota_bytes is None else quota_bytes
+        entries = sorted(self._entries(), key=lambda entry: entry[3])
+        total = sum(entry[2] for entry in entries)
+        removed = 0
+        for digest, suffix, size, _ in entries:
+            if total <= quota:
+                break
+            for path in (self._meta_path(digest, suffix), self._object_path(digest, suffix)):
+                try:
+                    os.unlink(path)
+                except FileNotFoundError:
+                    pass
+            total -= size
+            removed += 1
+        with self._lock:
+            self._size = total
+        return removed
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get store statistics.
+
+        Returns:
+            Dictionary with the root, number of artifacts, total size and quota in bytes
+        """
+        entries = list(self._entries())
+        total = sum(entry[2] for entry in entries)
+        with self._lock:
+            self._size = total
+        return {'root': self.root, 'artifacts': len(entries), 'size': total, 'quota': self.quota_bytes}
+
+_artifact_stores: Dict[Tuple[Optional[str], Optional[int]], ArtifactStore] = {}
+
+def get_artifact_store(root: Optional[str] = None, quota_bytes: Optional[int] = None) -> ArtifactStore:
+    """
+    Get a process-wide artifact store.
+
+    Args:
+        root: Store directory (defaults to FRACTFLOW_ARTIFACT_DIR or
+              ~/.cache/fractflow/artifacts)
+        quota_bytes: Disk quota of the store (defaults to DEFAULT_QUOTA_BYTES)
+
+    Returns:
+        The shared ArtifactStore instance for that directory and quota
+    """
+    key = (os.path.abspath(os.path.expanduser(root)) if root else None, quota_bytes)
+    store = _artifact_stores.get(key)
+    if store is None:
+        store = _artifact_stores[key] = ArtifactStore(
+            key[0], DEFAULT_QUOTA_BYTES if quota_bytes is None else quota_bytes
+        )
+    return store
@@ -0,0 +1,225 @@
+"""
+Query budgets shared by recursive agents.
+
+A budget bounds the wall-clock time, number of LLM calls and tokens of a whole
+user query, across every level of nested agents. It travels with each MCP
+tools/call request in the `_meta` field, next to the trace context, and all
+processes charge their LLM calls to one ledger file, so siblings running in
+parallel draw from the same pool. Agents shrink their iteration limit to the
+calls left and stop with a partial answer once the budget is exhausted.
+"""
+
+import os
+import re
+import time
+import uuid
+import tempfile
+import contextvars
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+BUDGET_META_KEY = 'fractflow/budget'
+
+# Budget IDs name ledger files, so only uuid4().hex-style IDs are accepted from requests
+_BUDGET_ID = re.compile(r'[0-9a-f]{32}')
+
+_current: contextvars.ContextVar[Optional['Budget']] = contextvars.ContextVar(
+    'fractflow_budget', default=None
+)
+
+class Budget:
+    """
+    Time, LLM call and token limits of one query.
+    """
+
+    def __init__(self, time_limit: Optional[float] = None,
+                 llm_calls: Optional[int] = None,
+                 tokens: Optional[int] = None,
+                 budget_id: Optional[str] = None,
+                 deadline: Optional[float] = None):
+        """
+        Initialize the budget.
+
+        Args:
+            time_limit: Seconds the query may take (None for no limit)
+            llm_calls: Maximum number of LLM calls across all agents (None for no limit)
+            tokens: Maximum number of LLM tokens across all agents (None for no limit)
+            budget_id: ID of an existing budget to share (when received from a parent)
+            deadline: Absolute deadline (time.time()), overriding time_limit
+        """
+        self.id = budget_id or uuid.uuid4().hex
+        self.deadline = deadline if deadline is not None else (
+            time.time() + time_limit if time_limit else None
+        )
+        self.max_llm_calls = llm_calls or None
+        self.max_tokens = tokens or None
+        self.ledger_path = os.path.join(tempfile.gettempdir(), 'fractflow-budgets', f"{self.id}.ledger")
+
+    @property
+    def is_limited(self) -> bool:
+        """Whether any limit is set."""
+        return any(limit is not None for limit in (self.deadline, self.max_llm_calls, self.max_tokens))
+
+    def charge(self, llm_calls: int = 1, tokens: int = 0) -> None:
+        """
+        Record LLM usage in the ledger shared by all processes.
+
+        Args:
+            llm_calls: Number of LLM calls made
+            tokens: Number of tokens they used
+        """
+        if self.max_llm_calls is None and self.max_tokens is None:
+            return
+        os.makedirs(os.path.dirname(self.ledger_path), exist_ok=True)
+        fd = os.open(self.ledger_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+        try:
+            os.write(fd, f"{llm_calls} {tokens}\n".encode('ascii'))
+        finally:
+            os.close(fd)
+
+    def usage(self) -> Tuple[int, int]:
+        """
+        Get the usage charged so far by all agents sharing this budget.
+
+        Returns:
+            Tuple of (LLM calls, tokens)
+        """
+        calls = tokens = 0
+        try:
+            with open(self.ledger_path, encoding='ascii') as f:
+                for line in f:
+                    parts = line.split()
+                    if len(parts) == 2:
+                        calls += int(parts[0])
+                        tokens += int(parts[1])
+        except (OSError, ValueError):
+            pass
+        return calls, tokens
+
+    def remaining_time(self) -> Optional[float]:
+        """Seconds left before the deadline, or None without a time limit."""
+        return None if self.deadline is None else max(0.0, self.deadline - time.time())
+
+    def remaining_llm_calls(self) -> Optional[int]:
+        """LLM calls left, or None without a call limit."""
+        if self.max_llm_calls is None:
+            return None
+        return max(0, self.max_llm_calls - self.usage()[0])
+
+    def exhausted(self) -> Optional[str]:
+        """
+        Check whether the budget is used up.
+
+        Returns:
+            A description of the exhausted limit, or None if budget is left
+        """
+        if self.deadline is not None and time.time() >= self.deadline:
+            return "time limit reached"
+        if self.max_llm_calls is None and self.max_tokens is None:
+            return None
+        calls, tokens = self.usage()
+        if self.max_llm_calls is not None and calls >= self.max_llm_calls:
+            return f"LLM call limit of {self.max_llm_calls} reached"
+        if self.max_tokens is not None and tokens >= self.max_tokens:
+            return f"token limit of {self.max_tokens} reached"
+        return None
+
+    def iteration_limit(self, max_iterations: int) -> int:
+        """
+        Shrink an agent's iteration limit to the LLM calls left.
+
+        Args:
+            max_iterations: The agent's own limit
+
+        Returns:
+            The smaller of the two
+        """
+        remaining = self.remaining_llm_calls()
+        return max_iterations if remaining is None else min(max_iterations, remaining)
+
+    def to_meta(self) -> Dict[str, Any]:
+        """Serialize the budget for the `_meta` field of a request."""
+        return {BUDGET_META_KEY: {
+            'id': self.id,
+            'deadline': self.deadline,
+            'llm_calls': self.max_llm_calls,
+            'tokens': self.max_tokens,
+        }}
+
+    @classmethod
+    def from_meta(cls, meta: Any) -> Optional['Budget']:
+        """
+        Read a budget from the `_meta` field of a request.
+
+        Args:
+            meta: Request meta (pydantic model or dict), may be None
+
+        Returns:
+            The shared budget, or None if the request carries none or its ID
+            is malformed
+        """
+        if meta is None:
+            return None
+        if isinstance(meta, dict):
+            value = meta.get(BUDGET_META_KEY)
+        else:
+            value = (getattr(meta, 'model_extra', None) or {}).get(BUDGET_META_KEY)
+        if not isinstance(value, dict) or not _BUDGET_ID.fullmatch(str(value.get('id') or '')):
+            return None
+        return cls(
+            llm_calls=value.get('llm_calls'),
+            tokens=value.get('tokens'),
+            budget_id=str(value['id']),
+            deadline=value.get('deadline'),
+        )
+
+    def close(self) -> None:
+        """Delete the ledger once the query that owns the budget has finished."""
+        try:
+            os.unlink(self.ledger_path)
+        except OSError:
+            pass
+
+def current() -> Optional[Budget]:
+    """Get the budget of the query the current task works on, if any."""
+    return _current.get()
+
+def inject() -> Optional[Dict[str, Any]]:
+    """
+    Build the `_meta` entries that pass the current budget to a tool server.
+
+    Returns:
+        Dictionary with the serialized budget, or None without a budget
+    """
+    budget = _current.get()
+    return budget.to_meta() if budget is not None else None
+
+@contextmanager
+def attach(budget: Optional[Budget]) -> Iterator[None]:
+    """
+    Run a block of code under a budget.
+
+    Args:
+        budget: Budget to charge, or None to do nothing
+    """
+    if budget is None:
+        yield
+        return
+    token = _current.set(budget)
+    try:
+        yield
+    finally:
+        _current.reset(token)
+
+def record_llm_call(response: Any) -> None:
+    """
+    Charge an LLM response to the current budget.
+
+    Args:
+        response: Chat completion response (its usage is read if present)
+    """
+    budget = _current.get()
+    if budget is None or response is None:
+        return
+    usage = getattr(response, 'usage', None)
+    budget.charge(1, getattr(usage, 'total_tokens', 0) or 0)
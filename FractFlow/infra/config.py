@@ -3,12 +3,49 @@ Configuration management for the agent system.
 
 Provides a unified interface for loading and accessing configuration
 from various sources, including environment variables and config files.
+
+Lookups go through a flattened dotted-key index, and ConfigSnapshot freezes a
+configuration so that it can be shared by many agents without copying. Log call
+paths are scoped with contextvars (see call_path_scope) instead of being
+accumulated in the shared configuration.
 """
 
 import os
 import json
 import copy
-from typing import Any, Dict, Optional
+import contextvars
+from contextlib import contextmanager
+from types import MappingProxyType
+from typing import Any, Dict, FrozenSet, Iterator, Optional
+
+# Call path of the component whose code is running, e.g. 'agent->orchestrator'
+_call_path_scope: contextvars.ContextVar[str] = contextvars.ContextVar('fractflow_call_path', default='')
+
+@contextmanager
+def call_path_scope(call_path: str) -> Iterator[None]:
+    """
+    Make a call path the parent of the components created in a block.
+    
+    Args:
+        call_path: Full call path of the creating component
+    """
+    token = _call_path_scope.set(call_path)
+    try:
+        yield
+    finally:
+        _call_path_scope.reset(token)
+
+def _flatten(config: Dict[str, Any], freeze: bool = False, prefix: str = '') -> Dict[str, Any]:
+    """Index every value of a nested configuration by its dotted key."""
+    flat = {}
+    for key, value in config.items():
+        path = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(_flatten(value, freeze, f"{path}."))
+            if freeze:
+                value = MappingProxyType({k: flat[f"{path}.{k}"] for k in value})
+        flat[path] = value
+    return flat
 
 class ConfigManager:
     """
@@ -18,6 +55,9 @@ class ConfigManager:
     allowing configuration to be set from various sources.
     """
     
+    # Dotted keys of the default configuration, computed once for validation
+    _schema: Optional[FrozenSet[str]] = None
+    
     def __init__(
         self,
         # Provider配置
@@ -49,6 +89,15 @@ class ConfigManager:
         max_iterations: int = 10,
         custom_system_prompt: str = '',
         call_path: str = '',
+        parallel_tool_calls: bool = False,
+        tool_top_k: int = 0,
+        plan_mode: bool = False,
+        response_cache: bool = False,
+        response_cache_ttl: float = 3600.0,
+        response_cache_similarity: float = 0.9,
+        budget_time: float = 0.0,
+        budget_llm_calls: int = 0,
+        budget_tokens: int = 0,
         
         # 工具调用配置
         tool_calling_max_retries: int = 5,
@@ -56,6 +105,41 @@ class ConfigManager:
         tool_calling_model: str = 'deepseek-chat',
         tool_calling_version: str = 'stable',
         tool_calling_temperature: float = 0,
+        
+        # MCP工具服务器配置
+        mcp_lazy_start: bool = False,
+        mcp_idle_timeout: float = 300.0,
+        mcp_manifest_cache_dir: str = '',
+        mcp_zygote: bool = False,
+        mcp_result_cache: bool = True,
+        mcp_result_cache_size: int = 1024,
+        mcp_result_cache_ttl: float = 300.0,
+        mcp_result_cache_policies: Optional[Dict[str, float]] = None,
+        mcp_coalesce_calls: bool = True,
+        
+        # 工具调用调度配置
+        scheduler_max_concurrent: int = 0,
+        scheduler_tool_limits: Optional[Dict[str, int]] = None,
+        scheduler_priority: str = 'interactive',
+        
+        # 产物存储配置
+        artifacts_dir: str = '',
+        artifacts_quota_mb: int = 10240,
+        
+        # 运行监控配置
+        monitor_loop_threshold: float = 0.0,
+        monitor_loop_report_dir: str = '',
+        monitor_resource_interval: float = 10.0,
+        monitor_rss_limit_mb: float = 0.0,
+        monitor_fd_limit: int = 0,
+        
+        # 链路追踪配置
+        tracing_dir: str = '',
+        
+        # 会话历史配置
+        history_store: str = '',
+        history_path: str = '',
+        history_window: int = 50,
     ):
         """
         Initialize the config manager with configuration parameters.
@@ -81,11 +165,43 @@ class ConfigManager:
             max_iterations: Agent最大迭代次数，影响复杂任务处理深度
             custom_system_prompt: 自定义系统提示，用于调整Agent行为风格
             call_path: 调用路径，用于日志记录层次结构
+            parallel_tool_calls: 模型在同一轮返回多个工具调用时是否并发执行（结果仍按原顺序写入历史）；默认按顺序执行，因为同一轮的调用可能相互依赖（如先创建目录再写文件），只在确认工具调用彼此独立时开启
+            tool_top_k: 每轮提示中只描述与当前请求最相关的 k 个工具（本地 BM25 检索），0 表示描述全部工具；所选工具无法满足请求时自动扩展到全部工具
+            plan_mode: 规划模式，模型可一次性给出带依赖关系的工具调用图（DAG），按依赖并行执行后再由模型汇总，仅在出错时返回模型
+            response_cache: 是否缓存新会话（无历史轮次）的最终回答，相同或高度相似的问题直接返回缓存结果，进程内所有智能体共享；按模型、系统提示和工具集区分
+            response_cache_ttl: 缓存回答的有效时间（秒）
+            response_cache_similarity: 近似匹配所需的最小 TF-IDF 余弦相似度，0 表示只接受规范化后完全相同的问题
+            budget_time: 每个查询的总耗时预算（秒），随工具调用传递给所有嵌套智能体，用尽后各层返回已有的部分结果，0 表示不限制；作为嵌套智能体运行时沿用上层预算
+            budget_llm_calls: 每个查询在所有嵌套智能体中的 LLM 调用总数预算，同时限制各层的迭代次数，0 表示不限制
+            budget_tokens: 每个查询在所有嵌套智能体中的 LLM token 总数预算，0 表示不限制
             tool_calling_max_retries: 工具调用最大重试次数
             tool_calling_base_url: 工具调用API基础URL
             tool_calling_model: 工具调用使用的模型
             tool_calling_version: 工具调用版本，'stable'更稳定，'turbo'更快
             tool_calling_temperature: 工具调用温度参数
+            mcp_lazy_start: 是否按需启动工具服务器（首次调用时才启动进程）
+            mcp_idle_timeout: 按需启动的工具服务器空闲多少秒后自动关闭，0 表示不自动关闭
+            mcp_manifest_cache_dir: 工具清单缓存目录，为空时使用 ~/.cache/fractflow/tool_manifests
+            mcp_zygote: 是否通过预加载依赖的常驻进程 fork 工具服务器以加快启动（仅 Linux），嵌套智能体自动继承
+            mcp_result_cache: 是否缓存只读工具（声明 readOnlyHint 注解的工具）的调用结果，进程内所有智能体共享
+            mcp_result_cache_size: 结果缓存最多保存的条目数（LRU 淘汰）
+            mcp_result_cache_ttl: 只读工具结果的默认缓存时间（秒）
+            mcp_result_cache_policies: 按工具名覆盖缓存时间（秒），0 表示不缓存，例如 {'web_search': 600, 'get_alerts': 0}
+            mcp_coalesce_calls: 是否合并同时进行的相同工具调用（仅限声明 readOnlyHint 或 idempotentHint 的工具），后到者等待首个调用的结果
+            scheduler_max_concurrent: 进程内所有会话同时执行的工具调用上限，0 表示不限制；只约束本 Agent 的调用，不影响其他 Agent 的设置
+            scheduler_tool_limits: 按工具名限制并发数，例如 {'execute_comfyui_workflow': 2}，同样只约束本 Agent；排队调用在会话间轮转公平调度
+            scheduler_priority: 该智能体工具调用的默认优先级，'interactive'（交互）优先于 'batch'（批处理）
+            artifacts_dir: 按内容哈希存储图片、音频、视频等产物的共享目录，为空时使用 FRACTFLOW_ARTIFACT_DIR 或 ~/.cache/fractflow/artifacts；工具参数中的 artifact:// 句柄自动解析为本地路径
+            artifacts_quota_mb: 产物存储的磁盘配额（MB），超出后按最近最少使用删除，0 表示不限制
+            monitor_loop_threshold: 事件循环阻塞检测阈值（秒），大于 0 时监控智能体及其启动的所有工具服务器，记录阻塞超过阈值的调用栈并按工具汇总
+            monitor_loop_report_dir: 事件循环阻塞报告目录，每个被监控的进程在其中写入一个 JSON 汇总，为空时只写日志
+            monitor_resource_interval: 工具服务器资源（CPU、内存、打开的文件）采样间隔（秒），包括其嵌套智能体启动的子进程，0 表示不采样
+            monitor_rss_limit_mb: 工具服务器进程树的内存软限制（MB），超出后在空闲时重启该服务器，0 表示不限制
+            monitor_fd_limit: 工具服务器进程树打开文件数的软限制，超出后在空闲时重启该服务器，0 表示不限制
+            tracing_dir: 链路追踪的共享目录，非空时智能体及其所有（嵌套）工具服务器把调用片段写入其中，按 trace ID 合并为时间线，为空时使用 FRACTFLOW_TRACE_DIR，均未设置则不追踪
+            history_store: 会话历史的持久化后端，'sqlite' 时按会话 ID 追加写入本地数据库，可通过会话 ID 恢复会话；为空时只保存在内存中
+            history_path: SQLite 会话历史数据库路径，为空时使用 ~/.cache/fractflow/history.sqlite3
+            history_window: 持久化会话在内存中保留并发送给模型的最近消息数（系统提示除外），更早的消息按需从数据库读取
         """
         # 自动从环境变量读取API密钥
         if deepseek_api_key is None:
@@ -124,6 +240,15 @@ class ConfigManager:
                 'custom_system_prompt': custom_system_prompt,
                 'provider': provider,
                 'call_path': call_path,
+                'parallel_tool_calls': parallel_tool_calls,
+                'tool_top_k': tool_top_k,
+                'plan_mode': plan_mode,
+                'response_cache': response_cache,
+                'response_cache_ttl': response_cache_ttl,
+                'response_cache_similarity': response_cache_similarity,
+                'budget_time': budget_time,
+                'budget_llm_calls': budget_llm_calls,
+                'budget_tokens': budget_tokens,
             },
             'tool_calling': {
                 'max_retries': tool_calling_max_retries,
@@ -131,8 +256,59 @@ class ConfigManager:
                 'model': tool_calling_model,
                 'version': tool_calling_version,
                 'temperature': tool_calling_temperature,
+            },
+            'mcp': {
+                'lazy_start': mcp_lazy_start,
+                'idle_timeout': mcp_idle_timeout,
+                'manifest_cache_dir': mcp_manifest_cache_dir,
+                'zygote': mcp_zygote,
+                'result_cache': mcp_result_cache,
+                'result_cache_size': mcp_result_cache_size,
+                'result_cache_ttl': mcp_result_cache_ttl,
+                'result_cache_policies': mcp_result_cache_policies or {},
+                'coalesce_calls': mcp_coalesce_calls,
+            },
+            'scheduler': {
+                'max_concurrent': scheduler_max_concurrent,
+                'tool_limits': scheduler_tool_limits or {},
+                'priority': scheduler_priority,
+            },
+            'artifacts': {
+                'dir': artifacts_dir,
+                'quota_mb': artifacts_quota_mb,
+            },
+            'monitor': {
+                'loop_threshold': monitor_loop_threshold,
+                'loop_report_dir': monitor_loop_report_dir,
+                'resource_interval': monitor_resource_interval,
+                'rss_limit_mb': monitor_rss_limit_mb,
+                'fd_limit': monitor_fd_limit,
+            },
+            'tracing': {
+                'dir': tracing_dir,
+            },
+            'history': {
+                'store': history_store,
+                'path': history_path,
+                'window': history_window,
             }
         }
+        self._flat: Optional[Dict[str, Any]] = None
+    
+    @classmethod
+    def _valid_keys(cls) -> FrozenSet[str]:
+        """Get the dotted keys of the default configuration structure."""
+        if ConfigManager._schema is None:
+            ConfigManager._schema = frozenset(_flatten(ConfigManager()._config))
+        return ConfigManager._schema
+    
+    @classmethod
+    def _from_config(cls, config: Dict[str, Any]) -> 'ConfigManager':
+        """Create an instance around an existing configuration dictionary without reading the environment."""
+        instance = cls.__new__(cls)
+        instance._config = config
+        instance._flat = None
+        return instance
     
     def get_config(self) -> Dict[str, Any]:
         """
@@ -151,9 +327,16 @@ class ConfigManager:
         Returns:
             A new ConfigManager instance with a copy of the current configuration
         """
-        new_config = ConfigManager()
-        new_config.set_config(self.get_config())
-        return new_config
+        return ConfigManager._from_config(self.get_config())
+    
+    def snapshot(self) -> 'ConfigSnapshot':
+        """
+        Freeze the current configuration.
+        
+        Returns:
+            An immutable ConfigSnapshot that later changes to this instance do not affect
+        """
+        return ConfigSnapshot(self.get_config())
     
     def set_config(self, config: Dict[str, Any]) -> None:
         """
@@ -185,16 +368,9 @@ class ConfigManager:
         Returns:
             The configuration value, or the default if not found
         """
-        parts = key.split('.')
-        value = self._config
-        
-        for part in parts:
-            if isinstance(value, dict) and part in value:
-                value = value[part]
-            else:
-                return default
-                
-        return value
+        if self._flat is None:
+            self._flat = _flatten(self._config)
+        return self._flat.get(key, default)
     
     def set(self, key: str, value: Any) -> None:
         """
@@ -211,18 +387,10 @@ class ConfigManager:
         if value is None:
             return
             
-        # Check if the key exists in the default configuration by creating a temporary default instance
-        default_config = ConfigManager()._config
-        parts = key.split('.')
-        check_config = default_config
+        if key not in self._valid_keys():
+            raise KeyError(f"Config key '{key}' does not exist in the default configuration structure")
         
-        for part in parts:
-            if isinstance(check_config, dict) and part in check_config:
-                check_config = check_config[part]
-            else:
-                raise KeyError(f"Config key '{key}' does not exist in the default configuration structure")
-        
-        # If we got here, the key exists in the default config, so we can set it
+        parts = key.split('.')
         config = self._config
         
         for i, part in enumerate(parts[:-1]):
@@ -231,6 +399,7 @@ class ConfigManager:
             config = config[part]
             
         config[parts[-1]] = value
+        self._flat = None
     
     def load_from_file(self, file_path: str) -> None:
         """
@@ -248,25 +417,78 @@ class ConfigManager:
         except Exception as e:
             print(f"Error loading configuration from {file_path}: {e}")
 
-    def push_to_call_path(self, module_name: str) -> None:
+    def push_to_call_path(self, module_name: str) -> str:
         """
-        Push a module name to the call path.
+        Build the call path of a component.
+        
+        The path extends the scope of the component that is creating it (see
+        call_path_scope), or the configured agent.call_path at the top level.
+        The configuration itself is not modified, so components sharing it
+        (e.g. one snapshot per tool class) neither see nor accumulate each
+        other's names; each component keeps the returned path itself.
         
         Args:
             module_name: The module name to add to the call path
+            
+        Returns:
+            The component's call path
         """
-        current_path = self.get('agent.call_path', '')
+        current_path = _call_path_scope.get() or self.get('agent.call_path', '')
         if current_path:
             new_path = f"{current_path}->{module_name}"
         else:
             new_path = module_name
-        self.set('agent.call_path', new_path)
+        return new_path
     
     def get_call_path(self) -> str:
         """
         Get the current call path.
         
         Returns:
-            The current call path as a string
+            The path of the current scope, or the configured agent.call_path
+        """
+        return _call_path_scope.get() or self.get('agent.call_path', '')
+
+class ConfigSnapshot(ConfigManager):
+    """
+    Immutable, precompiled configuration.
+    
+    Every dotted key is resolved in one dictionary lookup and sections are
+    read-only views, so one snapshot can be shared by any number of agents.
+    Use create_copy() to get a mutable ConfigManager again.
+    """
+    
+    def __init__(self, config: Dict[str, Any]):
+        """
+        Initialize the snapshot.
+        
+        Args:
+            config: Configuration dictionary, which the snapshot takes ownership of
+        """
+        self._config = config
+        self._flat = _flatten(config, freeze=True)
+    
+    def snapshot(self) -> 'ConfigSnapshot':
+        """Return this snapshot, which is already immutable."""
+        return self
+    
+    def set(self, key: str, value: Any) -> None:
+        """
+        Raises:
+            TypeError: Always, snapshots cannot be modified
+        """
+        raise TypeError("ConfigSnapshot is immutable; use create_copy() to get a modifiable ConfigManager")
+    
+    def set_config(self, config: Dict[str, Any]) -> None:
+        """
+        Raises:
+            TypeError: Always, snapshots cannot be modified
+        """
+        raise TypeError("ConfigSnapshot is immutable; use create_copy() to get a modifiable ConfigManager")
+    
+    def load_from_file(self, file_path: str) -> None:
+        """
+        Raises:
+            TypeError: Always, snapshots cannot be modified
         """
-        return self.get('agent.call_path', '') 
\ No newline at end of file
+        raise TypeError("ConfigSnapshot is immutable; use create_copy() to get a modifiable ConfigManager")
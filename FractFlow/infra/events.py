@@ -0,0 +1,73 @@
+"""
+Progress events of a running query.
+
+While a query is processed under an event sink (see Agent.stream_query), the
+agent reports what it is doing: 'token' events carry pieces of the model's
+response as they are generated, 'tool_start' and 'tool_end' events bracket
+each tool call. Components call emit(), which does nothing when no sink is
+attached, so streaming costs nothing for ordinary queries.
+
+Events may be emitted from worker threads (the model's streaming response is
+read in one); they are handed to the sink on the event loop it was attached on.
+"""
+
+import time
+import asyncio
+import contextvars
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+Sink = Callable[[Dict[str, Any]], None]
+
+# (sink, event loop the sink belongs to) of the query the current task works on
+_current: contextvars.ContextVar[Optional[Tuple[Sink, Optional[asyncio.AbstractEventLoop]]]] = contextvars.ContextVar(
+    'fractflow_event_sink', default=None
+)
+
+def is_enabled() -> bool:
+    """Whether events of the current task are consumed by anyone."""
+    return _current.get() is not None
+
+@contextmanager
+def attach(sink: Optional[Sink]) -> Iterator[None]:
+    """
+    Send the events of a block of code to a sink.
+
+    Args:
+        sink: Callable receiving each event dictionary on the current event
+              loop, or None to do nothing
+    """
+    if sink is None:
+        yield
+        return
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        loop = None
+    token = _current.set((sink, loop))
+    try:
+        yield
+    finally:
+        _current.reset(token)
+
+def emit(event_type: str, **data: Any) -> None:
+    """
+    Report an event to the current sink, if any.
+
+    Args:
+        event_type: Event type, e.g. 'token' or 'tool_start'
+        **data: JSON-serializable event fields
+    """
+    current = _current.get()
+    if current is None:
+        return
+    sink, loop = current
+    event = {'type': event_type, 'time': time.time(), **data}
+    try:
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        running = None
+    if loop is None or running is loop:
+        sink(event)
+    elif not loop.is_closed():
+        loop.call_soon_threadsafe(sink, event)
@@ -0,0 +1,323 @@
+"""
+Event loop stall detection.
+
+A LoopMonitor keeps a heartbeat callback scheduled on an asyncio event loop and
+runs a watchdog thread that notices when the heartbeat is late. When the loop
+has been blocked for longer than the threshold, the watchdog captures the stack
+of the loop thread, so the code doing blocking work inside `async def` (a
+synchronous HTTP or websocket client, a model call, video encoding...) shows up
+by name. Stalls are aggregated per MCP tool when a tool is running on the
+blocked stack, and per code location otherwise.
+
+The agent enables it through the `monitor.loop_threshold` setting; tool servers
+it starts inherit it through the FRACTFLOW_LOOP_MONITOR environment variable and
+are run under run_script(), which attaches a monitor to the server's loop.
+"""
+
+import os
+import sys
+import json
+import time
+import runpy
+import asyncio
+import logging
+import sysconfig
+import threading
+import traceback
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Stall threshold in seconds; tool servers started while it is set are monitored
+LOOP_MONITOR_ENV = 'FRACTFLOW_LOOP_MONITOR'
+# Directory in which every monitored process keeps a JSON report of its stalls
+LOOP_MONITOR_REPORT_ENV = 'FRACTFLOW_LOOP_MONITOR_REPORT_DIR'
+
+# Runs a server script under the monitor: python -c BOOTSTRAP script.py [args...]
+BOOTSTRAP = 'import sys; from FractFlow.infra.loop_monitor import run_script; run_script(sys.argv[1], sys.argv[2:])'
+
+_LIBRARY_PATHS = tuple(
+    os.path.realpath(path) + os.sep
+    for path in {sysconfig.get_paths()[key] for key in ('stdlib', 'platstdlib', 'purelib', 'platlib')}
+)
+_PACKAGE_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def _is_library(filename: str) -> bool:
+    return filename.startswith('<') or os.path.realpath(filename).startswith(_LIBRARY_PATHS)
+
+def _running_tool(frame) -> Optional[str]:
+    """Name of the FastMCP tool whose call is on the stack, if any."""
+    while frame is not None:
+        code = frame.f_code
+        if code.co_name == 'run' and code.co_filename.endswith(os.path.join('fastmcp', 'tools', 'base.py')):
+            try:
+                return getattr(frame.f_locals.get('self'), 'name', None)
+            except Exception:
+                return None
+        frame = frame.f_back
+    return None
+
+class LoopMonitor:
+    """
+    Watchdog for event loop stalls.
+
+    The heartbeat runs every `interval` seconds on the watched loop. The watchdog
+    thread checks it at the same pace; once the next beat is overdue by more than
+    `threshold`, it snapshots the loop thread's stack. The stall's full duration
+    is recorded when the loop gets to run the heartbeat again.
+    """
+
+    def __init__(self, threshold: float = 0.25, interval: Optional[float] = None,
+                 report_dir: Optional[str] = None, name: Optional[str] = None):
+        """
+        Initialize the monitor.
+
+        Args:
+            threshold: Seconds the loop may be blocked before a stall is recorded
+            interval: Seconds between heartbeats (defaults to a fifth of the threshold)
+            report_dir: Directory to keep a JSON report of this process's stalls in
+            name: Process name used in logs and in the report file name
+        """
+        self.threshold = threshold
+        self.interval = interval or threshold / 5
+        self.report_dir = report_dir
+        self.name = name or os.path.basename(sys.argv[0] or 'python')
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread: Optional[int] = None
+        self._due: Optional[float] = None
+        self._stall: Optional[Dict[str, Any]] = None
+        self._lock = threading.Lock()
+        self._watchdog: Optional[threading.Thread] = None
+        self._stats: Dict[str, Dict[str, Any]] = {}
+
+    def attach(self, loop: asyncio.AbstractEventLoop) -> None:
+        """
+        Start watching an event loop (replacing the previously watched one).
+
+        Args:
+            loop: The loop to watch; the heartbeat starts once it runs
+        """
+        with self._lock:
+            if loop is self._loop:
+                return
+            self._loop = loop
+            self._due = None
+            self._stall = None
+            if self._watchdog is None:
+                self._watchdog = threading.Thread(target=self._watch, name='loop-monitor', daemon=True)
+                self._watchdog.start()
+        loop.call_soon_threadsafe(self._beat, loop)
+
+    def _beat(self, loop: asyncio.AbstractEventLoop) -> None:
+        """Heartbeat callback; runs on the watched loop."""
+        if loop is not self._loop:
+            return
+        now = time.monotonic()
+        with self._lock:
+            stall, self._stall = self._stall, None
+            if stall is not None:
+                stall['duration'] = now - stall['since']
+            self._loop_thread = threading.get_ident()
+            self._due = now + self.interval
+        if stall is not None:
+            self._record(stall)
+        loop.call_later(self.interval, self._beat, loop)
+
+    def _watch(self) -> None:
+        """Watchdog thread body."""
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                loop = self._loop
+                if loop is None or loop.is_closed():
+                    self._loop = None
+                    self._watchdog = None
+                    return
+                if not loop.is_running():
+                    # Between runs nothing is blocked; restart the clock on the next beat
+                    self._due = None
+                    continue
+                if self._due is None or self._stall is not None:
+                    continue
+                since = self._due
+                if time.monotonic() - since < self.threshold:
+                    continue
+                frame = sys._current_frames().get(self._loop_thread)
+                if frame is None:
+                    continue
+                stall = self._stall = self._capture(loop, frame, since)
+            logger.warning(
+                f"Event loop blocked for more than {self.threshold:.2f}s in {stall['key']}\n"
+                + ''.join(stall['stack'])
+            )
+
+    def _capture(self, loop: asyncio.AbstractEventLoop, frame, since: float) -> Dict[str, Any]:
+        """Snapshot the blocked loop thread."""
+        summary = traceback.extract_stack(frame)
+        tool = _running_tool(frame)
+        if tool:
+            key = f"tool:{tool}"
+        else:
+            # Innermost frame outside the standard library and installed packages
+            culprit = next((f for f in reversed(summary) if not _is_library(f.filename)), summary[-1])
+            filename = culprit.filename
+            if filename.startswith(_PACKAGE_ROOT + os.sep):
+                filename = os.path.relpath(filename, _PACKAGE_ROOT)
+            key = f"{filename}:{culprit.lineno} ({culprit.name})"
+        task = asyncio.current_task(loop)
+        return {
+            'key': key,
+            'since': since,
+            'task': task.get_name() if task is not None else None,
+            'stack': traceback.format_list(summary),
+        }
+
+    def _record(self, stall: Dict[str, Any]) -> None:
+        """Aggregate a finished stall."""
+        duration = stall['duration']
+        with self._lock:
+            stats = self._stats.setdefault(stall['key'], {'stalls': 0, 'total_time': 0.0, 'max_time': 0.0})
+            stats['stalls'] += 1
+            stats['total_time'] += duration
+            if duration >= stats['max_time']:
+                stats.update(max_time=duration, task=stall['task'], stack=stall['stack'])
+        logger.warning(f"Event loop was blocked for {duration:.2f}s in {stall['key']}")
+        if self.report_dir:
+            self._save_report()
+
+    def _save_report(self) -> None:
+        path = os.path.join(self.report_dir, f"loop_stalls-{self.name}-{os.getpid()}.json")
+        try:
+            os.makedirs(self.report_dir, exist_ok=True)
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump({'process': self.name, 'pid': os.getpid(), 'threshold': self.threshold,
+                           'stalls': self.get_stats()}, f, indent=2, ensure_ascii=False)
+        except OSError as e:
+            logger.warning(f"Could not write loop stall report {path}: {e}")
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Get the stalls seen so far.
+
+        Returns:
+            Dictionary keyed by 'tool:<name>' or code location, each with the number
+            of 'stalls', 'total_time' and 'max_time' in seconds, and the 'task' and
+            'stack' of the longest one, ordered by total time
+        """
+        with self._lock:
+            items = sorted(self._stats.items(), key=lambda item: item[1]['total_time'], reverse=True)
+            return {key: dict(stats) for key, stats in items}
+
+    def reset(self) -> None:
+        """Forget the recorded stalls."""
+        with self._lock:
+            self._stats.clear()
+
+_loop_monitor: Optional[LoopMonitor] = None
+
+def get_loop_monitor() -> LoopMonitor:
+    """
+    Get the process-wide loop monitor.
+
+    Returns:
+        The shared LoopMonitor (not watching any loop until attach() is called)
+    """
+    global _loop_monitor
+    if _loop_monitor is None:
+        _loop_monitor = LoopMonitor()
+    return _loop_monitor
+
+def enable(threshold: float, report_dir: Optional[str] = None,
+           loop: Optional[asyncio.AbstractEventLoop] = None) -> LoopMonitor:
+    """
+    Watch the current event loop and the tool servers started from now on.
+
+    Args:
+        threshold: Seconds the loop may be blocked before a stall is recorded
+        report_dir: Directory for JSON stall reports of this process and its servers
+        loop: Loop to watch (defaults to the running loop)
+
+    Returns:
+        The process-wide LoopMonitor
+    """
+    monitor = get_loop_monitor()
+    monitor.threshold = threshold
+    monitor.interval = threshold / 5
+    monitor.report_dir = report_dir or None
+    os.environ[LOOP_MONITOR_ENV] = str(threshold)
+    if report_dir:
+        os.environ[LOOP_MONITOR_REPORT_ENV] = report_dir
+    monitor.attach(loop or asyncio.get_running_loop())
+    return monitor
+
+def is_enabled() -> bool:
+    """Whether tool servers should be started under the monitor."""
+    return bool(os.environ.get(LOOP_MONITOR_ENV))
+
+def server_environment(env: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+    """
+    Build the environment for a monitored tool server.
+
+    Args:
+        env: Environment the server would otherwise get (None for the MCP default)
+
+    Returns:
+        The environment with the monitor settings and the FractFlow package on PYTHONPATH
+    """
+    if env is None:
+        from mcp.client.stdio import get_default_environment
+        env = get_default_environment()
+    env = dict(env)
+    for name in (LOOP_MONITOR_ENV, LOOP_MONITOR_REPORT_ENV):
+        if os.environ.get(name):
+            env[name] = os.environ[name]
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [_PACKAGE_ROOT, env.get('PYTHONPATH')]))
+    return env
+
+class _MonitoredEventLoopPolicy(asyncio.DefaultEventLoopPolicy):
+    """Attaches the process-wide monitor to every new event loop."""
+
+    def new_event_loop(self):
+        loop = super().new_event_loop()
+        get_loop_monitor().attach(loop)
+        return loop
+
+def install_from_environment(name: Optional[str] = None) -> bool:
+    """
+    Monitor the event loops of this process if FRACTFLOW_LOOP_MONITOR is set.
+
+    Args:
+        name: Process name used in logs and report file names
+
+    Returns:
+        Whether monitoring was installed
+    """
+    try:
+        threshold = float(os.environ.get(LOOP_MONITOR_ENV) or 0)
+    except ValueError:
+        threshold = 0
+    if threshold <= 0:
+        return False
+    monitor = get_loop_monitor()
+    monitor.threshold = threshold
+    monitor.interval = threshold / 5
+    monitor.report_dir = os.environ.get(LOOP_MONITOR_REPORT_ENV) or None
+    if name:
+        monitor.name = name
+    asyncio.set_event_loop_policy(_MonitoredEventLoopPolicy())
+    return True
+
+def run_script(script: str, args: List[str]) -> None:
+    """
+    Run a tool server script as __main__ with its event loops monitored.
+
+    Args:
+        script: Path to the server script
+        args: Command line arguments for the script
+    """
+    script = os.path.abspath(script)
+    install_from_environment(os.path.splitext(os.path.basename(script))[0])
+    sys.argv = [script] + list(args)
+    sys.path[0] = os.path.dirname(script)
+    runpy.run_path(script, run_name='__main__')
@@ -0,0 +1,291 @@
+"""
+Trace propagation across agent processes.
+
+A user query handled by a composite agent fans out over several processes: the
+agent calls tool servers, some of which are agents themselves with their own
+tool servers. Every process records spans (queries, model calls, tool calls)
+to a shared local sink, one JSON-lines file per trace in FRACTFLOW_TRACE_DIR,
+and the trace and parent span IDs travel with each MCP tools/call request in
+the `_meta` field as a W3C `traceparent`. The spans of one query can then be
+merged into a timeline or a Chrome trace (flame graph):
+
+    python -m FractFlow.infra.tracing <trace_id> [--chrome trace.json]
+
+Tracing is off unless FRACTFLOW_TRACE_DIR is set (see the 'tracing' config
+section); tool servers inherit the variable from their agent.
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import secrets
+import argparse
+import contextvars
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+TRACE_DIR_ENV = 'FRACTFLOW_TRACE_DIR'
+TRACEPARENT_KEY = 'traceparent'
+
+# version-trace_id-parent_id-flags; IDs are lowercase hex and never all zeros
+_TRACE_ID = re.compile(r'[0-9a-f]{32}')
+_SPAN_ID = re.compile(r'[0-9a-f]{16}')
+
+# (trace_id, span_id) of the span the current task runs in
+_current: contextvars.ContextVar[Optional[Tuple[str, str]]] = contextvars.ContextVar(
+    'fractflow_trace_span', default=None
+)
+
+def is_enabled() -> bool:
+    """Whether spans are recorded in this process."""
+    return bool(os.environ.get(TRACE_DIR_ENV))
+
+def enable(directory: str) -> None:
+    """
+    Record spans of this process and the tool servers it starts.
+
+    Args:
+        directory: Directory of the shared trace sink
+    """
+    directory = os.path.abspath(os.path.expanduser(directory))
+    os.makedirs(directory, exist_ok=True)
+    os.environ[TRACE_DIR_ENV] = directory
+
+def current() -> Optional[Tuple[str, str]]:
+    """Get the (trace_id, span_id) of the current span, if any."""
+    return _current.get()
+
+def inject() -> Optional[Dict[str, str]]:
+    """
+    Build the `_meta` entries that carry the current span to a tool server.
+
+    Returns:
+        Dictionary with a W3C traceparent, or None outside of a traced span
+    """
+    context = _current.get()
+    if context is None or not is_enabled():
+        return None
+    return {TRACEPARENT_KEY: f"00-{context[0]}-{context[1]}-01"}
+
+def extract(meta: Any) -> Optional[Tuple[str, str]]:
+    """
+    Read the parent span from the `_meta` of a request.
+
+    Args:
+        meta: Request meta (pydantic model or dict), may be None
+
+    Returns:
+        (trace_id, parent_span_id), or None if the request carries no valid traceparent
+    """
+    if meta is None:
+        return None
+    if isinstance(meta, dict):
+        value = meta.get(TRACEPARENT_KEY)
+    else:
+        value = getattr(meta, TRACEPARENT_KEY, None) or (getattr(meta, 'model_extra', None) or {}).get(TRACEPARENT_KEY)
+    parts = value.split('-') if isinstance(value, str) else []
+    if len(parts) != 4:
+        return None
+    trace_id, span_id = parts[1], parts[2]
+    # The trace ID names a file in the trace sink, so anything but hex is rejected
+    if not _TRACE_ID.fullmatch(trace_id) or not _SPAN_ID.fullmatch(span_id):
+        return None
+    if trace_id == '0' * 32 or span_id == '0' * 16:
+        return None
+    return trace_id, span_id
+
+@contextmanager
+def attach(context: Optional[Tuple[str, str]]) -> Iterator[None]:
+    """
+    Continue a trace received from another process.
+
+    Args:
+        context: (trace_id, parent_span_id) from extract(), or None to do nothing
+    """
+    if context is None:
+        yield
+        return
+    token = _current.set(context)
+    try:
+        yield
+    finally:
+        _current.reset(token)
+
+def _process_name() -> str:
+    return os.path.splitext(os.path.basename(sys.argv[0] or 'python'))[0] or 'python'
+
+def _write(trace_id: str, record: Dict[str, Any]) -> None:
+    """Append a span to the trace file shared by all processes."""
+    path = os.path.join(os.environ[TRACE_DIR_ENV], f"{trace_id}.jsonl")
+    line = json.dumps(record, ensure_ascii=False, default=str) + '\n'
+    # One write per line on an O_APPEND descriptor keeps concurrent writers from interleaving
+    fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        os.write(fd, line.encode('utf-8'))
+    finally:
+        os.close(fd)
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Optional[Dict[str, Any]]]:
+    """
+    Record a span around a block of code.
+
+    The span is a child of the current span, or starts a new trace. Nothing is
+    recorded while tracing is disabled.
+
+    Args:
+        name: Span name, e.g. 'query' or 'tool:web_search'
+        **attributes: JSON-serializable attributes stored with the span
+
+    Yields:
+        The span's attribute dictionary (to add attributes), or None when disabled
+    """
+    if not is_enabled():
+        yield None
+        return
+    parent = _current.get()
+    trace_id = parent[0] if parent else secrets.token_hex(16)
+    span_id = secrets.token_hex(8)
+    token = _current.set((trace_id, span_id))
+    start = time.time()
+    started = time.perf_counter()
+    status, error = 'ok', None
+    try:
+        yield attributes
+    except BaseException as e:
+        status, error = 'error', f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        _current.reset(token)
+        record = {
+            'trace_id': trace_id,
+            'span_id': span_id,
+            'parent_id': parent[1] if parent else None,
+            'name': name,
+            'start': start,
+            'duration': time.perf_counter() - started,
+            'pid': os.getpid(),
+            'process': _process_name(),
+            'status': status,
+            'attributes': attributes,
+        }
+        if error is not None:
+            record['error'] = error
+        try:
+            _write(trace_id, record)
+        except OSError:
+            pass
+
+def load_trace(trace_id: str, directory: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Load the spans of a trace recorded by all processes.
+
+    Args:
+        trace_id: ID of the trace
+        directory: Trace sink directory (defaults to FRACTFLOW_TRACE_DIR)
+
+    Returns:
+        Spans ordered by start time
+    """
+    path = os.path.join(directory or os.environ.get(TRACE_DIR_ENV, '.'), f"{trace_id}.jsonl")
+    spans = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            try:
+                spans.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+    return sorted(spans, key=lambda record: record['start'])
+
+def format_timeline(spans: List[Dict[str, Any]]) -> str:
+    """
+    Render spans as an indented call tree with offsets and durations.
+
+    Args:
+        spans: Spans of one trace
+
+    Returns:
+        One line per span: start offset, duration, process and name
+    """
+    if not spans:
+        return ''
+    origin = min(record['start'] for record in spans)
+    ids = {record['span_id'] for record in spans}
+    children: Dict[Optional[str], List[Dict[str, Any]]] = {}
+    for record in spans:
+        parent = record['parent_id'] if record['parent_id'] in ids else None
+        children.setdefault(parent, []).append(record)
+
+    lines = []
+    def visit(record: Dict[str, Any], depth: int) -> None:
+        marker = ' !' if record.get('status') == 'error' else ''
+        lines.append(
+            f"{(record['start'] - origin) * 1000:9.1f}ms {record['duration'] * 1000:9.1f}ms  "
+            f"{'  ' * depth}{record['name']} [{record['process']}:{record['pid']}]{marker}"
+        )
+        for child in children.get(record['span_id'], []):
+            visit(child, depth + 1)
+    for root in children.get(None, []):
+        visit(root, 0)
+    return '\n'.join(lines)
+
+def to_chrome_trace(spans: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Convert spans to the Chrome trace event format (chrome://tracing, Perfetto).
+
+    Overlapping spans of one process, such as parallel tool calls, are placed on
+    separate tracks so that every track nests properly.
+
+    Args:
+        spans: Spans of one trace
+
+    Returns:
+        A JSON-serializable trace object
+    """
+    events = []
+    lanes: Dict[int, List[List[float]]] = {}  # pid -> per track, end times of the open spans
+    names: Dict[int, str] = {}
+    for record in sorted(spans, key=lambda r: (r['start'], -r['duration'])):
+        start, end = record['start'], record['start'] + record['duration']
+        tracks = lanes.setdefault(record['pid'], [])
+        names[record['pid']] = record['process']
+        for index, stack in enumerate(tracks):
+            while stack and stack[-1] <= start:
+                stack.pop()
+            if not stack or end <= stack[-1]:
+                break
+        else:
+            tracks.append([])
+            index = len(tracks) - 1
+        tracks[index].append(end)
+        events.append({
+            'name': record['name'],
+            'ph': 'X',
+            'ts': start * 1e6,
+            'dur': record['duration'] * 1e6,
+            'pid': record['pid'],
+            'tid': index,
+            'args': dict(record.get('attributes') or {}, status=record.get('status')),
+        })
+    for pid, name in names.items():
+        events.append({'name': 'process_name', 'ph': 'M', 'pid': pid, 'args': {'name': f"{name} ({pid})"}})
+    return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+def main() -> None:
+    """Print the merged timeline of a trace, optionally writing a Chrome trace."""
+    parser = argparse.ArgumentParser(description='Merge the spans of a FractFlow trace')
+    parser.add_argument('trace_id', help='Trace ID (name of a file in the trace directory without .jsonl)')
+    parser.add_argument('--dir', default=None, help=f'Trace directory (defaults to ${TRACE_DIR_ENV})')
+    parser.add_argument('--chrome', default=None, help='Write a Chrome trace / flame graph JSON to this path')
+    args = parser.parse_args()
+
+    spans = load_trace(args.trace_id, args.dir)
+    print(format_timeline(spans))
+    if args.chrome:
+        with open(args.chrome, 'w', encoding='utf-8') as f:
+            json.dump(to_chrome_trace(spans), f)
+
+if __name__ == '__main__':
+    main()
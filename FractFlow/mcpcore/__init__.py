@@ -6,13 +6,24 @@ and managing tool providers.
 """
 
 # 导出主要的类和函数
-from .client_pool import MCPClientPool, get_client_pool
-from .launcher import MCPLauncher
+from .client_pool import MCPClientPool, SharedServerRegistry, get_client_pool
+from .launcher import MCPLauncher, Zygote, get_zygote
 from .tool_loader import MCPToolLoader
+from .manifest_cache import ToolManifestCache
+from .result_cache import ToolResultCache, get_result_cache
+from .single_flight import SingleFlight, get_single_flight
 
 __all__ = [
     'MCPClientPool',
+    'SharedServerRegistry',
     'get_client_pool',
     'MCPLauncher',
+    'Zygote',
+    'get_zygote',
     'MCPToolLoader',
+    'ToolManifestCache',
+    'ToolResultCache',
+    'get_result_cache',
+    'SingleFlight',
+    'get_single_flight',
 ] 
\ No newline at end of file
@@ -5,71 +5,352 @@ Provides a client pool for MCP clients, managing the lifecycle of clients
 and coordinating tool calls.
 """
 
+import os
+import time
 import asyncio
+import hashlib
 import logging
-from typing import Dict, Any, Optional, Tuple
-from contextlib import AsyncExitStack
+from typing import Dict, Any, List, Optional, Tuple
 
 # 导入外部MCP库
 import mcp  
-from mcp.client.session import ClientSession
-from mcp.client.stdio import StdioServerParameters, stdio_client
+from mcp import types
+from mcp.client.stdio import get_default_environment
+
+from .connection import ServerConnection, RemoteServerConnection, ReplicaSet, _connection_stats
+from .manifest_cache import ToolManifestCache
+from .result_cache import ToolResultCache, path_arguments
+from .single_flight import SingleFlight, get_single_flight
+from ..infra import tracing
 
 logger = logging.getLogger(__name__)
 
 # 单例实例
 _instance = None
 
+class SharedServerRegistry:
+    """
+    Process-wide registry of MCP server connections shared between pools.
+    
+    Identical servers (same script and environment, on the same event loop) are
+    started once and reference counted, so several agents in one process share a
+    single server process instead of each spawning their own copy.
+    """
+    
+    def __init__(self):
+        """Initialize an empty registry."""
+        self._connections: Dict[Tuple, ServerConnection] = {}
+        self._refcounts: Dict[Tuple, int] = {}
+    
+    @staticmethod
+    def make_key(server_script_path: str, env: Optional[Dict[str, str]] = None, replicas: int = 1) -> Tuple:
+        """
+        Build the sharing key for a server.
+        
+        Args:
+            server_script_path: Path to the server script
+            env: Environment for the server process
+            replicas: Number of server processes
+            
+        Returns:
+            A hashable key identifying the server
+        """
+        env_key = tuple(sorted(env.items())) if env else None
+        return (asyncio.get_running_loop(), os.path.abspath(server_script_path), env_key, replicas)
+    
+    def acquire(self, client_name: str, server_script_path: str,
+                env: Optional[Dict[str, str]] = None,
+                idle_timeout: Optional[float] = None,
+                replicas: int = 1,
+                zygote: Optional[Any] = None) -> Tuple[Tuple, ServerConnection]:
+        """
+        Get a shared connection for a server, creating it if needed.
+        
+        Args:
+            client_name: Name of the client requesting the connection
+            server_script_path: Path to the server script
+            env: Environment for the server process
+            idle_timeout: Idle timeout to use if the connection is created
+            replicas: Number of server processes; more than one creates a ReplicaSet
+            zygote: Warm interpreter to fork new server processes from
+            
+        Returns:
+            Tuple of (sharing key, connection)
+        """
+        key = self.make_key(server_script_path, env, replicas)
+        connection = self._connections.get(key)
+        if connection is None:
+            if replicas > 1:
+                connection = ReplicaSet(client_name, server_script_path, replicas,
+                                        env=env, idle_timeout=idle_timeout, zygote=zygote)
+            else:
+                connection = ServerConnection(client_name, server_script_path,
+                                              env=env, idle_timeout=idle_timeout, zygote=zygote)
+            self._connections[key] = connection
+            self._refcounts[key] = 0
+        elif idle_timeout is None:
+            # An eager user needs the server kept alive
+            connection.idle_timeout = None
+        self._refcounts[key] += 1
+        return key, connection
+    
+    def acquire_remote(self, client_name: str, url: str,
+                       transport: str = "streamable-http") -> Tuple[Tuple, ServerConnection]:
+        """
+        Get a shared connection to an already running MCP server.
+        
+        All pools on the same event loop reuse one session per endpoint.
+        
+        Args:
+            client_name: Name of the client requesting the connection
+            url: Endpoint of the server
+            transport: 'streamable-http' or 'sse'
+            
+        Returns:
+            Tuple of (sharing key, connection)
+        """
+        key = (asyncio.get_running_loop(), url, transport)
+        if key not in self._connections:
+            self._connections[key] = RemoteServerConnection(client_name, url, transport)
+            self._refcounts[key] = 0
+        self._refcounts[key] += 1
+        return key, self._connections[key]
+    
+    async def release(self, key: Tuple) -> None:
+        """
+        Drop one reference to a shared connection, closing it when unused.
+        
+        Args:
+            key: Sharing key returned by acquire()
+        """
+        if key not in self._refcounts:
+            return
+        self._refcounts[key] -= 1
+        if self._refcounts[key] <= 0:
+            connection = self._connections.pop(key)
+            del self._refcounts[key]
+            await connection.close()
+    
+    def refcount(self, key: Tuple) -> int:
+        """Get the number of pools holding a shared connection."""
+        return self._refcounts.get(key, 0)
+    
+    def connections(self, loop: Optional[asyncio.AbstractEventLoop] = None) -> List[ServerConnection]:
+        """
+        Get the shared connections.
+        
+        Args:
+            loop: Only return connections used on this event loop
+            
+        Returns:
+            List of connections and replica sets
+        """
+        return [
+            connection for key, connection in self._connections.items()
+            if loop is None or key[0] is loop
+        ]
+
+_shared_servers = SharedServerRegistry()
+
 class MCPClientPool:
     """
     Maintains a pool of MCP clients for different tools.
     
     Provides methods to add clients, call tools, and manage the lifecycle
-    of the client connections.
+    of the client connections. Clients can be started eagerly, or lazily on
+    their first tool call using schemas from the tool manifest cache.
+    
+    Each agent owns its own pool, so tool name mappings never leak between
+    agents. The server processes behind the clients are shared between pools
+    through the SharedServerRegistry and are closed when the last pool releases them.
     """
     
-    def __init__(self):
-        """Initialize the MCP client pool."""
-        self.clients: Dict[str, ClientSession] = {}
-        self.exit_stack = AsyncExitStack()
+    def __init__(self, manifest_cache: Optional[ToolManifestCache] = None,
+                 registry: Optional[SharedServerRegistry] = None):
+        """
+        Initialize the MCP client pool.
+        
+        Args:
+            manifest_cache: Cache used to persist tool schemas between runs
+            registry: Registry of shared server connections (defaults to the process-wide one)
+        """
+        self.clients: Dict[str, ServerConnection] = {}
         self.tool_to_client: Dict[str, str] = {}  # Maps tool_name to client_name
+        self.manifest_cache = manifest_cache or ToolManifestCache()
+        self.registry = registry or _shared_servers
+        self._shared_keys: Dict[str, Tuple] = {}  # Maps client_name to its registry key
+        self._server_ids: Dict[str, str] = {}  # Maps client_name to a digest of its server's identity
+        self.server_env: Dict[str, str] = {}  # Extra environment for the servers this pool starts
+        self.artifact_store = None  # Store that resolves artifact handles for this pool's tools
+        self._reaper_task: Optional[asyncio.Task] = None
+        self.zygote = None  # Set by the launcher in zygote mode
         
-    async def add_client(self, client_name: str, server_script_path: str) -> None:
+        # Result caching: read-only tools (MCP readOnlyHint) are cached for cache_ttl
+        # seconds; cache_policies maps tool names to a TTL that overrides this (0 disables)
+        self.result_cache: Optional[ToolResultCache] = None
+        self.cache_ttl = 300.0
+        self.cache_policies: Dict[str, float] = {}
+        self._read_only_tools: set = set()
+        self._idempotent_tools: set = set()
+        
+        # Identical concurrent calls of read-only or idempotent tools share one execution
+        self.single_flight: Optional[SingleFlight] = get_single_flight()
+        
+    async def add_client(self, client_name: str, server_script_path: str,
+                         lazy: bool = False, idle_timeout: Optional[float] = None,
+                         env: Optional[Dict[str, str]] = None, replicas: int = 1) -> None:
         """
         Initialize a new MCP client and add it to the pool.
         
         Args:
             client_name: Name to identify this client
             server_script_path: Path to the server script
+            lazy: If True, defer starting the server until one of its tools is called.
+                  Tool schemas are then taken from the manifest cache when available.
+            idle_timeout: For lazy clients, seconds without calls after which the
+                          server is shut down again (None keeps it running)
+            env: Environment for the server process (None uses the MCP default)
+            replicas: Number of server processes to run for CPU-heavy servers.
+                      Calls go to the replica with the fewest calls in flight.
             
         Raises:
             Exception: If the client cannot be added
         """
+        if client_name in self.clients:
+            await self.remove_client(client_name)
+        
+        if self.server_env:
+            env = {**(env if env is not None else get_default_environment()), **self.server_env}
+        key, connection = self.registry.acquire(
+            client_name,
+            server_script_path,
+            env=env,
+            idle_timeout=idle_timeout if lazy else None,
+            replicas=replicas,
+            zygote=self.zygote
+        )
+        
         try:
-            # Connect to the MCP server using stdio
-            server_params = StdioServerParameters(
-                command="python",
-                args=[server_script_path],
-                env=None
-            )
-            
-            stdio_transport = await self.exit_stack.enter_async_context(stdio_client(server_params))
-            stdio, write = stdio_transport
-            session = await self.exit_stack.enter_async_context(ClientSession(stdio, write))
-            
-            await session.initialize()
-            self.clients[client_name] = session
-            
-            # Map tools to this client
-            response = await session.list_tools()
-            for tool in response.tools:
-                self.tool_to_client[tool.name] = client_name
+            tools = connection.tools or None
+            if tools is None and lazy:
+                tools = self.manifest_cache.load(server_script_path)
+            if tools is None or (not lazy and not connection.is_connected):
+                # Start the server to discover its tools and refresh the manifest
+                await connection.connect()
+                tools = connection.tools
+                self.manifest_cache.save(server_script_path, tools)
+            else:
+                connection.tools = tools
+            
+            self.clients[client_name] = connection
+            self._shared_keys[client_name] = key
+            self._server_ids[client_name] = self._server_id(key)
+            
+            self._map_tools(client_name, tools)
+            
+            if lazy:
+                self._ensure_reaper()
                 
-            logger.info(f"Added client '{client_name}' with {len(response.tools)} tools")
+            logger.info(f"Added client '{client_name}' with {len(tools)} tools"
+                        f"{f' x{replicas} replicas' if replicas > 1 else ''}"
+                        f"{' (lazy)' if lazy else ''}")
             
         except Exception as e:
+            await self.registry.release(key)
             logger.error(f"Error adding client '{client_name}': {e}")
             raise
+    
+    async def add_remote_client(self, client_name: str, url: str,
+                                transport: str = "streamable-http") -> None:
+        """
+        Connect to an already running MCP server and add it to the pool.
+        
+        The server is not spawned or stopped by the pool, so it can be shared by
+        many agents and processes, e.g. one per host started with `--http`.
+        
+        Args:
+            client_name: Name to identify this client
+            url: Endpoint of the server, e.g. http://127.0.0.1:8000/mcp
+            transport: 'streamable-http' or 'sse'
+            
+        Raises:
+            Exception: If the server cannot be reached
+        """
+        if client_name in self.clients:
+            await self.remove_client(client_name)
+        
+        key, connection = self.registry.acquire_remote(client_name, url, transport)
+        
+        try:
+            if not connection.is_connected:
+                await connection.connect()
+            
+            self.clients[client_name] = connection
+            self._shared_keys[client_name] = key
+            self._server_ids[client_name] = self._server_id(key)
+            self._map_tools(client_name, connection.tools)
+                
+            logger.info(f"Added remote client '{client_name}' at {url} with {len(connection.tools)} tools")
+            
+        except Exception as e:
+            await self.registry.release(key)
+            logger.error(f"Error adding remote client '{client_name}': {e}")
+            raise
+    
+    @staticmethod
+    def _server_id(key: Tuple) -> str:
+        """
+        Identify a server by its registry key without the event loop.
+        
+        Servers of the same script with different environments (API keys,
+        models, artifact directories) get different IDs, so their results are
+        never cached or coalesced together.
+        """
+        return hashlib.sha256(repr(key[1:]).encode('utf-8')).hexdigest()
+    
+    def _map_tools(self, client_name: str, tools: List[types.Tool]) -> None:
+        """Map tools to a client and record which of them declare themselves read-only or idempotent."""
+        for tool in tools:
+            self.tool_to_client[tool.name] = client_name
+            annotations = tool.annotations
+            for hint, names in (('readOnlyHint', self._read_only_tools), ('idempotentHint', self._idempotent_tools)):
+                if annotations is not None and getattr(annotations, hint):
+                    names.add(tool.name)
+                else:
+                    names.discard(tool.name)
+    
+    async def remove_client(self, client_name: str) -> None:
+        """
+        Remove a client from this pool and release its server.
+        
+        The server process keeps running while other pools still use it.
+        
+        Args:
+            client_name: Name of the client to remove
+        """
+        self.clients.pop(client_name, None)
+        self._server_ids.pop(client_name, None)
+        self.tool_to_client = {
+            tool: name for tool, name in self.tool_to_client.items() if name != client_name
+        }
+        key = self._shared_keys.pop(client_name, None)
+        if key is not None:
+            await self.registry.release(key)
+    
+    def get_tools(self, client_name: str) -> List[types.Tool]:
+        """
+        Get the tool schemas advertised by a client.
+        
+        Does not require the client's server to be running.
+        
+        Args:
+            client_name: Name of the client
+            
+        Returns:
+            List of MCP tool schemas
+        """
+        connection = self.clients.get(client_name)
+        return list(connection.tools) if connection else []
             
     async def call(self, tool_name: str, arguments: Dict[str, Any]) -> str:
         """
@@ -91,12 +372,119 @@ class MCPClientPool:
         client_name = self.tool_to_client[tool_name]
         client = self.clients[client_name]
         
+        cache_ttl = self.get_cache_ttl(tool_name)
+        coalesce = self.single_flight is not None and self.is_coalescable(tool_name)
+        # Keyed by server identity including its environment, for caching and coalescing alike
+        call_key = ToolResultCache.make_key(self._server_ids[client_name], tool_name, arguments)
+        if self.result_cache is not None:
+            # Record file modification times before the call so that a file
+            # changing while the tool runs never yields a stale cache entry
+            paths = path_arguments(arguments)
+            if cache_ttl:
+                cached = self.result_cache.get(call_key, tool_name)
+                if cached is not None:
+                    logger.debug(f"Cache hit for tool {tool_name}")
+                    return cached
+        
         try:
-            result = await client.call_tool(tool_name, arguments)
-            return result.content
+            with tracing.span(f"tool:{tool_name}", server=client_name, started=not client.is_connected) as attributes:
+                if not client.is_connected:
+                    logger.info(f"Starting client '{client_name}' on demand")
+                if coalesce:
+                    # Identical calls already running are joined instead of repeated
+                    result = await self.single_flight.do(call_key, lambda: client.call_tool(tool_name, arguments))
+                else:
+                    result = await client.call_tool(tool_name, arguments)
+                if attributes is not None:
+                    attributes['is_error'] = result.isError
         except Exception as e:
             logger.error(f"Error calling tool {tool_name}: {e}")
             raise
+        
+        if self.result_cache is not None:
+            if cache_ttl and not result.isError:
+                self.result_cache.put(call_key, tool_name, result.content, cache_ttl, paths)
+            elif tool_name not in self._read_only_tools:
+                # The tool may have written to these paths
+                for path in paths:
+                    self.result_cache.invalidate(path=path)
+        return result.content
+    
+    def is_coalescable(self, tool_name: str) -> bool:
+        """
+        Whether identical concurrent calls of a tool may share one execution.
+        
+        True for tools annotated as read-only or idempotent.
+        
+        Args:
+            tool_name: Name of the tool
+        """
+        return tool_name in self._read_only_tools or tool_name in self._idempotent_tools
+    
+    def get_cache_ttl(self, tool_name: str) -> Optional[float]:
+        """
+        Get how long results of a tool may be cached.
+        
+        Args:
+            tool_name: Name of the tool
+            
+        Returns:
+            TTL in seconds, or None if the tool's results are not cached
+        """
+        if tool_name in self.cache_policies:
+            return self.cache_policies[tool_name] or None
+        if tool_name in self._read_only_tools:
+            return self.cache_ttl or None
+        return None
+    
+    def get_stats(self) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Get per-replica load statistics for every client.
+        
+        Returns:
+            Dictionary mapping client names to a list of replica statistics,
+            each with 'replica', 'connected', 'in_flight' (queue depth), 'calls', 'restarts'
+            and the latest 'resources' sample (see resource_monitor)
+        """
+        stats = {}
+        for client_name, connection in self.clients.items():
+            if isinstance(connection, ReplicaSet):
+                stats[client_name] = connection.get_stats()
+            else:
+                stats[client_name] = [_connection_stats(connection)]
+        return stats
+    
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """
+        Get result cache statistics.
+        
+        Returns:
+            Cache statistics including the hit rate, plus call coalescing statistics
+            under 'coalescing'; empty if both are disabled
+        """
+        stats = self.result_cache.get_stats() if self.result_cache is not None else {}
+        if self.single_flight is not None:
+            stats['coalescing'] = self.single_flight.get_stats()
+        return stats
+    
+    def _ensure_reaper(self) -> None:
+        """Start the background task that shuts down idle lazy clients."""
+        if self._reaper_task is None or self._reaper_task.done():
+            self._reaper_task = asyncio.create_task(self._reap_idle_clients(), name="mcp-idle-reaper")
+    
+    async def _reap_idle_clients(self) -> None:
+        """Periodically shut down lazy clients that have been idle for too long."""
+        while True:
+            timeouts = [c.idle_timeout for c in self.clients.values() if c.idle_timeout is not None]
+            if not timeouts:
+                return
+            await asyncio.sleep(max(1.0, min(min(timeouts) / 2, 30.0)))
+            
+            now = time.monotonic()
+            for client_name, connection in list(self.clients.items()):
+                if connection.is_idle(now):
+                    logger.info(f"Shutting down idle client '{client_name}'")
+                    await connection.close()
             
     async def cleanup(self) -> None:
         """
@@ -105,7 +493,16 @@ class MCPClientPool:
         Closes all client connections and releases resources.
         """
         try:
-            await self.exit_stack.aclose()
+            if self._reaper_task is not None:
+                self._reaper_task.cancel()
+                try:
+                    await self._reaper_task
+                except asyncio.CancelledError:
+                    pass
+                self._reaper_task = None
+            
+            for client_name in list(self.clients):
+                await self.remove_client(client_name)
             logger.info("All MCP clients cleaned up")
         except Exception as e:
             logger.error(f"Error during cleanup: {e}")
@@ -116,10 +513,13 @@ def get_client_pool() -> MCPClientPool:
     """
     Get the singleton client pool instance.
     
+    Agents create their own pools; this shared instance remains available
+    for callers that are not bound to an agent.
+    
     Returns:
         The global client pool instance
     """
     global _instance
     if _instance is None:
         _instance = MCPClientPool()
-    return _instance 
\ No newline at end of file
+    return _instance 
@@ -0,0 +1,423 @@
+"""
+MCP server connection.
+
+Wraps a single MCP tool server process and its client session so that it can be
+started and stopped independently of the other servers in a pool.
+"""
+
+import os
+import time
+import uuid
+import asyncio
+import logging
+from typing import Any, Callable, Dict, List, Optional
+
+import anyio
+from mcp import types
+from mcp.client.session import ClientSession
+from mcp.client.stdio import StdioServerParameters, get_default_environment, stdio_client
+from mcp.client.sse import sse_client
+from mcp.client.streamable_http import streamablehttp_client
+
+from ..infra import budget, loop_monitor, tracing
+from ..infra.artifact_store import ARTIFACT_DIR_ENV
+from ..infra.error_handling import ClientError
+
+logger = logging.getLogger(__name__)
+
+# Marks the environment of each server process so that its PID can be found
+SERVER_ID_ENV = 'FRACTFLOW_SERVER_ID'
+
+class ServerConnection:
+    """
+    A connection to one MCP tool server.
+
+    The transport and ClientSession are owned by a dedicated background task,
+    because their context managers must be entered and exited from the same task.
+    This allows a server to be shut down (e.g. after being idle) while the rest of
+    the pool keeps running.
+    """
+
+    def __init__(self, name: str, server_script_path: str,
+                 env: Optional[Dict[str, str]] = None,
+                 idle_timeout: Optional[float] = None,
+                 zygote: Optional[Any] = None):
+        """
+        Initialize the connection.
+
+        Args:
+            name: Name of the client this connection belongs to
+            server_script_path: Path to the server script
+            env: Environment for the server process (None uses the MCP default)
+            idle_timeout: Seconds without calls after which the server may be shut down,
+                          or None to keep it running
+            zygote: Warm interpreter to fork the server from instead of starting
+                    a new Python process (see launcher.Zygote)
+        """
+        self.name = name
+        self.server_script_path = server_script_path
+        self.env = env
+        self.idle_timeout = idle_timeout
+        self.zygote = zygote
+
+        self.session: Optional[ClientSession] = None
+        self.tools: List[types.Tool] = []
+        self.in_flight = 0
+        self.last_used = time.monotonic()
+        
+        # Statistics and crash handling
+        self.calls = 0
+        self.restarts = 0
+        self.crashed = False
+        self.on_crash: Optional[Callable[['ServerConnection'], None]] = None
+        
+        # Resource accounting (see resource_monitor)
+        self.server_id = uuid.uuid4().hex
+        self.last_tool: Optional[str] = None
+        self.resources: Dict[str, Any] = {}
+
+        self._task: Optional[asyncio.Task] = None
+        self._ready: Optional[asyncio.Event] = None
+        self._stop: Optional[asyncio.Event] = None
+        self._closed: Optional[asyncio.Event] = None
+        self._error: Optional[Exception] = None
+        self._lock = asyncio.Lock()
+
+    @property
+    def is_connected(self) -> bool:
+        """Whether the server process is running and the session is initialized."""
+        return self.session is not None and self._task is not None and not self._task.done()
+
+    def _open_transport(self):
+        """Create the transport context manager for this server."""
+        env = dict(self.env if self.env is not None else get_default_environment())
+        env[SERVER_ID_ENV] = self.server_id
+        args = [self.server_script_path]
+        if os.environ.get(ARTIFACT_DIR_ENV):
+            # Share the artifact store with the server
+            env.setdefault(ARTIFACT_DIR_ENV, os.environ[ARTIFACT_DIR_ENV])
+        if tracing.is_enabled():
+            # Spans of the server go to the same trace sink
+            env.setdefault(tracing.TRACE_DIR_ENV, os.environ[tracing.TRACE_DIR_ENV])
+        if loop_monitor.is_enabled():
+            # Run the script under the event loop stall monitor
+            env = loop_monitor.server_environment(env)
+            args = ["-c", loop_monitor.BOOTSTRAP] + args
+        if self.zygote is not None and self.zygote.is_running:
+            # The forked child installs the monitor itself when the variable is set
+            return stdio_client(self.zygote.server_parameters(self.server_script_path, env))
+        server_params = StdioServerParameters(
+            command="python",
+            args=args,
+            env=env
+        )
+        return stdio_client(server_params)
+
+    async def connect(self) -> None:
+        """
+        Start the server and initialize the session, if not already running.
+
+        Raises:
+            Exception: If the server cannot be started
+        """
+        async with self._lock:
+            if self.is_connected:
+                return
+
+            if self.crashed:
+                self.restarts += 1
+            self._ready = asyncio.Event()
+            self._stop = asyncio.Event()
+            self._closed = asyncio.Event()
+            self._error = None
+            self.crashed = False
+            self._task = asyncio.create_task(self._run(), name=f"mcp-server:{self.name}")
+            await self._ready.wait()
+
+            if self._error is not None:
+                error, self._error = self._error, None
+                self._task = None
+                raise error
+
+            self.last_used = time.monotonic()
+
+    async def _run(self) -> None:
+        """Own the transport and session for the lifetime of the connection."""
+        try:
+            async with self._open_transport() as streams:
+                # The streamable HTTP transport also yields a session id getter
+                read_stream, write_stream = streams[0], streams[1]
+                # Relay server messages through our own stream so that the server
+                # exiting is noticed instead of leaving requests waiting forever
+                relay_writer, relay_reader = anyio.create_memory_object_stream(0)
+                async with anyio.create_task_group() as task_group:
+                    task_group.start_soon(self._relay, read_stream, relay_writer, task_group.cancel_scope)
+                    async with ClientSession(relay_reader, write_stream) as session:
+                        await session.initialize()
+                        response = await session.list_tools()
+                        self.tools = list(response.tools)
+                        self.session = session
+                        self._ready.set()
+                        await self._stop.wait()
+                    task_group.cancel_scope.cancel()
+        except Exception as e:
+            if not self._ready.is_set():
+                self._error = e
+            else:
+                logger.error(f"Connection to '{self.name}' closed with error: {e}")
+        finally:
+            self.session = None
+            if not self._ready.is_set() and self._error is None:
+                self._error = ClientError(f"MCP server '{self.name}' exited during startup")
+            self._ready.set()
+            self._closed.set()
+        
+        if self.crashed and self.on_crash is not None:
+            self.on_crash(self)
+    
+    async def _relay(self, read_stream, relay_writer, cancel_scope) -> None:
+        """Forward server messages to the session and detect the server exiting."""
+        async with relay_writer:
+            try:
+                async for message in read_stream:
+                    await relay_writer.send(message)
+            except (anyio.ClosedResourceError, anyio.BrokenResourceError):
+                pass
+        
+        if not self._stop.is_set():
+            if self._ready.is_set():
+                self.crashed = True
+                logger.warning(f"MCP server '{self.name}' exited unexpectedly")
+            cancel_scope.cancel()
+
+    async def call_tool(self, tool_name: str, arguments: Dict[str, Any]) -> types.CallToolResult:
+        """
+        Call a tool on this server, starting it first if necessary.
+
+        Args:
+            tool_name: Name of the tool to call
+            arguments: Arguments to pass to the tool
+
+        Returns:
+            The raw MCP tool call result
+        """
+        if not self.is_connected:
+            await self.connect()
+
+        self.in_flight += 1
+        self.calls += 1
+        self.last_tool = tool_name
+        call = asyncio.ensure_future(self._send_call(tool_name, arguments))
+        closed = asyncio.ensure_future(self._closed.wait())
+        try:
+            await asyncio.wait({call, closed}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            closed.cancel()
+            interrupted = not call.done()
+            if interrupted:
+                call.cancel()
+            self.in_flight -= 1
+            self.last_used = time.monotonic()
+        
+        if interrupted:
+            raise ClientError(f"MCP server '{self.name}' exited while calling {tool_name}")
+        return call.result()
+
+    def _send_call(self, tool_name: str, arguments: Dict[str, Any]):
+        """Send a tools/call request carrying the current trace context and budget in `_meta`."""
+        meta = {**(tracing.inject() or {}), **(budget.inject() or {})}
+        if not meta:
+            return self.session.call_tool(tool_name, arguments)
+        return self.session.send_request(
+            types.ClientRequest(
+                types.CallToolRequest(
+                    method="tools/call",
+                    params=types.CallToolRequestParams(
+                        name=tool_name,
+                        arguments=arguments,
+                        _meta=types.RequestParams.Meta(**meta),
+                    ),
+                )
+            ),
+            types.CallToolResult,
+        )
+
+    def is_idle(self, now: Optional[float] = None) -> bool:
+        """Whether the server has exceeded its idle timeout with no calls in flight."""
+        if self.idle_timeout is None or not self.is_connected or self.in_flight:
+            return False
+        now = time.monotonic() if now is None else now
+        return now - self.last_used >= self.idle_timeout
+
+    async def close(self) -> None:
+        """Shut down the server process and close the session."""
+        async with self._lock:
+            if self._task is None:
+                return
+            self._stop.set()
+            self.crashed = False
+            try:
+                await self._task
+            except Exception as e:
+                logger.error(f"Error closing connection '{self.name}': {e}")
+            finally:
+                self._task = None
+
+
+class RemoteServerConnection(ServerConnection):
+    """
+    A connection to an already running MCP server reached over HTTP.
+    
+    Nothing is spawned: the server is shared by every agent and process that
+    connects to its URL. If the connection drops it is re-established on the
+    next tool call.
+    """
+    
+    TRANSPORTS = ("streamable-http", "sse")
+    
+    def __init__(self, name: str, url: str, transport: str = "streamable-http"):
+        """
+        Initialize the connection.
+        
+        Args:
+            name: Name of the client this connection belongs to
+            url: Endpoint of the server, e.g. http://127.0.0.1:8000/mcp
+            transport: 'streamable-http' or 'sse'
+            
+        Raises:
+            ValueError: If the transport is not supported
+        """
+        if transport not in self.TRANSPORTS:
+            raise ValueError(f"Unsupported MCP transport '{transport}', expected one of {self.TRANSPORTS}")
+        super().__init__(name, url)
+        self.url = url
+        self.transport = transport
+    
+    def _open_transport(self):
+        """Create the HTTP transport context manager for this server."""
+        if self.transport == "sse":
+            return sse_client(self.url)
+        return streamablehttp_client(self.url)
+
+
+class ReplicaSet:
+    """
+    A group of identical MCP server processes for one CPU-heavy tool server.
+
+    Calls are dispatched to the replica with the fewest calls in flight, and
+    replicas that crash are restarted in the background. Exposes the same
+    interface as ServerConnection so the pool can treat both alike.
+    """
+
+    def __init__(self, name: str, server_script_path: str, replicas: int,
+                 env: Optional[Dict[str, str]] = None,
+                 idle_timeout: Optional[float] = None,
+                 zygote: Optional[Any] = None):
+        """
+        Initialize the replica set.
+
+        Args:
+            name: Name of the client this replica set belongs to
+            server_script_path: Path to the server script
+            replicas: Number of server processes to run
+            env: Environment for the server processes
+            idle_timeout: Seconds without calls after which the servers may be shut down
+            zygote: Warm interpreter to fork the servers from
+        """
+        self.name = name
+        self.server_script_path = server_script_path
+        self.replicas = [
+            ServerConnection(f"{name}#{i}", server_script_path, env=env, idle_timeout=idle_timeout, zygote=zygote)
+            for i in range(max(1, replicas))
+        ]
+        for replica in self.replicas:
+            replica.on_crash = self._schedule_restart
+        self._restart_tasks = set()
+
+    @property
+    def tools(self) -> List[types.Tool]:
+        return self.replicas[0].tools
+
+    @tools.setter
+    def tools(self, tools: List[types.Tool]) -> None:
+        for replica in self.replicas:
+            replica.tools = tools
+
+    @property
+    def idle_timeout(self) -> Optional[float]:
+        return self.replicas[0].idle_timeout
+
+    @idle_timeout.setter
+    def idle_timeout(self, idle_timeout: Optional[float]) -> None:
+        for replica in self.replicas:
+            replica.idle_timeout = idle_timeout
+
+    @property
+    def is_connected(self) -> bool:
+        return any(replica.is_connected for replica in self.replicas)
+
+    @property
+    def in_flight(self) -> int:
+        return sum(replica.in_flight for replica in self.replicas)
+
+    async def connect(self) -> None:
+        """Start all replicas."""
+        await asyncio.gather(*(replica.connect() for replica in self.replicas))
+
+    def _pick_replica(self) -> ServerConnection:
+        """Choose the least-loaded replica, preferring ones that are already running."""
+        return min(self.replicas, key=lambda r: (r.in_flight, not r.is_connected, r.last_used))
+
+    async def call_tool(self, tool_name: str, arguments: Dict[str, Any]) -> types.CallToolResult:
+        """
+        Call a tool on the least-loaded replica.
+
+        Args:
+            tool_name: Name of the tool to call
+            arguments: Arguments to pass to the tool
+
+        Returns:
+            The raw MCP tool call result
+        """
+        return await self._pick_replica().call_tool(tool_name, arguments)
+
+    def _schedule_restart(self, replica: ServerConnection) -> None:
+        """Restart a crashed replica in the background."""
+        task = asyncio.create_task(self._restart(replica), name=f"mcp-restart:{replica.name}")
+        self._restart_tasks.add(task)
+        task.add_done_callback(self._restart_tasks.discard)
+
+    async def _restart(self, replica: ServerConnection) -> None:
+        try:
+            logger.info(f"Restarting crashed replica '{replica.name}'")
+            await replica.connect()
+        except Exception as e:
+            logger.error(f"Failed to restart replica '{replica.name}': {e}")
+
+    def is_idle(self, now: Optional[float] = None) -> bool:
+        """Whether every running replica has exceeded its idle timeout."""
+        running = [replica for replica in self.replicas if replica.is_connected]
+        return bool(running) and all(replica.is_idle(now) for replica in running)
+
+    def get_stats(self) -> List[Dict[str, Any]]:
+        """Get per-replica load statistics."""
+        return [_connection_stats(replica) for replica in self.replicas]
+
+    async def close(self) -> None:
+        """Shut down all replicas."""
+        for task in list(self._restart_tasks):
+            task.cancel()
+        for replica in self.replicas:
+            await replica.close()
+
+
+def _connection_stats(connection: ServerConnection) -> Dict[str, Any]:
+    """Summarize the load of a single server connection."""
+    return {
+        "replica": connection.name,
+        "connected": connection.is_connected,
+        "in_flight": connection.in_flight,
+        "calls": connection.calls,
+        "restarts": connection.restarts,
+        "resources": connection.resources,
+    }
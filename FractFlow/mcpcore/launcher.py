@@ -5,12 +5,136 @@ Provides functionality to manage and launch multiple MCP tool servers.
 """
 
 import os
-from typing import Dict, List, Optional
+import sys
+import select
+import asyncio
+import tempfile
+import subprocess
+import threading
+from typing import Any, Dict, List, Optional
 
-from .client_pool import get_client_pool
+from mcp.client.stdio import StdioServerParameters
+
+from . import zygote as zygote_server
+from .client_pool import MCPClientPool, get_client_pool
+from .manifest_cache import ToolManifestCache
+from .resource_monitor import get_resource_monitor
+from .result_cache import get_result_cache
+from ..infra import loop_monitor, tracing
+from ..infra.artifact_store import ARTIFACT_DIR_ENV, get_artifact_store
 from ..infra.config import ConfigManager
 from ..infra.logging_utils import get_logger
 
+class Zygote:
+    """
+    Client side of the warm interpreter used to spawn stdio tool servers.
+    
+    Starts a zygote process that has imported the shared stack once. Servers are
+    then spawned through a tiny shim script whose stdio pipes the zygote hands to
+    a forked child, avoiding a cold interpreter start per server. Nested agents
+    running inside forked servers reuse the same zygote through an environment
+    variable.
+    """
+    
+    SHIM_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'zygote_shim.py')
+    
+    def __init__(self, socket_path: Optional[str] = None):
+        """
+        Initialize the zygote client.
+        
+        Args:
+            socket_path: Socket of an already running zygote, or None to start one
+        """
+        self.socket_path = socket_path
+        self.process: Optional[subprocess.Popen] = None
+        self._lock = threading.Lock()
+    
+    @property
+    def is_running(self) -> bool:
+        """Whether the zygote can accept spawn requests."""
+        if self.process is not None:
+            return self.process.poll() is None
+        return self.socket_path is not None and os.path.exists(self.socket_path)
+    
+    def start(self, timeout: float = 60.0) -> None:
+        """
+        Start the zygote process and wait until it has preloaded its modules.
+        
+        Args:
+            timeout: Seconds to wait for the zygote to become ready
+            
+        Raises:
+            RuntimeError: If the platform is unsupported or the zygote fails to start
+        """
+        with self._lock:
+            if self.is_running:
+                return
+            if not zygote_server.is_supported():
+                raise RuntimeError("The tool server zygote requires Linux (fork, pidfd and fd passing)")
+            
+            self.socket_path = os.path.join(tempfile.mkdtemp(prefix='fractflow-zygote-'), 'zygote.sock')
+            package_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+            env = dict(os.environ)
+            env['PYTHONPATH'] = os.pathsep.join(filter(None, [package_root, env.get('PYTHONPATH')]))
+            
+            # stdin stays open for our lifetime; the zygote exits when it sees EOF
+            self.process = subprocess.Popen(
+                [sys.executable, '-c', 'from FractFlow.mcpcore.zygote import main; main()', self.socket_path],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                env=env,
+                start_new_session=True,
+            )
+            
+            readable, _, _ = select.select([self.process.stdout], [], [], timeout)
+            if not readable or self.process.stdout.readline().strip() != b'ready':
+                self.stop()
+                raise RuntimeError("Tool server zygote failed to start")
+    
+    def server_parameters(self, script_path: str, env: Optional[Dict[str, str]] = None) -> StdioServerParameters:
+        """
+        Build stdio parameters that spawn a server through the zygote.
+        
+        Args:
+            script_path: Path to the server script
+            env: Environment for the server process
+            
+        Returns:
+            Parameters for stdio_client
+        """
+        return StdioServerParameters(
+            command=sys.executable,
+            args=[self.SHIM_PATH, self.socket_path, script_path],
+            env=env
+        )
+    
+    def stop(self) -> None:
+        """Stop the zygote process if we started it."""
+        if self.process is None:
+            return
+        try:
+            self.process.stdin.close()
+            self.process.wait(timeout=5)
+        except Exception:
+            self.process.kill()
+        finally:
+            self.process.stdout.close()
+        self.process = None
+
+_zygote: Optional[Zygote] = None
+
+def get_zygote() -> Zygote:
+    """
+    Get the process-wide zygote, reusing one inherited from a parent agent.
+    
+    Returns:
+        The zygote client (not necessarily started yet)
+    """
+    global _zygote
+    if _zygote is None:
+        _zygote = Zygote(os.environ.get(zygote_server.ZYGOTE_SOCKET_ENV))
+    return _zygote
+
 class MCPLauncher:
     """
     Manages and launches multiple MCP tool servers.
@@ -18,33 +142,69 @@ class MCPLauncher:
     Provides a unified interface to access all available tools.
     """
     
-    def __init__(self, config: Optional[ConfigManager] = None):
+    def __init__(self, config: Optional[ConfigManager] = None, client_pool: Optional[MCPClientPool] = None):
         """
         Initialize the MCP launcher.
         
         Args:
             config: Configuration manager instance to use
+            client_pool: Client pool to launch servers into (defaults to the global pool)
         """
         self.config = config or ConfigManager()
         
         # Push component name to call path
-        self.config.push_to_call_path("launcher")
+        self.call_path = self.config.push_to_call_path("launcher")
         
         # Initialize logger
-        self.logger = get_logger(self.config.get_call_path())
+        self.logger = get_logger(self.call_path)
         
-        self.client_pool = get_client_pool()
+        self.client_pool = client_pool or get_client_pool()
         self.server_paths: Dict[str, str] = {}
+        self.server_options: Dict[str, Dict[str, Any]] = {}
+        self.remote_servers: Dict[str, Dict[str, str]] = {}
+        
+        # Lazy start: servers are spawned on their first tool call and stopped when idle
+        self.lazy_start = bool(self.config.get('mcp.lazy_start', False))
+        self.idle_timeout = self.config.get('mcp.idle_timeout', 300.0) or None
+        manifest_cache_dir = self.config.get('mcp.manifest_cache_dir', '')
+        if manifest_cache_dir:
+            self.client_pool.manifest_cache = ToolManifestCache(manifest_cache_dir)
+        
+        # Result cache shared by the agents in the process that use the same size
+        if self.config.get('mcp.result_cache', True):
+            self.client_pool.result_cache = get_result_cache(self.config.get('mcp.result_cache_size', 1024))
+            self.client_pool.cache_ttl = self.config.get('mcp.result_cache_ttl', 300.0)
+            self.client_pool.cache_policies = dict(self.config.get('mcp.result_cache_policies', {}) or {})
+        
+        # Artifact store of this agent, shared with its tool servers through their environment
+        artifact_store = get_artifact_store(
+            self.config.get('artifacts.dir', '') or None,
+            int(self.config.get('artifacts.quota_mb', 10240) or 0) * 1024 * 1024
+        )
+        self.client_pool.artifact_store = artifact_store
+        if self.config.get('artifacts.dir', ''):
+            self.client_pool.server_env[ARTIFACT_DIR_ENV] = artifact_store.root
+        
+        # Trace sink shared with the tool servers through the environment
+        if self.config.get('tracing.dir', ''):
+            tracing.enable(self.config.get('tracing.dir'))
         
-        self.logger.debug("Launcher initialized")
+        if not self.config.get('mcp.coalesce_calls', True):
+            self.client_pool.single_flight = None
         
-    def register_server(self, server_name: str, script_path: str) -> None:
+        # Zygote mode: fork servers from a warm interpreter; inherited by nested agents
+        self.use_zygote = bool(self.config.get('mcp.zygote', False)) or zygote_server.ZYGOTE_SOCKET_ENV in os.environ
+        
+        self.logger.debug("Launcher initialized", {"lazy_start": self.lazy_start, "zygote": self.use_zygote})
+        
+    def register_server(self, server_name: str, script_path: str, replicas: int = 1) -> None:
         """
         Register an MCP server to be launched.
         
         Args:
             server_name: A unique name for this server
             script_path: Path to the server script
+            replicas: Number of server processes to launch for this script
             
         Raises:
             FileNotFoundError: If the server script doesn't exist
@@ -55,7 +215,20 @@ class MCPLauncher:
             raise FileNotFoundError(error_msg)
             
         self.server_paths[server_name] = script_path
-        self.logger.debug(f"Registered server", {"name": server_name, "path": script_path})
+        self.server_options[server_name] = {"replicas": max(1, int(replicas))}
+        self.logger.debug(f"Registered server", {"name": server_name, "path": script_path, "replicas": replicas})
+        
+    def register_remote_server(self, server_name: str, url: str, transport: str = "streamable-http") -> None:
+        """
+        Register an already running MCP server to connect to.
+        
+        Args:
+            server_name: A unique name for this server
+            url: Endpoint of the server, e.g. http://127.0.0.1:8000/mcp
+            transport: 'streamable-http' or 'sse'
+        """
+        self.remote_servers[server_name] = {"url": url, "transport": transport}
+        self.logger.debug(f"Registered remote server", {"name": server_name, "url": url, "transport": transport})
         
     async def launch_all(self) -> None:
         """
@@ -64,12 +237,44 @@ class MCPLauncher:
         Raises:
             Exception: If any server fails to launch
         """
-        self.logger.debug(f"Launching servers", {"count": len(self.server_paths)})
+        self.logger.debug(f"Launching servers", {"count": len(self.server_paths), "remote": len(self.remote_servers)})
+        
+        loop_threshold = self.config.get('monitor.loop_threshold', 0.0)
+        if loop_threshold and loop_threshold > 0:
+            # Watch this loop; servers launched below inherit the monitor
+            loop_monitor.enable(loop_threshold, self.config.get('monitor.loop_report_dir', '') or None)
+        
+        if self.use_zygote and self.server_paths and self.client_pool.zygote is None:
+            zygote = get_zygote()
+            try:
+                await asyncio.to_thread(zygote.start)
+                self.client_pool.zygote = zygote
+            except Exception as e:
+                self.logger.warning("Zygote unavailable, spawning tool servers normally", {"error": str(e)})
+        
+        # Sample the servers of every agent in the process from one background task
+        resource_monitor = get_resource_monitor()
+        resource_monitor.interval = self.config.get('monitor.resource_interval', 10.0) or 0
+        resource_monitor.rss_limit_mb = self.config.get('monitor.rss_limit_mb', 0.0) or 0
+        resource_monitor.fd_limit = self.config.get('monitor.fd_limit', 0) or 0
         
         try:
             for server_name, script_path in self.server_paths.items():
                 self.logger.debug(f"Launching server", {"name": server_name})
-                await self.client_pool.add_client(server_name, script_path)
+                await self.client_pool.add_client(
+                    server_name,
+                    script_path,
+                    lazy=self.lazy_start,
+                    idle_timeout=self.idle_timeout,
+                    **self.server_options.get(server_name, {})
+                )
+            
+            for server_name, endpoint in self.remote_servers.items():
+                self.logger.debug(f"Connecting to remote server", {"name": server_name, "url": endpoint["url"]})
+                await self.client_pool.add_remote_client(server_name, endpoint["url"], endpoint["transport"])
+            
+            if self.server_paths:
+                resource_monitor.start(self.client_pool.registry)
                 
             self.logger.info("All servers launched successfully")
         except Exception as e:
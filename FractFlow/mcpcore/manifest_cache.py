@@ -0,0 +1,108 @@
+"""
+MCP tool manifest cache.
+
+Persists the tool schemas advertised by MCP server scripts so that tool
+definitions can be shown to the model without a running server process.
+"""
+
+import os
+import json
+import hashlib
+import logging
+from typing import List, Optional
+
+from mcp import types
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = os.path.join(
+    os.getenv('FRACTFLOW_CACHE_DIR', os.path.join(os.path.expanduser('~'), '.cache', 'fractflow')),
+    'tool_manifests'
+)
+
+class ToolManifestCache:
+    """
+    On-disk cache of MCP tool schemas.
+
+    Entries are keyed by the absolute path of the server script and are only
+    valid while the script's modification time is unchanged.
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None):
+        """
+        Initialize the manifest cache.
+
+        Args:
+            cache_dir: Directory used to store manifests (defaults to ~/.cache/fractflow/tool_manifests)
+        """
+        self.cache_dir = cache_dir or DEFAULT_CACHE_DIR
+
+    def _entry_path(self, script_path: str) -> str:
+        """Get the manifest file path for a server script."""
+        digest = hashlib.sha1(os.path.abspath(script_path).encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, f"{digest}.json")
+
+    @staticmethod
+    def _mtime(script_path: str) -> Optional[float]:
+        try:
+            return os.path.getmtime(script_path)
+        except OSError:
+            return None
+
+    def load(self, script_path: str) -> Optional[List[types.Tool]]:
+        """
+        Load the cached tool schemas for a server script.
+
+        Args:
+            script_path: Path to the server script
+
+        Returns:
+            The cached tools, or None if there is no valid entry
+        """
+        mtime = self._mtime(script_path)
+        if mtime is None:
+            return None
+
+        try:
+            with open(self._entry_path(script_path), 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        if entry.get('path') != os.path.abspath(script_path) or entry.get('mtime') != mtime:
+            return None
+
+        try:
+            return [types.Tool.model_validate(tool) for tool in entry.get('tools', [])]
+        except Exception as e:
+            logger.warning(f"Ignoring corrupt tool manifest for {script_path}: {e}")
+            return None
+
+    def save(self, script_path: str, tools: List[types.Tool]) -> None:
+        """
+        Store the tool schemas of a server script.
+
+        Args:
+            script_path: Path to the server script
+            tools: Tools advertised by the server
+        """
+        mtime = self._mtime(script_path)
+        if mtime is None:
+            return
+
+        entry = {
+            'path': os.path.abspath(script_path),
+            'mtime': mtime,
+            'tools': [tool.model_dump(mode='json', by_alias=True, exclude_none=True) for tool in tools],
+        }
+
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            # Write to a temporary file first so concurrent readers never see partial JSON
+            entry_path = self._entry_path(script_path)
+            tmp_path = f"{entry_path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(entry, f, ensure_ascii=False)
+            os.replace(tmp_path, entry_path)
+        except OSError as e:
+            logger.warning(f"Could not write tool manifest for {script_path}: {e}")
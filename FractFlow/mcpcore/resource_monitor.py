@@ -0,0 +1,295 @@
+"""
+Resource accounting for MCP tool servers.
+
+Periodically samples the CPU, memory (RSS) and open file descriptors of every
+tool server process started by this process, together with everything the
+server started itself: subprocesses such as ffmpeg, and the tool servers of
+nested agents. Servers forked by the zygote are found through the PID file the
+zygote writes for each shim. Optional soft limits restart a server whose
+process tree grows too large, once it has no calls in flight. The background
+sampler scans the process trees in a worker thread; only the results come back
+to the event loop.
+
+Requires psutil; without it, sampling is disabled.
+"""
+
+import os
+import asyncio
+import logging
+import threading
+from typing import Any, Dict, List, Optional
+
+from . import zygote as zygote_server
+from .connection import SERVER_ID_ENV, RemoteServerConnection, ReplicaSet, ServerConnection
+
+try:
+    import psutil
+except ImportError:  # pragma: no cover - psutil is a declared dependency
+    psutil = None
+
+logger = logging.getLogger(__name__)
+
+_MB = 1024 * 1024
+_SHIM_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'zygote_shim.py')
+
+def is_available() -> bool:
+    """Whether resource sampling is supported (psutil is installed)."""
+    return psutil is not None
+
+def _expand(connection: Any) -> List[ServerConnection]:
+    """Get the individual server connections behind a connection or replica set."""
+    if isinstance(connection, ReplicaSet):
+        return list(connection.replicas)
+    if isinstance(connection, RemoteServerConnection):
+        return []
+    return [connection]
+
+class ResourceMonitor:
+    """
+    Samples the resource usage of tool server process trees.
+    """
+
+    def __init__(self, interval: float = 10.0, rss_limit_mb: float = 0.0, fd_limit: int = 0):
+        """
+        Initialize the monitor.
+
+        Args:
+            interval: Seconds between samples
+            rss_limit_mb: Memory of a server's process tree above which the
+                          server is restarted when idle (0 for no limit)
+            fd_limit: Open file descriptors of a server's process tree above which
+                      the server is restarted when idle (0 for no limit)
+        """
+        self.interval = interval
+        self.rss_limit_mb = rss_limit_mb
+        self.fd_limit = fd_limit
+        self._processes: Dict[int, Any] = {}  # pid -> psutil.Process, kept for CPU deltas
+        self._servers: Dict[str, int] = {}  # server id -> pid of the server process
+        self._peaks: Dict[str, int] = {}  # server id -> peak RSS in bytes
+        self._over_limit: Dict[str, str] = {}  # server id -> reason, while a restart is pending
+        self._lock = threading.Lock()  # guards the caches above against concurrent scans
+        self._task: Optional[asyncio.Task] = None
+        self.limit_restarts = 0
+
+    def _process(self, pid: int):
+        """Get a cached psutil.Process, so that cpu_percent() measures since the last sample."""
+        process = self._processes.get(pid)
+        if process is None or not process.is_running():
+            process = psutil.Process(pid)
+            process.cpu_percent(None)
+            self._processes[pid] = process
+        return process
+
+    def _find_server(self, server_id: str):
+        """Find the process of a server through the marker in its environment."""
+        # A restarted server keeps its marker, so a cached process must still be running
+        process = self._processes.get(self._servers.get(server_id))
+        if process is not None and process.is_running():
+            return process
+
+        candidates = []
+        for child in psutil.Process().children(recursive=True):
+            try:
+                if child.environ().get(SERVER_ID_ENV) == server_id:
+                    candidates.append(child)
+            except psutil.Error:
+                continue
+        if not candidates:
+            return None
+        # Subprocesses of the server inherit the marker; the server is the topmost match
+        pids = {child.pid for child in candidates}
+        server = next((child for child in candidates if child.ppid() not in pids), candidates[0])
+        self._servers[server_id] = server.pid
+        return self._process(server.pid)
+
+    def _forked_server(self, process) -> Optional[int]:
+        """PID of the server the zygote forked for a shim process, if it is one."""
+        try:
+            cmdline = process.cmdline()
+        except psutil.Error:
+            return None
+        if len(cmdline) > 2 and cmdline[1] == _SHIM_PATH:
+            return zygote_server.forked_pid(cmdline[2], process.pid)
+        return None
+
+    def _tree(self, root) -> List[Any]:
+        """Get a process and all its descendants, following shims to their forked servers."""
+        processes, stack, seen = [], [root], set()
+        while stack:
+            process = stack.pop()
+            forked = self._forked_server(process)
+            if forked is not None:
+                try:
+                    process = self._process(forked)
+                except psutil.Error:
+                    continue
+            if process.pid in seen:
+                continue
+            seen.add(process.pid)
+            processes.append(process)
+            try:
+                stack.extend(self._process(child.pid) for child in process.children())
+            except psutil.Error:
+                continue
+        return processes
+
+    def _measure(self, server_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Measure the process tree of one server (blocking, scans /proc).
+
+        Args:
+            server_id: Marker of the server in its environment
+
+        Returns:
+            The measurements, or None if the server process was not found
+        """
+        with self._lock:
+            root = self._find_server(server_id)
+            if root is None:
+                return None
+
+            rss = cpu = fds = threads = 0
+            tree = self._tree(root)
+            for process in tree:
+                try:
+                    with process.oneshot():
+                        rss += process.memory_info().rss
+                        cpu += process.cpu_percent(None)
+                        fds += process.num_fds() if hasattr(process, 'num_fds') else process.num_handles()
+                        threads += process.num_threads()
+                except psutil.Error:
+                    continue
+
+            peak = max(rss, self._peaks.get(server_id, 0))
+            self._peaks[server_id] = peak
+            return {
+                "pid": tree[0].pid if tree else root.pid,
+                "processes": len(tree),
+                "rss": rss,
+                "peak_rss": peak,
+                "cpu_percent": round(cpu, 1),
+                "fds": fds,
+                "threads": threads,
+            }
+
+    def _measure_all(self, server_ids: List[str]) -> Dict[str, Optional[Dict[str, Any]]]:
+        """Measure several servers after forgetting exited processes (runs in a worker thread)."""
+        with self._lock:
+            self._prune()
+        return {server_id: self._measure(server_id) for server_id in server_ids}
+
+    @staticmethod
+    def _record(connection: ServerConnection, measured: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """Store a server's measurements on its connection."""
+        if measured is not None:
+            connection.resources = {**measured, "last_tool": connection.last_tool}
+        return connection.resources
+
+    def sample_connection(self, connection: ServerConnection) -> Dict[str, Any]:
+        """
+        Sample the resource usage of one server.
+
+        Args:
+            connection: The server connection
+
+        Returns:
+            Dictionary with the server 'pid', the number of 'processes' in its tree,
+            their total 'rss' and 'peak_rss' in bytes, 'cpu_percent' since the
+            previous sample, open 'fds' and 'threads', and the 'last_tool' called;
+            empty if the server is not running
+        """
+        if psutil is None or not connection.is_connected:
+            connection.resources = {}
+            return {}
+        return self._record(connection, self._measure(connection.server_id))
+
+    def _limit_exceeded(self, resources: Dict[str, Any]) -> Optional[str]:
+        if self.rss_limit_mb and resources.get("rss", 0) > self.rss_limit_mb * _MB:
+            return f"RSS {resources['rss'] / _MB:.0f} MB > {self.rss_limit_mb:g} MB"
+        if self.fd_limit and resources.get("fds", 0) > self.fd_limit:
+            return f"{resources['fds']} open files > {self.fd_limit}"
+        return None
+
+    async def sample(self, connections: List[Any]) -> None:
+        """
+        Sample a set of servers and restart idle ones that exceed a soft limit.
+
+        A server over its limit while calls are in flight is restarted as soon as
+        a later sample finds it idle. The next tool call starts it again.
+
+        Args:
+            connections: Server connections or replica sets
+        """
+        if psutil is None:
+            return
+        servers = [c for item in connections for c in _expand(item)]
+        measured = await asyncio.to_thread(
+            self._measure_all, [c.server_id for c in servers if c.is_connected])
+        for connection in servers:
+            if connection.is_connected:
+                resources = self._record(connection, measured.get(connection.server_id))
+            else:
+                resources = connection.resources = {}
+            reason = self._limit_exceeded(resources) or self._over_limit.get(connection.server_id)
+            if reason is None:
+                continue
+            if connection.in_flight:
+                self._over_limit[connection.server_id] = reason
+                continue
+            self._over_limit.pop(connection.server_id, None)
+            logger.warning(f"Restarting MCP server '{connection.name}' over its resource limit: {reason} "
+                           f"(last tool: {connection.last_tool})")
+            self.limit_restarts += 1
+            await connection.close()
+            with self._lock:
+                self._peaks.pop(connection.server_id, None)
+                self._servers.pop(connection.server_id, None)
+            connection.resources = {}
+
+    def _prune(self) -> None:
+        """Forget processes that have exited (caller holds the lock)."""
+        for pid in [pid for pid, process in self._processes.items() if not process.is_running()]:
+            del self._processes[pid]
+
+    async def _run(self, registry) -> None:
+        """Sample the registry's servers on this event loop until none are left."""
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.interval)
+            connections = registry.connections(loop)
+            if not connections:
+                return
+            try:
+                await self.sample(connections)
+            except Exception as e:
+                logger.error(f"Error sampling tool server resources: {e}")
+
+    def start(self, registry) -> None:
+        """
+        Start sampling the servers of a registry in the background on the running loop.
+
+        Args:
+            registry: SharedServerRegistry whose connections are sampled
+        """
+        if psutil is None:
+            logger.warning("psutil is not installed, tool server resource monitoring is disabled")
+            return
+        if self.interval <= 0:
+            return
+        loop = asyncio.get_running_loop()
+        if self._task is None or self._task.done() or self._task.get_loop() is not loop:
+            self._task = loop.create_task(self._run(registry), name="mcp-resource-monitor")
+
+_resource_monitor: Optional[ResourceMonitor] = None
+
+def get_resource_monitor() -> ResourceMonitor:
+    """
+    Get the process-wide resource monitor.
+
+    Returns:
+        The shared ResourceMonitor instance
+    """
+    global _resource_monitor
+    if _resource_monitor is None:
+        _resource_monitor = ResourceMonitor()
+    return _resource_monitor
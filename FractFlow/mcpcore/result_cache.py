@@ -0,0 +1,208 @@
+"""
+MCP tool result cache.
+
+Caches the results of read-only tool calls, keyed by the tool server, tool name
+and canonicalized arguments, so that repeated lookups inside a ReAct loop or
+across sessions in one process are served without calling the server again.
+"""
+
+import os
+import json
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+# Argument names whose string values are treated as file system paths even when
+# the path does not exist yet (so that creating it later invalidates the entry)
+PATH_ARGUMENT_HINTS = ('path', 'file', 'dir')
+
+def _mtime(path: str) -> Optional[float]:
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return None
+
+def path_arguments(arguments: Dict[str, Any]) -> Dict[str, Optional[float]]:
+    """
+    Find the file system paths referenced by tool arguments.
+
+    Args:
+        arguments: Tool call arguments
+
+    Returns:
+        Dictionary mapping absolute paths to their current modification time
+        (None if the path does not exist)
+    """
+    paths = {}
+    for name, value in (arguments or {}).items():
+        if not isinstance(value, str) or not value or len(value) > 4096:
+            continue
+        if any(hint in name.lower() for hint in PATH_ARGUMENT_HINTS) or os.path.exists(value):
+            path = os.path.abspath(os.path.expanduser(value))
+            paths[path] = _mtime(path)
+    return paths
+
+class ToolResultCache:
+    """
+    LRU cache of tool results with per-entry TTL.
+
+    Entries record the modification times of the paths in their arguments and
+    are dropped when any of those files change, or when invalidate() is called
+    for one of the paths (e.g. after a write tool touched it).
+    """
+
+    def __init__(self, max_entries: int = 1024):
+        """
+        Initialize the result cache.
+
+        Args:
+            max_entries: Maximum number of cached results before the least
+                         recently used ones are evicted
+        """
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[str, Any, float, Dict[str, Optional[float]]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'expirations': 0, 'invalidations': 0}
+        self._tool_stats: Dict[str, Dict[str, int]] = {}
+
+    @staticmethod
+    def make_key(server_id: str, tool_name: str, arguments: Dict[str, Any]) -> str:
+        """
+        Build a canonical cache key for a tool call.
+
+        Args:
+            server_id: Identity of the tool server, including its environment
+            tool_name: Name of the tool
+            arguments: Tool call arguments
+
+        Returns:
+            The cache key
+        """
+        return json.dumps([server_id, tool_name, arguments or {}],
+                          sort_keys=True, separators=(',', ':'), ensure_ascii=False, default=str)
+
+    def _count(self, tool_name: str, outcome: str) -> None:
+        self._stats[outcome] += 1
+        tool_stats = self._tool_stats.setdefault(tool_name, {'hits': 0, 'misses': 0})
+        tool_stats[outcome] += 1
+
+    def get(self, key: str, tool_name: str) -> Optional[Any]:
+        """
+        Look up a cached result.
+
+        Args:
+            key: Key from make_key()
+            tool_name: Name of the tool, for per-tool statistics
+
+        Returns:
+            The cached result, or None on a miss
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                _, value, expires_at, paths = entry
+                if time.monotonic() >= expires_at:
+                    del self._entries[key]
+                    self._stats['expirations'] += 1
+                elif any(_mtime(path) != mtime for path, mtime in paths.items()):
+                    del self._entries[key]
+                    self._stats['invalidations'] += 1
+                else:
+                    self._entries.move_to_end(key)
+                    self._count(tool_name, 'hits')
+                    return value
+            self._count(tool_name, 'misses')
+            return None
+
+    def put(self, key: str, tool_name: str, value: Any, ttl: float,
+            paths: Optional[Dict[str, Optional[float]]] = None) -> None:
+        """
+        Store a tool result.
+
+        Args:
+            key: Key from make_key()
+            tool_name: Name of the tool
+            value: Result to cache
+            ttl: Seconds the result stays valid
+            paths: Paths the result depends on, with their modification times
+                   taken before the call (see path_arguments())
+        """
+        if ttl <= 0 or self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (tool_name, value, time.monotonic() + ttl, dict(paths or {}))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats['evictions'] += 1
+
+    def invalidate(self, tool_name: Optional[str] = None, path: Optional[str] = None) -> int:
+        """
+        Drop cached results by tool and/or referenced path.
+
+        Args:
+            tool_name: Only drop results of this tool
+            path: Only drop results whose arguments reference this path
+                  (or a path inside it, for directories)
+
+        Returns:
+            Number of entries removed
+        """
+        if path is not None:
+            path = os.path.abspath(os.path.expanduser(path))
+        with self._lock:
+            stale = []
+            for key, (entry_tool, _, _, paths) in self._entries.items():
+                if tool_name is not None and entry_tool != tool_name:
+                    continue
+                if path is not None and not any(
+                        p == path or p.startswith(path + os.sep) or path.startswith(p + os.sep) for p in paths):
+                    continue
+                stale.append(key)
+            for key in stale:
+                del self._entries[key]
+            self._stats['invalidations'] += len(stale)
+            return len(stale)
+
+    def clear(self) -> None:
+        """Drop all cached results."""
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get cache statistics.
+
+        Returns:
+            Dictionary with entry count, hit/miss/eviction counters, the overall
+            hit rate, and per-tool hits and misses
+        """
+        with self._lock:
+            lookups = self._stats['hits'] + self._stats['misses']
+            return {
+                'entries': len(self._entries),
+                **self._stats,
+                'hit_rate': self._stats['hits'] / lookups if lookups else 0.0,
+                'tools': {name: dict(stats) for name, stats in self._tool_stats.items()},
+            }
+
+_result_caches: Dict[int, ToolResultCache] = {}
+
+def get_result_cache(max_entries: int = 1024) -> ToolResultCache:
+    """
+    Get a process-wide result cache shared by all agents.
+
+    Agents configured with the same size share one cache; a different size
+    gets its own, so no agent changes the capacity another one relies on.
+
+    Args:
+        max_entries: Capacity of the cache
+
+    Returns:
+        The shared ToolResultCache instance of that size
+    """
+    cache = _result_caches.get(max_entries)
+    if cache is None:
+        cache = _result_caches[max_entries] = ToolResultCache(max_entries)
+    return cache
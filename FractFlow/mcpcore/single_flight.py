@@ -0,0 +1,106 @@
+"""
+Single-flight coalescing of identical concurrent tool calls.
+
+When several callers issue the same call while it is still running, only the
+first one (the leader) reaches the tool server; the others await its result.
+"""
+
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+class _Flight:
+    """A call in progress and the number of callers waiting for it."""
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+class SingleFlight:
+    """
+    Coalesces identical in-flight calls.
+
+    The shared call runs in its own task, so a caller that is cancelled (for
+    example because its session went away) does not cancel the call for the
+    others. The call itself is only cancelled once every caller has gone.
+    """
+
+    def __init__(self):
+        """Initialize with no calls in flight."""
+        self._flights: Dict[Tuple[asyncio.AbstractEventLoop, Hashable], _Flight] = {}
+        self.leaders = 0
+        self.followers = 0
+
+    async def do(self, key: Hashable, call: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Run a call, or join an identical one that is already running.
+
+        Args:
+            key: Identity of the call (e.g. tool name and canonical arguments)
+            call: Factory returning the awaitable that performs the call
+
+        Returns:
+            The result of the shared call
+
+        Raises:
+            Exception: Whatever the shared call raised
+        """
+        flight_key = (asyncio.get_running_loop(), key)
+        flight = self._flights.get(flight_key)
+        if flight is None:
+            flight = _Flight(asyncio.ensure_future(call()))
+            self._flights[flight_key] = flight
+            flight.task.add_done_callback(lambda task: self._finish(flight_key, flight))
+            self.leaders += 1
+        else:
+            self.followers += 1
+            logger.debug(f"Joining in-flight call {key}")
+
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                # Nobody is interested in the result any more; later callers start afresh
+                flight.task.cancel()
+                if self._flights.get(flight_key) is flight:
+                    del self._flights[flight_key]
+
+    def _finish(self, flight_key: Tuple, flight: _Flight) -> None:
+        """Forget a completed call so that later calls start afresh."""
+        if self._flights.get(flight_key) is flight:
+            del self._flights[flight_key]
+        if not flight.task.cancelled():
+            # Mark the exception as retrieved when every caller has gone away
+            flight.task.exception()
+
+    def in_flight(self) -> int:
+        """Get the number of distinct calls currently running."""
+        return len(self._flights)
+
+    def get_stats(self) -> Dict[str, int]:
+        """
+        Get coalescing statistics.
+
+        Returns:
+            Dictionary with the number of calls started ('leaders'), the number of
+            duplicate calls that joined one of them ('followers') and 'in_flight'
+        """
+        return {'leaders': self.leaders, 'followers': self.followers, 'in_flight': self.in_flight()}
+
+_single_flight: Optional[SingleFlight] = None
+
+def get_single_flight() -> SingleFlight:
+    """
+    Get the process-wide single-flight group shared by all agents.
+
+    Returns:
+        The shared SingleFlight instance
+    """
+    global _single_flight
+    if _single_flight is None:
+        _single_flight = SingleFlight()
+    return _single_flight
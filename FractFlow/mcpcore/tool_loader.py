@@ -29,10 +29,10 @@ class MCPToolLoader:
         self.config = config or ConfigManager()
         
         # Push component name to call path
-        self.config.push_to_call_path("tool_loader")
+        self.call_path = self.config.push_to_call_path("tool_loader")
         
         # Initialize logger
-        self.logger = get_logger(self.config.get_call_path())
+        self.logger = get_logger(self.call_path)
         
         self.logger.debug("Tool loader initialized")
     
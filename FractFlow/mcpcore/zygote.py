@@ -0,0 +1,249 @@
+"""
+Warm interpreter (zygote) for spawning MCP tool servers.
+
+The zygote is a long-lived process that imports the shared FractFlow stack
+(mcp, pydantic, openai, ...) once and then forks one child per tool server.
+Each child takes over the stdio pipes of a lightweight shim process started by
+the stdio client (see zygote_shim.py) and runs the server script as __main__,
+so a new server is ready in milliseconds instead of repeating the imports.
+
+Started by launcher.Zygote, which runs main() with the socket path as argument.
+
+Linux only: relies on fork, SCM_RIGHTS file descriptor passing and pidfds.
+"""
+
+import os
+import sys
+import json
+import runpy
+import signal
+import socket
+import struct
+import importlib
+import selectors
+from typing import Optional
+
+# Environment variable through which nested agents find a running zygote
+ZYGOTE_SOCKET_ENV = 'FRACTFLOW_ZYGOTE_SOCKET'
+
+# Modules imported once in the zygote and inherited by every forked server
+PRELOAD_MODULES = [
+    'pydantic',
+    'anyio',
+    'httpx',
+    'openai',
+    'mcp',
+    'mcp.server.fastmcp',
+    'mcp.client.stdio',
+    'FractFlow.agent',
+    'FractFlow.tool_template',
+]
+
+_HEADER = struct.Struct('!I')
+_STATUS = struct.Struct('!i')
+_CREDENTIALS = struct.Struct('3i')
+
+def is_supported() -> bool:
+    """Whether this platform supports the zygote."""
+    return (
+        hasattr(os, 'fork')
+        and hasattr(os, 'pidfd_open')
+        and hasattr(socket, 'send_fds')
+        and hasattr(socket, 'AF_UNIX')
+    )
+
+def preload(modules=None) -> None:
+    """Import the shared modules, skipping any that are not installed."""
+    for module in modules or PRELOAD_MODULES:
+        try:
+            importlib.import_module(module)
+        except Exception as e:
+            print(f"zygote: could not preload {module}: {e}", file=sys.stderr)
+
+def pid_dir(socket_path: str) -> str:
+    """Directory in which the zygote records the PID of the server forked for each shim."""
+    return os.path.join(os.path.dirname(socket_path), 'pids')
+
+def forked_pid(socket_path: str, shim_pid: int) -> Optional[int]:
+    """
+    Find the server process that a zygote forked for a shim.
+
+    Args:
+        socket_path: Socket of the zygote the shim connected to
+        shim_pid: PID of the shim process
+
+    Returns:
+        PID of the forked server, or None if unknown
+    """
+    try:
+        with open(os.path.join(pid_dir(socket_path), str(shim_pid))) as f:
+            return int(f.read())
+    except (OSError, ValueError):
+        return None
+
+def _recv_exact(conn: socket.socket, size: int) -> bytes:
+    data = b''
+    while len(data) < size:
+        chunk = conn.recv(size - len(data))
+        if not chunk:
+            raise EOFError("connection closed")
+        data += chunk
+    return data
+
+def _run_child(request: dict, fds, socket_path: str) -> None:
+    """Become the tool server described by a spawn request. Never returns."""
+    code = 1
+    try:
+        for target, fd in enumerate(fds):
+            os.dup2(fd, target)
+            os.close(fd)
+        signal.signal(signal.SIGINT, signal.default_int_handler)
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+
+        os.environ.clear()
+        os.environ.update(request.get('env', {}))
+        os.environ[ZYGOTE_SOCKET_ENV] = socket_path
+        os.chdir(request.get('cwd') or '/')
+
+        script = request['script']
+        sys.argv = [script] + list(request.get('args', []))
+        sys.path[0] = os.path.dirname(os.path.abspath(script))
+
+        import random
+        random.seed()
+
+        if os.environ.get('FRACTFLOW_LOOP_MONITOR'):
+            from FractFlow.infra.loop_monitor import install_from_environment
+            install_from_environment(os.path.splitext(os.path.basename(script))[0])
+
+        runpy.run_path(script, run_name='__main__')
+        code = 0
+    except SystemExit as e:
+        code = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+    except BaseException:
+        import traceback
+        traceback.print_exc()
+    finally:
+        try:
+            sys.stdout.flush()
+            sys.stderr.flush()
+        finally:
+            os._exit(code)
+
+def serve(socket_path: str) -> None:
+    """
+    Accept spawn requests until the parent process closes our stdin.
+
+    Args:
+        socket_path: Path of the Unix socket to listen on
+    """
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    listener.bind(socket_path)
+    os.chmod(socket_path, 0o600)
+    listener.listen(64)
+
+    selector = selectors.DefaultSelector()
+    selector.register(listener, selectors.EVENT_READ, 'accept')
+    selector.register(sys.stdin.fileno(), selectors.EVENT_READ, 'parent')
+    children = {}  # pid -> (connection, pidfd)
+    shims = {}  # pid -> path of the file recording it for its shim
+    os.makedirs(pid_dir(socket_path), exist_ok=True)
+
+    print('ready', flush=True)
+
+    try:
+        while True:
+            for key, _ in selector.select():
+                kind = key.data
+                if kind == 'parent':
+                    if not os.read(sys.stdin.fileno(), 1024):
+                        return
+                elif kind == 'accept':
+                    conn, _ = listener.accept()
+                    fds = []
+                    try:
+                        message, fds, _, _ = socket.recv_fds(conn, _HEADER.size, 3)
+                        if len(fds) != 3:
+                            raise ValueError(f"expected 3 file descriptors, got {len(fds)}")
+                        header = message + _recv_exact(conn, _HEADER.size - len(message))
+                        (size,) = _HEADER.unpack(header)
+                        request = json.loads(_recv_exact(conn, size).decode('utf-8'))
+                    except Exception as e:
+                        print(f"zygote: bad spawn request: {e}", file=sys.stderr)
+                        for fd in fds:
+                            os.close(fd)
+                        conn.close()
+                        continue
+
+                    sys.stdout.flush()
+                    sys.stderr.flush()
+                    pid = os.fork()
+                    if pid == 0:
+                        selector.close()
+                        listener.close()
+                        conn.close()
+                        for other_conn, other_pidfd in children.values():
+                            other_conn.close()
+                            os.close(other_pidfd)
+                        _run_child(request, fds, socket_path)
+
+                    for fd in fds:
+                        os.close(fd)
+                    pidfd = os.pidfd_open(pid)
+                    children[pid] = (conn, pidfd)
+                    try:
+                        shim_pid, _, _ = _CREDENTIALS.unpack(
+                            conn.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, _CREDENTIALS.size)
+                        )
+                        shims[pid] = os.path.join(pid_dir(socket_path), str(shim_pid))
+                        with open(shims[pid], 'w') as f:
+                            f.write(str(pid))
+                    except OSError:
+                        pass
+                    selector.register(conn, selectors.EVENT_READ, ('shim', pid))
+                    selector.register(pidfd, selectors.EVENT_READ, ('exit', pid))
+                elif kind[0] == 'shim':
+                    # The shim only closes its end when it is killed; take the server down with it
+                    pid = kind[1]
+                    try:
+                        data = key.fileobj.recv(16)
+                    except OSError:
+                        data = b''
+                    if not data:
+                        selector.unregister(key.fileobj)
+                        try:
+                            os.kill(pid, signal.SIGTERM)
+                        except ProcessLookupError:
+                            pass
+                elif kind[0] == 'exit':
+                    pid = kind[1]
+                    _, status = os.waitpid(pid, 0)
+                    conn, pidfd = children.pop(pid)
+                    if pid in shims:
+                        try:
+                            os.unlink(shims.pop(pid))
+                        except OSError:
+                            pass
+                    selector.unregister(pidfd)
+                    os.close(pidfd)
+                    try:
+                        selector.unregister(conn)
+                    except KeyError:
+                        pass
+                    try:
+                        conn.sendall(_STATUS.pack(os.waitstatus_to_exitcode(status)))
+                    except OSError:
+                        pass
+                    conn.close()
+    finally:
+        listener.close()
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+
+def main() -> None:
+    """Entry point: zygote <socket_path> [preload modules...]"""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    preload(sys.argv[2:] or None)
+    serve(sys.argv[1])
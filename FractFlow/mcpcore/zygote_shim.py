@@ -0,0 +1,54 @@
+"""
+Stand-in process for a tool server forked by the zygote.
+
+Started by the stdio client in place of `python script.py`. Hands its stdio
+pipes to the zygote, which forks a warm child to run the script, then waits
+for that child to exit and exits with the same status. Killing the shim
+terminates the child.
+
+Deliberately imports only the standard library so that it starts quickly.
+
+Usage: python zygote_shim.py <socket_path> <script_path> [args...]
+"""
+
+import os
+import sys
+import json
+import signal
+import socket
+import struct
+
+def main() -> int:
+    socket_path, script = sys.argv[1], sys.argv[2]
+    request = json.dumps({
+        'script': os.path.abspath(script),
+        'args': sys.argv[3:],
+        'cwd': os.getcwd(),
+        'env': dict(os.environ),
+    }).encode('utf-8')
+
+    conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    conn.connect(socket_path)
+    socket.send_fds(conn, [struct.pack('!I', len(request))], [0, 1, 2])
+    conn.sendall(request)
+
+    # Only our socket should keep the pipes referenced from this side
+    devnull = os.open(os.devnull, os.O_RDWR)
+    for fd in (0, 1):
+        os.dup2(devnull, fd)
+
+    # When asked to terminate, have the zygote stop the server and exit only once
+    # it is gone, so that the pipes close together with this process as they would
+    # for a server started directly
+    signal.signal(signal.SIGTERM, lambda signum, frame: conn.shutdown(socket.SHUT_WR))
+
+    status = b''
+    while len(status) < 4:
+        chunk = conn.recv(4 - len(status))
+        if not chunk:
+            return 1
+        status += chunk
+    return struct.unpack('!i', status)[0]
+
+if __name__ == '__main__':
+    sys.exit(main())
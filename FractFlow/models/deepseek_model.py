@@ -30,10 +30,10 @@ class DeepSeekModel(OrchestratorModel):
             config = ConfigManager()
             
         # Push model type to call path
-        config.push_to_call_path("deepseek")
+        call_path = config.push_to_call_path("deepseek")
         
         # Initialize logger
-        self.logger = get_logger(config.get_call_path())
+        self.logger = get_logger(call_path)
             
         history_adapter = DeepSeekHistoryAdapter()
         
@@ -45,7 +45,8 @@ class DeepSeekModel(OrchestratorModel):
             model_name=config.get('deepseek.model', 'deepseek-reasoner'),
             provider_name='deepseek',
             history_adapter=history_adapter,
-            config=config
+            config=config,
+            call_path=call_path
         )
         
         self.logger.debug("DeepSeek model created", {
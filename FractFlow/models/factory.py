@@ -29,10 +29,10 @@ def create_model(provider: Optional[str] = None, config: Optional[ConfigManager]
         config = ConfigManager()
     
     # Push models to call path
-    config.push_to_call_path("models")
+    call_path = config.push_to_call_path("models")
     
     # Initialize logger
-    logger = get_logger(config.get_call_path())
+    logger = get_logger(call_path)
         
     # Use provider from args, or from config, or default to openai
     provider = provider or config.get('agent.provider', 'deepseek')
@@ -7,11 +7,18 @@ Provides a base implementation for models that orchestrate tools and reasoning.
 import json
 import re
 import uuid
+import asyncio
+import threading
+from types import SimpleNamespace
 from typing import Dict, List, Any, Optional
 from openai import OpenAI
 
 from .base_model import BaseModel
 from .toolcall_model import ToolCallFactory
+from ..core.tool_index import ToolIndex, tool_name
+from ..core.plan_executor import PLAN_INSTRUCTIONS, PlanError, parse_plan
+from ..infra import events
+from ..infra.budget import record_llm_call
 from ..infra.config import ConfigManager
 from ..infra.error_handling import LLMError, handle_error, create_error_response
 from ..conversation.base_history import ConversationHistory
@@ -32,7 +39,8 @@ class OrchestratorModel(BaseModel):
     """
     
     def __init__(self, base_url: str, api_key: str, model_name: str, provider_name: str, 
-                 history_adapter: Any, config: Optional[ConfigManager] = None):
+                 history_adapter: Any, config: Optional[ConfigManager] = None,
+                 call_path: Optional[str] = None):
         """
         Initialize the orchestrator model with provider-specific settings.
         
@@ -43,6 +51,8 @@ class OrchestratorModel(BaseModel):
             provider_name: Name of the provider for tool helper creation
             history_adapter: Provider-specific history adapter instance
             config: Configuration manager instance to use
+            call_path: Call path of the provider model for logging (defaults
+                       to the current scope)
         """
         if config is None:
             config = ConfigManager()
@@ -51,7 +61,8 @@ class OrchestratorModel(BaseModel):
         self.provider_name = provider_name
         
         # Initialize logger
-        self.logger = get_logger(self.config.get_call_path())
+        self.call_path = call_path or self.config.get_call_path()
+        self.logger = get_logger(self.call_path)
         
         self.client = OpenAI(
             base_url=base_url,
@@ -65,12 +76,46 @@ class OrchestratorModel(BaseModel):
         # Combine the custom prompt with the required tool calling instructions
         complete_system_prompt = f"{custom_system_prompt}\n\n{ToolCallFactory(config=config).create_tool_call_instruction()}"
         
+        # Plan mode: the model may also answer with a whole graph of tool calls
+        self.plan_mode = bool(config.get('agent.plan_mode', False))
+        if self.plan_mode:
+            complete_system_prompt = f"{complete_system_prompt}\n\n{PLAN_INSTRUCTIONS}"
+        
         # Create conversation history with the complete system prompt
         self.history = ConversationHistory(complete_system_prompt)
         
         self.history_adapter = history_adapter
         # Use the unified ToolCallHelper with provider name
         self.tool_helper = ToolCallFactory(config=config).create_tool_call_helper()
+        
+        # Relevance-based tool subsetting for large catalogs (0 describes every tool)
+        self.tool_top_k = config.get('agent.tool_top_k', 0) or 0
+        self._tool_index: Optional[ToolIndex] = None
+        # Tools the model has used in this conversation stay in every subset
+        self._pinned_tools = set()
+    
+    def _select_tools(self, tools: List[Dict[str, Any]], text: str) -> List[Dict[str, Any]]:
+        """
+        Select the tools relevant to a text when tool subsetting is enabled.
+        
+        Args:
+            tools: All available tools
+            text: Text to rank the tools against
+            
+        Returns:
+            The top tool_top_k tools plus the pinned ones, or all tools
+        """
+        if not self.tool_top_k or len(tools) <= self.tool_top_k:
+            return tools
+        if self._tool_index is None or self._tool_index.names != [tool_name(tool) for tool in tools]:
+            self._tool_index = ToolIndex(tools)
+        return self._tool_index.select(text, self.tool_top_k, include=self._pinned_tools)
+    
+    def _recent_context(self, max_chars: int = 2000) -> str:
+        """Text of the latest user query and the messages after it, to rank tools against."""
+        messages = self.history.get_messages()
+        start = max((i for i, m in enumerate(messages) if m.get("role") == "user"), default=0)
+        return "\n".join(str(m.get("content") or "")[:max_chars] for m in messages[start:][-3:])
 
     async def execute(self, tools: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
         """
@@ -87,8 +132,9 @@ class OrchestratorModel(BaseModel):
         try:
             # Format history using the adapter
             # Pass tools to the main model so it knows what tools are available
+            prompt_tools = self._select_tools(tools, self._recent_context()) if tools else tools
             formatted_messages = self.history_adapter.format_for_model(
-                self.history.get_messages(), tools=tools
+                self.history.get_messages(), tools=prompt_tools
             )
             self.logger.debug(f"Formatted messages: {formatted_messages}")
             # Get model response
@@ -111,6 +157,30 @@ class OrchestratorModel(BaseModel):
                 reasoning_content = response.choices[0].message.reasoning_content
                 self.logger.info("Reasoning content", {"reasoning_content": reasoning_content})
 
+            # --- Plan Mode ---
+            if self.plan_mode and tools:
+                try:
+                    plan = parse_plan(content, [tool_name(tool) for tool in tools])
+                except PlanError as e:
+                    self.logger.warning("Invalid plan", {"error": str(e)})
+                    plan, plan_error = None, str(e)
+                else:
+                    plan_error = None
+                if plan or plan_error:
+                    if plan:
+                        self.logger.info("Received plan", {"steps": [f"{node.id}: {node.tool}" for node in plan]})
+                    return {
+                        "choices": [{
+                            "message": {
+                                "content": content,
+                                "tool_calls": None,
+                                "plan": plan,
+                                "plan_error": plan_error,
+                                "reasoning_content": reasoning_content
+                            }
+                        }]
+                    }
+            
             # --- Multiple Tool Calling Logic ---
             tool_calls = []
             
@@ -128,9 +198,16 @@ class OrchestratorModel(BaseModel):
                     
                     # Pass the instruction to the robust tool calling helper
                     self.logger.debug(f"Invoking tool_helper for request {i+1}...")
-                    validated_tool_calls, stats = await self.tool_helper.call_tool(tool_instruction, tools)
+                    helper_tools = self._select_tools(tools, tool_instruction)
+                    validated_tool_calls, stats = await self.tool_helper.call_tool(tool_instruction, helper_tools)
+                    
+                    if not validated_tool_calls and len(helper_tools) < len(tools):
+                        # The request may need a tool that was filtered out: widen to the full catalog
+                        self.logger.info(f"Retrying tool request {i+1} with all tools", {"selected": len(helper_tools), "total": len(tools)})
+                        validated_tool_calls, stats = await self.tool_helper.call_tool(tool_instruction, tools)
                     
                     if validated_tool_calls and len(validated_tool_calls) > 0:
+                        self._pinned_tools.update(call["function"]["name"] for call in validated_tool_calls)
                         # Add all valid tool calls to our list
                         tool_calls.extend(validated_tool_calls)
                         self.logger.debug(f"Helper generated {stats['valid_calls']} tool calls for request {i+1}")
@@ -179,13 +256,65 @@ class OrchestratorModel(BaseModel):
             if 'temperature' not in kwargs:
                 kwargs['temperature'] = self.config.get(f'{self.provider_name}.temperature')
                 
-            result = self.client.chat.completions.create(**kwargs)
-            return await result if hasattr(result, "__await__") else result
+            if events.is_enabled():
+                # Someone watches the query: forward the response as it is generated
+                response = await self._stream_chat_completion(kwargs)
+            else:
+                result = self.client.chat.completions.create(**kwargs)
+                response = await result if hasattr(result, "__await__") else result
+            record_llm_call(response)
+            return response
         except Exception as e:
             error = handle_error(e, {"kwargs": kwargs})
             self.logger.error(f"API call error: {error}")
             return None
 
+    async def _stream_chat_completion(self, kwargs: Dict[str, Any]) -> Any:
+        """
+        Request a streamed completion, emitting a 'token' event per content delta.
+        
+        The stream is read in a worker thread so that the events reach the
+        event loop while the response is generated; cancelling the call closes
+        the stream.
+        
+        Args:
+            kwargs: Arguments to pass to the API
+            
+        Returns:
+            A response object with the same fields as a non-streamed completion
+        """
+        stop = threading.Event()
+        
+        def consume() -> Any:
+            stream = self.client.chat.completions.create(
+                stream=True, stream_options={"include_usage": True}, **kwargs
+            )
+            content, reasoning, usage = [], [], None
+            try:
+                for chunk in stream:
+                    if stop.is_set():
+                        break
+                    if getattr(chunk, "usage", None):
+                        usage = chunk.usage
+                    if not chunk.choices:
+                        continue
+                    delta = chunk.choices[0].delta
+                    if delta.content:
+                        content.append(delta.content)
+                        events.emit("token", content=delta.content)
+                    if getattr(delta, "reasoning_content", None):
+                        reasoning.append(delta.reasoning_content)
+            finally:
+                stream.close()
+            message = SimpleNamespace(content="".join(content), reasoning_content="".join(reasoning) or None)
+            return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=usage)
+        
+        try:
+            return await asyncio.to_thread(consume)
+        except asyncio.CancelledError:
+            stop.set()
+            raise
+
     def add_user_message(self, message: str) -> None:
         """
         Add a user message to the conversation history.
@@ -30,10 +30,10 @@ class QwenModel(OrchestratorModel):
             config = ConfigManager()
             
         # Push model type to call path
-        config.push_to_call_path("qwen")
+        call_path = config.push_to_call_path("qwen")
         
         # Initialize logger
-        self.logger = get_logger(config.get_call_path())
+        self.logger = get_logger(call_path)
             
         history_adapter = QwenHistoryAdapter()
         
@@ -45,7 +45,8 @@ class QwenModel(OrchestratorModel):
             model_name=config.get('qwen.model', 'qwen-max'),
             provider_name='qwen',
             history_adapter=history_adapter,
-            config=config
+            config=config,
+            call_path=call_path
         )
         
         self.logger.debug("Qwen model created", {
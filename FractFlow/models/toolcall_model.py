@@ -6,6 +6,7 @@ from tokencost import calculate_prompt_cost
 
 from openai import OpenAI
 
+from ..infra.budget import record_llm_call
 from ..infra.config import ConfigManager
 from ..infra.error_handling import handle_error
 from ..infra.logging_utils import get_logger
@@ -28,10 +29,10 @@ class ToolCallHelper_v1:
         self.config = config or ConfigManager()
         
         # Push component name to call path
-        self.config.push_to_call_path("tool_call_helper")
+        self.call_path = self.config.push_to_call_path("tool_call_helper")
         
         # Initialize logger
-        self.logger = get_logger(self.config.get_call_path())
+        self.logger = get_logger(self.call_path)
         
         self.client = None
         
@@ -224,7 +225,9 @@ Output JSON only, no other text. The arguments must be a valid JSON object."""
             })
             result = self.client.chat.completions.create(**kwargs)
             self.logger.debug("API call successful")
-            return await result if hasattr(result, "__await__") else result, None
+            response = await result if hasattr(result, "__await__") else result
+            record_llm_call(response)
+            return response, None
         except Exception as e:
             error = handle_error(e, {"kwargs": kwargs})
             self.logger.error(f"API call error", {"error": str(error)})
@@ -596,10 +599,10 @@ class ToolCallHelper_v2:
         self.config = config
         
         # Push component name to call path
-        self.config.push_to_call_path("tool_call_helper_v2")
+        self.call_path = self.config.push_to_call_path("tool_call_helper_v2")
         
         # Initialize logger
-        self.logger = get_logger(self.config.get_call_path())
+        self.logger = get_logger(self.call_path)
         
         # Load configuration with defaults
         self.max_retries = self.config.get('tool_calling.max_retries', 5)
@@ -0,0 +1,118 @@
+import asyncio
+import importlib
+import unittest
+
+from fastapi import HTTPException
+
+admission = importlib.import_module("前端.admission")
+AdmissionController = admission.AdmissionController
+
+class TestAdmissionController(unittest.TestCase):
+    def test_full_queue_is_rejected_with_retry_after(self):
+        """Test that requests beyond the slots and the queue get a 429 with Retry-After"""
+        controller = AdmissionController("chat", 1, max_queue=1, queue_timeout=5, session_limit=0)
+
+        async def run():
+            release = await controller.acquire()
+            queued = asyncio.create_task(controller.acquire())
+            await asyncio.sleep(0)
+            with self.assertRaises(HTTPException) as raised:
+                await controller.acquire()
+            release()
+            (await queued)()
+            return raised.exception
+
+        error = asyncio.run(run())
+        self.assertEqual(error.status_code, 429)
+        self.assertGreaterEqual(int(error.headers["Retry-After"]), 1)
+        metrics = controller.metrics()
+        self.assertEqual((metrics["rejected_full"], metrics["admitted"], metrics["running"]), (1, 2, 0))
+
+    def test_queue_timeout_is_rejected(self):
+        """Test that a request waiting longer than the queue timeout is rejected and leaves the queue"""
+        controller = AdmissionController("tts", 1, max_queue=4, queue_timeout=0.05, session_limit=0)
+
+        async def run():
+            release = await controller.acquire()
+            with self.assertRaises(HTTPException) as raised:
+                await controller.acquire()
+            queued = controller.metrics()["queued"]
+            release()
+            return raised.exception, queued
+
+        error, queued = asyncio.run(run())
+        self.assertEqual(error.status_code, 429)
+        self.assertEqual(queued, 0)
+        metrics = controller.metrics()
+        self.assertEqual((metrics["rejected_timeout"], metrics["running"]), (1, 0))
+
+    def test_session_limit(self):
+        """Test that a session cannot have more requests in flight than its limit"""
+        controller = AdmissionController("chat", 4, session_limit=1)
+
+        async def run():
+            release = await controller.acquire("s1")
+            with self.assertRaises(HTTPException) as raised:
+                await controller.acquire("s1")
+            other = await controller.acquire("s2")
+            release()
+            release()  # releasing twice is harmless
+            again = await controller.acquire("s1")
+            again()
+            other()
+            return raised.exception
+
+        error = asyncio.run(run())
+        self.assertEqual(error.status_code, 429)
+        self.assertEqual(error.headers["Retry-After"], "1")
+        metrics = controller.metrics()
+        self.assertEqual((metrics["rejected_session"], metrics["running"]), (1, 0))
+        self.assertEqual(controller._sessions, {})
+
+    def test_abandoned_waiter_hands_its_slot_on(self):
+        """Test that a waiter cancelled right after being handed the slot passes it to the next one"""
+        controller = AdmissionController("chat", 1, max_queue=4, queue_timeout=5)
+
+        async def run():
+            release = await controller.acquire("holder")
+            abandoned = asyncio.create_task(controller.acquire("abandoned"))
+            waiting = asyncio.create_task(controller.acquire("waiting"))
+            await asyncio.sleep(0)
+            # The slot goes to the first waiter, which is cancelled before it can resume
+            release()
+            abandoned.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await abandoned
+            next_release = await asyncio.wait_for(waiting, 1)
+            running = controller.metrics()["running"]
+            next_release()
+            return running
+
+        self.assertEqual(asyncio.run(run()), 1)
+        self.assertEqual(controller.metrics()["running"], 0)
+        self.assertEqual(controller._sessions, {})
+
+    def test_cancelled_waiter_leaves_the_queue(self):
+        """Test that a waiter cancelled while queued frees its queue place and session"""
+        controller = AdmissionController("chat", 1, max_queue=1, queue_timeout=5)
+
+        async def run():
+            release = await controller.acquire("holder")
+            waiter = asyncio.create_task(controller.acquire("gone"))
+            await asyncio.sleep(0)
+            waiter.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await waiter
+            queued = controller.metrics()["queued"]
+            follower = asyncio.create_task(controller.acquire("gone"))
+            await asyncio.sleep(0)
+            release()
+            (await follower)()
+            return queued
+
+        self.assertEqual(asyncio.run(run()), 0)
+        self.assertEqual(controller.metrics()["running"], 0)
+        self.assertEqual(controller._sessions, {})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,232 @@
+import os
+import time
+import shutil
+import asyncio
+import tempfile
+import importlib
+import threading
+import unittest
+from unittest import mock
+from types import SimpleNamespace
+
+import httpx
+from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+
+from FractFlow.conversation.history_store import SQLiteHistoryStore
+
+_cache_dir = tempfile.mkdtemp()
+os.environ.setdefault("FRACTFLOW_TTS_CACHE_DIR", _cache_dir)
+api_server = importlib.import_module("前端.api_server")
+admission = importlib.import_module("前端.admission")
+tts_cache = importlib.import_module("前端.tts_cache")
+
+def tearDownModule():
+    shutil.rmtree(_cache_dir, ignore_errors=True)
+
+def counting(controller, calls):
+    """Make every release function of an admission controller record its calls."""
+    acquire = controller.acquire
+
+    async def counting_acquire(session_id=None):
+        release = await acquire(session_id)
+
+        def counted():
+            calls.append(session_id)
+            release()
+        return counted
+
+    controller.acquire = counting_acquire
+    return controller
+
+class FakeAssistantAPI:
+    """Stands in for HKUSTAssistantAPI, recording shutdowns instead of stopping agents."""
+
+    shutdowns = []
+
+    def __init__(self, session_id):
+        self.session_id = session_id
+        self.assistant = None
+
+    async def shutdown(self):
+        FakeAssistantAPI.shutdowns.append(self.session_id)
+
+class TestSessionManager(unittest.TestCase):
+    def setUp(self):
+        FakeAssistantAPI.shutdowns = []
+        self.store = SQLiteHistoryStore(':memory:')
+        self.addCleanup(self.store.close)
+        for target, value in (("HKUSTAssistantAPI", FakeAssistantAPI), ("get_history_store", lambda: self.store)):
+            patcher = mock.patch.object(api_server, target, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def use(self, manager, *session_ids):
+        """Acquire and release sessions one after another."""
+        async def run():
+            for session_id in session_ids:
+                await manager.acquire(session_id)
+                manager.release(session_id)
+        asyncio.run(run())
+
+    def test_least_recently_used_session_is_evicted(self):
+        """Test that going over capacity shuts down the session used longest ago"""
+        manager = api_server.SessionManager(max_sessions=2, idle_timeout=0)
+        self.use(manager, "a", "b", "a", "c")
+        self.assertEqual(list(manager._sessions), ["a", "c"])
+        self.assertEqual(FakeAssistantAPI.shutdowns, ["b"])
+        self.assertEqual(manager.stats["evicted_lru"], 1)
+
+    def test_busy_sessions_are_not_evicted(self):
+        """Test that sessions with requests in flight stay even when over capacity"""
+        manager = api_server.SessionManager(max_sessions=1, idle_timeout=0)
+
+        async def run():
+            first = await manager.acquire("a")
+            second = await manager.acquire("b")
+            self.assertEqual(list(manager._sessions), ["a", "b"])
+            manager.release("b")
+            manager.release("a")
+            await manager.acquire("c")
+            return first, second
+
+        first, second = asyncio.run(run())
+        self.assertEqual((first.session_id, second.session_id), ("a", "b"))
+        self.assertEqual(FakeAssistantAPI.shutdowns, ["a", "b"])
+        self.assertEqual(list(manager._sessions), ["c"])
+
+    def test_idle_sessions_are_evicted(self):
+        """Test that idle sessions past the timeout are shut down, but busy ones are kept"""
+        manager = api_server.SessionManager(max_sessions=8, idle_timeout=60)
+
+        async def run():
+            for session_id in ("idle", "fresh"):
+                await manager.acquire(session_id)
+                manager.release(session_id)
+            await manager.acquire("busy")
+            for session_id in ("idle", "busy"):
+                manager._sessions[session_id].last_used = time.time() - 120
+            return await manager.evict_idle()
+
+        self.assertEqual(asyncio.run(run()), 1)
+        self.assertEqual(FakeAssistantAPI.shutdowns, ["idle"])
+        self.assertEqual(sorted(manager._sessions), ["busy", "fresh"])
+        self.assertEqual(manager.stats["evicted_idle"], 1)
+
+    def test_evicted_session_with_history_is_resumed(self):
+        """Test that a session known to the history store counts as resumed rather than created"""
+        manager = api_server.SessionManager(max_sessions=1, idle_timeout=0)
+        self.use(manager, "a")
+        self.store.append("a", {"role": "user", "content": "hello"})
+        self.use(manager, "b", "a")
+        self.assertEqual(FakeAssistantAPI.shutdowns, ["a", "b"])
+        self.assertEqual((manager.stats["created"], manager.stats["resumed"]), (2, 1))
+
+    def test_metrics_scan_tool_processes_off_the_event_loop(self):
+        """Test that per-session tool memory is measured in a worker thread, once per shared process"""
+        threads = []
+
+        def resource_report():
+            threads.append(threading.current_thread())
+            return {"search": [{"pid": 100, "rss": 1000}], "files": [{"pid": 101, "rss": 500}, {}]}
+
+        agent = SimpleNamespace(resource_report=resource_report)
+        manager = api_server.SessionManager(max_sessions=4, idle_timeout=0)
+
+        async def run():
+            api = await manager.acquire("a")
+            api.assistant = SimpleNamespace(is_initialized=True, agents={"academic": agent, "voice": agent})
+            return await manager.metrics()
+
+        metrics = asyncio.run(run())
+        self.assertEqual(metrics["sessions"][0]["toolsRss"], 1500)
+        self.assertEqual(metrics["toolsRss"], 1500)
+        self.assertEqual(len(threads), 2)
+        self.assertTrue(all(thread is not threading.main_thread() for thread in threads))
+
+class TestChatStreaming(unittest.TestCase):
+    def setUp(self):
+        self.releases = []
+        self.admission = counting(admission.AdmissionController("chat", 2, session_limit=1), self.releases)
+        patcher = mock.patch.object(api_server, "chat_admission", self.admission)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = TestClient(api_server.app)
+
+    def events(self, *events, error=None):
+        async def chat_events(session_id, message):
+            for event in events:
+                yield event
+            if error is not None:
+                raise error
+        return mock.patch.object(api_server, "_chat_events", chat_events)
+
+    def test_sse_releases_its_slot_once(self):
+        """Test that a finished SSE stream hands back its admission slot exactly once"""
+        with self.events({"type": "session", "sessionId": "s1"}, {"type": "final", "content": "hi"}):
+            response = self.client.post("/api/chat/stream", json={"message": "hello", "sessionId": "s1"})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("event: final", response.text)
+        self.assertEqual(self.releases, ["s1"])
+        self.assertEqual(self.admission.metrics()["running"], 0)
+
+    def test_websocket_reports_errors_and_closes(self):
+        """Test that an agent failure reaches the client as an error frame followed by close code 1011"""
+        with self.events({"type": "session", "sessionId": "s2"}, error=RuntimeError("tool crashed")):
+            with self.client.websocket_connect("/api/chat/stream") as websocket:
+                websocket.send_json({"message": "hello", "sessionId": "s2"})
+                self.assertEqual(websocket.receive_json(), {"type": "session", "sessionId": "s2"})
+                self.assertEqual(websocket.receive_json(), {"type": "error", "content": "tool crashed"})
+                with self.assertRaises(WebSocketDisconnect) as raised:
+                    websocket.receive_json()
+        self.assertEqual(raised.exception.code, 1011)
+        self.assertEqual(self.releases, ["s2"])
+
+class TestTextToSpeech(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir, True)
+        self.cache = tts_cache.TTSCache(self.tmp_dir)
+        self.synthesized = []
+
+        async def synthesize(text, voice, rate, key):
+            self.synthesized.append(text)
+            writer = self.cache.writer(key)
+            await asyncio.sleep(0.05)
+            writer.write(text.encode("utf-8"))
+            yield text.encode("utf-8")
+            writer.commit()
+
+        for target, value in (("tts_cache", self.cache), ("_synthesize", synthesize),
+                              ("tts_admission", admission.AdmissionController("tts", 1, session_limit=0))):
+            patcher = mock.patch.object(api_server, target, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_identical_requests_synthesize_once(self):
+        """Test that concurrent requests for the same audio share one synthesis"""
+        async def run():
+            transport = httpx.ASGITransport(app=api_server.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                responses = await asyncio.gather(*(
+                    client.post("/api/text-to-speech", json={"text": "你好"}) for _ in range(3)
+                ))
+
+                # Audio cached while a request waits for its slot is not synthesized again
+                _, _, key = api_server._tts_params(api_server.TTSRequest(text="早上好"))
+                async with api_server.tts_admission.slot():
+                    queued = asyncio.create_task(client.post("/api/text-to-speech/stream", json={"text": "早上好"}))
+                    await asyncio.sleep(0.05)
+                    writer = self.cache.writer(key)
+                    writer.write(b"audio")
+                    writer.commit()
+                return responses, await queued
+
+        responses, streamed = asyncio.run(run())
+        self.assertEqual({response.json()["audioUrl"] for response in responses}, {responses[0].json()["audioUrl"]})
+        self.assertEqual(self.synthesized, ["你好"])
+        self.assertEqual((streamed.headers["X-TTS-Cache"], streamed.content), ("hit", b"audio"))
+        self.assertEqual(self.cache.metrics()["entries"], 2)
+
+if __name__ == '__main__':
+    unittest.main()
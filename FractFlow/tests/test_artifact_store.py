@@ -0,0 +1,95 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from FractFlow.infra.artifact_store import ArtifactStore, is_handle
+
+class TestArtifactStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.store = ArtifactStore(os.path.join(self.tmp_dir, "store"), quota_bytes=0)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def test_content_addressing_and_metadata(self):
+        """Test that identical content is stored once and read back zero-copy"""
+        handle = self.store.put_bytes(b"png-bytes", ".png", {"producer": "test"})
+        self.assertTrue(is_handle(handle))
+        self.assertTrue(handle.endswith(".png"))
+
+        source = os.path.join(self.tmp_dir, "copy.png")
+        with open(source, "wb") as f:
+            f.write(b"png-bytes")
+        self.assertEqual(self.store.put_file(source), handle)
+        self.assertEqual(self.store.get_stats()["artifacts"], 1)
+
+        with self.store.open(handle) as data:
+            self.assertEqual(data[:3], b"png")
+        self.assertEqual(self.store.metadata(handle)["metadata"], {"producer": "test"})
+
+        exported = self.store.export(handle, os.path.join(self.tmp_dir, "out", "image.png"))
+        with open(exported, "rb") as f:
+            self.assertEqual(f.read(), b"png-bytes")
+
+    def test_resolve_arguments(self):
+        """Test that handles in nested arguments become local paths"""
+        handle = self.store.put_bytes(b"audio", ".mp3")
+        missing = "artifact://sha256/" + "0" * 64
+        resolved = self.store.resolve_arguments({"clips": [handle, "plain.mp3"], "other": missing})
+        self.assertEqual(resolved["clips"], [self.store.path(handle), "plain.mp3"])
+        self.assertEqual(resolved["other"], missing)
+
+    def test_tools_cannot_change_shared_objects(self):
+        """Test that stored objects are read-only and exported copies are private"""
+        handle = self.store.put_bytes(b"mask", ".png")
+        self.assertEqual(os.stat(self.store.path(handle)).st_mode & 0o777, 0o444)
+
+        copy = self.store.export(handle, os.path.join(self.tmp_dir, "edit.png"), copy=True)
+        with open(copy, "ab") as f:
+            f.write(b"!")
+        self.assertEqual(open(self.store.path(handle), "rb").read(), b"mask")
+
+    def test_published_output_stays_writable(self):
+        """Test that a tool can publish to the same output path again without touching the first artifact"""
+        output = os.path.join(self.tmp_dir, "out", "segment.mp4")
+        os.makedirs(os.path.dirname(output))
+        handles = []
+        for content in (b"first cut", b"second cut"):
+            with open(output, "wb") as f:
+                f.write(content)
+            handles.append(self.store.publish(output, {"producer": "test"}))
+            self.assertFalse(os.path.samefile(output, self.store.path(handles[-1])))
+        with open(output, "ab") as f:
+            f.write(b"!")
+
+        self.assertNotEqual(handles[0], handles[1])
+        self.assertEqual(open(self.store.path(handles[0]), "rb").read(), b"first cut")
+        self.assertEqual(open(self.store.path(handles[1]), "rb").read(), b"second cut")
+
+    def test_modified_artifact_is_discarded(self):
+        """Test that an artifact changed in place is no longer served"""
+        handle = self.store.put_bytes(b"original", ".txt")
+        # Objects are read-only; a privileged tool can still force a change
+        os.chmod(self.store.path(handle), 0o644)
+        with open(self.store.path(handle), "ab") as f:
+            f.write(b"!")
+        with self.assertRaises(KeyError):
+            self.store.path(handle)
+        self.assertEqual(self.store.put_bytes(b"original", ".txt"), handle)
+        self.assertEqual(open(self.store.path(handle), "rb").read(), b"original")
+
+    def test_gc_evicts_least_recently_used(self):
+        """Test that collection keeps the store within its quota"""
+        old = self.store.put_bytes(b"a" * 100, ".bin")
+        new = self.store.put_bytes(b"b" * 100, ".bin")
+        meta = os.path.join(os.path.dirname(self.store.path(old)), os.path.basename(self.store.path(old)) + ".json")
+        os.utime(meta, (0, 0))
+        self.assertEqual(self.store.gc(quota_bytes=150), 1)
+        with self.assertRaises(KeyError):
+            self.store.path(old)
+        self.assertTrue(os.path.exists(self.store.path(new)))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+import json
+import asyncio
+import threading
+import unittest
+from unittest import mock
+
+from FractFlow import asr_service
+from FractFlow.asr_service import ASRWorker, _frame, _read_frame, clean_transcript
+
+class FakeModel:
+    """funasr-style model that records the size of each batch."""
+
+    def __init__(self):
+        self.batches = []
+
+    def generate(self, input, cache, language, use_itn, batch_size):
+        self.batches.append((len(input), language))
+        return [{'text': f"<|{language}|><|NEUTRAL|><|Speech|>{samples}"} for samples in input]
+
+class TestASRWorker(unittest.TestCase):
+    def test_concurrent_requests_share_a_batch(self):
+        """Test that requests arriving together are recognized in one inference per language"""
+        model = FakeModel()
+        worker = ASRWorker(model, max_batch=8, batch_window=0.05)
+
+        async def run():
+            worker._queue = asyncio.Queue()
+            batcher = asyncio.create_task(worker._batcher())
+            try:
+                return await asyncio.gather(
+                    worker.transcribe('a', 'zh'),
+                    worker.transcribe('b', 'zh'),
+                    worker.transcribe('c', 'en'),
+                    worker.transcribe('d', 'zh'),
+                )
+            finally:
+                batcher.cancel()
+
+        texts = asyncio.run(run())
+        self.assertEqual(texts, ['a', 'b', 'c', 'd'])
+        self.assertEqual(sorted(model.batches), [(1, 'en'), (3, 'zh')])
+        self.assertEqual(worker.stats['batches'], 2)
+
+    def serve(self, worker, requests):
+        """Send raw frames to a worker over a real connection and collect the response frames."""
+        async def run():
+            worker._queue = asyncio.Queue()
+            batcher = asyncio.create_task(worker._batcher())
+            server = await asyncio.start_server(worker._handle, '127.0.0.1', 0)
+            try:
+                reader, writer = await asyncio.open_connection(*server.sockets[0].getsockname())
+                responses = []
+                for frames in requests:
+                    writer.write(b''.join(_frame(frame) for frame in frames))
+                    try:
+                        responses.append(json.loads(await _read_frame(reader)))
+                    except asyncio.IncompleteReadError:
+                        responses.append(None)
+                writer.close()
+                return responses
+            finally:
+                server.close()
+                batcher.cancel()
+
+        return asyncio.run(run())
+
+    def test_malformed_header_gets_an_error(self):
+        """Test that a header that is not a JSON object is answered with an error before the connection closes"""
+        for header in (b'{not json', b'[1, 2]', b'\xff\xfe'):
+            responses = self.serve(ASRWorker(FakeModel()), [[header], [b'{"op": "stats"}']])
+            self.assertIn('Malformed request header', responses[0]['error'])
+            self.assertIsNone(responses[1])
+
+    def test_audio_is_decoded_off_the_event_loop(self):
+        """Test that decoding (and resampling) runs in a worker thread"""
+        threads = []
+
+        def decode(data, audio_format, sample_rate, channels):
+            threads.append(threading.current_thread())
+            return data.decode('utf-8')
+
+        model = FakeModel()
+        header = json.dumps({'format': 'pcm', 'language': 'zh'}).encode('utf-8')
+        with mock.patch.object(asr_service, 'decode_audio', decode):
+            responses = self.serve(ASRWorker(model, batch_window=0.01), [[header, b'hello']])
+        self.assertEqual(responses, [{'text': 'hello'}])
+        self.assertEqual(len(threads), 1)
+        self.assertIsNot(threads[0], threading.main_thread())
+
+    def test_clean_transcript(self):
+        """Test that SenseVoice tags are stripped"""
+        self.assertEqual(clean_transcript('<|zh|><|NEUTRAL|><|Speech|><|woitn|>你好'), '你好')
+        self.assertEqual(clean_transcript('plain'), 'plain')
+
+if __name__ == '__main__':
+    unittest.main()
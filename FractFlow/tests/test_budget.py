@@ -0,0 +1,120 @@
+import time
+import asyncio
+import unittest
+from types import SimpleNamespace
+
+from mcp import types
+
+from FractFlow.core.query_processor import QueryProcessor
+from FractFlow.infra import budget as budgets
+from FractFlow.infra.budget import Budget
+from FractFlow.infra.config import ConfigManager
+
+class FakeModel:
+    """Model that requests a tool on every turn, using 100 tokens per call."""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.calls = 0
+        self.messages = []
+
+    async def execute(self, tools):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        budgets.record_llm_call(SimpleNamespace(usage=SimpleNamespace(total_tokens=100)))
+        return {"choices": [{"message": {
+            "content": f"step {self.calls}",
+            "tool_calls": [{"id": str(self.calls), "function": {"name": "search", "arguments": "{}"}}],
+        }}]}
+
+    def add_user_message(self, message):
+        self.messages.append(("user", message))
+
+    def add_assistant_message(self, message, tool_calls=None):
+        self.messages.append(("assistant", message))
+
+    def add_tool_result(self, tool_name, result, tool_call_id=None):
+        self.messages.append(("tool", result))
+
+class FakeOrchestrator:
+    def __init__(self, model):
+        self.model = model
+
+    def get_model(self):
+        return self.model
+
+    async def get_available_tools(self):
+        return [{"type": "function", "function": {"name": "search", "parameters": {}}}]
+
+    async def get_tool_name_mapping(self):
+        return {}
+
+class FakeToolExecutor:
+    def __init__(self):
+        self.calls = 0
+
+    async def execute_tool(self, tool_name, arguments):
+        self.calls += 1
+        return f"finding {self.calls}"
+
+class TestBudget(unittest.TestCase):
+    def test_ledger_is_shared_between_holders(self):
+        """Test that usage charged through any copy of a budget counts for all"""
+        budget = Budget(llm_calls=3, tokens=1000)
+        self.addCleanup(budget.close)
+        child = Budget.from_meta(types.RequestParams.Meta(**budget.to_meta()))
+        self.assertEqual(child.id, budget.id)
+
+        budget.charge(1, 200)
+        child.charge(1, 300)
+        self.assertEqual(budget.usage(), (2, 500))
+        self.assertEqual(budget.iteration_limit(10), 1)
+        self.assertIsNone(budget.exhausted())
+        child.charge(1, 0)
+        self.assertIn("LLM call limit", budget.exhausted())
+
+        self.assertIn("time limit", Budget(deadline=time.time() - 1).exhausted())
+        self.assertIsNone(Budget.from_meta({"traceparent": "x"}))
+        self.assertFalse(Budget().is_limited)
+
+    def test_malformed_budget_id_is_rejected(self):
+        """Test that budget IDs which could escape the ledger directory are ignored"""
+        for budget_id in ("../../../../tmp/evil", "/tmp/evil", "4BF92F3577B34DA6A3CE929D0E0E4736", ""):
+            meta = {budgets.BUDGET_META_KEY: {"id": budget_id, "llm_calls": 3}}
+            self.assertIsNone(Budget.from_meta(meta), budget_id)
+        budget_id = "4bf92f3577b34da6a3ce929d0e0e4736"
+        budget = Budget.from_meta({budgets.BUDGET_META_KEY: {"id": budget_id, "llm_calls": 3}})
+        self.assertEqual(budget.id, budget_id)
+
+    def run_query(self, model, budget):
+        processor = QueryProcessor(FakeOrchestrator(model), FakeToolExecutor(), ConfigManager(max_iterations=10))
+
+        async def run():
+            with budgets.attach(budget):
+                return await processor.process_query("research this")
+
+        try:
+            return asyncio.run(run())
+        finally:
+            budget.close()
+
+    def test_call_limit_stops_with_partial_result(self):
+        """Test that the agent stops at the call limit and returns what it gathered"""
+        model = FakeModel()
+        answer = self.run_query(model, Budget(llm_calls=3))
+        self.assertEqual(model.calls, 3)
+        self.assertIn("budget was exhausted", answer)
+        self.assertIn("step 3", answer)
+        self.assertIn("finding 3", answer)
+
+    def test_deadline_cuts_off_model_call(self):
+        """Test that a model call running past the deadline is cut off"""
+        model = FakeModel(delay=0.3)
+        start = time.monotonic()
+        answer = self.run_query(model, Budget(time_limit=0.5))
+        self.assertLess(time.monotonic() - start, 0.9)
+        self.assertIn("time limit reached", answer)
+        self.assertIn("finding 1", answer)
+
+if __name__ == '__main__':
+    unittest.main()
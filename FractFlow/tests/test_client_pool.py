@@ -0,0 +1,425 @@
+import os
+import sys
+import time
+import shutil
+import socket
+import asyncio
+import subprocess
+import tempfile
+import textwrap
+import unittest
+
+from FractFlow.mcpcore.client_pool import MCPClientPool
+from FractFlow.mcpcore.launcher import Zygote
+from FractFlow.mcpcore import zygote as zygote_server
+from FractFlow.mcpcore.manifest_cache import ToolManifestCache
+from FractFlow.mcpcore.result_cache import ToolResultCache
+from FractFlow.infra.error_handling import ClientError
+
+ECHO_SERVER = textwrap.dedent('''
+    from mcp.server.fastmcp import FastMCP
+    from mcp.types import ToolAnnotations
+
+    mcp = FastMCP("echo_tool")
+    reads = {"count": 0}
+
+    @mcp.tool()
+    def echo(text: str) -> str:
+        """Return the given text unchanged."""
+        return text
+
+    @mcp.tool()
+    async def slow_echo(text: str, delay: float = 0.5) -> str:
+        """Return the given text after a delay."""
+        import asyncio
+        await asyncio.sleep(delay)
+        return text
+
+    @mcp.tool(annotations=ToolAnnotations(readOnlyHint=True))
+    def read_text(file_path: str) -> str:
+        """Return how often the server read a file, and its content."""
+        reads["count"] += 1
+        with open(file_path) as f:
+            return f"{reads['count']}:{f.read()}"
+
+    @mcp.tool(annotations=ToolAnnotations(idempotentHint=True))
+    async def slow_count(delay: float = 0.3) -> str:
+        """Count executions, slowly."""
+        import asyncio
+        reads["count"] += 1
+        count = reads["count"]
+        await asyncio.sleep(delay)
+        return str(count)
+
+    @mcp.tool()
+    def crash() -> str:
+        """Terminate the server process."""
+        import os
+        os._exit(1)
+
+    if __name__ == "__main__":
+        import sys
+        mcp.run(transport='streamable-http' if '--http' in sys.argv else 'stdio')
+''')
+
+BLOCKING_SERVER = textwrap.dedent('''
+    import sys
+    import time
+    sys.path.insert(0, {project_root!r})
+
+    from mcp.server.fastmcp import FastMCP
+    from FractFlow.tool_template import offload
+
+    mcp = FastMCP("blocking_tool")
+
+    @mcp.tool()
+    @offload
+    def blocking_sleep(seconds: float) -> str:
+        """Block for a while."""
+        time.sleep(seconds)
+        return "slept"
+
+    @mcp.tool()
+    def ping() -> str:
+        """Answer immediately."""
+        return "pong"
+
+    if __name__ == "__main__":
+        mcp.run(transport='stdio')
+''').format(project_root=os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+class TestMCPClientPool(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.script_path = os.path.join(self.tmp_dir, "echo_mcp.py")
+        with open(self.script_path, "w") as f:
+            f.write(ECHO_SERVER)
+        self.manifest_cache = ToolManifestCache(os.path.join(self.tmp_dir, "manifests"))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def test_eager_client_call(self):
+        """Test that an eagerly started client serves tool calls"""
+        async def run():
+            pool = MCPClientPool(self.manifest_cache)
+            try:
+                await pool.add_client("echo", self.script_path)
+                self.assertTrue(pool.clients["echo"].is_connected)
+                result = await pool.call("echo", {"text": "hello"})
+                self.assertEqual(result[0].text, "hello")
+            finally:
+                await pool.cleanup()
+
+        asyncio.run(run())
+
+    def test_lazy_client_uses_manifest(self):
+        """Test that a lazy client starts on first call using cached schemas"""
+        async def run():
+            # First run populates the manifest cache
+            pool = MCPClientPool(self.manifest_cache)
+            await pool.add_client("echo", self.script_path)
+            await pool.cleanup()
+
+            pool = MCPClientPool(self.manifest_cache)
+            try:
+                await pool.add_client("echo", self.script_path, lazy=True, idle_timeout=60)
+                self.assertFalse(pool.clients["echo"].is_connected)
+                self.assertIn("echo", [tool.name for tool in pool.get_tools("echo")])
+
+                result = await pool.call("echo", {"text": "lazy"})
+                self.assertEqual(result[0].text, "lazy")
+                self.assertTrue(pool.clients["echo"].is_connected)
+            finally:
+                await pool.cleanup()
+
+        asyncio.run(run())
+
+    def test_manifest_invalidated_by_mtime(self):
+        """Test that editing the script invalidates its manifest entry"""
+        async def run():
+            pool = MCPClientPool(self.manifest_cache)
+            await pool.add_client("echo", self.script_path)
+            await pool.cleanup()
+
+        asyncio.run(run())
+        self.assertIsNotNone(self.manifest_cache.load(self.script_path))
+
+        stat = os.stat(self.script_path)
+        os.utime(self.script_path, (stat.st_atime, stat.st_mtime + 10))
+        self.assertIsNone(self.manifest_cache.load(self.script_path))
+
+    def test_pools_share_server_process(self):
+        """Test that pools share one server and keep it alive until all release it"""
+        async def run():
+            pool_a = MCPClientPool(self.manifest_cache)
+            pool_b = MCPClientPool(self.manifest_cache)
+            try:
+                await pool_a.add_client("echo", self.script_path)
+                await pool_b.add_client("echo_b", self.script_path)
+                self.assertIs(pool_a.clients["echo"], pool_b.clients["echo_b"])
+                self.assertNotIn("echo_b", pool_a.clients)
+
+                await pool_a.cleanup()
+                self.assertEqual(pool_a.tool_to_client, {})
+                result = await pool_b.call("echo", {"text": "still running"})
+                self.assertEqual(result[0].text, "still running")
+            finally:
+                await pool_a.cleanup()
+                await pool_b.cleanup()
+            self.assertFalse(pool_b.registry._connections)
+
+        asyncio.run(run())
+
+    def test_replicas_least_loaded_dispatch(self):
+        """Test that concurrent calls are spread over replicas"""
+        async def run():
+            pool = MCPClientPool(self.manifest_cache)
+            try:
+                await pool.add_client("echo", self.script_path, replicas=2)
+                results = await asyncio.gather(
+                    pool.call("slow_echo", {"text": "a"}),
+                    pool.call("slow_echo", {"text": "b"}),
+                )
+                self.assertEqual(sorted(r[0].text for r in results), ["a", "b"])
+                stats = pool.get_stats()["echo"]
+                self.assertEqual([replica["calls"] for replica in stats], [1, 1])
+                self.assertEqual([replica["in_flight"] for replica in stats], [0, 0])
+            finally:
+                await pool.cleanup()
+
+        asyncio.run(run())
+
+    def test_crashed_replica_is_restarted(self):
+        """Test that a crashing replica fails the call and is restarted"""
+        async def run():
+            pool = MCPClientPool(self.manifest_cache)
+            try:
+                await pool.add_client("echo", self.script_path, replicas=2)
+                with self.assertRaises(ClientError):
+                    await pool.call("crash", {})
+
+                for _ in range(100):
+                    stats = pool.get_stats()["echo"]
+                    if sum(r["restarts"] for r in stats) == 1 and all(r["connected"] for r in stats):
+                        break
+                    await asyncio.sleep(0.05)
+                self.assertEqual(sum(r["restarts"] for r in stats), 1)
+                self.assertTrue(all(r["connected"] for r in stats))
+
+                result = await pool.call("echo", {"text": "recovered"})
+                self.assertEqual(result[0].text, "recovered")
+            finally:
+                await pool.cleanup()
+
+        asyncio.run(run())
+
+    def _start_http_server(self):
+        """Start the echo server over streamable HTTP and return (process, url)."""
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            port = sock.getsockname()[1]
+        env = dict(os.environ, FASTMCP_HOST="127.0.0.1", FASTMCP_PORT=str(port))
+        process = subprocess.Popen([sys.executable, self.script_path, "--http"], env=env,
+                                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        self.addCleanup(process.wait)
+        self.addCleanup(process.terminate)
+        deadline = time.monotonic() + 20
+        while time.monotonic() < deadline:
+            try:
+                socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+                break
+            except OSError:
+                time.sleep(0.1)
+        return process, f"http://127.0.0.1:{port}/mcp"
+
+    def test_remote_http_client_shared(self):
+        """Test that pools connect to a running HTTP server over one shared session"""
+        _, url = self._start_http_server()
+
+        async def run():
+            pool_a = MCPClientPool(self.manifest_cache)
+            pool_b = MCPClientPool(self.manifest_cache)
+            try:
+                await pool_a.add_remote_client("echo", url)
+                await pool_b.add_remote_client("echo_b", url)
+                self.assertIs(pool_a.clients["echo"], pool_b.clients["echo_b"])
+
+                results = await asyncio.gather(
+                    pool_a.call("echo", {"text": "a"}),
+                    pool_b.call("echo", {"text": "b"}),
+                )
+                self.assertEqual([r[0].text for r in results], ["a", "b"])
+
+                await pool_a.cleanup()
+                self.assertTrue(pool_b.clients["echo_b"].is_connected)
+            finally:
+                await pool_a.cleanup()
+                await pool_b.cleanup()
+
+        asyncio.run(run())
+
+    @unittest.skipUnless(zygote_server.is_supported(), "zygote requires Linux")
+    def test_zygote_spawned_server(self):
+        """Test that servers forked from the zygote serve calls and restart after crashes"""
+        zygote = Zygote()
+        zygote.start()
+        self.addCleanup(zygote.stop)
+
+        async def run():
+            pool = MCPClientPool(self.manifest_cache)
+            pool.zygote = zygote
+            try:
+                await pool.add_client("echo", self.script_path, replicas=2)
+                result = await pool.call("echo", {"text": "warm"})
+                self.assertEqual(result[0].text, "warm")
+
+                with self.assertRaises(ClientError):
+                    await pool.call("crash", {})
+                for _ in range(100):
+                    if all(r["connected"] for r in pool.get_stats()["echo"]):
+                        break
+                    await asyncio.sleep(0.05)
+                result = await pool.call("echo", {"text": "again"})
+                self.assertEqual(result[0].text, "again")
+            finally:
+                await pool.cleanup()
+
+        asyncio.run(run())
+
+    def test_result_cache_for_read_only_tools(self):
+        """Test that read-only tool results are cached until the file changes"""
+        data_path = os.path.join(self.tmp_dir, "data.txt")
+        with open(data_path, "w") as f:
+            f.write("v1")
+
+        async def run():
+            pool = MCPClientPool(self.manifest_cache)
+            pool.result_cache = ToolResultCache()
+            try:
+                await pool.add_client("echo", self.script_path)
+                first = await pool.call("read_text", {"file_path": data_path})
+                second = await pool.call("read_text", {"file_path": data_path})
+                self.assertEqual(first[0].text, "1:v1")
+                self.assertEqual(second[0].text, "1:v1")
+
+                # Tools without readOnlyHint are never cached
+                self.assertIsNone(pool.get_cache_ttl("echo"))
+
+                with open(data_path, "w") as f:
+                    f.write("v2")
+                mtime = os.path.getmtime(data_path) + 10
+                os.utime(data_path, (mtime, mtime))
+                third = await pool.call("read_text", {"file_path": data_path})
+                self.assertEqual(third[0].text, "2:v2")
+
+                stats = pool.get_cache_stats()
+                self.assertEqual((stats["hits"], stats["misses"]), (1, 2))
+                self.assertEqual(stats["tools"]["read_text"]["hits"], 1)
+
+                pool.cache_policies["read_text"] = 0
+                fourth = await pool.call("read_text", {"file_path": data_path})
+                self.assertEqual(fourth[0].text, "3:v2")
+            finally:
+                await pool.cleanup()
+
+        asyncio.run(run())
+
+    def test_identical_concurrent_calls_are_coalesced(self):
+        """Test that followers share the leader's call even if the leader's caller goes away"""
+        async def run():
+            pool = MCPClientPool(self.manifest_cache)
+            try:
+                await pool.add_client("echo", self.script_path)
+                followers_before = pool.single_flight.followers
+
+                leader = asyncio.ensure_future(pool.call("slow_count", {}))
+                await asyncio.sleep(0.05)
+                followers = [asyncio.ensure_future(pool.call("slow_count", {})) for _ in range(2)]
+                await asyncio.sleep(0.05)
+                leader.cancel()
+
+                results = await asyncio.gather(*followers)
+                self.assertEqual([r[0].text for r in results], ["1", "1"])
+                self.assertEqual(pool.single_flight.followers - followers_before, 2)
+
+                # Completed calls are not reused
+                result = await pool.call("slow_count", {})
+                self.assertEqual(result[0].text, "2")
+            finally:
+                await pool.cleanup()
+
+        asyncio.run(run())
+
+    def test_cache_is_scoped_by_server_env(self):
+        """Test that cached results are never shared between servers of one script with different environments"""
+        async def run():
+            cache = ToolResultCache()
+            pools = []
+            for api_key in ("key-a", "key-b"):
+                pool = MCPClientPool(self.manifest_cache)
+                pool.result_cache = cache
+                pool.server_env["ECHO_API_KEY"] = api_key
+                pools.append(pool)
+            try:
+                for pool in pools:
+                    await pool.add_client("echo", self.script_path)
+                self.assertIsNot(pools[0].clients["echo"], pools[1].clients["echo"])
+
+                data_path = os.path.join(self.tmp_dir, "data.txt")
+                with open(data_path, "w") as f:
+                    f.write("v1")
+                first = await pools[0].call("read_text", {"file_path": data_path})
+                second = await pools[1].call("read_text", {"file_path": data_path})
+                self.assertEqual((first[0].text, second[0].text), ("1:v1", "1:v1"))
+                self.assertEqual(cache.get_stats()["hits"], 0)
+            finally:
+                for pool in pools:
+                    await pool.cleanup()
+
+        asyncio.run(run())
+
+    def test_coalescing_is_scoped_by_server_env(self):
+        """Test that identical concurrent calls to differently configured servers each run"""
+        async def run():
+            pools = []
+            for api_key in ("key-a", "key-b"):
+                pool = MCPClientPool(self.manifest_cache)
+                pool.server_env["ECHO_API_KEY"] = api_key
+                pools.append(pool)
+            try:
+                for pool in pools:
+                    await pool.add_client("echo", self.script_path)
+                results = await asyncio.gather(*(pool.call("slow_count", {}) for pool in pools))
+                self.assertEqual([r[0].text for r in results], ["1", "1"])
+            finally:
+                for pool in pools:
+                    await pool.cleanup()
+
+        asyncio.run(run())
+
+    def test_offloaded_tool_does_not_block_server(self):
+        """Test that a slow offloaded tool and a quick one run concurrently on one session"""
+        blocking_path = os.path.join(self.tmp_dir, "blocking_mcp.py")
+        with open(blocking_path, "w") as f:
+            f.write(BLOCKING_SERVER)
+
+        async def run():
+            pool = MCPClientPool(self.manifest_cache)
+            try:
+                await pool.add_client("blocking", blocking_path)
+                slow = asyncio.ensure_future(pool.call("blocking_sleep", {"seconds": 2.0}))
+                await asyncio.sleep(0.2)
+                start = time.monotonic()
+                result = await pool.call("ping", {})
+                self.assertEqual(result[0].text, "pong")
+                self.assertLess(time.monotonic() - start, 1.0)
+                self.assertFalse(slow.done())
+                self.assertEqual((await slow)[0].text, "slept")
+            finally:
+                await pool.cleanup()
+
+        asyncio.run(run())
+
+if __name__ == '__main__':
+    unittest.main()
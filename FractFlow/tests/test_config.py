@@ -0,0 +1,55 @@
+import unittest
+
+from FractFlow.agent import Agent
+from FractFlow.infra.config import ConfigManager, ConfigSnapshot, call_path_scope
+
+class TestConfigManager(unittest.TestCase):
+    def test_set_validates_against_default_schema(self):
+        """Test that only keys of the default structure can be set"""
+        config = ConfigManager()
+        config.set('agent.max_iterations', 3)
+        self.assertEqual(config.get('agent.max_iterations'), 3)
+        self.assertEqual(config.get('agent')['max_iterations'], 3)
+        with self.assertRaises(KeyError):
+            config.set('agent.no_such_key', 1)
+        self.assertEqual(config.get('agent.no_such_key', 'default'), 'default')
+
+    def test_snapshot_is_frozen_and_independent(self):
+        """Test that snapshots ignore later changes and reject modification"""
+        config = ConfigManager(max_iterations=4)
+        snapshot = config.snapshot()
+        config.set('agent.max_iterations', 8)
+
+        self.assertIsInstance(snapshot, ConfigSnapshot)
+        self.assertIs(snapshot.snapshot(), snapshot)
+        self.assertEqual(snapshot.get('agent.max_iterations'), 4)
+        with self.assertRaises(TypeError):
+            snapshot.set('agent.max_iterations', 5)
+        with self.assertRaises(TypeError):
+            snapshot.get('agent')['max_iterations'] = 5
+
+        copy = snapshot.create_copy()
+        copy.set('agent.max_iterations', 6)
+        self.assertEqual(copy.get('agent.max_iterations'), 6)
+        self.assertEqual(snapshot.get('agent.max_iterations'), 4)
+
+    def test_call_paths_are_scoped(self):
+        """Test that components sharing a config do not accumulate each other's names"""
+        snapshot = ConfigManager().snapshot()
+        first = Agent(snapshot, name='first')
+        second = Agent(snapshot, name='second')
+        self.assertEqual(first.call_path, 'first')
+        self.assertEqual(second.call_path, 'second')
+
+        with call_path_scope(first.call_path):
+            self.assertEqual(snapshot.push_to_call_path('orchestrator'), 'first->orchestrator')
+            self.assertEqual(snapshot.push_to_call_path('query_processor'), 'first->query_processor')
+            # Pushing never changes the shared snapshot
+            self.assertEqual(snapshot.get_call_path(), 'first')
+        self.assertEqual(snapshot.get_call_path(), '')
+        self.assertFalse(hasattr(snapshot, '_call_path'))
+
+        self.assertEqual(ConfigManager(call_path='root').push_to_call_path('agent'), 'root->agent')
+
+if __name__ == '__main__':
+    unittest.main()
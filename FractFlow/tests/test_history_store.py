@@ -0,0 +1,134 @@
+import os
+import shutil
+import asyncio
+import tempfile
+import unittest
+from unittest import mock
+
+from FractFlow.conversation.base_history import PersistentConversationHistory
+from FractFlow.conversation.history_store import SQLiteHistoryStore, get_history_store
+from FractFlow.core.orchestrator import Orchestrator
+from FractFlow.infra.config import ConfigManager
+
+class TestHistoryStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_dir, "history.sqlite3")
+        self.store = SQLiteHistoryStore(self.path)
+
+    def tearDown(self):
+        self.store.close()
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def add_turn(self, history, n):
+        history.add_user_message(f"question {n}")
+        history.add_assistant_message("", [{"name": "search", "arguments": {"q": n}, "id": f"call_{n}"}])
+        history.add_tool_result("search", f"result {n}", f"call_{n}")
+        history.add_assistant_message(f"answer {n}")
+
+    def test_window_keeps_whole_recent_turns(self):
+        """Test that memory holds a bounded window of whole turns while the store keeps everything"""
+        history = PersistentConversationHistory("s1", self.store, window=6, system_prompt="be brief")
+        for n in range(5):
+            self.add_turn(history, n)
+
+        messages = history.get_messages()
+        self.assertEqual(messages[0], {"role": "system", "content": "be brief"})
+        self.assertEqual([m["content"] for m in messages[1:] if m["role"] == "user"], ["question 4"])
+        self.assertEqual(len(messages), 5)
+
+        self.assertEqual(self.store.count("s1"), 20)
+        self.assertEqual(len(history.load_messages()), 20)
+        page = history.load_messages(limit=4, before=8)
+        self.assertEqual(page[0]["content"], "question 1")
+        self.assertEqual(page[-1]["content"], "answer 1")
+
+    def test_session_resumes_in_new_process_state(self):
+        """Test that a session is resumed by ID from a fresh store connection"""
+        history = PersistentConversationHistory("s2", self.store, window=50, system_prompt="old prompt")
+        for n in range(3):
+            self.add_turn(history, n)
+        # Another connection only sees the appends once the background writer has written them
+        self.store.flush()
+
+        resumed = PersistentConversationHistory("s2", SQLiteHistoryStore(self.path), window=7,
+                                                system_prompt="new prompt")
+        messages = resumed.get_messages()
+        self.assertEqual(messages[0]["content"], "new prompt")
+        # The last 7 stored messages start inside turn 1, so the window starts at turn 2
+        self.assertEqual(messages[1], {"role": "user", "content": "question 2"})
+        self.assertEqual(len(messages), 5)
+
+        resumed.clear()
+        self.assertEqual(self.store.count("s2"), 0)
+        self.assertEqual(resumed.get_messages(), [{"role": "system", "content": "new prompt"}])
+
+    def test_reload_picks_up_turns_of_other_histories(self):
+        """Test that histories sharing a session see each other's turns after reload, keeping their own prompt"""
+        academic = PersistentConversationHistory("s3", self.store, window=50, system_prompt="academic")
+        voice = PersistentConversationHistory("s3", self.store, window=50, system_prompt="voice")
+        self.add_turn(academic, 0)
+        self.add_turn(voice, 1)
+
+        academic.reload()
+        messages = academic.get_messages()
+        self.assertEqual(messages[0], {"role": "system", "content": "academic"})
+        self.assertEqual([m["content"] for m in messages if m["role"] == "user"], ["question 0", "question 1"])
+        self.assertEqual(self.store.count("s3"), 8)
+
+    def test_in_memory_and_uri_stores_create_no_stray_files(self):
+        """Test that ':memory:' and 'file:' URIs are passed to SQLite instead of being treated as paths"""
+        cwd = os.getcwd()
+        os.chdir(self.tmp_dir)
+        try:
+            memory = get_history_store(':memory:')
+            self.assertIs(get_history_store(':memory:'), memory)
+            memory.append("m", {"role": "user", "content": "hi"})
+            uri_path = os.path.join(self.tmp_dir, "uri.sqlite3")
+            uri_store = get_history_store(f"file:{uri_path}?mode=rwc")
+            uri_store.append("u", {"role": "user", "content": "hi"})
+            self.assertEqual(uri_store.count("u"), 1)
+            self.assertFalse(os.path.exists(os.path.join(self.tmp_dir, ':memory:')))
+            self.assertTrue(os.path.exists(uri_path))
+        finally:
+            os.chdir(cwd)
+
+    def test_appends_are_written_in_background_in_order(self):
+        """Test that queued appends keep their order and are visible to the next read"""
+        for n in range(20):
+            self.store.append_nowait("s5", {"role": "user", "content": str(n)})
+        self.assertEqual([m["content"] for m in self.store.load("s5")], [str(n) for n in range(20)])
+
+    def test_orchestrator_persists_configured_sessions(self):
+        """Test that the orchestrator's model history goes through the configured store"""
+        config = ConfigManager(deepseek_api_key='test', history_store='sqlite',
+                               history_path=self.path, history_window=10)
+        orchestrator = Orchestrator(config=config, session_id="s3")
+        orchestrator.get_model().add_user_message("hello")
+
+        self.assertEqual(orchestrator.get_history()[-1], {"role": "user", "content": "hello"})
+        self.assertEqual(orchestrator.get_history(limit=10), [{"role": "user", "content": "hello"}])
+        self.assertEqual(self.store.load("s3"), [{"role": "user", "content": "hello"}])
+
+        plain = Orchestrator(config=ConfigManager(deepseek_api_key='test'), session_id="s4")
+        plain.get_model().add_user_message("hello")
+        self.assertEqual(self.store.count("s4"), 0)
+
+    def test_orchestrator_resumes_session_on_start(self):
+        """Test that a resumed session is loaded by the awaited reload, not by the constructor"""
+        history = PersistentConversationHistory("s6", self.store, window=50)
+        self.add_turn(history, 0)
+        config = ConfigManager(deepseek_api_key='test', history_store='sqlite',
+                               history_path=self.path, history_window=10)
+
+        self.store.flush()
+
+        with mock.patch.object(SQLiteHistoryStore, "load") as load:
+            orchestrator = Orchestrator(config=config, session_id="s6")
+        load.assert_not_called()
+        self.assertFalse([m for m in orchestrator.get_history() if m["role"] != "system"])
+        asyncio.run(orchestrator.reload_history())
+        self.assertEqual(orchestrator.get_history()[-1], {"role": "assistant", "content": "answer 0"})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+import os
+import json
+import time
+import shutil
+import asyncio
+import tempfile
+import textwrap
+import unittest
+
+from FractFlow.infra import loop_monitor
+from FractFlow.infra.loop_monitor import LoopMonitor
+from FractFlow.mcpcore.client_pool import MCPClientPool
+from FractFlow.mcpcore.manifest_cache import ToolManifestCache
+
+STALLING_SERVER = textwrap.dedent('''
+    import time
+    from mcp.server.fastmcp import FastMCP
+
+    mcp = FastMCP("stalling_tool")
+
+    @mcp.tool()
+    async def stall(seconds: float) -> str:
+        """Block the event loop."""
+        time.sleep(seconds)
+        return "done"
+
+    if __name__ == "__main__":
+        mcp.run(transport='stdio')
+''')
+
+class TestLoopMonitor(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+        for name in (loop_monitor.LOOP_MONITOR_ENV, loop_monitor.LOOP_MONITOR_REPORT_ENV):
+            os.environ.pop(name, None)
+
+    def test_blocking_callback_is_recorded_with_stack(self):
+        """Test that a coroutine blocking the loop is recorded with its location"""
+        monitor = LoopMonitor(threshold=0.1)
+
+        async def blocking_step():
+            time.sleep(0.4)
+
+        async def run():
+            monitor.attach(asyncio.get_running_loop())
+            await asyncio.sleep(0.1)
+            await blocking_step()
+            await asyncio.sleep(0.1)
+
+        asyncio.run(run())
+        stats = monitor.get_stats()
+        self.assertEqual(len(stats), 1)
+        key, entry = next(iter(stats.items()))
+        self.assertIn("blocking_step", key)
+        self.assertEqual(entry["stalls"], 1)
+        self.assertGreaterEqual(entry["max_time"], 0.2)
+        self.assertTrue(any("time.sleep" in line for line in entry["stack"]))
+
+    def test_tool_server_stalls_reported_per_tool(self):
+        """Test that servers started while monitoring report stalls by tool name"""
+        script_path = os.path.join(self.tmp_dir, "stalling_mcp.py")
+        with open(script_path, "w") as f:
+            f.write(STALLING_SERVER)
+        report_dir = os.path.join(self.tmp_dir, "reports")
+
+        async def run():
+            loop_monitor.enable(0.1, report_dir)
+            pool = MCPClientPool(ToolManifestCache(os.path.join(self.tmp_dir, "manifests")))
+            try:
+                await pool.add_client("stalling", script_path)
+                result = await pool.call("stall", {"seconds": 0.5})
+                self.assertEqual(result[0].text, "done")
+                await pool.call("stall", {"seconds": 0.0})
+            finally:
+                await pool.cleanup()
+
+        asyncio.run(run())
+        reports = [name for name in os.listdir(report_dir) if name.startswith("loop_stalls-stalling_mcp-")]
+        self.assertEqual(len(reports), 1)
+        with open(os.path.join(report_dir, reports[0])) as f:
+            report = json.load(f)
+        self.assertEqual(report["stalls"]["tool:stall"]["stalls"], 1)
+
+if __name__ == '__main__':
+    unittest.main()
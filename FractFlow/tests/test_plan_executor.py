@@ -0,0 +1,81 @@
+import asyncio
+import unittest
+
+from FractFlow.core.plan_executor import PlanError, PlanExecutor, parse_plan, resolve_arguments
+
+PIPELINE = """Here is the plan.
+<plan>
+[
+  {"id": "a", "tool": "make", "args": {"name": "a"}},
+  {"id": "b", "tool": "make", "args": {"name": "b"}},
+  {"id": "join", "tool": "join", "args": {"parts": ["${a}", "${b}"]}},
+  {"id": "save", "tool": "save", "args": {"text": "joined: ${join}"}}
+]
+</plan>"""
+
+class TestPlanExecutor(unittest.TestCase):
+    def test_parse_plan(self):
+        """Test that references become dependencies and bad plans are rejected"""
+        nodes = {node.id: node for node in parse_plan(PIPELINE, ["make", "join", "save"])}
+        self.assertEqual(nodes["join"].depends_on, {"a", "b"})
+        self.assertEqual(nodes["save"].depends_on, {"join"})
+        self.assertIsNone(parse_plan("No plan here", ["make"]))
+
+        with self.assertRaises(PlanError):
+            parse_plan(PIPELINE, ["make", "join"])
+        with self.assertRaises(PlanError):
+            parse_plan('<plan>[{"id": "x", "tool": "t", "args": {"v": "${y}"}},'
+                       ' {"id": "y", "tool": "t", "args": {"v": "${x}"}}]</plan>', ["t"])
+
+    def test_resolve_arguments(self):
+        """Test whole-value, embedded and field references"""
+        outputs = {"a": '{"path": "/tmp/a.mp4", "clips": [1, 2]}', "b": "plain"}
+        self.assertEqual(resolve_arguments("${a.path}", outputs), "/tmp/a.mp4")
+        self.assertEqual(resolve_arguments(["${a.clips.1}", "x ${b}"], outputs), [2, "x plain"])
+        with self.assertRaises(PlanError):
+            resolve_arguments("${b.missing}", outputs)
+
+    def test_independent_steps_run_in_parallel(self):
+        """Test that ready steps run together and dependents see their outputs"""
+        async def run():
+            calls = []
+            active = {"now": 0, "max": 0}
+
+            async def call_tool(tool, args):
+                calls.append((tool, args))
+                active["now"] += 1
+                active["max"] = max(active["max"], active["now"])
+                await asyncio.sleep(0.05)
+                active["now"] -= 1
+                if tool == "make":
+                    return args["name"].upper()
+                if tool == "join":
+                    return "+".join(args["parts"])
+                return "saved"
+
+            results = await PlanExecutor(call_tool).run(parse_plan(PIPELINE))
+            self.assertEqual(active["max"], 2)
+            self.assertEqual(results["join"]["output"], "A+B")
+            self.assertEqual(calls[-1], ("save", {"text": "joined: A+B"}))
+            self.assertTrue(all(r["status"] == "done" for r in results.values()))
+
+        asyncio.run(run())
+
+    def test_failed_step_stops_dependents(self):
+        """Test that steps after a failure are skipped"""
+        async def run():
+            async def call_tool(tool, args):
+                if args.get("name") == "b":
+                    raise RuntimeError("boom")
+                return "ok"
+
+            results = await PlanExecutor(call_tool).run(parse_plan(PIPELINE))
+            self.assertEqual(results["a"]["status"], "done")
+            self.assertEqual(results["b"]["status"], "failed")
+            self.assertEqual(results["join"]["status"], "skipped")
+            self.assertEqual(results["save"]["status"], "skipped")
+
+        asyncio.run(run())
+
+if __name__ == '__main__':
+    unittest.main()
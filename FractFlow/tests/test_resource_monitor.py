@@ -0,0 +1,123 @@
+import os
+import shutil
+import asyncio
+import tempfile
+import textwrap
+import threading
+import unittest
+
+from FractFlow.mcpcore import resource_monitor
+from FractFlow.mcpcore import zygote as zygote_server
+from FractFlow.mcpcore.client_pool import MCPClientPool
+from FractFlow.mcpcore.launcher import Zygote
+from FractFlow.mcpcore.manifest_cache import ToolManifestCache
+from FractFlow.mcpcore.resource_monitor import ResourceMonitor
+
+GROWING_SERVER = textwrap.dedent('''
+    from mcp.server.fastmcp import FastMCP
+
+    mcp = FastMCP("growing_tool")
+    buffers = []
+
+    @mcp.tool()
+    def grow(megabytes: int) -> str:
+        """Allocate memory that is never released."""
+        buffers.append(bytearray(megabytes * 1024 * 1024))
+        return "ok"
+
+    if __name__ == "__main__":
+        mcp.run(transport='stdio')
+''')
+
+MB = 1024 * 1024
+
+@unittest.skipUnless(resource_monitor.is_available(), "psutil is not installed")
+class TestResourceMonitor(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.script_path = os.path.join(self.tmp_dir, "growing_mcp.py")
+        with open(self.script_path, "w") as f:
+            f.write(GROWING_SERVER)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def _run(self, monitor, zygote=None):
+        async def run():
+            pool = MCPClientPool(ToolManifestCache(os.path.join(self.tmp_dir, "manifests")))
+            pool.zygote = zygote
+            try:
+                await pool.add_client("growing", self.script_path)
+                connection = pool.clients["growing"]
+                before = monitor.sample_connection(connection)
+                await pool.call("grow", {"megabytes": 200})
+                after = monitor.sample_connection(connection)
+
+                await monitor.sample(pool.registry.connections())
+                restarted = not connection.is_connected
+                await pool.call("grow", {"megabytes": 1})
+                return before, after, restarted, connection.is_connected
+            finally:
+                await pool.cleanup()
+
+        return asyncio.run(run())
+
+    def test_server_growth_is_attributed(self):
+        """Test that the memory of a server and the last tool it ran are reported"""
+        monitor = ResourceMonitor()
+        before, after, restarted, _ = self._run(monitor)
+        self.assertNotEqual(before["pid"], os.getpid())
+        self.assertGreater(before["fds"], 0)
+        self.assertGreaterEqual(after["rss"] - before["rss"], 150 * MB)
+        self.assertEqual(after["peak_rss"], after["rss"])
+        self.assertEqual(after["last_tool"], "grow")
+        self.assertFalse(restarted)
+
+    def test_soft_limit_restarts_idle_server(self):
+        """Test that an idle server over its memory limit is restarted on demand"""
+        monitor = ResourceMonitor(rss_limit_mb=150)
+        _, after, restarted, reconnected = self._run(monitor)
+        self.assertGreater(after["rss"], 150 * MB)
+        self.assertTrue(restarted)
+        self.assertTrue(reconnected)
+        self.assertEqual(monitor.limit_restarts, 1)
+
+    def test_background_sampling_scans_off_the_event_loop(self):
+        """Test that the sampler walks the process trees in a worker thread"""
+        monitor = ResourceMonitor()
+        threads = []
+        measure = monitor._measure
+
+        def recording_measure(server_id):
+            threads.append(threading.current_thread())
+            return measure(server_id)
+
+        monitor._measure = recording_measure
+
+        async def run():
+            pool = MCPClientPool(ToolManifestCache(os.path.join(self.tmp_dir, "manifests")))
+            try:
+                await pool.add_client("growing", self.script_path)
+                await monitor.sample(pool.registry.connections())
+                return pool.clients["growing"].resources
+            finally:
+                await pool.cleanup()
+
+        resources = asyncio.run(run())
+        self.assertGreater(resources["rss"], 0)
+        self.assertEqual(len(threads), 1)
+        self.assertIsNot(threads[0], threading.main_thread())
+
+    @unittest.skipUnless(zygote_server.is_supported(), "zygote requires Linux")
+    def test_zygote_forked_server_is_measured(self):
+        """Test that a server forked by the zygote is measured instead of its shim"""
+        zygote = Zygote()
+        zygote.start()
+        self.addCleanup(zygote.stop)
+        monitor = ResourceMonitor()
+        before, after, _, _ = self._run(monitor, zygote)
+        self.assertEqual(before["pid"], after["pid"])
+        self.assertGreaterEqual(after["rss"] - before["rss"], 150 * MB)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,50 @@
+import time
+import unittest
+
+from FractFlow.core.response_cache import ResponseCache, make_scope, normalize_query
+
+class TestResponseCache(unittest.TestCase):
+    def test_exact_match_after_normalization(self):
+        """Test that case, spacing and trailing punctuation do not matter"""
+        cache = ResponseCache(similarity=0)
+        scope = make_scope("qwen", "system prompt", [])
+        cache.put(scope, "Where is the  Library?", "Building E1")
+        self.assertEqual(normalize_query("图书馆在哪里？"), "图书馆在哪里")
+        self.assertEqual(cache.get(scope, "where is the library"), "Building E1")
+        self.assertIsNone(cache.get(make_scope("qwen", "other prompt", []), "where is the library"))
+        self.assertEqual(cache.get_stats()["exact_hits"], 1)
+
+    def test_near_match(self):
+        """Test that similar questions hit and unrelated ones miss"""
+        cache = ResponseCache(similarity=0.8)
+        scope = make_scope("scope")
+        cache.put(scope, "图书馆的开放时间是什么时候", "8:00-22:00")
+        cache.put(scope, "how do I apply for a student card", "Visit the service centre")
+        self.assertEqual(cache.get(scope, "图书馆的开放时间是什么时候呢"), "8:00-22:00")
+        self.assertIsNone(cache.get(scope, "食堂在哪里"))
+        stats = cache.get_stats()
+        self.assertEqual((stats["near_hits"], stats["misses"]), (1, 1))
+
+    def test_similarity_per_lookup(self):
+        """Test that callers with different thresholds share one cache without changing its settings"""
+        cache = ResponseCache(similarity=0.9)
+        scope = make_scope("scope")
+        cache.put(scope, "图书馆的开放时间是什么时候", "8:00-22:00")
+        self.assertIsNone(cache.get(scope, "图书馆的开放时间是什么时候呢", similarity=0))
+        self.assertEqual(cache.get(scope, "图书馆的开放时间是什么时候呢", similarity=0.5), "8:00-22:00")
+        self.assertEqual(cache.similarity, 0.9)
+
+    def test_ttl_and_eviction(self):
+        """Test that entries expire and the least recently used one is evicted"""
+        cache = ResponseCache(max_entries=2, similarity=0)
+        cache.put("s", "a", "A", ttl=0.05)
+        cache.put("s", "b", "B")
+        cache.put("s", "c", "C")
+        self.assertIsNone(cache.get("s", "a"))
+        cache.put("s", "d", "D", ttl=0.05)
+        time.sleep(0.1)
+        self.assertIsNone(cache.get("s", "d"))
+        self.assertEqual(cache.get("s", "c"), "C")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,132 @@
+import asyncio
+import unittest
+
+from FractFlow.core.scheduler import ToolScheduler, get_scheduler
+from FractFlow.core.tool_executor import ToolExecutor
+from FractFlow.infra.config import ConfigManager
+
+class TestToolScheduler(unittest.TestCase):
+    def test_saturated_tool_does_not_block_other_tools(self):
+        """Test that calls to other tools pass while a limited tool is saturated"""
+        async def run():
+            scheduler = ToolScheduler(tool_limits={"heavy": 1})
+            release = asyncio.Event()
+            order = []
+
+            async def call(tool, session):
+                async with scheduler.slot(tool, session, "batch"):
+                    order.append((tool, session))
+                    if tool == "heavy":
+                        await release.wait()
+
+            heavy = [asyncio.ensure_future(call("heavy", "a")) for _ in range(3)]
+            await asyncio.sleep(0)
+            await asyncio.wait_for(call("light", "b"), timeout=1)
+            self.assertEqual(order, [("heavy", "a"), ("light", "b")])
+            self.assertEqual(scheduler.get_stats()["queued"], 2)
+
+            release.set()
+            await asyncio.gather(*heavy)
+            stats = scheduler.get_stats()
+            self.assertEqual((stats["running"], stats["queued"]), (0, 0))
+            self.assertEqual(stats["queue_wait"]["heavy"]["calls"], 3)
+
+        asyncio.run(run())
+
+    def test_round_robin_and_priority(self):
+        """Test that sessions take turns and interactive calls overtake batch ones"""
+        async def run():
+            scheduler = ToolScheduler(max_concurrent=1)
+            gate = asyncio.Event()
+            order = []
+
+            async def call(session, priority):
+                async with scheduler.slot("tool", session, priority):
+                    order.append(session)
+                    await gate.wait()
+
+            first = asyncio.ensure_future(call("a", "batch"))
+            await asyncio.sleep(0)
+            waiting = [asyncio.ensure_future(call(s, "batch")) for s in ("a", "a", "b", "b")]
+            await asyncio.sleep(0)
+            waiting.append(asyncio.ensure_future(call("c", "interactive")))
+            await asyncio.sleep(0)
+
+            gate.set()
+            await asyncio.gather(first, *waiting)
+            self.assertEqual(order, ["a", "c", "a", "b", "a", "b"])
+
+        asyncio.run(run())
+
+    def test_session_limits_do_not_override_each_other(self):
+        """Test that each session's limits gate only its own calls"""
+        async def run():
+            scheduler = ToolScheduler()
+            scheduler.set_session_limits("strict", tool_limits={"heavy": 1})
+            scheduler.set_session_limits("loose", tool_limits={"heavy": 3})
+            release = asyncio.Event()
+            started = []
+
+            async def call(session):
+                async with scheduler.slot("heavy", session):
+                    started.append(session)
+                    await release.wait()
+
+            calls = [asyncio.ensure_future(call(s)) for s in ("strict", "strict", "loose", "loose")]
+            await asyncio.sleep(0.01)
+            # The second strict call waits; the loose calls may share the tool up to three
+            self.assertEqual(started, ["strict", "loose", "loose"])
+            self.assertEqual(scheduler.get_stats()["queued"], 1)
+
+            release.set()
+            await asyncio.gather(*calls)
+            self.assertEqual(started.count("strict"), 2)
+
+        asyncio.run(run())
+
+    def test_executor_shutdown_removes_its_limits(self):
+        """Test that a shut down executor leaves no session limits behind in the shared scheduler"""
+        class Pool:
+            artifact_store = None
+
+            async def call(self, tool_name, arguments):
+                return "ok"
+
+        async def run():
+            config = ConfigManager(scheduler_tool_limits={"heavy": 1})
+            executor = ToolExecutor(config=config, client_pool=Pool(), session_id="agent-1")
+            await executor.execute_tool("heavy", {})
+            registered = dict(get_scheduler()._session_limits)
+            executor.shutdown()
+            return registered, dict(get_scheduler()._session_limits)
+
+        registered, remaining = asyncio.run(run())
+        self.assertEqual(registered, {"agent-1": (0, {"heavy": 1})})
+        self.assertEqual(remaining, {})
+
+    def test_cancelled_waiter_leaves_queue(self):
+        """Test that cancelling a queued call frees its place"""
+        async def run():
+            scheduler = ToolScheduler(max_concurrent=1)
+            gate = asyncio.Event()
+
+            async def call():
+                async with scheduler.slot("tool", "a", "batch"):
+                    await gate.wait()
+
+            running = asyncio.ensure_future(call())
+            await asyncio.sleep(0)
+            queued = asyncio.ensure_future(call())
+            await asyncio.sleep(0)
+            queued.cancel()
+            await asyncio.gather(queued, return_exceptions=True)
+            self.assertEqual(scheduler.get_stats()["queued"], 0)
+
+            gate.set()
+            await running
+            self.assertEqual(scheduler.get_stats()["running"], 0)
+
+        asyncio.run(run())
+
+if __name__ == '__main__':
+    unittest.main()
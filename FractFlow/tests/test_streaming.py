@@ -0,0 +1,108 @@
+import asyncio
+import unittest
+
+from FractFlow.agent import Agent
+from FractFlow.core.query_processor import QueryProcessor
+from FractFlow.infra import events
+from FractFlow.infra.config import ConfigManager
+
+class FakeModel:
+    """Model that streams its answer in pieces after one search."""
+
+    def __init__(self):
+        self.calls = 0
+
+    async def execute(self, tools):
+        self.calls += 1
+        if self.calls == 1:
+            return {"choices": [{"message": {
+                "content": "",
+                "tool_calls": [{"id": "1", "function": {"name": "search", "arguments": "{\"q\": \"x\"}"}}],
+            }}]}
+
+        def generate():
+            # Streamed responses are read in a worker thread
+            for piece in ("The ", "answer"):
+                events.emit("token", content=piece)
+            return "The answer"
+        content = await asyncio.to_thread(generate)
+        return {"choices": [{"message": {"content": content, "tool_calls": None}}]}
+
+    def add_user_message(self, message):
+        pass
+
+    def add_assistant_message(self, message, tool_calls=None):
+        pass
+
+    def add_tool_result(self, tool_name, result, tool_call_id=None):
+        pass
+
+class FakeOrchestrator:
+    def __init__(self, model):
+        self.model = model
+
+    def get_model(self):
+        return self.model
+
+    async def get_available_tools(self):
+        return [{"type": "function", "function": {"name": "search", "parameters": {}}}]
+
+    async def get_tool_name_mapping(self):
+        return {}
+
+class FakeToolExecutor:
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.cancelled = False
+
+    async def execute_tool(self, tool_name, arguments):
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        return "found it"
+
+class TestStreaming(unittest.TestCase):
+    def make_agent(self, tool_delay=0.0):
+        agent = Agent(ConfigManager(), name='streamer')
+        self.executor = FakeToolExecutor(tool_delay)
+        processor = QueryProcessor(FakeOrchestrator(FakeModel()), self.executor, agent.config)
+        agent.process_query = lambda query, priority=None, budget=None: processor.process_query(query)
+        return agent
+
+    def test_events_arrive_in_order(self):
+        """Test that tool and token events precede the final answer"""
+        agent = self.make_agent()
+
+        async def run():
+            return [event async for event in agent.stream_query("question")]
+
+        stream = asyncio.run(run())
+        self.assertEqual([event["type"] for event in stream],
+                         ["tool_start", "tool_end", "token", "token", "final"])
+        self.assertEqual(stream[0]["arguments"], {"q": "x"})
+        self.assertEqual(stream[1]["result"], "found it")
+        self.assertEqual("".join(event["content"] for event in stream if event["type"] == "token"), "The answer")
+        self.assertEqual(stream[-1]["content"], "The answer")
+
+    def test_heartbeat_and_cancellation(self):
+        """Test that heartbeats fill silences and closing the stream cancels the running tool"""
+        agent = self.make_agent(tool_delay=5.0)
+
+        async def run():
+            seen = []
+            stream = agent.stream_query("question", heartbeat=0.05)
+            async for event in stream:
+                seen.append(event["type"])
+                if seen.count("heartbeat") == 2:
+                    break
+            await stream.aclose()
+            return seen
+
+        seen = asyncio.run(run())
+        self.assertEqual(seen, ["tool_start", "heartbeat", "heartbeat"])
+        self.assertTrue(self.executor.cancelled)
+
+if __name__ == '__main__':
+    unittest.main()
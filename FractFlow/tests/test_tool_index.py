@@ -0,0 +1,50 @@
+import unittest
+
+from FractFlow.core.tool_index import ToolIndex, tokenize
+
+def make_tool(name, description, **parameters):
+    return {
+        "type": "function",
+        "function": {
+            "name": name,
+            "description": description,
+            "parameters": {
+                "type": "object",
+                "properties": {p: {"type": "string", "description": d} for p, d in parameters.items()},
+            },
+        },
+    }
+
+TOOLS = [
+    make_tool("read_file", "Read the content of a text file", file_path="Path of the file"),
+    make_tool("web_search", "Search the web for up to date information", query="Search keywords"),
+    make_tool("scale_object", "缩放场景中的对象", object_name="对象名称", scale="缩放比例"),
+    make_tool("get_alerts", "Get weather alerts for a US state", state="Two-letter state code"),
+    make_tool("concatenate_videos", "Join several video clips into one video", video_paths="Clip paths"),
+]
+
+class TestToolIndex(unittest.TestCase):
+    def test_tokenize(self):
+        """Test that identifiers are split and CJK text becomes unigrams and bigrams"""
+        self.assertEqual(tokenize("readFile read_file"), ["read", "file", "read", "file"])
+        self.assertEqual(tokenize("缩放对象"), ["缩", "放", "对", "象", "缩放", "放对", "对象"])
+
+    def test_select_top_k_in_catalog_order(self):
+        """Test that the most relevant tools are selected, keeping catalog order"""
+        index = ToolIndex(TOOLS)
+        selected = [t["function"]["name"] for t in index.select("join these video clips then search the web", 2)]
+        self.assertEqual(selected, ["web_search", "concatenate_videos"])
+
+        selected = [t["function"]["name"] for t in index.select("把椅子缩放到两倍", 1)]
+        self.assertEqual(selected, ["scale_object"])
+
+    def test_select_widens_with_pinned_and_named_tools(self):
+        """Test that pinned tools and tools named in the text are always selected"""
+        index = ToolIndex(TOOLS)
+        selected = [t["function"]["name"] for t in index.select("use get_alerts for CA", 1, include=["read_file"])]
+        self.assertIn("get_alerts", selected)
+        self.assertIn("read_file", selected)
+        self.assertEqual(len(index.select("anything", 10)), len(TOOLS))
+
+if __name__ == '__main__':
+    unittest.main()
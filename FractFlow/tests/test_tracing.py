@@ -0,0 +1,110 @@
+import os
+import shutil
+import asyncio
+import tempfile
+import textwrap
+import unittest
+
+from FractFlow.infra import tracing
+from FractFlow.mcpcore.client_pool import MCPClientPool
+from FractFlow.mcpcore.manifest_cache import ToolManifestCache
+
+TRACED_SERVER = textwrap.dedent('''
+    import sys
+    import time
+    sys.path.insert(0, {project_root!r})
+
+    from mcp.server.fastmcp import Context, FastMCP
+    from FractFlow.infra import tracing
+
+    mcp = FastMCP("traced_tool")
+
+    @mcp.tool()
+    async def work(seconds: float, ctx: Context) -> str:
+        """Record a span under the caller's trace."""
+        with tracing.attach(tracing.extract(ctx.request_context.meta)):
+            with tracing.span("inner"):
+                time.sleep(seconds)
+        return "done"
+
+    if __name__ == "__main__":
+        mcp.run(transport='stdio')
+''').format(project_root=os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+class TestTracing(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.trace_dir = os.path.join(self.tmp_dir, "traces")
+        tracing.enable(self.trace_dir)
+
+    def tearDown(self):
+        os.environ.pop(tracing.TRACE_DIR_ENV, None)
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def test_traceparent_round_trip(self):
+        """Test that the current span is carried as a W3C traceparent"""
+        with tracing.span("root"):
+            trace_id, span_id = tracing.current()
+            meta = tracing.inject()
+        self.assertEqual(tracing.extract(meta), (trace_id, span_id))
+        self.assertIsNone(tracing.extract({"traceparent": "garbage"}))
+        self.assertIsNone(tracing.inject())
+
+    def test_malicious_traceparent_is_rejected(self):
+        """Test that trace IDs which could escape the trace directory are ignored"""
+        for value in (
+            "00-/tmp/evil_file_name_padding_xxxx-00f067aa0ba902b7-01",
+            "00-../../../../../../../../tmp/evil-00f067aa0ba902b7-01",
+            "00-4BF92F3577B34DA6A3CE929D0E0E4736-00f067aa0ba902b7-01",
+            "00-00000000000000000000000000000000-00f067aa0ba902b7-01",
+            "00-4bf92f3577b34da6a3ce929d0e0e4736-0000000000000000-01",
+        ):
+            self.assertIsNone(tracing.extract({"traceparent": value}), value)
+        self.assertEqual(
+            tracing.extract({"traceparent": "00-4bf92f3577b34da6a3ce929d0e0e4736-00f067aa0ba902b7-01"}),
+            ("4bf92f3577b34da6a3ce929d0e0e4736", "00f067aa0ba902b7"),
+        )
+
+    def test_spans_of_tool_server_join_the_trace(self):
+        """Test that a tool server's spans become children of the calling tool span"""
+        script_path = os.path.join(self.tmp_dir, "traced_mcp.py")
+        with open(script_path, "w") as f:
+            f.write(TRACED_SERVER)
+
+        async def run():
+            pool = MCPClientPool(ToolManifestCache(os.path.join(self.tmp_dir, "manifests")))
+            try:
+                await pool.add_client("traced", script_path)
+                with tracing.span("query"):
+                    trace_id = tracing.current()[0]
+                    await asyncio.gather(pool.call("work", {"seconds": 0.2}), pool.call("work", {"seconds": 0.1}))
+                return trace_id
+            finally:
+                await pool.cleanup()
+
+        trace_id = asyncio.run(run())
+        spans = tracing.load_trace(trace_id, self.trace_dir)
+        by_name = {}
+        for record in spans:
+            by_name.setdefault(record["name"], []).append(record)
+
+        query = by_name["query"][0]
+        tool_spans = by_name["tool:work"]
+        self.assertEqual(len(tool_spans), 2)
+        self.assertTrue(all(record["parent_id"] == query["span_id"] for record in tool_spans))
+        inner = by_name["inner"]
+        self.assertEqual({record["parent_id"] for record in inner}, {record["span_id"] for record in tool_spans})
+        self.assertTrue(all(record["pid"] != os.getpid() for record in inner))
+
+        timeline = tracing.format_timeline(spans)
+        self.assertEqual(len(timeline.splitlines()), 5)
+        self.assertIn("      inner", timeline)
+
+        chrome = tracing.to_chrome_trace(spans)
+        local_tracks = {event["tid"] for event in chrome["traceEvents"]
+                        if event["ph"] == "X" and event["pid"] == os.getpid()}
+        # The two concurrent tool calls cannot nest, so they need separate tracks
+        self.assertEqual(len(local_tracks), 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+import os
+import time
+import shutil
+import tempfile
+import importlib
+import unittest
+
+tts_cache = importlib.import_module("前端.tts_cache")
+TTSCache = tts_cache.TTSCache
+tts_cache_key = tts_cache.tts_cache_key
+
+class TestTTSCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def part_files(self):
+        return [name for name in os.listdir(self.tmp_dir) if name.endswith(".part")]
+
+    def test_commit_is_atomic(self):
+        """Test that audio only becomes visible in the cache once the writer commits"""
+        cache = TTSCache(self.tmp_dir)
+        key = tts_cache_key("你好", "zh-CN-XiaoyiNeural", "+0%")
+        writer = cache.writer(key)
+        writer.write(b"first half ")
+        self.assertIsNone(cache.get(key))
+        writer.write(b"second half")
+        path = writer.commit()
+
+        self.assertEqual(cache.get(key), path)
+        self.assertEqual(path.read_bytes(), b"first half second half")
+        self.assertEqual(self.part_files(), [])
+        metrics = cache.metrics()
+        self.assertEqual((metrics["entries"], metrics["bytes"], metrics["stores"]), (1, 22, 1))
+        self.assertEqual((metrics["hits"], metrics["misses"]), (1, 1))
+
+    def test_discard_leaves_nothing_behind(self):
+        """Test that an interrupted synthesis is neither cached nor left on disk"""
+        cache = TTSCache(self.tmp_dir)
+        writer = cache.writer("interrupted")
+        writer.write(b"partial audio")
+        self.assertEqual(len(self.part_files()), 1)
+        writer.discard()
+        self.assertIsNone(cache.get("interrupted"))
+        self.assertEqual(os.listdir(self.tmp_dir), [])
+
+    def test_least_recently_used_entries_are_evicted(self):
+        """Test that the cache stays within its size limit by deleting the least recently used audio"""
+        cache = TTSCache(self.tmp_dir, max_bytes=250)
+        for key in ("a", "b"):
+            writer = cache.writer(key)
+            writer.write(b"x" * 100)
+            writer.commit()
+        # Make "a" the most recently used entry
+        past = time.time() - 60
+        os.utime(cache.path("b"), (past, past))
+        os.utime(cache.path("a"), (past - 60, past - 60))
+        self.assertIsNotNone(cache.get("a"))
+
+        writer = cache.writer("c")
+        writer.write(b"x" * 100)
+        writer.commit()
+
+        self.assertIsNone(cache.get("b"))
+        self.assertIsNotNone(cache.get("a"))
+        self.assertIsNotNone(cache.get("c"))
+        metrics = cache.metrics()
+        self.assertEqual((metrics["entries"], metrics["bytes"], metrics["evictions"]), (2, 200, 1))
+
+    def test_existing_entries_are_counted_on_startup(self):
+        """Test that a new cache over an existing directory reports its entries and drops stale partial writes"""
+        cache = TTSCache(self.tmp_dir)
+        writer = cache.writer("kept")
+        writer.write(b"x" * 10)
+        writer.commit()
+        stale = cache.writer("stale")
+        stale.write(b"partial")
+        stale._file.close()
+        old = time.time() - 7200
+        os.utime(stale.temp_path, (old, old))
+
+        reopened = TTSCache(self.tmp_dir)
+        self.assertEqual(self.part_files(), [])
+        metrics = reopened.metrics()
+        self.assertEqual((metrics["entries"], metrics["bytes"]), (1, 10))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -12,16 +12,101 @@ import os
 import sys
 import logging
 import argparse
+import functools
+import contextvars
+import multiprocessing
+import concurrent.futures
 from typing import List, Tuple, Dict, Any, Optional
 from dotenv import load_dotenv
-from mcp.server.fastmcp import FastMCP
+from mcp.server.fastmcp import Context, FastMCP
 import os.path as osp
 
 # Import the FractFlow Agent and Config
-from .agent import Agent
+from .agent import Agent, is_remote_tool
+from .infra import budget as budgets, tracing
 from .infra.config import ConfigManager
 from .infra.logging_utils import setup_logging, get_logger
 
+# Worker pools shared by all offloaded tool functions of a server process
+_thread_pool = None
+_process_pool = None
+_offloaded_functions: Dict[str, Any] = {}
+
+def _get_executor(mode: str):
+    """Get (creating on first use) the worker pool for an offload mode."""
+    global _thread_pool, _process_pool
+    if mode == 'thread':
+        if _thread_pool is None:
+            _thread_pool = concurrent.futures.ThreadPoolExecutor(
+                max_workers=int(os.getenv('FRACTFLOW_TOOL_THREADS', '0')) or None,
+                thread_name_prefix='fractflow-tool'
+            )
+        return _thread_pool
+    if _process_pool is None:
+        # Forked workers inherit the registry of offloaded functions
+        context = multiprocessing.get_context('fork') if hasattr(os, 'fork') else None
+        _process_pool = concurrent.futures.ProcessPoolExecutor(
+            max_workers=int(os.getenv('FRACTFLOW_TOOL_PROCESSES', '0')) or None,
+            mp_context=context
+        )
+    return _process_pool
+
+def _run_offloaded(key: str, args: tuple, kwargs: dict) -> Any:
+    """Run a registered tool function inside a worker process."""
+    return _offloaded_functions[key](*args, **kwargs)
+
+def offload(func=None, *, mode: str = 'thread'):
+    """
+    Run a synchronous MCP tool function off the server's event loop.
+    
+    FastMCP runs synchronous tools directly on its event loop, so one slow call
+    (a video concatenation, an image blend, a large file read) stalls every other
+    request to the server. Decorating the function makes it awaitable and runs it
+    in a worker thread ('thread', for I/O and code that releases the GIL such as
+    numpy/OpenCV) or a worker process ('process', for pure-Python CPU work), so
+    the server keeps answering concurrent requests. Apply it below @mcp.tool():
+    
+        @mcp.tool()
+        @offload
+        def read_lines(file_path: str) -> dict: ...
+        
+        @mcp.tool()
+        @offload(mode='process')
+        def render(scene: str) -> str: ...
+    
+    Other tool functions that call an offloaded tool directly must use its
+    synchronous original, `read_lines.__wrapped__(...)`.
+    
+    Pool sizes can be set with FRACTFLOW_TOOL_THREADS / FRACTFLOW_TOOL_PROCESSES.
+    In process mode arguments and results must be picklable and the tool cannot
+    take a FastMCP Context.
+    
+    Args:
+        func: The synchronous tool function
+        mode: 'thread' or 'process'
+        
+    Returns:
+        An async function with the same signature and docstring
+    """
+    if mode not in ('thread', 'process'):
+        raise ValueError(f"Unknown offload mode '{mode}', expected 'thread' or 'process'")
+    
+    def decorator(func):
+        key = f"{func.__module__}.{func.__qualname__}"
+        _offloaded_functions[key] = func
+        
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            loop = asyncio.get_running_loop()
+            if mode == 'process':
+                return await loop.run_in_executor(_get_executor(mode), _run_offloaded, key, args, kwargs)
+            call = functools.partial(contextvars.copy_context().run, func, *args, **kwargs)
+            return await loop.run_in_executor(_get_executor(mode), call)
+        
+        return wrapper
+    
+    return decorator(func) if func is not None else decorator
+
 class ToolTemplate:
     """
     Base template class for creating FractFlow tools with multiple running modes.
@@ -57,6 +142,16 @@ class ToolTemplate:
     The system will automatically inform the model that "file_manager_agent" maps to 
     the actual functions provided by file_io_agent.py (like "fileioagent").
     
+    An optional third element passes server options to Agent.add_tool, e.g. to run
+    several processes of a CPU-heavy tool server:
+    
+        TOOLS = [("tools/core/video_processor/video_processor_mcp.py", "video_processor", {"replicas": 4})]
+    
+    A tool path may also be the URL of a server that is already running, e.g. one
+    started once per host with `python websearch_agent.py --http --port 8001`:
+    
+        TOOLS = [("http://127.0.0.1:8001/mcp", "web_search")]
+    
     ===== SCENARIO 3: Advanced Configuration =====
     Override configuration method for complex setups:
     
@@ -79,7 +174,8 @@ class ToolTemplate:
     TOOL_DESCRIPTION (str): Description for the main MCP tool function
     
     ===== OPTIONAL ATTRIBUTES =====
-    TOOLS (List[Tuple[str, str]]): List of (tool_path, tool_name) tuples
+    TOOLS (List[Tuple[str, str]]): List of (tool_path, tool_name) tuples, optionally
+        followed by a dict of server options such as {"replicas": 4}
     MCP_SERVER_NAME (str): Custom MCP server name (defaults to class name)
     
     ===== OPTIONAL OVERRIDES =====
@@ -152,6 +248,9 @@ class ToolTemplate:
     # Class-level MCP server instance
     _mcp = None
     
+    # Frozen result of create_config(), per class
+    _config_snapshot = None
+    
     @classmethod
     def create_config(cls) -> ConfigManager:
         """
@@ -193,7 +292,11 @@ class ToolTemplate:
         Returns:
             Agent: Initialized agent ready for use
         """
-        config = cls.create_config()
+        # create_config() runs once per class; agents share the frozen result
+        config = cls.__dict__.get('_config_snapshot')
+        if config is None:
+            config = cls.create_config().snapshot()
+            cls._config_snapshot = config
         agent = Agent(config=config, name=f'{cls.__name__.lower()}_{name_suffix}')
         
         # Add tools to the agent
@@ -215,17 +318,19 @@ class ToolTemplate:
         """
         project_root = cls._get_project_root()
         
-        for tool_path, tool_name in cls.TOOLS:
+        for tool_path, tool_name, *tool_options in cls.TOOLS:
             # Handle relative paths - now relative to project root
-            if not os.path.isabs(tool_path):
+            if is_remote_tool(tool_path):
+                full_path = tool_path
+            elif not os.path.isabs(tool_path):
                 full_path = os.path.join(project_root, tool_path)
             else:
                 full_path = tool_path
                 
-            if not os.path.exists(full_path):
+            if not is_remote_tool(full_path) and not os.path.exists(full_path):
                 raise ValueError(f"Tool path does not exist: {full_path}")
                 
-            agent.add_tool(full_path, tool_name)
+            agent.add_tool(full_path, tool_name, **(tool_options[0] if tool_options else {}))
     
     @classmethod
     def _get_project_root(cls):
@@ -311,7 +416,9 @@ class ToolTemplate:
         
         # Validate tool paths exist
         project_root = cls._get_project_root()
-        for tool_path, tool_name in cls.TOOLS:
+        for tool_path, tool_name, *_ in cls.TOOLS:
+            if is_remote_tool(tool_path):
+                continue
             # Handle relative paths - now relative to project root
             if not os.path.isabs(tool_path):
                 full_path = os.path.join(project_root, tool_path)
@@ -327,14 +434,24 @@ class ToolTemplate:
                 )
     
     @classmethod
-    async def _mcp_tool_function(cls, query: str) -> str:
+    async def _mcp_tool_function(cls, query: str, ctx: Context = None) -> str:
         """The main MCP tool function that processes queries"""
-        agent = await cls.create_agent()
-        try:
-            result = await agent.process_query(query)
-            return result
-        finally:
-            await agent.shutdown()
+        # Continue the calling agent's trace and budget, carried in the request's _meta
+        parent = budget = None
+        if ctx is not None:
+            try:
+                meta = ctx.request_context.meta
+            except ValueError:
+                meta = None
+            parent = tracing.extract(meta)
+            budget = budgets.Budget.from_meta(meta)
+        with tracing.attach(parent), budgets.attach(budget):
+            agent = await cls.create_agent()
+            try:
+                result = await agent.process_query(query)
+                return result
+            finally:
+                await agent.shutdown()
     
     @classmethod
     async def _run_interactive(cls):
@@ -407,8 +524,16 @@ class ToolTemplate:
             print("\nAgent session ended.")
     
     @classmethod
-    def _run_mcp_server(cls):
-        """Run in MCP Server mode"""
+    def _run_mcp_server(cls, transport: str = 'stdio', host: Optional[str] = None, port: Optional[int] = None):
+        """
+        Run in MCP Server mode
+        
+        Args:
+            transport: 'stdio' to serve a single parent process, or 'streamable-http'
+                       to serve any number of agents connecting to http://host:port/mcp
+            host: Interface to bind in HTTP mode
+            port: Port to bind in HTTP mode
+        """
         # Initialize MCP server if not already done
         if cls._mcp is None:
             cls._mcp = FastMCP(cls._get_mcp_server_name())
@@ -420,8 +545,13 @@ class ToolTemplate:
             tool_description = cls._get_tool_description()
             cls._mcp.tool(name=tool_name, description=tool_description)(cls._mcp_tool_function)
         
+        if host is not None:
+            cls._mcp.settings.host = host
+        if port is not None:
+            cls._mcp.settings.port = port
+        
         # Run the MCP server
-        cls._mcp.run(transport='stdio')
+        cls._mcp.run(transport=transport)
     
     @classmethod
     def main(cls):
@@ -434,6 +564,9 @@ class ToolTemplate:
         parser.add_argument('--audio-interactive', '-a', action='store_true', help='Run in audio interactive mode')
         parser.add_argument('--interactive', '-i', action='store_true', help='Run in interactive mode')
         parser.add_argument('--query', '-q', type=str, help='Single query mode: process this query and exit')
+        parser.add_argument('--http', action='store_true', help='Run as a long-lived MCP server over streamable HTTP instead of stdio')
+        parser.add_argument('--host', type=str, default='127.0.0.1', help='Host to bind in HTTP server mode')
+        parser.add_argument('--port', type=int, default=8000, help='Port to bind in HTTP server mode')
         parser.add_argument('--log-level', '-l', choices=['DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL'], default='INFO', help='Log level: DEBUG, INFO, WARNING, ERROR, CRITICAL')
         args = parser.parse_args()
         
@@ -452,6 +585,10 @@ class ToolTemplate:
             # Single query mode
             print(f"Starting {cls.__name__} in single query mode.")
             asyncio.run(cls._run_single_query(args.query))
+        elif args.http:
+            # Shared MCP Server mode over HTTP
+            print(f"Starting {cls.__name__} in MCP Server mode on http://{args.host}:{args.port}/mcp")
+            cls._run_mcp_server(transport='streamable-http', host=args.host, port=args.port)
         else:
             # Default: MCP Server mode
             print(f"Starting {cls.__name__} in MCP Server mode.")
@@ -1,11 +1,11 @@
-import os
 import asyncio
 import pygame
 import edge_tts
 import langid
 import json
-import uuid
-from typing import Callable
+from typing import Callable, Dict, Tuple
+
+from FractFlow.infra.artifact_store import get_artifact_store
 
 class TTSOutput:
     def __init__(self):
@@ -20,39 +20,32 @@ class TTSOutput:
         }
         # 初始化pygame mixer用于音频播放
         pygame.mixer.init()
-        # 临时文件目录
-        self.temp_dir = "temp_tts"
-        if os.path.exists(self.temp_dir):
-            self._cleanup_temp_dir()
-        os.makedirs(self.temp_dir, exist_ok=True)
-        self.current_file = None
-
-    def _cleanup_temp_dir(self):
-        """清理临时目录中的所有文件"""
-        try:
-            import shutil
-            shutil.rmtree(self.temp_dir)
-        except Exception as e:
-            print(f"清理临时目录失败: {e}")
+        # 合成的语音保存在产物存储中（按内容去重、按配额回收），重复的文本直接复用
+        self.store = get_artifact_store()
+        self._spoken: Dict[Tuple[str, str], str] = {}
 
     def _detect_language(self, text: str) -> str:
         """检测文本语言并返回对应的speaker"""
         language, _ = langid.classify(text)
         return self.language_speaker.get(language, "zh-CN-XiaoyiNeural")
 
-    async def _generate_speech(self, text: str, output_file: str):
-        """生成语音文件"""
+    async def _generate_speech(self, text: str) -> str:
+        """生成语音并返回音频文件路径（存储中的只读文件）"""
         voice = self._detect_language(text)
-        communicate = edge_tts.Communicate(text, voice)
-        # 确保在生成新文件前释放旧文件
-        if self.current_file and os.path.exists(self.current_file):
+        handle = self._spoken.get((voice, text))
+        if handle is not None:
             try:
-                pygame.mixer.music.unload()
-                os.remove(self.current_file)
-            except:
-                pass
-        await communicate.save(output_file)
-        self.current_file = output_file
+                return self.store.path(handle)
+            except KeyError:
+                pass  # 已被回收，重新合成
+        
+        audio = bytearray()
+        async for chunk in edge_tts.Communicate(text, voice).stream():
+            if chunk["type"] == "audio":
+                audio.extend(chunk["data"])
+        handle = self.store.put_bytes(bytes(audio), ".mp3", {"producer": "tts", "voice": voice})
+        self._spoken[(voice, text)] = handle
+        return self.store.path(handle)
 
     async def speak(self, text: str, interrupt_checker: Callable[[], bool] = None):
         """
@@ -62,9 +55,6 @@ class TTSOutput:
             text: 要播放的文本（JSON字符串或普通文本）
             interrupt_checker: 检查是否需要打断的回调函数
         """
-        # 生成唯一的临时文件名
-        temp_file = os.path.join(self.temp_dir, f"speech_{uuid.uuid4()}.mp3")
-        
         # 尝试解析JSON，获取response_text
         try:
             response_data = json.loads(text)
@@ -75,19 +65,16 @@ class TTSOutput:
         
         try:
             # 生成语音文件
-            await self._generate_speech(text_to_speak, temp_file)
+            speech_file = await self._generate_speech(text_to_speak)
             
             # 确保pygame mixer已初始化
             if not pygame.mixer.get_init():
                 pygame.mixer.init()
                 pygame.mixer.music.set_volume(1.0)
             
-            # 等待50ms确保文件写入完成
-            await asyncio.sleep(0.05)
-            
             # 加载并播放音频
             try:
-                pygame.mixer.music.load(temp_file)
+                pygame.mixer.music.load(speech_file)
                 pygame.mixer.music.play()
             except Exception as e:
                 print(f"音频加载或播放出错: {e}")
@@ -114,8 +101,6 @@ class TTSOutput:
                 if pygame.mixer.get_init():
                     pygame.mixer.music.stop()
                     pygame.mixer.music.unload()
-                if os.path.exists(temp_file):
-                    os.remove(temp_file)
             except Exception as e:
                 print(f"资源清理出错: {e}")
 
@@ -127,6 +112,4 @@ class TTSOutput:
                 pygame.mixer.music.unload()
                 pygame.mixer.quit()
         except Exception as e:
-            print(f"Pygame清理出错: {e}")
-            
-        self._cleanup_temp_dir()
\ No newline at end of file
+            print(f"Pygame清理出错: {e}")
\ No newline at end of file
@@ -136,6 +136,7 @@ class LongVideoGenerator(ToolTemplate):
             provider='deepseek',
             deepseek_model='deepseek-chat',
             max_iterations=30,  # 长视频生成需要多个步骤
+            plan_mode=True,  # 分段生成→拼接→保存报告可一次规划，按依赖并行执行
             custom_system_prompt=cls.SYSTEM_PROMPT,
             tool_calling_version='stable'
         )
@@ -4,10 +4,14 @@ import json
 import urllib.request
 import urllib.parse
 import os
-from typing import List
+from typing import List, Tuple
 from mcp.server.fastmcp import FastMCP
+from mcp.types import ToolAnnotations
 from dotenv import load_dotenv
 from pathlib import Path
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '../../..'))
+from FractFlow.infra.artifact_store import get_artifact_store
 
 try:
     from .workflow_manager import WorkflowManager
@@ -62,8 +66,8 @@ def get_file_from_comfyui(filename: str, subfolder: str, folder_type: str) -> by
         return response.read()
 
 
-def download_outputs(history: dict, save_directory: str, meta: dict, custom_filename: str = None) -> List[str]:
-    """下载工作流输出文件到指定目录，支持自定义文件名"""
+def download_outputs(history: dict, save_directory: str, meta: dict, custom_filename: str = None) -> List[Tuple[str, str]]:
+    """下载工作流输出文件到产物存储并链接到指定目录，支持自定义文件名，返回 (文件路径, 产物句柄) 列表"""
     save_dir = Path(save_directory)
     save_dir.mkdir(parents=True, exist_ok=True)
     
@@ -109,11 +113,14 @@ def download_outputs(history: dict, save_directory: str, meta: dict, custom_file
                         # 使用默认的语义化命名
                         filename = f"{output_name}_{i}{actual_extension}" if len(file_list) > 1 else f"{output_name}{actual_extension}"
                     
-                    file_path = save_dir / filename
-                    with open(file_path, 'wb') as f:
-                        f.write(file_data)
+                    # 按内容哈希存储，相同输出只保存一份，目标路径为指向它的硬链接
+                    store = get_artifact_store()
+                    handle = store.put_bytes(file_data, actual_extension.lower(), {
+                        'producer': 'comfyui', 'output': output_name, 'type': output_type
+                    })
+                    file_path = store.export(handle, str(save_dir / filename))
                     
-                    saved_files.append(str(file_path))
+                    saved_files.append((file_path, handle))
                     print(f"Downloaded: {filename} ({output_type})")
                     
                 except Exception as e:
@@ -124,7 +131,7 @@ def download_outputs(history: dict, save_directory: str, meta: dict, custom_file
     return saved_files
 
 
-@mcp.tool()
+@mcp.tool(annotations=ToolAnnotations(readOnlyHint=True))
 async def list_comfyui_workflows() -> str:
     """列出所有可用的ComfyUI工作流及其完整文档"""
     try:
@@ -199,8 +206,8 @@ async def execute_comfyui_workflow(workflow_name: str, save_path: str, parameter
         # 构建结果报告
         result = f"Workflow '{workflow_name}' executed successfully!\n"
         result += f"Generated {len(saved_files)} output file(s):\n"
-        for file_path in saved_files:
-            result += f"- {file_path}\n"
+        for file_path, handle in saved_files:
+            result += f"- {file_path} ({handle})\n"
         
         if parameters:
             result += f"\nUsed parameters:\n"
@@ -214,4 +221,5 @@ async def execute_comfyui_workflow(workflow_name: str, save_path: str, parameter
 
 
 if __name__ == "__main__":
-    mcp.run(transport='stdio') 
\ No newline at end of file
+    # Pass --http to serve many agents over streamable HTTP (bind with FASTMCP_HOST/FASTMCP_PORT)
+    mcp.run(transport='streamable-http' if '--http' in sys.argv else 'stdio') 
\ No newline at end of file
@@ -1,8 +1,17 @@
 import os
+import sys
 import pathlib
 from typing import List, Dict, Union, Optional, Tuple
 import re
 from mcp.server.fastmcp import FastMCP
+from mcp.types import ToolAnnotations
+
+# Make the FractFlow package importable when running from a source checkout
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..')))
+from FractFlow.tool_template import offload
+
+# Read tools run in worker threads so large reads do not stall other requests;
+# write tools stay on the event loop, which keeps edits to one file in order
 
 # Initialize MCP server
 mcp = FastMCP("file_io_tool")
@@ -66,7 +75,8 @@ def check_file_exists(file_path: str) -> Dict[str, Union[bool, str]]:
         }
 
 
-@mcp.tool()
+@mcp.tool(annotations=ToolAnnotations(readOnlyHint=True))
+@offload
 def get_total_line_count(file_path: str) -> Dict[str, Union[int, str, bool]]:
     """
     Counts the total number of lines in a text file.
@@ -126,7 +136,8 @@ def get_total_line_count(file_path: str) -> Dict[str, Union[int, str, bool]]:
         }
 
 
-@mcp.tool()
+@mcp.tool(annotations=ToolAnnotations(readOnlyHint=True))
+@offload
 def read_lines(file_path: str, start_line: int = 1, end_line: Optional[int] = None) -> Dict[str, Union[str, int, bool, List[str]]]:
     """
     Reads specific line range from a text file.
@@ -179,7 +190,7 @@ def read_lines(file_path: str, start_line: int = 1, end_line: Optional[int] = No
             }
             
         # Get file line count
-        line_count_result = get_total_line_count(path)
+        line_count_result = get_total_line_count.__wrapped__(path)
         if not line_count_result.get("success", False):
             return line_count_result
             
@@ -241,7 +252,8 @@ def read_lines(file_path: str, start_line: int = 1, end_line: Optional[int] = No
         }
 
 
-@mcp.tool()
+@mcp.tool(annotations=ToolAnnotations(readOnlyHint=True))
+@offload
 def read_file_in_chunks(file_path: str, chunk_size: int, 
                     overlap: int = 0, 
                     chunk_index: Optional[int] = None) -> Dict[str, Union[str, int, bool, List[Dict]]]:
@@ -324,7 +336,7 @@ def read_file_in_chunks(file_path: str, chunk_size: int,
             }
         
         # Get file line count
-        line_count_result = get_total_line_count(path)
+        line_count_result = get_total_line_count.__wrapped__(path)
         if not line_count_result.get("success", False):
             return line_count_result
             
@@ -371,7 +383,7 @@ def read_file_in_chunks(file_path: str, chunk_size: int,
                 }
                 
             chunk_info = chunks[chunk_index]
-            chunk_content = read_lines(path, chunk_info["start_line"], chunk_info["end_line"])
+            chunk_content = read_lines.__wrapped__(path, chunk_info["start_line"], chunk_info["end_line"])
             
             if not chunk_content.get("success", False):
                 return chunk_content
@@ -405,7 +417,8 @@ def read_file_in_chunks(file_path: str, chunk_size: int,
         }
 
 
-@mcp.tool()
+@mcp.tool(annotations=ToolAnnotations(readOnlyHint=True))
+@offload
 def read_with_line_numbers(file_path: str, start_line: int = 1, 
                                end_line: Optional[int] = None) -> Dict[str, Union[str, int, bool]]:
     """
@@ -440,7 +453,7 @@ def read_with_line_numbers(file_path: str, start_line: int = 1,
     """
     try:
         # First get the content without line numbers
-        result = read_lines(file_path, start_line, end_line)
+        result = read_lines.__wrapped__(file_path, start_line, end_line)
         
         if not result.get("success", False):
             return result
@@ -768,7 +781,8 @@ def delete_line(file_path: str, line_number: int) -> Dict[str, Union[bool, str,
         }
 
 
-@mcp.tool()
+@mcp.tool(annotations=ToolAnnotations(readOnlyHint=True))
+@offload
 def list_directory(dir_path: str) -> Dict[str, Union[bool, str, List[str]]]:
     """
     Lists files and directories in the specified directory.
@@ -3,7 +3,10 @@ from openai import OpenAI
 from mcp.server.fastmcp import FastMCP
 from typing import List
 import os
+import sys
 from dotenv import load_dotenv
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '../../..'))
+from FractFlow.infra.artifact_store import get_artifact_store
 
 # Load environment variables
 load_dotenv()
@@ -34,6 +37,19 @@ def normalize_path(path: str) -> str:
         
     return expanded_path
 
+def save_image(image_bytes: bytes, save_path: str, prompt: str) -> str:
+    """
+    Store a generated image in the artifact store and link it at save_path.
+    
+    Returns:
+        The saved path followed by the artifact handle in parentheses
+    """
+    store = get_artifact_store()
+    handle = store.put_bytes(image_bytes, os.path.splitext(save_path)[1].lower() or '.png', {
+        'producer': 'gpt_imagen', 'prompt': prompt
+    })
+    return f"{store.export(handle, save_path)} ({handle})"
+
 @mcp.tool()
 async def edit_image_with_gpt(
     save_path: str,
@@ -51,7 +67,8 @@ async def edit_image_with_gpt(
         image_paths: List of paths to reference images that will be used as input for editing
         
     Returns:
-        Image file path as a string where the generated image is saved
+        Image file path where the generated image is saved, followed by its
+        artifact handle in parentheses
         
     Example:
         To generate an image combining multiple character portraits:
@@ -92,10 +109,7 @@ async def edit_image_with_gpt(
         image_base64 = result.data[0].b64_json
         image_bytes = base64.b64decode(image_base64)
         
-        with open(save_path, "wb") as f:
-            f.write(image_bytes)
-            
-        return save_path
+        return save_image(image_bytes, save_path, prompt)
         
     finally:
         # Close all opened image files
@@ -116,7 +130,8 @@ async def create_image_with_gpt(
         prompt: Detailed text description of the image to generate
         
     Returns:
-        Image file path as a string where the generated image is saved
+        Image file path where the generated image is saved, followed by its
+        artifact handle in parentheses
         
     Example:
         To generate a children's book style illustration:
@@ -148,10 +163,7 @@ async def create_image_with_gpt(
         image_base64 = result.data[0].b64_json
         image_bytes = base64.b64decode(image_base64)
         
-        with open(save_path, "wb") as f:
-            f.write(image_bytes)
-            
-        return save_path
+        return save_image(image_bytes, save_path, prompt)
     except Exception as e:
         raise Exception(f"Failed to generate image: {str(e)}")
     finally:
@@ -1,13 +1,18 @@
+import io
 import os
+import sys
 import asyncio
 from typing import Any, Optional, List
 from mcp.server.fastmcp import FastMCP
+from mcp.types import ToolAnnotations
 from dotenv import load_dotenv
 import replicate
 import httpx
 from urllib.parse import urlparse
 import json
 from PIL import Image
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '../../..'))
+from FractFlow.infra.artifact_store import get_artifact_store
 
 # Load environment variables
 load_dotenv()
@@ -35,22 +40,27 @@ def normalize_path(path: str) -> str:
         
     return expanded_path
 
-async def download_file(url: str, save_path: str) -> None:
+async def download_file(url: str, save_path: str) -> str:
     """
-    Download a file from URL to local path.
+    Download a file from URL into the artifact store and link it at a local path.
     
     Args:
         url: The URL to download from
         save_path: Local path to save the file
+        
+    Returns:
+        The artifact handle of the file
     """
     async with httpx.AsyncClient() as client:
         response = await client.get(url)
         response.raise_for_status()
         
-        with open(save_path, 'wb') as f:
-            f.write(response.content)
+    store = get_artifact_store()
+    handle = store.put_bytes(response.content, os.path.splitext(save_path)[1].lower(), {'producer': 'grounding_dino'})
+    store.export(handle, save_path)
+    return handle
 
-@mcp.tool()
+@mcp.tool(annotations=ToolAnnotations(idempotentHint=True))
 async def detect_objects_with_grounding_dino(
     image_path: str,
     query: str,
@@ -126,7 +136,7 @@ async def detect_objects_with_grounding_dino(
         annotated_image_path = None
         if show_visualisation and output.get("result_image"):
             annotated_image_path = os.path.join(save_directory, "annotated_image.png")
-            await download_file(str(output["result_image"]), annotated_image_path)
+            annotated_handle = await download_file(str(output["result_image"]), annotated_image_path)
         
         # Format detection results
         detections = output.get("detections", [])
@@ -150,14 +160,14 @@ async def detect_objects_with_grounding_dino(
         result_text += f"Files saved to: {save_directory}\n"
         result_text += f"- Detection results: {results_file}\n"
         if annotated_image_path:
-            result_text += f"- Annotated image: {annotated_image_path}\n"
+            result_text += f"- Annotated image: {annotated_image_path} ({annotated_handle})\n"
         
         return result_text.strip()
         
     except Exception as e:
         return f"Error during object detection: {str(e)}"
 
-@mcp.tool()
+@mcp.tool(annotations=ToolAnnotations(idempotentHint=True))
 async def detect_and_crop_objects(
     image_path: str,
     query: str,
@@ -236,7 +246,9 @@ async def detect_and_crop_objects(
         image_width, image_height = original_image.size
         
         cropped_image_paths = []
+        cropped_artifacts = []
         detection_results = []
+        store = get_artifact_store()
         
         # Process each detection
         for i, detection in enumerate(detections, 1):
@@ -263,9 +275,15 @@ async def detect_and_crop_objects(
             crop_filename = f"{safe_label}_{i}_conf{confidence:.2f}.png"
             crop_path = os.path.join(save_directory, crop_filename)
             
-            # Save cropped image
-            cropped_image.save(crop_path)
+            # Save cropped image to the artifact store and link it into the save directory
+            buffer = io.BytesIO()
+            cropped_image.save(buffer, format="PNG")
+            handle = store.put_bytes(buffer.getvalue(), ".png", {
+                'producer': 'grounding_dino', 'label': label, 'source': image_path
+            })
+            store.export(handle, crop_path)
             cropped_image_paths.append(crop_path)
+            cropped_artifacts.append(handle)
             
             # Add detection info
             detection_results.append({
@@ -274,6 +292,7 @@ async def detect_and_crop_objects(
                 "confidence": confidence,
                 "bbox": bbox,
                 "cropped_image_path": crop_path,
+                "artifact": handle,
                 "crop_size": [x2 - x1, y2 - y1]
             })
         
@@ -284,6 +303,7 @@ async def detect_and_crop_objects(
             "total_detections": len(detections),
             "detections": detection_results,
             "cropped_images": cropped_image_paths,
+            "cropped_artifacts": cropped_artifacts,
             "save_directory": save_directory,
             "original_image": image_path
         }
@@ -297,6 +317,7 @@ async def detect_and_crop_objects(
             "query": query,
             "total_detections": len(detections),
             "cropped_images": cropped_image_paths,
+            "cropped_artifacts": cropped_artifacts,
             "detections": detection_results,
             "save_directory": save_directory,
             "results_file": results_file
@@ -2,11 +2,16 @@ import cv2
 import numpy as np
 import urllib.request
 import os
+import sys
 from uuid import uuid4
 from urllib.parse import urlparse
 
 from mcp.server.fastmcp import FastMCP
 
+# Make the FractFlow package importable when running from a source checkout
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..')))
+from FractFlow.tool_template import offload
+
 mcp = FastMCP("laplacian_blending")
 
 def load_image(path_or_url):
@@ -27,6 +32,7 @@ def load_image(path_or_url):
     return image
 
 @mcp.tool()
+@offload
 def laplacian_blending(path_A, path_B, path_mask, output_dir="output", levels=6):
     """Blend two images using Laplacian pyramid blending with a mask.
     
@@ -1,10 +1,13 @@
 import os
+import sys
 import asyncio
 from typing import Any
 from mcp.server.fastmcp import FastMCP
 from dotenv import load_dotenv
 import replicate
 import httpx
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '../../..'))
+from FractFlow.infra.artifact_store import get_artifact_store
 
 # Load environment variables
 load_dotenv()
@@ -32,20 +35,25 @@ def normalize_path(path: str) -> str:
         
     return expanded_path
 
-async def download_file(url: str, save_path: str) -> None:
+async def download_file(url: str, save_path: str) -> str:
     """
-    Download a file from URL to local path.
+    Download a file from URL into the artifact store and link it at a local path.
     
     Args:
         url: The URL to download from
         save_path: Local path to save the file
+        
+    Returns:
+        The artifact handle of the file
     """
     async with httpx.AsyncClient() as client:
         response = await client.get(url)
         response.raise_for_status()
         
-        with open(save_path, 'wb') as f:
-            f.write(response.content)
+    store = get_artifact_store()
+    handle = store.put_bytes(response.content, os.path.splitext(save_path)[1].lower(), {'producer': 'sam'})
+    store.export(handle, save_path)
+    return handle
 
 @mcp.tool()
 async def segment_anything_v2(
@@ -103,19 +111,18 @@ async def segment_anything_v2(
         
         # Download combined mask
         combined_mask_path = os.path.join(save_directory, "combined_mask.png")
-        await download_file(str(output["combined_mask"]), combined_mask_path)
+        combined_handle = await download_file(str(output["combined_mask"]), combined_mask_path)
         
         # Download individual masks
-        individual_mask_paths = []
+        individual_masks = []
         for i, mask_file in enumerate(output["individual_masks"]):
             mask_path = os.path.join(save_directory, f"mask_{i}.png")
-            await download_file(str(mask_file), mask_path)
-            individual_mask_paths.append(mask_path)
+            individual_masks.append((mask_path, await download_file(str(mask_file), mask_path)))
         
-        # Return specific file paths
-        result = f"Segmentation completed!\nCombined mask: {combined_mask_path}\nIndividual masks ({len(individual_mask_paths)} files):\n"
-        for mask_path in individual_mask_paths:
-            result += f"- {mask_path}\n"
+        # Return specific file paths with their artifact handles
+        result = f"Segmentation completed!\nCombined mask: {combined_mask_path} ({combined_handle})\nIndividual masks ({len(individual_masks)} files):\n"
+        for mask_path, handle in individual_masks:
+            result += f"- {mask_path} ({handle})\n"
         
         return result.strip()
         
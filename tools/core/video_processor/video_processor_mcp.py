@@ -1,8 +1,15 @@
 import os
+import sys
+import shutil
 import tempfile
 from typing import List, Optional
 from pathlib import Path
 from mcp.server.fastmcp import FastMCP
+
+# Make the FractFlow package importable when running from a source checkout
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..')))
+from FractFlow.tool_template import offload
+from FractFlow.infra.artifact_store import get_artifact_store
 from dotenv import load_dotenv
 import subprocess
 import json
@@ -45,7 +52,8 @@ def ensure_output_dir(output_path: str) -> str:
 
 
 @mcp.tool()
-async def concatenate_videos(video_paths: List[str], output_path: str, transition_duration: float = 0.5) -> str:
+@offload
+def concatenate_videos(video_paths: List[str], output_path: str, transition_duration: float = 0.5) -> str:
     """
     拼接多个视频文件
     
@@ -125,16 +133,18 @@ async def concatenate_videos(video_paths: List[str], output_path: str, transitio
         for clip in clips:
             clip.close()
         
-        return f"Successfully concatenated {len(video_paths)} videos to: {output_path}"
+        handle = get_artifact_store().publish(output_path, {'producer': 'video_processor', 'op': 'concatenate'})
+        return f"Successfully concatenated {len(video_paths)} videos to: {output_path} ({handle})"
         
     except Exception as e:
         return f"Error concatenating videos: {str(e)}"
 
 
 @mcp.tool()
-async def add_transitions(video_paths: List[str], transition_type: str = "fade", duration: float = 0.5) -> str:
+@offload
+def add_transitions(video_paths: List[str], transition_type: str = "fade", duration: float = 0.5) -> str:
     """
-    为视频列表添加过渡效果，生成带过渡的临时文件
+    为视频列表添加过渡效果，生成的片段保存在产物存储中
     
     Args:
         video_paths: 视频文件路径列表
@@ -142,7 +152,7 @@ async def add_transitions(video_paths: List[str], transition_type: str = "fade",
         duration: 过渡时长（秒）
     
     Returns:
-        处理后的视频文件路径信息
+        处理后视频片段的产物句柄
     """
     try:
         ensure_moviepy()
@@ -195,7 +205,10 @@ async def add_transitions(video_paths: List[str], transition_type: str = "fade",
                     logger=None
                 )
                 
-                processed_paths.append(output_path)
+                # 片段移入产物存储，之后的工具直接使用句柄
+                processed_paths.append(get_artifact_store().put_file(
+                    output_path, {'producer': 'video_processor', 'op': 'transition', 'source': path}, move=True
+                ))
                 
                 # 清理资源
                 processed_clip.close()
@@ -204,11 +217,12 @@ async def add_transitions(video_paths: List[str], transition_type: str = "fade",
             except Exception as e:
                 return f"Error processing video {path}: {str(e)}"
         
+        shutil.rmtree(temp_dir, ignore_errors=True)
+        
         result = f"Successfully added {transition_type} transitions to {len(video_paths)} videos.\n"
-        result += f"Temporary files created in: {temp_dir}\n"
-        result += "Processed files:\n"
-        for path in processed_paths:
-            result += f"- {path}\n"
+        result += "Processed files (artifact handles, usable wherever a video path is expected):\n"
+        for handle in processed_paths:
+            result += f"- {handle}\n"
         
         return result
         
@@ -217,7 +231,8 @@ async def add_transitions(video_paths: List[str], transition_type: str = "fade",
 
 
 @mcp.tool()
-async def convert_format(input_path: str, output_path: str, format: str = "mp4", quality: str = "high") -> str:
+@offload
+def convert_format(input_path: str, output_path: str, format: str = "mp4", quality: str = "high") -> str:
     """
     转换视频格式
     
@@ -279,14 +294,16 @@ async def convert_format(input_path: str, output_path: str, format: str = "mp4",
         # 清理资源
         clip.close()
         
-        return f"Successfully converted {input_path} to {format} format: {output_path}"
+        handle = get_artifact_store().publish(output_path, {'producer': 'video_processor', 'op': 'convert', 'format': format})
+        return f"Successfully converted {input_path} to {format} format: {output_path} ({handle})"
         
     except Exception as e:
         return f"Error converting video format: {str(e)}"
 
 
 @mcp.tool()
-async def optimize_quality(input_path: str, output_path: str, target_size_mb: Optional[int] = None) -> str:
+@offload
+def optimize_quality(input_path: str, output_path: str, target_size_mb: Optional[int] = None) -> str:
     """
     优化视频质量和大小
     
@@ -347,7 +364,8 @@ async def optimize_quality(input_path: str, output_path: str, target_size_mb: Op
         result += f"Original size: {original_size:.2f} MB\n"
         result += f"Optimized size: {output_size:.2f} MB\n"
         result += f"Compression: {compression_ratio:.1f}%\n"
-        result += f"Output: {output_path}"
+        handle = get_artifact_store().publish(output_path, {'producer': 'video_processor', 'op': 'optimize'})
+        result += f"Output: {output_path} ({handle})"
         
         return result
         
@@ -1,6 +1,7 @@
 from typing import List, Dict, Optional, Any
 import os
 from mcp.server.fastmcp import FastMCP
+from mcp.types import ToolAnnotations
 from openai import OpenAI
 from dotenv import load_dotenv
 load_dotenv()
@@ -55,7 +56,7 @@ def load_image(image_path: str, size_limit: tuple[int, int] = (512, 512)) -> tup
     base64_image = encode_image(image, size_limit)
     return base64_image, meta_info
 
-@mcp.tool()
+@mcp.tool(annotations=ToolAnnotations(idempotentHint=True))
 async def Visual_Question_Answering(image_path: str, prompt: str) -> str:
     '''
     This tool uses Qwen-VL-Plus model to perform visual question answering or image analysis.
@@ -90,7 +91,7 @@ async def Visual_Question_Answering(image_path: str, prompt: str) -> str:
     )
     return completion.choices[0].message.content
 
-@mcp.tool()
+@mcp.tool(annotations=ToolAnnotations(idempotentHint=True))
 async def Visual_Question_Answering_Multiple_Images(image_paths: List[str], prompt: str) -> str:
     '''
     This tool uses Qwen-VL-Plus model to perform visual question answering or image analysis on multiple images.
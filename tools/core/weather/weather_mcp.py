@@ -7,6 +7,7 @@ Provides tools for retrieving weather forecasts, alerts, and assessing running c
 from typing import Any, Dict
 import httpx
 from mcp.server.fastmcp import FastMCP
+from mcp.types import ToolAnnotations
 
 # Initialize FastMCP server
 mcp = FastMCP("weather")
@@ -40,7 +41,7 @@ Description: {props.get('description', 'No description available')}
 Instructions: {props.get('instruction', 'No specific instructions provided')}
 """
 
-@mcp.tool()
+@mcp.tool(annotations=ToolAnnotations(readOnlyHint=True))
 async def get_alerts(state: str) -> str:
     """Get weather alerts for a US state.
 
@@ -59,7 +60,7 @@ async def get_alerts(state: str) -> str:
     alerts = [format_alert(feature) for feature in data["features"]]
     return "\n---\n".join(alerts)
 
-@mcp.tool()
+@mcp.tool(annotations=ToolAnnotations(readOnlyHint=True))
 async def get_forecast(latitude: float, longitude: float) -> str:
     """Get weather forecast for a location.
 
@@ -95,7 +96,7 @@ Forecast: {period['detailedForecast']}
 
     return "\n---\n".join(forecasts)
 
-@mcp.tool()
+@mcp.tool(annotations=ToolAnnotations(readOnlyHint=True))
 async def assess_running_condition(weather: Dict[str, Any]) -> str:
     """评估天气条件是否适合跑步。
     
@@ -15,6 +15,7 @@ License: MIT License
 """
 
 from mcp.server.fastmcp import FastMCP
+from mcp.types import ToolAnnotations
 import sys
 from pathlib import Path
 import os
@@ -30,7 +31,7 @@ from src.core_logic import web_search_and_browse, crawl, MAX_CONTENT_LENGTH
 # Initialize MCP server
 mcp = FastMCP("web_search_browse_tool")
 
-@mcp.tool()
+@mcp.tool(annotations=ToolAnnotations(readOnlyHint=True))
 async def search_and_browse(query: str, search_engine: str = "duckduckgo", num_results: int = 5, 
                            max_browse: int = 1, max_length: int = 40000) -> str:
     """
@@ -69,7 +70,7 @@ async def search_and_browse(query: str, search_engine: str = "duckduckgo", num_r
     """
     return await web_search_and_browse(query, search_engine, num_results, max_browse, max_length)
 
-@mcp.tool()
+@mcp.tool(annotations=ToolAnnotations(readOnlyHint=True))
 async def web_crawl(url: str, max_length: int = 40000) -> str:
     """
     爬取网页内容
@@ -105,5 +106,6 @@ async def web_crawl(url: str, max_length: int = 40000) -> str:
         return f"网址: {result['url']}\n\n内容:\n{result['content']}"
 
 # If this module is run directly, start the MCP server
+# (pass --http to serve many agents over streamable HTTP; bind with FASTMCP_HOST/FASTMCP_PORT)
 if __name__ == "__main__":
-    mcp.run(transport="stdio") 
\ No newline at end of file
+    mcp.run(transport="streamable-http" if "--http" in sys.argv else "stdio") 
\ No newline at end of file
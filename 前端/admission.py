@@ -0,0 +1,171 @@
+"""
+网关的准入控制与背压
+
+每类请求（对话、语音合成）有全局并发上限和有界的 FIFO 等待队列：
+- 并发已满时请求进入队列排队，排队超过 queue_timeout（排队时间 SLO）则拒绝
+- 队列已满时立即拒绝
+- 同一会话同时只能有 session_limit 个请求在处理或排队
+拒绝时抛出 429 HTTPException，并按近期平均处理时间估算 Retry-After，
+流量高峰时快速拒绝少量请求，而不是让所有请求都变慢。
+"""
+
+from __future__ import annotations
+
+import math
+import time
+import asyncio
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, Deque, Dict, Optional
+
+from fastapi import HTTPException
+
+class AdmissionController:
+    """一类请求的并发上限、等待队列和按会话的在途请求限制"""
+
+    def __init__(self, name: str, max_concurrent: int, max_queue: int = 32,
+                 queue_timeout: float = 10.0, session_limit: int = 1):
+        """
+        Args:
+            name: 请求类别名称，用于错误信息和统计
+            max_concurrent: 同时处理的请求上限
+            max_queue: 等待队列长度上限，0 表示并发已满时直接拒绝
+            queue_timeout: 最长排队时间（秒），超过后拒绝
+            session_limit: 同一会话同时处理或排队的请求上限，0 表示不限制
+        """
+        self.name = name
+        self.max_concurrent = max(1, max_concurrent)
+        self.max_queue = max(0, max_queue)
+        self.queue_timeout = queue_timeout
+        self.session_limit = session_limit
+        self._running = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._sessions: Dict[str, int] = {}
+        # 近期平均处理时间和排队时间（指数滑动平均，秒）
+        self._service_time = 1.0
+        self._queue_time = 0.0
+        self.stats = {"admitted": 0, "queued_total": 0, "rejected_full": 0,
+                      "rejected_timeout": 0, "rejected_session": 0}
+
+    def retry_after(self) -> int:
+        """估算排队请求全部开始处理所需的秒数"""
+        backlog = len(self._waiters) + 1
+        return max(1, math.ceil(self._service_time * backlog / self.max_concurrent))
+
+    def _reject(self, reason: str, counter: str, retry_after: Optional[int] = None) -> HTTPException:
+        self.stats[counter] += 1
+        return HTTPException(
+            status_code=429,
+            detail=f"{self.name}: {reason}",
+            headers={"Retry-After": str(retry_after or self.retry_after())},
+        )
+
+    async def acquire(self, session_id: Optional[str] = None) -> Callable[[], None]:
+        """
+        获取一个处理名额，必要时排队
+
+        Args:
+            session_id: 请求所属会话，用于按会话限制在途请求
+
+        Returns:
+            释放名额的函数（可重复调用）
+
+        Raises:
+            HTTPException: 429，会话已有请求在处理、队列已满或排队超时
+        """
+        if session_id is not None and self.session_limit and self._sessions.get(session_id, 0) >= self.session_limit:
+            raise self._reject("该会话已有请求在处理", "rejected_session", retry_after=1)
+
+        if session_id is not None:
+            self._sessions[session_id] = self._sessions.get(session_id, 0) + 1
+        try:
+            await self._wait_for_slot()
+        except BaseException:
+            self._leave_session(session_id)
+            raise
+
+        self.stats["admitted"] += 1
+        started = time.monotonic()
+        released = False
+
+        def release() -> None:
+            nonlocal released
+            if released:
+                return
+            released = True
+            self._service_time = 0.8 * self._service_time + 0.2 * (time.monotonic() - started)
+            self._leave_session(session_id)
+            self._release()
+        return release
+
+    async def _wait_for_slot(self) -> None:
+        """占用一个名额，并发已满时排队"""
+        if self._running < self.max_concurrent and not self._waiters:
+            self._running += 1
+        else:
+            if len(self._waiters) >= self.max_queue:
+                raise self._reject("服务繁忙，请稍后重试", "rejected_full")
+            self.stats["queued_total"] += 1
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            queued = time.monotonic()
+            try:
+                await asyncio.wait({waiter}, timeout=self.queue_timeout)
+            except BaseException:
+                self._abandon(waiter)
+                raise
+            if not waiter.done():
+                self._abandon(waiter)
+                raise self._reject("排队超时，请稍后重试", "rejected_timeout")
+            self._queue_time = 0.8 * self._queue_time + 0.2 * (time.monotonic() - queued)
+
+    def _leave_session(self, session_id: Optional[str]) -> None:
+        if session_id is None:
+            return
+        remaining = self._sessions.get(session_id, 1) - 1
+        if remaining > 0:
+            self._sessions[session_id] = remaining
+        else:
+            self._sessions.pop(session_id, None)
+
+    def _abandon(self, waiter: asyncio.Future) -> None:
+        """放弃排队；若名额恰好已分配给该请求，则交还"""
+        if waiter.done() and not waiter.cancelled():
+            self._release()
+            return
+        waiter.cancel()
+        try:
+            self._waiters.remove(waiter)
+        except ValueError:
+            pass
+
+    def _release(self) -> None:
+        """归还名额，直接交给队首的等待者"""
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self._running -= 1
+
+    @asynccontextmanager
+    async def slot(self, session_id: Optional[str] = None) -> AsyncIterator[None]:
+        """在一个处理名额内执行代码块（见 acquire）"""
+        release = await self.acquire(session_id)
+        try:
+            yield
+        finally:
+            release()
+
+    def metrics(self) -> Dict[str, Any]:
+        """当前并发、排队长度、平均排队/处理时间和拒绝计数"""
+        return {
+            "running": self._running,
+            "queued": len(self._waiters),
+            "maxConcurrent": self.max_concurrent,
+            "maxQueue": self.max_queue,
+            "queueTimeout": self.queue_timeout,
+            "avgQueueSeconds": round(self._queue_time, 3),
+            "avgServiceSeconds": round(self._service_time, 3),
+            **self.stats,
+        }
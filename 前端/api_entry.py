@@ -7,7 +7,8 @@ HKUST(GZ) AI Assistant API入口
 import asyncio
 import os
 import sys
-from typing import Dict, Any, Optional
+from contextlib import aclosing
+from typing import Dict, Any, Optional, AsyncIterator
 
 # 确保项目根目录在Python路径中
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -31,9 +32,32 @@ except ModuleNotFoundError:
 class HKUSTAssistantAPI:
     """HKUST AI Assistant API接口"""
     
-    def __init__(self):
+    def __init__(self, session_id: Optional[str] = None):
+        """
+        Args:
+            session_id: 会话ID，切换模式时沿用同一会话的对话历史
+        """
+        self.session_id = session_id
         self.assistant: Optional[HKUSTAIAssistant] = None
     
+    async def _enter_mode(self, mode: AssistantMode) -> Dict[str, Any]:
+        """
+        进入指定模式：已有助手时切换模式，复用已启动的各模式Agent和工具进程，对话上下文保持不变
+        
+        Args:
+            mode: 助手模式
+            
+        Returns:
+            初始化或切换结果
+        """
+        if self.assistant and self.assistant.is_initialized:
+            result = await self.assistant.switch_mode(mode)
+        else:
+            self.assistant = HKUSTAIAssistant(mode, session_id=self.session_id)
+            result = await self.assistant.initialize()
+        self.session_id = self.assistant.session_id
+        return result
+    
     async def start_academic_mode(self) -> Dict[str, Any]:
         """
         启动学术问答模式
@@ -42,11 +66,7 @@ class HKUSTAssistantAPI:
             启动结果
         """
         try:
-            if self.assistant:
-                await self.assistant.shutdown()
-            
-            self.assistant = HKUSTAIAssistant(AssistantMode.ACADEMIC_QA)
-            result = await self.assistant.initialize()
+            result = await self._enter_mode(AssistantMode.ACADEMIC_QA)
             
             return {
                 "success": True,
@@ -70,11 +90,7 @@ class HKUSTAssistantAPI:
             启动结果
         """
         try:
-            if self.assistant:
-                await self.assistant.shutdown()
-            
-            self.assistant = HKUSTAIAssistant(AssistantMode.VOICE_INTERACTION)
-            result = await self.assistant.initialize()
+            result = await self._enter_mode(AssistantMode.VOICE_INTERACTION)
             
             return {
                 "success": True,
@@ -104,11 +120,7 @@ class HKUSTAssistantAPI:
             启动结果
         """
         try:
-            if self.assistant:
-                await self.assistant.shutdown()
-            
-            self.assistant = HKUSTAIAssistant(AssistantMode.MANUAL_INTERRUPT)
-            result = await self.assistant.initialize()
+            result = await self._enter_mode(AssistantMode.MANUAL_INTERRUPT)
             
             return {
                 "success": True,
@@ -165,6 +177,45 @@ class HKUSTAssistantAPI:
                 "message": "处理消息时出现错误"
             }
     
+    async def stream_message(self, message: str, heartbeat: Optional[float] = None) -> AsyncIterator[Dict[str, Any]]:
+        """
+        处理用户消息并逐步返回进度事件
+        
+        Args:
+            message: 用户输入的消息
+            heartbeat: 无事件时每隔多少秒产生一个 heartbeat 事件
+            
+        Yields:
+            事件字典：token、tool_start、tool_end、heartbeat，最后为 final（或 error）
+        """
+        if not self.assistant or not self.assistant.is_initialized:
+            yield {"type": "error", "content": "助手尚未初始化，请先选择模式"}
+            return
+        
+        async with aclosing(self.assistant.stream_query(message, heartbeat=heartbeat)) as stream:
+            async for event in stream:
+                if event["type"] == "final":
+                    event["mode"] = self.assistant.mode.value
+                yield event
+    
+    async def get_history(self, limit: int = 50, before: Optional[int] = None) -> Dict[str, Any]:
+        """
+        获取当前会话的历史消息
+        
+        Args:
+            limit: 最多返回的消息数（最近的消息）
+            before: 只返回该位置之前的消息（用于向前翻页）
+            
+        Returns:
+            会话ID和消息列表
+        """
+        messages = self.assistant.get_history(limit=limit, before=before) if self.assistant else []
+        return {
+            "success": True,
+            "sessionId": self.session_id,
+            "messages": messages
+        }
+    
     async def get_status(self) -> Dict[str, Any]:
         """
         获取当前状态
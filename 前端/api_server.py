@@ -1,16 +1,28 @@
 from __future__ import annotations
 
 import os
+import json
+import time
 import uuid
+import asyncio
+import logging
+from collections import OrderedDict
+from contextlib import aclosing, suppress
 from pathlib import Path
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 
-from fastapi import FastAPI, UploadFile, File, HTTPException, BackgroundTasks
+from fastapi import FastAPI, UploadFile, File, HTTPException, Query, Request, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, StreamingResponse
 from pydantic import BaseModel
 
-from .api_entry import get_api, HKUSTAssistantAPI  # 业务逻辑层
+from .api_entry import HKUSTAssistantAPI  # 业务逻辑层
+from .admission import AdmissionController
+from .tts_cache import TTSCache, tts_cache_key
+from FractFlow.conversation.history_store import get_history_store
+from FractFlow.mcpcore.single_flight import SingleFlight
+
+logger = logging.getLogger(__name__)
 
 # ---------------------------------------------
 # 常量配置
@@ -22,6 +34,23 @@ AUDIO_DIR = STATIC_DIR / "audio"
 # 确保静态目录存在
 AUDIO_DIR.mkdir(parents=True, exist_ok=True)
 
+# 会话容量：每个会话持有一个 Agent 及其工具进程，超出上限时关闭最久未使用的会话
+MAX_SESSIONS = int(os.getenv("FRACTFLOW_MAX_SESSIONS", "32"))
+# 会话空闲多少秒后关闭（对话历史已持久化，再次访问时自动恢复），0 表示不超时
+SESSION_IDLE_TIMEOUT = float(os.getenv("FRACTFLOW_SESSION_IDLE_TIMEOUT", "1800"))
+# 流式接口在无事件时发送心跳的间隔（秒）
+STREAM_HEARTBEAT = float(os.getenv("FRACTFLOW_STREAM_HEARTBEAT", "15"))
+# 准入控制：全局并发上限、等待队列长度、最长排队时间（秒）和每个会话的在途请求数，超出时返回 429
+MAX_CONCURRENT_CHATS = int(os.getenv("FRACTFLOW_MAX_CONCURRENT_CHATS", "8"))
+MAX_CONCURRENT_TTS = int(os.getenv("FRACTFLOW_MAX_CONCURRENT_TTS", "4"))
+MAX_CONCURRENT_STT = int(os.getenv("FRACTFLOW_MAX_CONCURRENT_STT", "16"))
+ADMISSION_QUEUE_SIZE = int(os.getenv("FRACTFLOW_ADMISSION_QUEUE_SIZE", "32"))
+ADMISSION_QUEUE_TIMEOUT = float(os.getenv("FRACTFLOW_ADMISSION_QUEUE_TIMEOUT", "10"))
+SESSION_MAX_IN_FLIGHT = int(os.getenv("FRACTFLOW_SESSION_MAX_IN_FLIGHT", "1"))
+# 语音合成缓存：按 (文本, 音色, 语速) 缓存音频，目录为空时使用 ~/.cache/fractflow/tts，超过上限（MB）时按 LRU 删除
+TTS_CACHE_DIR = os.getenv("FRACTFLOW_TTS_CACHE_DIR", "")
+TTS_CACHE_MB = int(os.getenv("FRACTFLOW_TTS_CACHE_MB", "512"))
+
 # ---------------------------------------------
 # Pydantic 请求/响应模型（严格遵守用户定义）
 # ---------------------------------------------
@@ -33,12 +62,18 @@ class ChatResponse(BaseModel):
     response: str
     sessionId: str
 
+class HistoryResponse(BaseModel):
+    sessionId: str
+    messages: list[Dict[str, Any]]
+    total: int
+
 class STTResponse(BaseModel):
     text: str
 
 class TTSRequest(BaseModel):
     text: str
     language: str | None = "zh-CN"
+    rate: str | None = "+0%"
 
 class TTSResponse(BaseModel):
     audioUrl: str
@@ -64,28 +99,167 @@ app.mount("/static", StaticFiles(directory=str(STATIC_DIR)), name="static")
 # ---------------------------------------------
 # Session 管理器
 # ---------------------------------------------
-class SessionManager:
-    """简单的 sessionId -> HKUSTAssistantAPI 单例映射"""
-    def __init__(self):
-        self._sessions: Dict[str, HKUSTAssistantAPI] = {}
+class _Session:
+    """一个活跃会话：API 实例、最近使用时间和正在处理的请求数"""
+    def __init__(self, api: HKUSTAssistantAPI):
+        self.api = api
+        self.created = time.time()
+        self.last_used = self.created
+        self.in_flight = 0
 
-    def get_assistant(self, session_id: str) -> HKUSTAssistantAPI:
-        if session_id not in self._sessions:
-            self._sessions[session_id] = get_api()
-        return self._sessions[session_id]
+class SessionManager:
+    """
+    sessionId -> HKUSTAssistantAPI 映射，容量有限
+
+    - 超过 max_sessions 时关闭最久未使用的空闲会话（LRU），同时关闭其 Agent 的工具进程
+    - 空闲超过 idle_timeout 秒的会话由后台任务关闭
+    - 对话历史按 sessionId 持久化，被关闭的会话再次访问时从历史恢复
+    """
+    def __init__(self, max_sessions: int = MAX_SESSIONS, idle_timeout: float = SESSION_IDLE_TIMEOUT):
+        self.max_sessions = max(1, max_sessions)
+        self.idle_timeout = idle_timeout
+        self._sessions: "OrderedDict[str, _Session]" = OrderedDict()
+        self._lock = asyncio.Lock()
+        self._reaper: Optional[asyncio.Task] = None
+        self.stats = {"created": 0, "resumed": 0, "evicted_lru": 0, "evicted_idle": 0}
+
+    async def acquire(self, session_id: str) -> HKUSTAssistantAPI:
+        """获取（必要时创建或恢复）会话并标记为使用中，用完后必须调用 release()"""
+        async with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                if await asyncio.to_thread(get_history_store().count, session_id):
+                    self.stats["resumed"] += 1
+                else:
+                    self.stats["created"] += 1
+                session = _Session(HKUSTAssistantAPI(session_id))
+                self._sessions[session_id] = session
+            self._sessions.move_to_end(session_id)
+            session.in_flight += 1
+            session.last_used = time.time()
+            victims = self._pop_lru()
+        await self._shutdown(victims)
+        return session.api
+
+    def release(self, session_id: str) -> None:
+        session = self._sessions.get(session_id)
+        if session is not None:
+            session.in_flight = max(0, session.in_flight - 1)
+            session.last_used = time.time()
 
     def create_session(self) -> str:
-        session_id = str(uuid.uuid4())
-        self._sessions[session_id] = get_api()
-        return session_id
+        return str(uuid.uuid4())
+
+    def _pop_lru(self) -> list[HKUSTAssistantAPI]:
+        """移除超出容量的最久未使用会话（跳过正在处理请求的会话）"""
+        victims = []
+        for session_id in list(self._sessions):
+            if len(self._sessions) <= self.max_sessions:
+                break
+            if self._sessions[session_id].in_flight == 0:
+                victims.append(self._sessions.pop(session_id).api)
+                self.stats["evicted_lru"] += 1
+        return victims
+
+    async def evict_idle(self) -> int:
+        """关闭空闲超时的会话，返回关闭数量"""
+        if not self.idle_timeout:
+            return 0
+        deadline = time.time() - self.idle_timeout
+        async with self._lock:
+            expired = [session_id for session_id, session in self._sessions.items()
+                       if session.in_flight == 0 and session.last_used < deadline]
+            victims = [self._sessions.pop(session_id).api for session_id in expired]
+            self.stats["evicted_idle"] += len(victims)
+        await self._shutdown(victims)
+        return len(victims)
+
+    async def _shutdown(self, apis: list[HKUSTAssistantAPI]) -> None:
+        for api in apis:
+            try:
+                await api.shutdown()
+            except Exception:
+                pass
+
+    def start(self) -> None:
+        """启动空闲会话回收任务"""
+        if self.idle_timeout and self._reaper is None:
+            self._reaper = asyncio.create_task(self._reap())
+
+    async def _reap(self) -> None:
+        interval = min(60.0, max(1.0, self.idle_timeout / 4))
+        while True:
+            await asyncio.sleep(interval)
+            await self.evict_idle()
+
+    @staticmethod
+    def _tools_rss(agents: list) -> int:
+        """一个会话的工具进程内存占用（扫描进程树，较慢）"""
+        # 各模式的Agent可能共用同一工具进程，按进程号去重
+        processes = {}
+        for agent in agents:
+            for samples in agent.resource_report().values():
+                for sample in samples:
+                    processes[sample.get("pid")] = sample.get("rss", 0)
+        processes.pop(None, None)
+        return sum(processes.values())
+
+    async def metrics(self) -> Dict[str, Any]:
+        """活跃会话数、淘汰计数以及网关和各会话工具进程的内存占用；进程扫描在工作线程中进行"""
+        import psutil
+        now = time.time()
+        # 会话和 Agent 列表在事件循环中取快照，工作线程只做测量
+        snapshot = []
+        for session_id, session in self._sessions.items():
+            assistant = session.api.assistant
+            agents = list(assistant.agents.values()) if assistant is not None and assistant.is_initialized else []
+            snapshot.append((session_id, session, agents))
+
+        def measure():
+            return ([self._tools_rss(agents) for _, _, agents in snapshot],
+                    psutil.Process().memory_info().rss)
+
+        tools_rss, gateway_rss = await asyncio.to_thread(measure)
+        sessions = [{
+            "sessionId": session_id,
+            "idleSeconds": round(now - session.last_used, 1),
+            "inFlight": session.in_flight,
+            "toolsRss": rss,
+        } for (session_id, session, _), rss in zip(snapshot, tools_rss)]
+        return {
+            "activeSessions": len(self._sessions),
+            "maxSessions": self.max_sessions,
+            "idleTimeout": self.idle_timeout,
+            "gatewayRss": gateway_rss,
+            "toolsRss": sum(tools_rss),
+            **self.stats,
+            "sessions": sessions,
+        }
 
     async def shutdown_all(self):
-        for api in self._sessions.values():
-            await api.shutdown()
-        self._sessions.clear()
+        if self._reaper is not None:
+            self._reaper.cancel()
+            self._reaper = None
+        async with self._lock:
+            victims = [session.api for session in self._sessions.values()]
+            self._sessions.clear()
+        await self._shutdown(victims)
 
 session_manager = SessionManager()
 
+chat_admission = AdmissionController(
+    "chat", MAX_CONCURRENT_CHATS, ADMISSION_QUEUE_SIZE, ADMISSION_QUEUE_TIMEOUT, SESSION_MAX_IN_FLIGHT
+)
+tts_admission = AdmissionController(
+    "text-to-speech", MAX_CONCURRENT_TTS, ADMISSION_QUEUE_SIZE, ADMISSION_QUEUE_TIMEOUT, session_limit=0
+)
+stt_admission = AdmissionController(
+    "speech-to-text", MAX_CONCURRENT_STT, ADMISSION_QUEUE_SIZE, ADMISSION_QUEUE_TIMEOUT, session_limit=0
+)
+tts_cache = TTSCache(TTS_CACHE_DIR or None, TTS_CACHE_MB * 1024 ** 2)
+# 相同内容的并发合成请求共用一次合成
+tts_flights = SingleFlight()
+
 # ---------------------------------------------
 # API 路由实现
 # ---------------------------------------------
@@ -93,72 +267,257 @@ session_manager = SessionManager()
 async def chat_endpoint(payload: ChatRequest):
     # 获取或创建 session
     session_id = payload.sessionId or session_manager.create_session()
-    assistant_api = session_manager.get_assistant(session_id)
-
-    # 确保默认学术模式已初始化
-    if not assistant_api.assistant:
-        await assistant_api.start_academic_mode()
+    async with chat_admission.slot(session_id):
+        assistant_api = await session_manager.acquire(session_id)
+        try:
+            # 确保默认学术模式已初始化
+            if not assistant_api.assistant:
+                await assistant_api.start_academic_mode()
 
-    result = await assistant_api.process_message(payload.message)
+            result = await assistant_api.process_message(payload.message)
+        finally:
+            session_manager.release(session_id)
     if not result["success"]:
         raise HTTPException(status_code=500, detail=result["message"])
 
     return ChatResponse(response=result["response"], sessionId=session_id)
 
-@app.post("/api/speech-to-text", response_model=STTResponse)
-async def speech_to_text_endpoint(
-    sampleRate: int | None = 16000,
-    audioData: UploadFile = File(...),
-):
-    # 保存上传的文件到临时目录
-    temp_wav = AUDIO_DIR / f"input_{uuid.uuid4()}.wav"
+async def _chat_events(session_id: str, message: str):
+    """一次对话的事件流：session、token、tool_start、tool_end、heartbeat，最后为 final 或 error；提前关闭即取消查询"""
+    assistant_api = await session_manager.acquire(session_id)
     try:
-        with temp_wav.open("wb") as f:
-            f.write(await audioData.read())
-
-        # TODO: 在此接入真正的 ASR 模型；目前返回占位符文本
-        # 为了示例，简单返回文件名
-        recognized_text = "(placeholder)"
-
-        return STTResponse(text=recognized_text)
+        yield {"type": "session", "sessionId": session_id}
+        if not assistant_api.assistant:
+            await assistant_api.start_academic_mode()
+        async with aclosing(assistant_api.stream_message(message, heartbeat=STREAM_HEARTBEAT)) as events:
+            async for event in events:
+                yield event
     finally:
-        if temp_wav.exists():
-            temp_wav.unlink(missing_ok=True)
+        session_manager.release(session_id)
 
-@app.post("/api/text-to-speech", response_model=TTSResponse)
-async def text_to_speech_endpoint(payload: TTSRequest, background_tasks: BackgroundTasks):
-    # 生成唯一文件名
-    audio_filename = f"tts_{uuid.uuid4()}.mp3"
-    audio_path = AUDIO_DIR / audio_filename
+class _AdmittedStreamingResponse(StreamingResponse):
+    """持有准入名额的流式响应：无论正常结束、客户端断开还是出错，名额都只在这里归还一次"""
 
-    # 使用 edge_tts 直接生成语音文件，避免依赖 pygame
-    import edge_tts
+    def __init__(self, content, release, **kwargs):
+        super().__init__(content, **kwargs)
+        self._release = release
 
-    voice_map = {
-        "zh-CN": "zh-CN-XiaoyiNeural",
-        "en-US": "en-US-AnaNeural",
-        "ja-JP": "ja-JP-NanamiNeural",
-        "fr-FR": "fr-FR-DeniseNeural",
-        "es-ES": "ca-ES-JoanaNeural",
-        "de-DE": "de-DE-KatjaNeural",
-    }
-    voice = voice_map.get(payload.language, "zh-CN-XiaoyiNeural")
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self._release()
 
-    communicate = edge_tts.Communicate(payload.text, voice)
-    await communicate.save(str(audio_path))
+@app.post("/api/chat/stream")
+async def chat_stream_endpoint(payload: ChatRequest, request: Request):
+    """SSE 流式对话；客户端断开时停止服务端的查询和工具调用"""
+    session_id = payload.sessionId or session_manager.create_session()
+    # 在返回响应前完成准入，拒绝时客户端收到正常的 429 响应
+    release = await chat_admission.acquire(session_id)
+
+    async def event_stream():
+        async with aclosing(_chat_events(session_id, payload.message)) as events:
+            async for event in events:
+                if await request.is_disconnected():
+                    break
+                if event["type"] == "heartbeat":
+                    # SSE 注释行，保持连接并让代理不超时
+                    yield ": heartbeat\n\n"
+                else:
+                    yield f"event: {event['type']}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
+
+    return _AdmittedStreamingResponse(
+        event_stream(),
+        release,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+async def _forward_events(websocket: WebSocket, session_id: str, message: str):
+    try:
+        release = await chat_admission.acquire(session_id)
+    except HTTPException as e:
+        await websocket.send_json({
+            "type": "error", "status": e.status_code, "content": e.detail,
+            "retryAfter": int(e.headers["Retry-After"]),
+        })
+        return
+    try:
+        async with aclosing(_chat_events(session_id, message)) as events:
+            async for event in events:
+                await websocket.send_json(event)
+    finally:
+        release()
+
+@app.websocket("/api/chat/stream")
+async def chat_stream_websocket(websocket: WebSocket):
+    """
+    WebSocket 流式对话：客户端发送 {"message", "sessionId"}，服务端推送与 SSE 相同的事件；
+    对话进行中收到 {"type": "cancel"}、新消息或连接断开时取消当前查询；
+    处理出错时推送 error 事件并以 1011 关闭连接
+    """
+    await websocket.accept()
+    pending = None
+    try:
+        while True:
+            data = pending if pending is not None else await websocket.receive_json()
+            pending = None
+            if data.get("type") == "cancel":
+                continue
+            payload = ChatRequest(**data)
+            session_id = payload.sessionId or session_manager.create_session()
+
+            stream = asyncio.create_task(_forward_events(websocket, session_id, payload.message))
+            receive = asyncio.create_task(websocket.receive_json())
+            done, _ = await asyncio.wait({stream, receive}, return_when=asyncio.FIRST_COMPLETED)
+            if receive in done:
+                stream.cancel()
+                with suppress(asyncio.CancelledError):
+                    await stream
+                # 断开时抛出 WebSocketDisconnect；新消息在下一轮处理
+                pending = receive.result()
+            else:
+                receive.cancel()
+                with suppress(asyncio.CancelledError):
+                    await receive
+                stream.result()
+    except WebSocketDisconnect:
+        pass
+    except Exception as e:
+        logger.exception("WebSocket chat failed")
+        # 连接可能已经不可用，尽力通知客户端
+        with suppress(Exception):
+            await websocket.send_json({"type": "error", "content": str(e) or type(e).__name__})
+        with suppress(Exception):
+            await websocket.close(code=1011)
+
+@app.get("/api/history/{session_id}", response_model=HistoryResponse)
+async def history_endpoint(
+    session_id: str,
+    limit: int = Query(50, ge=1, le=500),
+    before: int | None = Query(None, ge=0),
+):
+    # 直接读取持久化的会话历史，已结束或不在本进程中的会话同样可以查看；
+    # 用 before=<上一页第一条消息的位置> 向前翻页
+    store = get_history_store()
+    total = await asyncio.to_thread(store.count, session_id)
+    if total == 0:
+        raise HTTPException(status_code=404, detail="会话不存在")
+    messages = await asyncio.to_thread(store.load, session_id, limit=limit, before=before)
+    return HistoryResponse(sessionId=session_id, messages=messages, total=total)
 
-    # 后台任务：可选的文件清理（例如 10 分钟后删除）
-    def _remove_file(path: Path):
+@app.post("/api/speech-to-text", response_model=STTResponse)
+async def speech_to_text_endpoint(
+    sampleRate: int | None = 16000,
+    audioData: UploadFile = File(...),
+):
+    """
+    语音识别：音频在内存中交给本机共享的 ASR 工作进程（见 FractFlow.asr_service），
+    模型只在工作进程中加载一次，并发请求在那里合批推理
+
+    audioData 为 WAV 文件，或 sampleRate 采样率的 16 位单声道 PCM
+    """
+    from FractFlow.asr_service import get_asr_client
+
+    data = await audioData.read()
+    if not data:
+        raise HTTPException(status_code=400, detail="音频为空")
+    audio_format = "wav" if data[:4] == b"RIFF" else "pcm"
+    async with stt_admission.slot():
         try:
-            path.unlink(missing_ok=True)
-        except Exception:
-            pass
+            text = await get_asr_client().atranscribe(data, audio_format, sampleRate or 16000)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        except (RuntimeError, OSError) as e:
+            raise HTTPException(status_code=503, detail=f"语音识别服务不可用: {e}")
+    return STTResponse(text=text)
+
+TTS_VOICES = {
+    "zh-CN": "zh-CN-XiaoyiNeural",
+    "en-US": "en-US-AnaNeural",
+    "ja-JP": "ja-JP-NanamiNeural",
+    "fr-FR": "fr-FR-DeniseNeural",
+    "es-ES": "ca-ES-JoanaNeural",
+    "de-DE": "de-DE-KatjaNeural",
+}
+
+def _tts_params(payload: TTSRequest) -> tuple[str, str, str]:
+    """(音色, 语速, 缓存键)"""
+    voice = TTS_VOICES.get(payload.language, "zh-CN-XiaoyiNeural")
+    rate = payload.rate or "+0%"
+    return voice, rate, tts_cache_key(payload.text, voice, rate)
+
+async def _synthesize(text: str, voice: str, rate: str, key: str):
+    """边合成边产出音频片段，同时写入缓存；合成中断（如客户端断开）时不缓存"""
+    # 使用 edge_tts 直接生成语音，避免依赖 pygame
+    import edge_tts
 
-    background_tasks.add_task(_remove_file, audio_path)
+    writer = tts_cache.writer(key)
+    try:
+        async for chunk in edge_tts.Communicate(text, voice, rate=rate).stream():
+            if chunk["type"] == "audio":
+                writer.write(chunk["data"])
+                yield chunk["data"]
+    except BaseException:
+        writer.discard()
+        raise
+    writer.commit()
+
+async def _synthesize_to_cache(text: str, voice: str, rate: str, key: str) -> None:
+    """在准入名额内合成并写入缓存；排队期间其他请求已缓存的内容不再重复合成"""
+    async with tts_admission.slot():
+        if tts_cache.get(key) is None:
+            async for _ in _synthesize(text, voice, rate, key):
+                pass
 
-    # 构建可访问 URL
-    audio_url = f"/static/audio/{audio_filename}"
-    return TTSResponse(audioUrl=audio_url)
+@app.post("/api/text-to-speech", response_model=TTSResponse)
+async def text_to_speech_endpoint(payload: TTSRequest):
+    voice, rate, key = _tts_params(payload)
+    if tts_cache.get(key) is None:
+        await tts_flights.do(key, lambda: _synthesize_to_cache(payload.text, voice, rate, key))
+
+    # 音频由缓存提供，不会在浏览器取回之前被删除
+    return TTSResponse(audioUrl=f"/api/tts/audio/{key}.mp3")
+
+@app.get("/api/tts/audio/{key}.mp3")
+async def tts_audio_endpoint(key: str):
+    if len(key) != 64 or any(c not in "0123456789abcdef" for c in key):
+        raise HTTPException(status_code=404, detail="音频不存在")
+    path = tts_cache.get(key)
+    if path is None:
+        raise HTTPException(status_code=404, detail="音频不存在或已过期")
+    return FileResponse(path, media_type="audio/mpeg")
+
+@app.post("/api/text-to-speech/stream")
+async def text_to_speech_stream_endpoint(payload: TTSRequest):
+    """边合成边返回 audio/mpeg 字节流；已缓存的内容直接返回文件"""
+    voice, rate, key = _tts_params(payload)
+    path = tts_cache.get(key)
+    if path is not None:
+        return FileResponse(path, media_type="audio/mpeg", headers={"X-TTS-Cache": "hit"})
+
+    release = await tts_admission.acquire()
+    # 排队期间可能已有相同内容合成完毕
+    path = tts_cache.get(key)
+    if path is not None:
+        release()
+        return FileResponse(path, media_type="audio/mpeg", headers={"X-TTS-Cache": "hit"})
+
+    async def audio_stream():
+        async with aclosing(_synthesize(payload.text, voice, rate, key)) as chunks:
+            async for data in chunks:
+                yield data
+
+    return _AdmittedStreamingResponse(
+        audio_stream(),
+        release,
+        media_type="audio/mpeg",
+        headers={"X-TTS-Cache": "miss", "Cache-Control": "no-cache"},
+    )
+
+@app.get("/api/tts/metrics")
+async def tts_metrics():
+    return tts_cache.metrics()
 
 # ---------------------------------------------
 # 健康检查端点
@@ -167,6 +526,25 @@ async def text_to_speech_endpoint(payload: TTSRequest, background_tasks: Backgro
 async def health_check():
     return {"status": "ok"}
 
+@app.get("/api/sessions/metrics")
+async def session_metrics():
+    return await session_manager.metrics()
+
+@app.get("/api/admission/metrics")
+async def admission_metrics():
+    return {
+        "chat": chat_admission.metrics(),
+        "speechToText": stt_admission.metrics(),
+        "textToSpeech": tts_admission.metrics(),
+    }
+
+# ---------------------------------------------
+# 会话回收任务 (startup)
+# ---------------------------------------------
+@app.on_event("startup")
+async def startup_event():
+    session_manager.start()
+
 # ---------------------------------------------
 # 清理任务 (shutdown)
 # ---------------------------------------------
@@ -8,7 +8,8 @@ import asyncio
 import os
 import sys
 import argparse
-from typing import Literal, Optional, Dict, Any
+from contextlib import aclosing
+from typing import Literal, Optional, Dict, Any, AsyncIterator, List
 from enum import Enum
 
 # 确保项目根目录在Python路径中
@@ -30,15 +31,21 @@ class AssistantMode(Enum):
 class HKUSTAIAssistant:
     """HKUST(GZ) AI Assistant 主类"""
     
-    def __init__(self, mode: AssistantMode = AssistantMode.ACADEMIC_QA):
+    def __init__(self, mode: AssistantMode = AssistantMode.ACADEMIC_QA, session_id: Optional[str] = None):
         """
         初始化AI助手
         
         Args:
             mode: 助手模式，默认为学术问答模式
+            session_id: 会话ID，对话历史按会话持久化，传入已有ID时恢复该会话
         """
         self.mode = mode
-        self.agent: Optional[Agent] = None
+        self.session_id = session_id
+        self.agent: Optional[Agent] = None  # 当前模式的Agent
+        # 已启动的各模式Agent：切换模式时直接复用，不再重启工具进程；
+        # 它们共用同一会话ID，对话历史写入同一份记录
+        self.agents: Dict[AssistantMode, Agent] = {}
+        self._starting: Dict[AssistantMode, asyncio.Task] = {}
         self.is_initialized = False
         self.voice_active = False  # 语音模式激活状态
         
@@ -168,53 +175,97 @@ class HKUSTAIAssistant:
 
 请根据用户需求启动相应的手动实时打断助手，为用户提供极致的打断体验。"""
 
+    async def _create_agent(self, mode: AssistantMode) -> Agent:
+        """
+        创建并启动指定模式的Agent
+        
+        Args:
+            mode: 助手模式
+            
+        Returns:
+            已启动的Agent
+        """
+        # 创建配置
+        config = ConfigManager(
+            provider='qwen',
+            custom_system_prompt=self.system_prompts[mode],
+            # 学术问答中的常见问题直接复用新会话的缓存回答
+            response_cache=(mode == AssistantMode.ACADEMIC_QA),
+            # 对话历史写入本地数据库，内存中只保留最近的消息
+            history_store='sqlite'
+        )
+        
+        # 创建Agent（相同会话ID恢复之前的对话）
+        agent = Agent(config=config, name=f"hkust_{mode.value}", session_id=self.session_id)
+        self.session_id = agent.session_id
+        
+        # 根据模式注册相应的语音助手工具
+        # （不同模式注册的同一脚本共用一个工具进程）
+        if mode == AssistantMode.VOICE_INTERACTION:
+            # 默认语音交互模式：只注册默认语音工具
+            agent.add_tool(
+                tool_path="tools/core/realtime_voice_interactive/realtime_voice_interactive_mcp.py",
+                tool_name="realtime_voice_interactive"
+            )
+        elif mode == AssistantMode.NI_VOICE_INTERACTION:
+            # 倪校语音交互模式：同时注册两种工具
+            agent.add_tool(
+                tool_path="tools/core/realtime_voice_interactive/realtime_voice_interactive_mcp.py",
+                tool_name="realtime_voice_interactive"
+            )
+            agent.add_tool(
+                tool_path="tools/core/realtime_voice_interactive/ni_realtime_voice_interactive_mcp.py",
+                tool_name="ni_realtime_voice_interactive"
+            )
+        elif mode == AssistantMode.MANUAL_INTERRUPT:
+            # 手动实时打断模式：注册手动打断工具
+            agent.add_tool(
+                tool_path="tools/core/手动实时打断/手动实时打断_mcp.py",
+                tool_name="manual_interrupt_voice_control"
+            )
+            agent.add_tool(
+                tool_path="tools/core/手动实时打断/手动实时打断_倪校版_mcp.py",
+                tool_name="manual_interrupt_ni_voice_control"
+            )
+        
+        # 启动Agent
+        try:
+            await agent.initialize()
+        except BaseException:
+            await agent.shutdown()
+            raise
+        return agent
+    
+    async def _get_agent(self, mode: AssistantMode) -> Agent:
+        """
+        获取指定模式的Agent，尚未启动时启动并保留
+        
+        同一模式同时只启动一次，并发的请求等待同一个启动过程
+        """
+        if mode in self.agents:
+            return self.agents[mode]
+        task = self._starting.get(mode)
+        if task is None:
+            task = asyncio.ensure_future(self._create_agent(mode))
+            self._starting[mode] = task
+            task.add_done_callback(lambda _: self._starting.pop(mode, None))
+        # 调用方被取消时不中断启动，Agent 仍可供之后的切换使用
+        agent = await asyncio.shield(task)
+        self.agents.setdefault(mode, agent)
+        return self.agents[mode]
+    
     async def initialize(self) -> Dict[str, Any]:
         """
-        初始化助手系统
+        初始化助手系统（当前模式的Agent已启动时直接复用）
         
         Returns:
             初始化结果
         """
         try:
-            # 创建配置
-            config = ConfigManager(
-                provider='qwen',
-                custom_system_prompt=self.system_prompts[self.mode]
-            )
-            
-            # 创建Agent
-            self.agent = Agent(config=config)
-            
-            # 根据模式注册相应的语音助手工具
-            if self.mode == AssistantMode.VOICE_INTERACTION:
-                # 默认语音交互模式：只注册默认语音工具
-                self.agent.add_tool(
-                    tool_path="tools/core/realtime_voice_interactive/realtime_voice_interactive_mcp.py",
-                    tool_name="realtime_voice_interactive"
-                )
-            elif self.mode == AssistantMode.NI_VOICE_INTERACTION:
-                # 倪校语音交互模式：同时注册两种工具
-                self.agent.add_tool(
-                    tool_path="tools/core/realtime_voice_interactive/realtime_voice_interactive_mcp.py",
-                    tool_name="realtime_voice_interactive"
-                )
-                self.agent.add_tool(
-                    tool_path="tools/core/realtime_voice_interactive/ni_realtime_voice_interactive_mcp.py",
-                    tool_name="ni_realtime_voice_interactive"
-                )
-            elif self.mode == AssistantMode.MANUAL_INTERRUPT:
-                # 手动实时打断模式：注册手动打断工具
-                self.agent.add_tool(
-                    tool_path="tools/core/手动实时打断/手动实时打断_mcp.py",
-                    tool_name="manual_interrupt_voice_control"
-                )
-                self.agent.add_tool(
-                    tool_path="tools/core/手动实时打断/手动实时打断_倪校版_mcp.py",
-                    tool_name="manual_interrupt_ni_voice_control"
-                )
-            
-            # 启动Agent
-            await self.agent.initialize()
+            agent = await self._get_agent(self.mode)
+            # 其他模式的Agent可能在同一会话中新增了对话，先同步
+            await agent.reload_history()
+            self.agent = agent
             self.is_initialized = True
             
             return {
@@ -230,6 +281,29 @@ class HKUSTAIAssistant:
                 "message": "助手初始化失败"
             }
     
+    async def prewarm(self, modes: Optional[List[AssistantMode]] = None) -> Dict[str, Any]:
+        """
+        提前启动其他模式的Agent，之后切换到这些模式只需毫秒级时间
+        
+        Args:
+            modes: 要预热的模式列表，默认为全部模式
+            
+        Returns:
+            预热结果，failed 中为启动失败的模式及原因
+        """
+        modes = [mode for mode in (modes or list(AssistantMode)) if mode not in self.agents]
+        results = await asyncio.gather(*(self._get_agent(mode) for mode in modes), return_exceptions=True)
+        failed = {
+            mode.value: str(result)
+            for mode, result in zip(modes, results)
+            if isinstance(result, BaseException)
+        }
+        return {
+            "success": not failed,
+            "warm_modes": [mode.value for mode in self.agents],
+            "failed": failed
+        }
+    
     async def activate_voice_mode(self) -> Dict[str, Any]:
         """
         在当前会话中激活语音模式
@@ -370,6 +444,33 @@ class HKUSTAIAssistant:
         except Exception as e:
             return f"❌ 处理查询时出现错误: {str(e)}"
     
+    async def stream_query(self, query: str, heartbeat: Optional[float] = None) -> AsyncIterator[Dict[str, Any]]:
+        """
+        处理用户查询并逐步返回进度事件（模型输出片段、工具开始/结束、最终回复）
+        
+        提前关闭迭代器（如客户端断开）会取消正在进行的查询及其工具调用
+        
+        Args:
+            query: 用户查询内容
+            heartbeat: 无事件时每隔多少秒产生一个 heartbeat 事件
+            
+        Yields:
+            事件字典，最后一个为 {'type': 'final', 'content': 回复}
+        """
+        # 未初始化或语音开关指令不经过模型流式输出
+        if not self.is_initialized or not self.agent or query.lower() in ['voice', '语音模式', 'voice on', '启动语音', '开始语音'] + ['voice off', '关闭语音', '文本模式', 'text mode']:
+            yield {"type": "final", "content": await self.process_query(query)}
+            return
+        
+        try:
+            async with aclosing(self.agent.stream_query(query, heartbeat=heartbeat)) as stream:
+                async for event in stream:
+                    if event["type"] == "final" and self.voice_active:
+                        event["content"] += "\n\n🎤 [语音模式已激活 | 输入 'voice off' 关闭]"
+                    yield event
+        except Exception as e:
+            yield {"type": "error", "content": f"❌ 处理查询时出现错误: {str(e)}"}
+    
     async def switch_mode(self, new_mode: AssistantMode) -> Dict[str, Any]:
         """
         切换助手模式
@@ -386,19 +487,15 @@ class HKUSTAIAssistant:
                 "message": f"已经处于 {new_mode.value} 模式"
             }
         
-        # 关闭当前Agent
-        if self.is_initialized and self.agent:
-            await self.agent.shutdown()
-        
-        # 切换到新模式
+        # 切换到新模式：当前Agent保持运行，新模式的Agent已启动时直接复用
+        previous_mode = self.mode
         self.mode = new_mode
-        self.is_initialized = False
-        
-        # 重新初始化
         result = await self.initialize()
         
         if result["success"]:
             result["message"] = f"已切换到 {new_mode.value} 模式"
+        else:
+            self.mode = previous_mode
         
         return result
     
@@ -410,9 +507,14 @@ class HKUSTAIAssistant:
             关闭结果
         """
         try:
-            if self.is_initialized and self.agent:
-                await self.agent.shutdown()
-                self.is_initialized = False
+            for task in list(self._starting.values()):
+                task.cancel()
+            agents = list(self.agents.values())
+            self.agents.clear()
+            for agent in agents:
+                await agent.shutdown()
+            self.agent = None
+            self.is_initialized = False
                 
             return {
                 "success": True,
@@ -425,6 +527,21 @@ class HKUSTAIAssistant:
                 "message": "关闭系统时出现错误"
             }
     
+    def get_history(self, limit: int = 50, before: Optional[int] = None) -> list:
+        """
+        获取会话历史（不含系统提示），可分页读取更早的消息
+        
+        Args:
+            limit: 最多返回的消息数（最近的消息）
+            before: 只返回该位置之前的消息
+            
+        Returns:
+            按时间顺序排列的消息列表
+        """
+        if not self.agent:
+            return []
+        return self.agent.get_history(limit=limit, before=before)
+    
     def get_status(self) -> Dict[str, Any]:
         """
         获取助手状态
@@ -435,6 +552,7 @@ class HKUSTAIAssistant:
         return {
             "mode": self.mode.value,
             "initialized": self.is_initialized,
+            "warm_modes": [mode.value for mode in self.agents],
             "available_modes": [mode.value for mode in AssistantMode]
         }
 
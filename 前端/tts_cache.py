@@ -0,0 +1,163 @@
+"""
+语音合成结果的磁盘缓存
+
+按 (文本, 音色, 语速) 的哈希保存合成好的音频，问候语、固定回答等重复内容直接从磁盘返回。
+写入先落到临时文件，完整合成后才原子地改名为缓存条目，中途断开的合成不会留下残缺文件；
+总大小超过上限时按最近最少使用（文件修改时间）删除。
+"""
+
+from __future__ import annotations
+
+import os
+import time
+import hashlib
+import tempfile
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+DEFAULT_TTS_CACHE_DIR = os.path.join("~", ".cache", "fractflow", "tts")
+
+def tts_cache_key(text: str, voice: str, rate: str) -> str:
+    """缓存键：文本、音色和语速的 SHA-256"""
+    payload = "\0".join((voice, rate, text)).encode("utf-8")
+    return hashlib.sha256(payload).hexdigest()
+
+class TTSCache:
+    """按内容寻址、有大小上限的 LRU 音频缓存"""
+
+    def __init__(self, directory: Optional[str] = None, max_bytes: int = 512 * 1024 ** 2, suffix: str = ".mp3"):
+        """
+        Args:
+            directory: 缓存目录，默认 ~/.cache/fractflow/tts
+            max_bytes: 缓存总大小上限（字节），0 表示不限制
+            suffix: 音频文件扩展名
+        """
+        self.directory = Path(os.path.expanduser(directory or DEFAULT_TTS_CACHE_DIR))
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.suffix = suffix
+        self._lock = threading.Lock()
+        # 条目数和总大小在首次需要时扫描一次目录，之后随写入和淘汰更新
+        self._size: Optional[int] = None
+        self._count = 0
+        self.stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+        self._remove_stale_parts()
+
+    def _remove_stale_parts(self, max_age: float = 3600.0) -> None:
+        """删除进程异常退出时遗留的未完成写入"""
+        now = time.time()
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".part"):
+                try:
+                    if now - entry.stat().st_mtime > max_age:
+                        os.unlink(entry.path)
+                except OSError:
+                    pass
+
+    def path(self, key: str) -> Path:
+        return self.directory / f"{key}{self.suffix}"
+
+    def get(self, key: str) -> Optional[Path]:
+        """
+        查找缓存条目并记录命中
+
+        Returns:
+            音频文件路径，未缓存时为 None
+        """
+        path = self.path(key)
+        try:
+            os.utime(path)  # 记录最近使用时间
+        except OSError:
+            self.stats["misses"] += 1
+            return None
+        self.stats["hits"] += 1
+        return path
+
+    def writer(self, key: str) -> "TTSCacheWriter":
+        """创建一个边合成边写入的缓存写入器"""
+        return TTSCacheWriter(self, key)
+
+    def _commit(self, key: str, temp_path: str) -> Path:
+        path = self.path(key)
+        size = os.path.getsize(temp_path)
+        with self._lock:
+            self._load_totals()
+            replaced = path.stat().st_size if path.exists() else None
+            os.replace(temp_path, path)
+            self._size += size - (replaced or 0)
+            self._count += replaced is None
+            self.stats["stores"] += 1
+        self._evict()
+        return path
+
+    def _entries(self):
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(self.suffix) and entry.is_file():
+                yield entry
+
+    def _load_totals(self) -> None:
+        """首次使用时统计已有条目（调用方持有锁）"""
+        if self._size is None:
+            sizes = [entry.stat().st_size for entry in self._entries()]
+            self._size, self._count = sum(sizes), len(sizes)
+
+    def _evict(self) -> None:
+        """超出大小上限时删除最久未使用的条目"""
+        if not self.max_bytes:
+            return
+        with self._lock:
+            self._load_totals()
+            if self._size <= self.max_bytes:
+                return
+            entries = sorted(self._entries(), key=lambda entry: entry.stat().st_mtime)
+            for entry in entries:
+                if self._size <= self.max_bytes:
+                    break
+                try:
+                    size = entry.stat().st_size
+                    os.unlink(entry.path)
+                except OSError:
+                    continue
+                self._size -= size
+                self._count -= 1
+                self.stats["evictions"] += 1
+
+    def metrics(self) -> Dict[str, Any]:
+        """命中率、条目数和占用空间"""
+        with self._lock:
+            self._load_totals()
+            entries, size = self._count, self._size
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {
+            "entries": entries,
+            "bytes": size,
+            "maxBytes": self.max_bytes,
+            "hitRate": round(self.stats["hits"] / lookups, 3) if lookups else 0.0,
+            **self.stats,
+        }
+
+class TTSCacheWriter:
+    """把流式合成的音频写入临时文件，完整结束后才加入缓存"""
+
+    def __init__(self, cache: TTSCache, key: str):
+        self.cache = cache
+        self.key = key
+        fd, self.temp_path = tempfile.mkstemp(dir=cache.directory, suffix=".part")
+        self._file = os.fdopen(fd, "wb")
+
+    def write(self, data: bytes) -> None:
+        self._file.write(data)
+
+    def commit(self) -> Path:
+        """合成完成：加入缓存并返回缓存文件路径"""
+        self._file.close()
+        return self.cache._commit(self.key, self.temp_path)
+
+    def discard(self) -> None:
+        """合成中断：丢弃残缺的音频"""
+        self._file.close()
+        try:
+            os.unlink(self.temp_path)
+        except OSError:
+            pass